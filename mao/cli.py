@@ -59,6 +59,8 @@ from mao.cli_feedback import register_feedback_commands
 from mao.cli_sessions import register_session_commands
 from mao.cli_shell_completion import register_completion_command
 from mao.cli_sandbox import register_sandbox_commands
+from mao.cli_queue import register_queue_commands
+from mao.cli_gc import register_gc_command
 
 register_start_command(main)
 register_project_commands(main)
@@ -68,6 +70,8 @@ register_feedback_commands(main)
 register_session_commands(main)
 register_completion_command(main)
 register_sandbox_commands(main)
+register_queue_commands(main)
+register_gc_command(main)
 
 
 @main.command()
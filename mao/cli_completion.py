@@ -130,10 +130,10 @@ def complete_session_ids(ctx, param, incomplete):
 
         # セッション一覧を取得
         temp_manager = SessionManager(project_path=project_path)
-        sessions = temp_manager.get_all_sessions()
+        sessions = temp_manager.get_all_sessions(limit=20)  # 最新20件
 
         candidates = []
-        for session_meta in sessions[:20]:  # 最新20件
+        for session_meta in sessions:
             session_id = session_meta.get("session_id", "")
             title = session_meta.get("title", "")
             message_count = session_meta.get("message_count", 0)
@@ -227,7 +227,8 @@ def register_improve_command(feedback_group: click.Group):
         app = InteractiveDashboard(
             project_path=feedback_worktree,
             config=config,
-            use_redis=False,
+            use_redis=config.state.backend == "redis",
+            redis_url=config.redis.url,
             initial_prompt=prompt,
             initial_model=model_id,
             feedback_branch=branch_name,
@@ -0,0 +1,84 @@
+"""
+CLI gc command - Compress old sessions, logs and debug dumps
+"""
+from pathlib import Path
+from typing import Optional
+
+import click
+from rich.console import Console
+
+console = Console()
+
+
+def _format_bytes(size: int) -> str:
+    """バイト数を読みやすい単位に変換"""
+    if abs(size) < 1024:
+        return f"{size} B"
+    value = size / 1024
+    for unit in ("KB", "MB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+def register_gc_command(main_group: click.Group):
+    """Register gc command to main CLI group"""
+
+    @main_group.command("gc")
+    @click.option("--project-dir", default=".", help="Project directory")
+    @click.option("--dry-run", is_flag=True, help="Only report what would be compressed")
+    @click.option(
+        "--older-than",
+        type=float,
+        default=None,
+        help="Compress everything not modified for this many days (overrides config)",
+    )
+    def gc(project_dir: str, dry_run: bool, older_than: Optional[float]):
+        """Compress old sessions, logs and debug dumps
+
+        Compressed files are still readable by mao session show and the dashboard.
+        """
+        from rich.table import Table
+        from mao.orchestrator.cold_storage import DAY, ColdStorage
+        from mao.orchestrator.project_loader import ProjectConfig, ProjectLoader
+
+        project_path = Path(project_dir).resolve()
+        try:
+            config = ProjectLoader(project_path).load()
+        except FileNotFoundError:
+            config = ProjectConfig(project_name=project_path.name)
+
+        options = config.cold_storage.model_dump()
+        if older_than is not None:
+            for key in ("session_max_age", "log_max_age", "debug_max_age"):
+                options[key] = older_than * DAY
+
+        storage = ColdStorage(project_path, **options)
+        report = storage.collect(dry_run=dry_run)
+
+        if not report.files:
+            console.print("[green]✓ 圧縮対象のファイルはありません[/green]")
+            return
+
+        title = "🗜️  圧縮対象 (dry run)" if dry_run else f"🗜️  圧縮しました ({storage.compression})"
+        console.print(f"\n[bold cyan]{title}[/bold cyan]\n")
+
+        table = Table(show_header=True, header_style="bold magenta")
+        table.add_column("対象", width=10)
+        table.add_column("ファイル", justify="right", width=8)
+        table.add_column("圧縮前", justify="right", width=10)
+        table.add_column("圧縮後", justify="right", width=10)
+        table.add_column("削減", justify="right", width=10)
+
+        for tier in report.tiers + [report]:
+            is_total = tier is report
+            table.add_row(
+                "[bold]合計[/bold]" if is_total else tier.name,
+                str(tier.files),
+                _format_bytes(tier.bytes_before),
+                _format_bytes(tier.bytes_after),
+                _format_bytes(tier.reclaimed),
+            )
+
+        console.print(table)
@@ -110,6 +110,22 @@ agents:
 # State management
 state:
   backend: sqlite  # sqlite or redis
+  flush_interval: 0.5  # seconds between batched state writes (0 = write every update)
+  metrics_raw_retention: 3600  # raw agent metric samples (seconds); older data stays as rollups
+
+# Message queue
+queue:
+  backend: log  # log, yaml or redis
+  codec: json  # json or msgpack (log backend)
+
+# Redis (used when state.backend or queue.backend is redis)
+redis:
+  url: redis://localhost:6379/0
+
+# Compression of old sessions and logs (mao gc)
+cold_storage:
+  compression: zstd  # zstd (needs the zstandard package, otherwise gzip) or gzip
+  session_max_age: 2592000  # seconds (30 days); null = never compress
 
 # Logging
 logging:
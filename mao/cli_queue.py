@@ -0,0 +1,63 @@
+"""
+CLI queue commands - Inspect and export the message/task queue
+"""
+import asyncio
+from pathlib import Path
+
+import click
+from rich.console import Console
+
+console = Console()
+
+
+def register_queue_commands(main_group: click.Group):
+    """Register queue group and commands to main CLI group"""
+
+    @main_group.group()
+    def queue():
+        """Inspect the message and task queue"""
+        pass
+
+    @queue.command("export")
+    @click.option("--project-dir", default=".", help="Project directory")
+    @click.option(
+        "--output", "-o",
+        default=None,
+        help="Output directory (default: .mao/queue/export)",
+    )
+    @click.option(
+        "--format", "fmt",
+        type=click.Choice(["yaml", "json"]),
+        default="yaml",
+        help="Output format",
+    )
+    def export_queue(project_dir: str, output: str, fmt: str):
+        """Export queued messages, tasks and results as readable files"""
+        from mao.orchestrator.codec import export_documents, get_codec
+        from mao.orchestrator.message_queue import MessageQueue
+        from mao.orchestrator.project_loader import ProjectConfig, ProjectLoader
+
+        project_path = Path(project_dir).resolve()
+        try:
+            config = ProjectLoader(project_path).load()
+        except FileNotFoundError:
+            config = ProjectConfig(project_name=project_path.name)
+
+        queue_dir = project_path / ".mao" / "queue"
+        output_dir = Path(output).resolve() if output else queue_dir / "export"
+        codec = get_codec(fmt)
+
+        message_queue = MessageQueue(
+            project_path=project_path,
+            backend=config.queue.backend,
+            store_options=config.queue.store_options(config.redis),
+        )
+        counts = {
+            "messages": asyncio.run(message_queue.export(output_dir / "messages", codec=fmt)),
+        }
+        for name in ("tasks", "results", "reports"):
+            counts[name] = export_documents(queue_dir / name, output_dir / name, codec)
+
+        console.print(f"[green]✓ Queue exported to {output_dir}[/green]")
+        for name, count in counts.items():
+            console.print(f"  {name}: {count}")
@@ -1,6 +1,7 @@
 """
 CLI session commands - Manage chat sessions
 """
+import asyncio
 from pathlib import Path
 
 import click
@@ -30,13 +31,13 @@ def register_session_commands(main_group: click.Group):
 
         project_path = Path(project_dir).resolve()
         temp_manager = SessionManager(project_path=project_path)
-        sessions = temp_manager.get_all_sessions()
+        sessions = temp_manager.get_all_sessions(limit=limit)
 
         if not sessions:
             console.print("[yellow]📝 セッションが見つかりません[/yellow]")
             return
 
-        console.print(f"\n[bold cyan]📚 セッション一覧 (最新{min(limit, len(sessions))}件)[/bold cyan]\n")
+        console.print(f"\n[bold cyan]📚 セッション一覧 (最新{len(sessions)}件)[/bold cyan]\n")
 
         table = Table(show_header=True, header_style="bold magenta")
         table.add_column("セッションID", width=20)
@@ -45,7 +46,7 @@ def register_session_commands(main_group: click.Group):
         table.add_column("最終更新", width=16)
         table.add_column("作成日時", width=16)
 
-        for session_meta in sessions[:limit]:
+        for session_meta in sessions:
             session_id = session_meta.get("session_id", "N/A")
             title = session_meta.get("title", "")
             message_count = session_meta.get("message_count", 0)
@@ -78,7 +79,7 @@ def register_session_commands(main_group: click.Group):
             )
 
         console.print(table)
-        console.print(f"\n[dim]Total: {len(sessions)} sessions[/dim]")
+        console.print(f"\n[dim]Total: {temp_manager.get_session_count()} sessions[/dim]")
 
     @session.command("rename")
     @click.argument("session_id", shell_complete=cli_completion.complete_session_ids)
@@ -90,13 +91,7 @@ def register_session_commands(main_group: click.Group):
 
         project_path = Path(project_dir).resolve()
         temp_manager = SessionManager(project_path=project_path)
-        sessions = temp_manager.get_all_sessions()
-
-        found = None
-        for s in sessions:
-            if s["session_id"].endswith(session_id):
-                found = s
-                break
+        found = temp_manager.find_session(session_id)
 
         if not found:
             console.print(f"[red]✗ セッションが見つかりません: {session_id}[/red]")
@@ -122,13 +117,7 @@ def register_session_commands(main_group: click.Group):
 
         project_path = Path(project_dir).resolve()
         temp_manager = SessionManager(project_path=project_path)
-        sessions = temp_manager.get_all_sessions()
-
-        found = None
-        for s in sessions:
-            if s["session_id"].endswith(session_id):
-                found = s
-                break
+        found = temp_manager.find_session(session_id)
 
         if not found:
             console.print(f"[red]✗ セッションが見つかりません: {session_id}[/red]")
@@ -166,13 +155,7 @@ def register_session_commands(main_group: click.Group):
 
         project_path = Path(project_dir).resolve()
         temp_manager = SessionManager(project_path=project_path)
-        sessions = temp_manager.get_all_sessions()
-
-        found = None
-        for s in sessions:
-            if s["session_id"].endswith(session_id):
-                found = s
-                break
+        found = temp_manager.find_session(session_id)
 
         if not found:
             console.print(f"[red]✗ セッションが見つかりません: {session_id}[/red]")
@@ -191,7 +174,7 @@ def register_session_commands(main_group: click.Group):
         console.print(f"[bold]タイトル:[/bold] {title}")
         console.print(f"[bold]メッセージ数:[/bold] {stats['total_messages']}")
         console.print(f"  - User: {stats['user_messages']}")
-        console.print(f"  - Manager: {stats['manager_messages']}")
+        console.print(f"  - CTO: {stats['cto_messages']}")
         console.print(f"  - System: {stats['system_messages']}")
 
         try:
@@ -229,3 +212,139 @@ def register_session_commands(main_group: click.Group):
                     subtitle=msg.timestamp[:19] if len(msg.timestamp) >= 19 else msg.timestamp,
                     border_style="cyan" if msg.role == "user" else "green" if msg.role == "cto" else "dim",
                 ))
+
+    @session.command("search")
+    @click.argument("query")
+    @click.option("--project-dir", default=".", help="Project directory")
+    @click.option("--role", "-r", default=None, help="Filter by role (user, cto, system)")
+    @click.option("--limit", "-n", default=20, help="Number of results to show")
+    def search_sessions(query: str, project_dir: str, role: str, limit: int):
+        """Search chat history across all sessions
+
+        Wrap words in double quotes to search for a phrase.
+        """
+        from rich.markup import escape
+        from rich.table import Table
+        from mao.orchestrator.session_manager import SessionManager
+
+        project_path = Path(project_dir).resolve()
+        temp_manager = SessionManager(project_path=project_path)
+        # 一致箇所の目印（Rich のマークアップと衝突しない制御文字）
+        hits = temp_manager.search_history(query, role=role, limit=limit, highlight=("\x02", "\x03"))
+
+        if not hits:
+            console.print(f"[yellow]🔍 見つかりませんでした: {query}[/yellow]")
+            return
+
+        console.print(f"\n[bold cyan]🔍 検索結果 (上位{len(hits)}件)[/bold cyan]\n")
+
+        table = Table(show_header=True, header_style="bold magenta")
+        table.add_column("セッションID", width=12)
+        table.add_column("タイトル", width=20)
+        table.add_column("ロール", width=6)
+        table.add_column("日時", width=16)
+        table.add_column("内容")
+
+        for hit in hits:
+            snippet = (
+                escape(hit["snippet"].replace("\n", " "))
+                .replace("\x02", "[bold yellow]")
+                .replace("\x03", "[/bold yellow]")
+            )
+            table.add_row(
+                hit["session_id"][-12:],
+                escape(hit["title"] or "") or "[dim](タイトルなし)[/dim]",
+                hit["role"],
+                hit["timestamp"][:16].replace("T", " "),
+                snippet,
+            )
+
+        console.print(table)
+
+    @session.command("reindex")
+    @click.option("--project-dir", default=".", help="Project directory")
+    def reindex_sessions(project_dir: str):
+        """Rebuild the session catalog and search index from session directories"""
+        from mao.orchestrator.session_manager import SessionManager
+
+        project_path = Path(project_dir).resolve()
+        temp_manager = SessionManager(project_path=project_path)
+        count = temp_manager.rebuild_catalog()
+        temp_manager.close()
+
+        console.print(f"[green]✓ セッションカタログを再構築しました ({count}件)[/green]")
+
+    @session.command("metrics")
+    @click.argument(
+        "session_id", required=False, shell_complete=cli_completion.complete_session_ids
+    )
+    @click.option("--project-dir", default=".", help="Project directory")
+    @click.option("--window", "-w", default=60, help="Window in minutes")
+    def session_metrics(session_id: str, project_dir: str, window: int):
+        """Show agent throughput, cost burn rate and time in each status"""
+        from rich.table import Table
+        from mao.orchestrator.session_manager import SessionManager
+        from mao.orchestrator.state_manager import StateManager
+        from mao.orchestrator.agent_metrics import sparkline
+
+        project_path = Path(project_dir).resolve()
+        temp_manager = SessionManager(project_path=project_path)
+
+        if session_id:
+            meta = temp_manager.find_session(session_id)
+            found = meta["session_id"] if meta else None
+        else:
+            found = temp_manager.get_latest_session_id()
+
+        if not found:
+            console.print(f"[red]✗ セッションが見つかりません: {session_id or '(最新)'}[/red]")
+            return
+
+        state_manager = StateManager(project_path=project_path, session_id=found)
+        seconds = window * 60
+
+        async def collect():
+            agents = await state_manager.get_metric_agents()
+            if not agents:
+                return []
+            # 最後の行は全エージェントの合計
+            return [
+                (agent_id, await state_manager.get_metrics(
+                    window=seconds, rate_window=seconds, agent_id=agent_id
+                ))
+                for agent_id in agents + [None]
+            ]
+
+        try:
+            rows = asyncio.run(collect())
+            if not rows:
+                console.print("[yellow]📝 メトリクスが記録されていません[/yellow]")
+                return
+
+            console.print(f"\n[bold cyan]📈 エージェントメトリクス (直近{window}分)[/bold cyan]\n")
+
+            table = Table(show_header=True, header_style="bold magenta")
+            table.add_column("エージェント", width=14)
+            table.add_column("トークン/分", justify="right", width=12)
+            table.add_column("コスト/時", justify="right", width=10)
+            table.add_column("推移", width=32)
+            table.add_column("ステータス滞在時間", width=40)
+
+            for agent_id, metrics in rows:
+                durations = ", ".join(
+                    f"{status} {value / 60:.1f}分"
+                    for status, value in sorted(
+                        metrics["status_seconds"].items(), key=lambda item: -item[1]
+                    )
+                )
+                table.add_row(
+                    agent_id or "[bold]合計[/bold]",
+                    f"{metrics['tokens_per_minute']:,.0f}",
+                    f"${metrics['cost_per_hour']:.2f}",
+                    sparkline(metrics["token_series"][-32:]),
+                    durations,
+                )
+
+            console.print(table)
+        finally:
+            state_manager.close()
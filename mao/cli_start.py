@@ -35,7 +35,7 @@ def _select_session(project_path: Path) -> tuple[Optional[str], Optional[str]]:
 
     # ダミーセッションマネージャーで全セッションを取得
     temp_manager = SessionManager(project_path=project_path)
-    sessions = temp_manager.get_all_sessions()
+    sessions = temp_manager.get_all_sessions(limit=10)
 
     if not sessions:
         console.print("[yellow]📝 セッションが見つかりません。新規セッションを作成します。[/yellow]")
@@ -51,7 +51,7 @@ def _select_session(project_path: Path) -> tuple[Optional[str], Optional[str]]:
     table.add_column("メッセージ", justify="right", width=10)
     table.add_column("最終更新", width=16)
 
-    for idx, session_meta in enumerate(sessions[:10], 1):
+    for idx, session_meta in enumerate(sessions, 1):
         session_id = session_meta.get("session_id", "N/A")
         title = session_meta.get("title", "")
         message_count = session_meta.get("message_count", 0)
@@ -250,6 +250,7 @@ def register_start_command(main_group: click.Group):
                 grid_width=grid_config.width,
                 grid_height=grid_config.height,
                 num_agents=num_agents,
+                snapshot_ttl=config.defaults.tmux.snapshot_ttl,
             )
         else:
             tmux_manager = TmuxManager(
@@ -331,8 +332,8 @@ def register_start_command(main_group: click.Group):
             app = InteractiveDashboard(
                 project_path=project_path,
                 config=config,
-                use_redis=False,
-                redis_url=None,
+                use_redis=config.state.backend == "redis",
+                redis_url=config.redis.url,
                 tmux_manager=tmux_manager,
                 initial_prompt=initial_prompt,
                 initial_role="general",
@@ -348,6 +349,7 @@ def register_start_command(main_group: click.Group):
             except KeyboardInterrupt:
                 console.print("\n[yellow]Dashboard closed[/yellow]")
             finally:
+                tmux_manager.close()
                 cleanup = console.input("\n[yellow]Destroy tmux session?[/yellow] (y/N): ")
                 if cleanup.lower() == "y":
                     tmux_manager.destroy_session()
@@ -424,8 +426,8 @@ def register_start_command(main_group: click.Group):
         app = InteractiveDashboard(
             project_path=project_path,
             config=config,
-            use_redis=False,
-            redis_url=None,
+            use_redis=config.state.backend == "redis",
+            redis_url=config.redis.url,
             tmux_manager=tmux_manager,
             initial_prompt=None,
             initial_role="general",
@@ -463,24 +465,25 @@ def _build_cto_prompt(project_path: Path, config, num_agents: int) -> str:
 
 - プロジェクトパス: {project_path}
 - 利用可能なエージェントペイン数: {num_agents}
-- エージェント通信: YAMLキュー経由 (.mao/queue/)
+- エージェント通信: JSONキュー経由 (.mao/queue/)
 
 ## エージェント起動方法
 
-エージェントを起動するには、以下のようなタスクYAMLを作成してください:
+エージェントを起動するには、以下のようなタスクJSONを `.mao/queue/tasks/agent-1.json` に作成してください:
 
-```yaml
-# .mao/queue/tasks/agent-1.yaml
-task_id: task-001
-role: agent-1
-prompt: |
-  タスクの詳細な説明...
-model: sonnet
-status: ASSIGNED
+```json
+{{
+  "task_id": "task-001",
+  "role": "agent-1",
+  "prompt": "タスクの詳細な説明...",
+  "model": "sonnet",
+  "status": "ASSIGNED"
+}}
 ```
 
 エージェントはこのファイルを検知して処理を開始します。
-完了後、結果は `.mao/queue/results/agent-1.yaml` に出力されます。
+完了後、結果は `.mao/queue/reports/<エージェントID>.json`（例: `.mao/queue/reports/agent-1.json`）に出力されます。
+（`.yaml` のファイルも読み込まれます。`mao queue export` で読みやすいYAMLに書き出せます）
 
 ## 重要事項
 
@@ -0,0 +1,441 @@
+"""
+Agent metrics - エージェントの tokens_used / cost / status の時系列
+
+StateManager が保持するのは最新の状態のみなので、スループット（トークン/分）、
+コスト消費率、ステータスごとの滞在時間は分からない。AgentMetricsStore は状態の
+書き込みごとにサンプルを追記し、同じトランザクションで 1分 / 1時間 の
+ロールアップを更新する（ダウンサンプリング）。
+
+- agent_metric_samples: 生サンプル（累積の tokens_used / cost と status）
+- agent_metric_rollups: (解像度, バケット, status) ごとのトークン増分・コスト増分・滞在秒数
+
+サンプル間の経過時間は前のサンプルの status に計上し、増分は新しいサンプルの
+バケットに計上する。保持期間（MetricsRetention）を過ぎた行は compact() で削除する。
+クエリ（rates / series / status_durations）はロールアップのみを読むため、
+生サンプルの量に依存しない。
+"""
+import logging
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# ロールアップの解像度（秒）
+MINUTE = 60
+HOUR = 3600
+RESOLUTIONS = (MINUTE, HOUR)
+
+SPARKLINE_CHARS = "▁▂▃▄▅▆▇█"
+
+
+@dataclass
+class MetricsRetention:
+    """保持期間（秒）"""
+    raw_seconds: float = HOUR
+    minute_seconds: float = 24 * HOUR
+    hour_seconds: float = 30 * 24 * HOUR
+
+    def for_resolution(self, resolution: int) -> float:
+        """ロールアップの解像度に対応する保持期間"""
+        return self.minute_seconds if resolution == MINUTE else self.hour_seconds
+
+
+@dataclass
+class MetricSample:
+    """状態の書き込み時点のサンプル（tokens_used / cost は累積値）"""
+    agent_id: str
+    ts: float
+    tokens_used: int
+    cost: float
+    status: str
+
+
+def sparkline(values: List[float]) -> str:
+    """値のリストをスパークライン文字列に変換"""
+    if not values:
+        return ""
+    peak = max(values)
+    if peak <= 0:
+        return SPARKLINE_CHARS[0] * len(values)
+    last = len(SPARKLINE_CHARS) - 1
+    return "".join(
+        SPARKLINE_CHARS[min(last, int(value / peak * last + 0.5))] if value > 0
+        else SPARKLINE_CHARS[0]
+        for value in values
+    )
+
+
+def _bucket(ts: float, resolution: int) -> int:
+    return int(ts // resolution) * resolution
+
+
+class AgentMetricsStore:
+    """エージェントメトリクスの時系列ストア（SQLite）
+
+    接続は StateManager と共有し、書き込みは呼び出し側のトランザクション内で行う。
+    クエリは conn で別の接続（AsyncDatabase の読み込み用接続）を指定できる。
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        retention: Optional[MetricsRetention] = None,
+        logger: Optional[logging.Logger] = None,
+        clock=time.time,
+        compact_interval: float = 60.0,
+    ):
+        """
+        Args:
+            conn: SQLite 接続（agent_states.db）
+            retention: 保持期間
+            logger: ロガー
+            clock: 現在時刻（UNIX 時刻）
+            compact_interval: 書き込み時に保持期間切れの行を削除する間隔（秒）
+        """
+        self.conn = conn
+        self.retention = retention or MetricsRetention()
+        self.logger = logger or logging.getLogger(__name__)
+        self._clock = clock
+        self.compact_interval = compact_interval
+        self._last_compact = 0.0
+        # (session_id, agent_id) -> コミット済みの最後のサンプル（増分と滞在時間の計算用）
+        self._last: Dict[Tuple[str, str], MetricSample] = {}
+        # 未コミットのトランザクションで記録したサンプル（コミット後に _last に反映）
+        self._uncommitted: Dict[Tuple[str, str], MetricSample] = {}
+        self._loaded_sessions: set = set()
+        # 書き込みスレッドと読み込みスレッドの _load_last を直列化
+        self._load_lock = threading.Lock()
+
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agent_metric_samples (
+                    session_id TEXT NOT NULL,
+                    agent_id TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    tokens_used INTEGER NOT NULL,
+                    cost REAL NOT NULL,
+                    status TEXT NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_metric_samples_agent "
+                "ON agent_metric_samples (session_id, agent_id, ts)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_metric_samples_ts "
+                "ON agent_metric_samples (ts)"
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agent_metric_rollups (
+                    resolution INTEGER NOT NULL,
+                    session_id TEXT NOT NULL,
+                    agent_id TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    tokens INTEGER NOT NULL DEFAULT 0,
+                    cost REAL NOT NULL DEFAULT 0.0,
+                    seconds REAL NOT NULL DEFAULT 0.0,
+                    samples INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (resolution, session_id, bucket, agent_id, status)
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_metric_rollups_bucket "
+                "ON agent_metric_rollups (resolution, bucket)"
+            )
+
+    def _load_last(self, session_id: str, conn: Optional[sqlite3.Connection] = None) -> None:
+        """セッションのエージェントごとの最後のサンプルを読み込む（初回のみ）"""
+        if session_id in self._loaded_sessions:
+            return
+        with self._load_lock:
+            if session_id in self._loaded_sessions:
+                return
+            cursor = (conn or self.conn).execute(
+                """
+                SELECT agent_id, MAX(ts) AS ts, tokens_used, cost, status
+                FROM agent_metric_samples WHERE session_id = ? GROUP BY agent_id
+                """,
+                (session_id,),
+            )
+            for row in cursor:
+                # 書き込み側が先に新しいサンプルを記録していればそちらを残す
+                self._last.setdefault(
+                    (session_id, row[0]), MetricSample(row[0], row[1], row[2], row[3], row[4])
+                )
+            self._loaded_sessions.add(session_id)
+
+    def record_many(self, session_id: str, samples: Iterable[MetricSample]) -> int:
+        """サンプルを追記してロールアップを更新
+
+        呼び出し側のトランザクション内で実行する（コミットしない）。コミットしたら
+        mark_committed()、ロールバックしたら discard_uncommitted() を呼ぶ。それまでは
+        同じトランザクション内の次の記録だけがこのサンプルからの増分を使う。
+
+        Args:
+            session_id: セッションID
+            samples: サンプル（時刻順）
+
+        Returns:
+            追記したサンプル数
+        """
+        samples = list(samples)
+        if not samples:
+            return 0
+        self._load_last(session_id)
+
+        # (resolution, bucket, agent_id, status) -> [tokens, cost, seconds, samples]
+        increments: Dict[Tuple[int, int, str, str], List[float]] = {}
+
+        def add(resolution, bucket, agent_id, status, tokens=0, cost=0.0, seconds=0.0, count=0):
+            entry = increments.setdefault((resolution, bucket, agent_id, status), [0, 0.0, 0.0, 0])
+            entry[0] += tokens
+            entry[1] += cost
+            entry[2] += seconds
+            entry[3] += count
+
+        for sample in samples:
+            key = (session_id, sample.agent_id)
+            previous = self._uncommitted.get(key) or self._last.get(key)
+            tokens, cost = sample.tokens_used, sample.cost
+            if previous is not None:
+                # 累積値が減ったらリセットとみなし、新しい値をそのまま増分にする
+                if sample.tokens_used >= previous.tokens_used:
+                    tokens -= previous.tokens_used
+                if sample.cost >= previous.cost:
+                    cost -= previous.cost
+            for resolution in RESOLUTIONS:
+                add(resolution, _bucket(sample.ts, resolution), sample.agent_id,
+                    sample.status, tokens, cost, count=1)
+                if previous is not None:
+                    for bucket, seconds in self._split(previous.ts, sample.ts, resolution):
+                        add(resolution, bucket, sample.agent_id, previous.status, seconds=seconds)
+            self._uncommitted[key] = sample
+
+        self.conn.executemany(
+            """
+            INSERT INTO agent_metric_samples (session_id, agent_id, ts, tokens_used, cost, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (session_id, s.agent_id, s.ts, s.tokens_used, s.cost, s.status)
+                for s in samples
+            ],
+        )
+        self.conn.executemany(
+            """
+            INSERT INTO agent_metric_rollups
+            (resolution, session_id, agent_id, bucket, status, tokens, cost, seconds, samples)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (resolution, session_id, bucket, agent_id, status) DO UPDATE SET
+                tokens = tokens + excluded.tokens,
+                cost = cost + excluded.cost,
+                seconds = seconds + excluded.seconds,
+                samples = samples + excluded.samples
+            """,
+            [
+                (resolution, session_id, agent_id, bucket, status, *values)
+                for (resolution, bucket, agent_id, status), values in increments.items()
+            ],
+        )
+
+        now = self._clock()
+        if now - self._last_compact >= self.compact_interval:
+            self.compact(now)
+        return len(samples)
+
+    def mark_committed(self) -> None:
+        """record_many() のトランザクションがコミットされた（増分の基準を進める）"""
+        self._last.update(self._uncommitted)
+        self._uncommitted.clear()
+
+    def discard_uncommitted(self) -> None:
+        """record_many() のトランザクションがロールバックされた（再試行で同じ増分を記録する）"""
+        self._uncommitted.clear()
+
+    @staticmethod
+    def _split(start: float, end: float, resolution: int) -> List[Tuple[int, float]]:
+        """[start, end) をバケットごとの秒数に分割"""
+        parts = []
+        cursor = start
+        while cursor < end:
+            bucket = _bucket(cursor, resolution)
+            boundary = min(bucket + resolution, end)
+            parts.append((bucket, boundary - cursor))
+            cursor = boundary
+        return parts
+
+    def compact(self, now: Optional[float] = None) -> None:
+        """保持期間を過ぎた生サンプルとロールアップを削除
+
+        生サンプルはエージェントごとの最新の1件を残す（次のサンプルの増分計算用）。
+        呼び出し側のトランザクション内で実行する。
+        """
+        now = self._clock() if now is None else now
+        self._last_compact = now
+        self.conn.execute(
+            """
+            DELETE FROM agent_metric_samples
+            WHERE ts < ? AND rowid NOT IN (
+                SELECT MAX(rowid) FROM agent_metric_samples GROUP BY session_id, agent_id
+            )
+            """,
+            (now - self.retention.raw_seconds,),
+        )
+        for resolution in RESOLUTIONS:
+            self.conn.execute(
+                "DELETE FROM agent_metric_rollups WHERE resolution = ? AND bucket < ?",
+                (resolution, now - self.retention.for_resolution(resolution)),
+            )
+
+    def _resolution_for(self, window: float) -> int:
+        """期間に使うロールアップの解像度（1分ロールアップが残っていれば1分）"""
+        return MINUTE if window <= self.retention.minute_seconds else HOUR
+
+    def _where(
+        self,
+        session_id: str,
+        resolution: int,
+        since: float,
+        agent_id: Optional[str],
+    ) -> Tuple[str, list]:
+        clause = "resolution = ? AND session_id = ? AND bucket >= ?"
+        params: list = [resolution, session_id, _bucket(since, resolution)]
+        if agent_id is not None:
+            clause += " AND agent_id = ?"
+            params.append(agent_id)
+        return clause, params
+
+    def series(
+        self,
+        session_id: str,
+        metric: str = "tokens",
+        resolution: int = MINUTE,
+        window: float = HOUR,
+        agent_id: Optional[str] = None,
+        now: Optional[float] = None,
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> List[float]:
+        """バケットごとの値（古い順、値のないバケットは 0）
+
+        Args:
+            session_id: セッションID
+            metric: tokens / cost / samples
+            resolution: 解像度（MINUTE / HOUR）
+            window: 期間（秒）
+            agent_id: エージェントID（None は全エージェントの合計）
+            now: 現在時刻
+            conn: クエリに使う接続（省略時は書き込みと同じ接続）
+
+        Returns:
+            window / resolution 個の値
+        """
+        if metric not in ("tokens", "cost", "samples"):
+            raise ValueError(f"Unknown metric: {metric}")
+        now = self._clock() if now is None else now
+        count = max(1, math.ceil(window / resolution))
+        first = _bucket(now, resolution) - (count - 1) * resolution
+
+        clause, params = self._where(session_id, resolution, first, agent_id)
+        cursor = (conn or self.conn).execute(
+            f"SELECT bucket, SUM({metric}) FROM agent_metric_rollups "
+            f"WHERE {clause} GROUP BY bucket",
+            params,
+        )
+        values = [0.0] * count
+        for bucket, value in cursor:
+            index = (bucket - first) // resolution
+            if 0 <= index < count:
+                values[index] = value or 0.0
+        return values
+
+    def rates(
+        self,
+        session_id: str,
+        window: float = 5 * MINUTE,
+        agent_id: Optional[str] = None,
+        now: Optional[float] = None,
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> Dict[str, float]:
+        """期間内の平均スループットとコスト消費率
+
+        Args:
+            session_id: セッションID
+            window: 期間（秒）
+            agent_id: エージェントID（None は全エージェントの合計）
+            now: 現在時刻
+            conn: クエリに使う接続（省略時は書き込みと同じ接続）
+
+        Returns:
+            tokens_per_minute, cost_per_hour
+        """
+        now = self._clock() if now is None else now
+        resolution = self._resolution_for(window)
+        clause, params = self._where(session_id, resolution, now - window, agent_id)
+        tokens, cost = (conn or self.conn).execute(
+            f"SELECT SUM(tokens), SUM(cost) FROM agent_metric_rollups WHERE {clause}",
+            params,
+        ).fetchone()
+        return {
+            "tokens_per_minute": (tokens or 0) * MINUTE / window,
+            "cost_per_hour": (cost or 0.0) * HOUR / window,
+        }
+
+    def status_durations(
+        self,
+        session_id: str,
+        window: float = HOUR,
+        agent_id: Optional[str] = None,
+        now: Optional[float] = None,
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> Dict[str, float]:
+        """期間内のステータスごとの滞在秒数
+
+        最後のサンプルから現在までの時間も、そのサンプルの status に計上する。
+
+        Args:
+            session_id: セッションID
+            window: 期間（秒）
+            agent_id: エージェントID（None は全エージェントの合計）
+            now: 現在時刻
+            conn: クエリに使う接続（省略時は書き込みと同じ接続）
+
+        Returns:
+            status -> 秒数
+        """
+        now = self._clock() if now is None else now
+        resolution = self._resolution_for(window)
+        clause, params = self._where(session_id, resolution, now - window, agent_id)
+        durations: Dict[str, float] = {}
+        cursor = (conn or self.conn).execute(
+            f"SELECT status, SUM(seconds) FROM agent_metric_rollups "
+            f"WHERE {clause} GROUP BY status",
+            params,
+        )
+        for status, seconds in cursor:
+            if seconds:
+                durations[status] = seconds
+
+        self._load_last(session_id, conn)
+        for (session, agent), sample in list(self._last.items()):
+            if session != session_id or (agent_id is not None and agent != agent_id):
+                continue
+            open_seconds = now - max(sample.ts, now - window)
+            if open_seconds > 0:
+                durations[sample.status] = durations.get(sample.status, 0.0) + open_seconds
+        return durations
+
+    def agents(self, session_id: str, conn: Optional[sqlite3.Connection] = None) -> List[str]:
+        """メトリクスのあるエージェントID（ソート済み）"""
+        self._load_last(session_id, conn)
+        return sorted(agent for session, agent in list(self._last) if session == session_id)
@@ -0,0 +1,355 @@
+"""
+Async SQLite access - イベントループをブロックしない SQLite アクセス層
+
+StateManager や DocumentTracker が Textual のイベントループ上で sqlite3 を同期的に
+呼ぶと、遅いディスクやロック待ちで UI が固まる。AsyncDatabase は SQLite への
+アクセスをループの外に出す。
+
+- 書き込み: 専用の書き込みスレッドが1本の接続で順番に実行する（1リクエスト1トランザクション）。
+  リクエストキューは有界で、満杯のときはコルーチンをループの外で待たせる（バックプレッシャー）。
+  結果を待たない書き込み（submit_nowait）は満杯でも待たず、あふれた分をメモリに溜めて順に取り込む
+- 読み込み: 読み込み用接続のプールをスレッドプールで使う（WAL なので書き込みと並行できる）
+- クエリ種別ごとにレイテンシ（キュー待ち + 実行）のヒストグラムを記録する
+"""
+import asyncio
+import bisect
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+# ヒストグラムのバケット上限（ミリ秒）。最後のバケットはそれより大きい値
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+@dataclass
+class LatencyHistogram:
+    """レイテンシのヒストグラム（固定バケット）"""
+    counts: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def record(self, ms: float) -> None:
+        """1回分のレイテンシを記録"""
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> float:
+        """パーセンタイルの近似値（該当バケットの上限、最後のバケットは最大値）"""
+        if self.count == 0:
+            return 0.0
+        threshold = self.count * p / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= threshold:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(LATENCY_BUCKETS_MS[index], self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        """表示用の辞書に変換"""
+        buckets = {
+            f"<={bound}ms": count
+            # 最後のカウントは上限を超えたもの
+            for bound, count in zip(LATENCY_BUCKETS_MS, self.counts[:-1], strict=True)
+            if count
+        }
+        if self.counts[-1]:
+            buckets[f">{LATENCY_BUCKETS_MS[-1]}ms"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "buckets": buckets,
+        }
+
+
+@dataclass
+class _WriteRequest:
+    query_type: str
+    fn: Callable[[sqlite3.Connection], Any]
+    future: Future
+    enqueued_at: float
+
+
+class AsyncDatabase:
+    """書き込みスレッドと読み込み接続プールによる SQLite アクセス
+
+    fn(conn) の形でクエリを渡す。書き込みは書き込みスレッドで1トランザクションとして、
+    読み込みはプールの接続で実行する。コルーチンからは execute() / read() を await し、
+    同期コード（起動時・終了時・CLI）からは submit() / read_sync() を使う。
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        init: Optional[Callable[[sqlite3.Connection], None]] = None,
+        readers: int = 2,
+        max_queue: int = 256,
+        timeout: float = 30.0,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            path: データベースファイルのパス
+            init: スキーマの作成・移行（書き込みスレッドの開始前に書き込み用接続で実行）
+            readers: 読み込み用接続（スレッド）の数
+            max_queue: 書き込みリクエストキューの上限
+            timeout: ロック待ちのタイムアウト（秒）
+            logger: ロガー
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+        # 書き込み用接続は書き込みスレッドが所有する（init は開始前に実行）
+        self.writer_conn = self._connect()
+        if init is not None:
+            init(self.writer_conn)
+
+        self._requests: "queue.Queue[Optional[_WriteRequest]]" = queue.Queue(maxsize=max_queue)
+        # キューが満杯のときに submit_nowait() が溜めるリクエスト（依頼順。書き込みスレッドが取り込む）
+        self._overflow: Deque[Optional[_WriteRequest]] = deque()
+        self._overflow_lock = threading.Lock()
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._reader_conns: List[sqlite3.Connection] = []
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=readers, thread_name_prefix="mao-db-read"
+        )
+
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._histogram_lock = threading.Lock()
+        self._closed = False
+        # 最後に依頼した書き込み（書き込みは依頼順に実行されるので、これが終われば全て終わっている）
+        self._last_write: Optional[Future] = None
+
+        self._writer = threading.Thread(target=self._write_loop, name="mao-db-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # WAL なら読み込み用接続が書き込みを待たず、NORMAL ならコミットごとの fsync が不要
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _record(self, query_type: str, started: float) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._histogram_lock:
+            histogram = self.histograms.get(query_type)
+            if histogram is None:
+                histogram = self.histograms[query_type] = LatencyHistogram()
+            histogram.record(elapsed_ms)
+
+    # --- 書き込み ---
+
+    def _write_loop(self) -> None:
+        """書き込みスレッド: リクエストを1件ずつ1トランザクションで実行"""
+        while True:
+            self._drain_overflow()
+            request = self._requests.get()
+            if request is None:
+                break
+            if not request.future.set_running_or_notify_cancel():
+                continue
+            try:
+                with self.writer_conn:
+                    result = request.fn(self.writer_conn)
+            except BaseException as e:
+                request.future.set_exception(e)
+            else:
+                request.future.set_result(result)
+            finally:
+                self._record(request.query_type, request.enqueued_at)
+
+    def _drain_overflow(self) -> None:
+        """溜まっているリクエストをキューの空きに移す（書き込みスレッドから呼ぶ）"""
+        with self._overflow_lock:
+            while self._overflow:
+                try:
+                    self._requests.put_nowait(self._overflow[0])
+                except queue.Full:
+                    return
+                self._overflow.popleft()
+
+    def _try_enqueue(self, request: Optional[_WriteRequest], buffer: bool) -> bool:
+        """待たずにリクエストをキューに入れる（溜まっている分があれば順序を保つためその後ろに溜める）
+
+        Args:
+            request: リクエスト（None は書き込みスレッドの終了）
+            buffer: キューが満杯のときにメモリに溜めるか
+
+        Returns:
+            入れた（溜めた）か。False ならキューが満杯で、呼び出し側が空くまで待つ
+        """
+        with self._overflow_lock:
+            if self._overflow:
+                self._overflow.append(request)
+                return True
+            try:
+                self._requests.put_nowait(request)
+                return True
+            except queue.Full:
+                if not buffer:
+                    return False
+                self._overflow.append(request)
+        self.logger.warning(f"Write queue for {self.path} is full, buffering writes in memory")
+        return True
+
+    def _enqueue(self, request: Optional[_WriteRequest]) -> None:
+        """リクエストをキューに入れる（満杯なら空くまで待つ）"""
+        if not self._try_enqueue(request, buffer=False):
+            self._requests.put(request)
+
+    def _request(self, query_type: str, fn: Callable[[sqlite3.Connection], Any]) -> _WriteRequest:
+        if self._closed:
+            raise RuntimeError(f"Database is closed: {self.path}")
+        request = _WriteRequest(query_type, fn, Future(), time.perf_counter())
+        self._last_write = request.future
+        return request
+
+    def submit(self, query_type: str, fn: Callable[[sqlite3.Connection], Any]) -> Future:
+        """書き込みを依頼（同期コード用。キューが満杯なら空くまで待つ）
+
+        Args:
+            query_type: クエリ種別（ヒストグラムのキー）
+            fn: 書き込み用接続を受け取る関数（トランザクション内で実行）
+
+        Returns:
+            fn の戻り値を返す Future
+        """
+        request = self._request(query_type, fn)
+        self._enqueue(request)
+        return request.future
+
+    def submit_nowait(self, query_type: str, fn: Callable[[sqlite3.Connection], Any]) -> Future:
+        """書き込みを依頼（待たない。イベントループ上から結果を待たずに書き込む用）
+
+        キューが満杯なら空くまで待つ代わりにメモリに溜め、書き込みスレッドが依頼順に取り込む。
+        溜まる量に上限はないので、書き込みが追いつかない状態が続く用途には使わない。
+
+        Args:
+            query_type: クエリ種別（ヒストグラムのキー）
+            fn: 書き込み用接続を受け取る関数（トランザクション内で実行）
+
+        Returns:
+            fn の戻り値を返す Future
+        """
+        request = self._request(query_type, fn)
+        self._try_enqueue(request, buffer=True)
+        return request.future
+
+    async def execute(self, query_type: str, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """書き込みを実行して完了を待つ（イベントループをブロックしない）
+
+        キューが満杯のときは、空くまでの待機をループの外（既定のエグゼキューター）で行う。
+
+        Args:
+            query_type: クエリ種別（ヒストグラムのキー）
+            fn: 書き込み用接続を受け取る関数（トランザクション内で実行）
+
+        Returns:
+            fn の戻り値
+        """
+        request = self._request(query_type, fn)
+        if not self._try_enqueue(request, buffer=False):
+            await asyncio.get_running_loop().run_in_executor(None, self._requests.put, request)
+        return await asyncio.wrap_future(request.future)
+
+    def wait(self) -> None:
+        """それまでに依頼した書き込みの完了を待つ（同期。書き込みの失敗は送出しない）"""
+        last = self._last_write
+        if last is not None:
+            wait_futures([last])
+
+    def queue_size(self) -> int:
+        """未処理の書き込みリクエスト数（溜まっている分を含む）"""
+        return self._requests.qsize() + len(self._overflow)
+
+    # --- 読み込み ---
+
+    def _run_read(
+        self,
+        query_type: str,
+        fn: Callable[[sqlite3.Connection], Any],
+        enqueued_at: float,
+    ) -> Any:
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+            self._reader_conns.append(conn)
+        try:
+            return fn(conn)
+        finally:
+            # 読み込みのトランザクションを残さない
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+            self._record(query_type, enqueued_at)
+
+    def read_submit(self, query_type: str, fn: Callable[[sqlite3.Connection], Any]) -> Future:
+        """読み込みを依頼
+
+        Args:
+            query_type: クエリ種別（ヒストグラムのキー）
+            fn: 読み込み用接続を受け取る関数
+
+        Returns:
+            fn の戻り値を返す Future
+        """
+        if self._closed:
+            raise RuntimeError(f"Database is closed: {self.path}")
+        return self._read_executor.submit(self._run_read, query_type, fn, time.perf_counter())
+
+    async def read(self, query_type: str, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """読み込みを実行して結果を返す（イベントループをブロックしない）"""
+        return await asyncio.wrap_future(self.read_submit(query_type, fn))
+
+    def read_sync(self, query_type: str, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """読み込みを実行して結果を返す（同期）"""
+        return self.read_submit(query_type, fn).result()
+
+    # --- 統計・終了 ---
+
+    def latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """クエリ種別ごとのレイテンシ（キュー待ち + 実行）
+
+        Returns:
+            クエリ種別 -> LatencyHistogram.to_dict()
+        """
+        with self._histogram_lock:
+            return {
+                query_type: histogram.to_dict()
+                for query_type, histogram in sorted(self.histograms.items())
+            }
+
+    def close(self) -> None:
+        """未処理の書き込みを実行してから接続を閉じる"""
+        if self._closed:
+            return
+        self._closed = True
+        # 溜まっているリクエストの後に終了する
+        self._enqueue(None)
+        self._writer.join()
+        self._read_executor.shutdown(wait=True)
+        for conn in self._reader_conns:
+            conn.close()
+        self._reader_conns.clear()
+        self.writer_conn.close()
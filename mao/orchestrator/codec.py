@@ -0,0 +1,344 @@
+"""
+Serialization codecs for queue files
+
+- JsonCodec: 1レコード1行の JSON（JSON lines、デフォルト）
+- MsgpackCodec: MessagePack（msgpack パッケージが必要）
+- YamlCodec: 人間・エージェント向けのエクスポートと既存 YAML ファイルの読み込み用
+
+キューのホットパス（メッセージログ、タスク・結果ファイル）は JSON lines で書き込み、
+読み込み時は拡張子からコーデックを判定するので既存の .yaml ファイルもそのまま読める。
+"""
+import json
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:  # pragma: no cover - libyaml がない環境
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
+
+# ストリーム中の (レコード, チャンク先頭からのレコード末尾オフセット)
+Frame = Tuple[Any, int]
+
+
+class Codec(ABC):
+    """コーデックの基底クラス
+
+    ドキュメント（1ファイル1レコード）を扱う。supports_stream が真のコーデックは
+    ストリーム（追記ログ）も扱え、segment_suffix にセグメントの拡張子を持つ。
+    """
+
+    name: str = ""
+    # ドキュメントファイルの拡張子
+    suffix: str = ""
+    # ストリーム（追記ログ）に使えるか
+    supports_stream: bool = False
+    # 追記ログのセグメント拡張子（ストリーム対応のコーデックのみ）
+    segment_suffix: str = ""
+
+    @abstractmethod
+    def encode(self, data: Any) -> bytes:
+        """1レコードをエンコード（ストリームにそのまま連結できる形式）"""
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> Any:
+        """1ドキュメントをデコード"""
+
+    def encode_many(self, records: List[Any]) -> bytes:
+        """複数レコードをストリーム形式でエンコード"""
+        return b"".join(self.encode(record) for record in records)
+
+    @abstractmethod
+    def decode_stream(
+        self,
+        chunk: bytes,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ) -> Tuple[List[Frame], int]:
+        """ストリームのバイト列を完結したレコードごとにデコード
+
+        書き込み途中の末尾レコードは消費しない。
+        ストリーム非対応のコーデック（supports_stream が偽）は ValueError を送出する。
+
+        Args:
+            chunk: 読み込んだバイト列
+            on_error: 壊れたレコードを読み飛ばすときに呼ばれるコールバック
+
+        Returns:
+            ((レコード, 末尾オフセット) のリスト, 消費したバイト数)
+        """
+
+
+class JsonCodec(Codec):
+    """JSON lines（1レコード1行）"""
+
+    name = "json"
+    suffix = ".json"
+    supports_stream = True
+    segment_suffix = ".log"
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    def decode(self, payload: bytes) -> Any:
+        return json.loads(payload)
+
+    def decode_stream(
+        self,
+        chunk: bytes,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ) -> Tuple[List[Frame], int]:
+        frames: List[Frame] = []
+        start = 0
+        end = chunk.rfind(b"\n")
+        while start <= end:
+            line_end = chunk.index(b"\n", start)
+            line = chunk[start:line_end]
+            start = line_end + 1
+            if not line:
+                continue
+            try:
+                frames.append((json.loads(line), start))
+            except ValueError as e:
+                if on_error:
+                    on_error(e)
+        return frames, end + 1
+
+
+class MsgpackCodec(Codec):
+    """MessagePack（自己区切りなのでそのまま連結してストリームにする）"""
+
+    name = "msgpack"
+    suffix = ".msgpack"
+    supports_stream = True
+    segment_suffix = ".mpk"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError(
+                "msgpack codec requires the msgpack package (pip install msgpack)"
+            )
+
+    def encode(self, data: Any) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False)
+
+    def decode_stream(
+        self,
+        chunk: bytes,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ) -> Tuple[List[Frame], int]:
+        frames: List[Frame] = []
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(chunk)
+        consumed = 0
+        while True:
+            try:
+                record = unpacker.unpack()
+            except msgpack.OutOfData:
+                break
+            except (ValueError, msgpack.UnpackException) as e:
+                # 区切りが分からなくなるので以降は読めない
+                if on_error:
+                    on_error(e)
+                return frames, len(chunk)
+            consumed = unpacker.tell()
+            frames.append((record, consumed))
+        return frames, consumed
+
+
+class YamlCodec(Codec):
+    """YAML（エクスポート・互換読み込み用。ストリームには使わない）"""
+
+    name = "yaml"
+    suffix = ".yaml"
+
+    def encode(self, data: Any) -> bytes:
+        return yaml.dump(
+            data, Dumper=_YamlDumper, default_flow_style=False, allow_unicode=True
+        ).encode("utf-8")
+
+    def decode(self, payload: bytes) -> Any:
+        return yaml.load(payload, Loader=_YamlLoader)
+
+    def decode_stream(
+        self,
+        chunk: bytes,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ) -> Tuple[List[Frame], int]:
+        # YAML ドキュメントは区切りなしに連結できないので、追記ログには json か msgpack を使う
+        raise ValueError(
+            "yaml codec does not support streams (use the json or msgpack codec for logs)"
+        )
+
+
+# コーデック名 -> クラス
+CODECS: Dict[str, type] = {
+    JsonCodec.name: JsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+    YamlCodec.name: YamlCodec,
+}
+
+DEFAULT_CODEC = JsonCodec.name
+
+_instances: Dict[str, Codec] = {}
+
+
+def get_codec(name: str = DEFAULT_CODEC) -> Codec:
+    """コーデック名からコーデックを取得
+
+    Args:
+        name: コーデック名（json / msgpack / yaml）
+
+    Returns:
+        コーデック
+    """
+    codec = _instances.get(name)
+    if codec is None:
+        codec_class = CODECS.get(name)
+        if codec_class is None:
+            raise ValueError(f"Unknown codec: {name} (available: {', '.join(CODECS)})")
+        codec = _instances[name] = codec_class()
+    return codec
+
+
+def codec_for_path(path: Path) -> Codec:
+    """拡張子からコーデックを判定"""
+    suffix = path.suffix
+    if suffix == ".yml":
+        suffix = YamlCodec.suffix
+    for codec_class in CODECS.values():
+        if codec_class.suffix == suffix:
+            return get_codec(codec_class.name)
+    raise ValueError(f"Unknown document type: {path}")
+
+
+# 読み込み時に探す拡張子（書き込みコーデックの拡張子が優先）
+DOCUMENT_SUFFIXES = (JsonCodec.suffix, MsgpackCodec.suffix, YamlCodec.suffix, ".yml")
+
+
+def find_document(directory: Path, stem: str, codec: Optional[Codec] = None) -> Optional[Path]:
+    """ディレクトリ内の <stem>.<拡張子> のドキュメントを探す
+
+    Args:
+        directory: ディレクトリ
+        stem: ファイル名（拡張子なし）
+        codec: 優先するコーデック
+
+    Returns:
+        見つかったパス、なければNone
+    """
+    suffixes = DOCUMENT_SUFFIXES
+    if codec is not None:
+        suffixes = (codec.suffix,) + tuple(s for s in suffixes if s != codec.suffix)
+    for suffix in suffixes:
+        path = directory / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def list_documents(directory: Path) -> List[Path]:
+    """ディレクトリ内のドキュメント（既知の拡張子のみ、一時ファイルを除く）"""
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return []
+    with entries:
+        return sorted(
+            Path(entry.path)
+            for entry in entries
+            if not entry.name.startswith(".")
+            and os.path.splitext(entry.name)[1] in DOCUMENT_SUFFIXES
+        )
+
+
+def read_document(path: Path) -> Any:
+    """ドキュメントを読み込む（拡張子からコーデックを判定）"""
+    with open(path, "rb") as f:
+        return codec_for_path(path).decode(f.read())
+
+
+def write_document(
+    directory: Path,
+    stem: str,
+    data: Any,
+    codec: Optional[Codec] = None,
+    exclusive: bool = False,
+) -> Path:
+    """ドキュメントをアトミックに書き込む
+
+    一時ファイルに書いてから置き換えるので、ポーリング中の読み手が書き込み途中の
+    ファイルを読むことはない。他のコーデックで書かれた同名ファイルは削除する。
+
+    Args:
+        directory: ディレクトリ
+        stem: ファイル名（拡張子なし）
+        data: 書き込むデータ
+        codec: コーデック（省略時は JSON）
+        exclusive: True なら同名ファイルが既にある場合に FileExistsError（上書きしない）
+
+    Returns:
+        書き込んだパス
+    """
+    codec = codec or get_codec()
+    path = directory / f"{stem}{codec.suffix}"
+    if exclusive and find_document(directory, stem) is not None:
+        raise FileExistsError(path)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(codec.encode(data))
+        if exclusive:
+            # link は既存ファイルがあれば失敗する（並行する書き込みと競合しない）
+            os.link(tmp_path, path)
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    if not exclusive:
+        for suffix in DOCUMENT_SUFFIXES:
+            if suffix != codec.suffix:
+                stale = directory / f"{stem}{suffix}"
+                if stale.exists():
+                    stale.unlink()
+    return path
+
+
+def export_documents(source_dir: Path, output_dir: Path, codec: Optional[Codec] = None) -> int:
+    """ディレクトリ内のドキュメントを別のコーデック（デフォルト YAML）に変換してコピー
+
+    Args:
+        source_dir: 変換元ディレクトリ
+        output_dir: 出力ディレクトリ
+        codec: 出力コーデック
+
+    Returns:
+        変換したファイル数
+    """
+    codec = codec or get_codec(YamlCodec.name)
+    documents = list_documents(source_dir)
+    if documents:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    for path in documents:
+        write_document(output_dir, path.stem, read_document(path), codec)
+    return len(documents)
@@ -0,0 +1,365 @@
+"""
+Cold storage - 古いセッション・ログ・デバッグ出力の圧縮
+
+.mao 以下で一定期間更新されていないファイルを圧縮して置き換える（mao gc）。
+
+- セッション: .mao/sessions/<id>/chat.jsonl（chat.idx は削除し、開いたときに作り直す）
+- ログ: .mao/logs/*.log（pipe-pane の出力）
+- デバッグ出力: .mao/debug/cto_response_*.txt
+
+圧縮形式は zstd（zstandard パッケージがある場合）または gzip。圧縮したファイルは元の名前に
+.zst / .gz を付けたもので、read_bytes() / read_text() に元のパスを渡すと圧縮版を透過的に読む。
+
+書き込み中のファイルは圧縮しない（圧縮後に元のファイルを削除すると、開いたままの書き手は
+削除された inode に書き続けて出力を失う）。次のいずれかに当たるファイルは飛ばす。
+
+- hold() で使用中にされている（path.lock への共有 flock。SessionManager・pipe-pane・ダッシュボード）
+- /proc から見て他のプロセスが開いている（Linux。tmux の pipe-pane が起動した tee など）
+- 圧縮している間に更新日時かサイズが変わった
+"""
+import gzip
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# 圧縮形式 -> 拡張子
+SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+
+DEFAULT_COMPRESSION = "zstd"
+
+DAY = 24 * 3600
+
+# 使用中のロックファイルの拡張子（path.lock）
+LOCK_SUFFIX = ".lock"
+
+
+def resolve_compression(name: str = DEFAULT_COMPRESSION) -> str:
+    """使用できる圧縮形式を返す（zstandard がなければ zstd の代わりに gzip）
+
+    Raises:
+        ValueError: 未知の圧縮形式
+    """
+    if name not in SUFFIXES:
+        raise ValueError(f"Unknown compression: {name} (available: {', '.join(SUFFIXES)})")
+    if name == "zstd" and zstandard is None:
+        return "gzip"
+    return name
+
+
+def compress(data: bytes, compression: str = DEFAULT_COMPRESSION) -> bytes:
+    """バイト列を圧縮"""
+    if resolve_compression(compression) == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data, mtime=0)
+
+
+def decompress(data: bytes, suffix: str) -> bytes:
+    """拡張子に応じてバイト列を展開
+
+    Raises:
+        ImportError: .zst の展開に zstandard パッケージが必要
+    """
+    if suffix == SUFFIXES["zstd"]:
+        if zstandard is None:
+            raise ImportError(
+                "reading .zst files requires the zstandard package (pip install zstandard)"
+            )
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if suffix == SUFFIXES["gzip"]:
+        return gzip.decompress(data)
+    return data
+
+
+def find_compressed(path: Path) -> Optional[Path]:
+    """path を圧縮したファイル（path.zst / path.gz）"""
+    for suffix in SUFFIXES.values():
+        candidate = path.with_name(path.name + suffix)
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def resolve(path: Path) -> Optional[Path]:
+    """path があればそれを、なければ圧縮版を返す（どちらもなければ None）"""
+    if path.exists():
+        return path
+    return find_compressed(path)
+
+
+def exists(path: Path) -> bool:
+    """path または圧縮版があるかどうか"""
+    return resolve(path) is not None
+
+
+def read_bytes(path: Path, offset: int = 0) -> bytes:
+    """path（なければ圧縮版を展開して）を読む
+
+    Args:
+        path: 元のファイルのパス
+        offset: 読み始める位置（展開後のバイト数）
+
+    Raises:
+        FileNotFoundError: path も圧縮版もない
+    """
+    actual = resolve(path)
+    if actual is None:
+        raise FileNotFoundError(path)
+    if actual.suffix not in SUFFIXES.values():
+        with open(actual, "rb") as f:
+            f.seek(offset)
+            return f.read()
+    return decompress(actual.read_bytes(), actual.suffix)[offset:]
+
+
+def read_text(path: Path, encoding: str = "utf-8", errors: str = "strict", offset: int = 0) -> str:
+    """path（なければ圧縮版を展開して）をテキストとして読む（offset はバイト数）"""
+    return read_bytes(path, offset).decode(encoding, errors)
+
+
+class FileLock:
+    """path.lock への flock（共有: 使用中の印、排他: mao gc の圧縮中）
+
+    プロセスが終了すると OS が解放するので、異常終了してもロックは残らない。
+    fcntl がない環境では常に取得できる。
+    """
+
+    def __init__(self, path: Path, exclusive: bool = False):
+        self.path = path.with_name(path.name + LOCK_SUFFIX)
+        self.exclusive = exclusive
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """ロックを取得（blocking=False で取得できなければ False）"""
+        if fcntl is None or self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        flags = fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH
+        try:
+            fcntl.flock(fd, flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        """ロックを解放"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def hold(path: Path) -> FileLock:
+    """path を使用中にする（release() するかプロセスが終了するまで mao gc が圧縮しない）
+
+    mao gc が圧縮している最中なら、圧縮が終わるまで待つ。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = FileLock(path)
+    lock.acquire()
+    return lock
+
+
+def open_files(directory: Path) -> Set[Path]:
+    """directory 以下で、いずれかのプロセスが開いているファイル（/proc がない環境では空）"""
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return set()
+    prefix = str(directory.resolve()) + os.sep
+    found = set()
+    for pid in os.listdir(proc):
+        if not pid.isdigit():
+            continue
+        try:
+            fds = os.listdir(proc / pid / "fd")
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                target = os.readlink(proc / pid / "fd" / fd)
+            except OSError:
+                continue
+            if target.startswith(prefix):
+                found.add(Path(target))
+    return found
+
+
+@dataclass
+class TierReport:
+    """1つの対象（セッション・ログ・デバッグ出力）の圧縮結果"""
+    name: str
+    files: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def reclaimed(self) -> int:
+        """削減したバイト数"""
+        return self.bytes_before - self.bytes_after
+
+
+@dataclass
+class GcReport:
+    """ColdStorage.collect() の結果"""
+    tiers: List[TierReport] = field(default_factory=list)
+    dry_run: bool = False
+
+    @property
+    def files(self) -> int:
+        return sum(tier.files for tier in self.tiers)
+
+    @property
+    def bytes_before(self) -> int:
+        return sum(tier.bytes_before for tier in self.tiers)
+
+    @property
+    def bytes_after(self) -> int:
+        return sum(tier.bytes_after for tier in self.tiers)
+
+    @property
+    def reclaimed(self) -> int:
+        """削減したバイト数"""
+        return self.bytes_before - self.bytes_after
+
+
+class ColdStorage:
+    """古いファイルを圧縮するストレージ管理"""
+
+    def __init__(
+        self,
+        project_path: Path,
+        compression: str = DEFAULT_COMPRESSION,
+        session_max_age: Optional[float] = 30 * DAY,
+        log_max_age: Optional[float] = 7 * DAY,
+        debug_max_age: Optional[float] = 7 * DAY,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            project_path: プロジェクトパス（.maoディレクトリの親）
+            compression: 圧縮形式（zstd または gzip）
+            session_max_age: この秒数更新されていないセッションを圧縮（None は圧縮しない）
+            log_max_age: この秒数更新されていないログを圧縮（None は圧縮しない）
+            debug_max_age: この秒数更新されていないデバッグ出力を圧縮（None は圧縮しない）
+            logger: ロガー
+        """
+        self.mao_dir = project_path / ".mao"
+        self.compression = resolve_compression(compression)
+        self.suffix = SUFFIXES[self.compression]
+        self.session_max_age = session_max_age
+        self.log_max_age = log_max_age
+        self.debug_max_age = debug_max_age
+        self.logger = logger or logging.getLogger(__name__)
+        # collect() の開始時点で他のプロセスが開いているファイル
+        self._open_files: Set[Path] = set()
+
+    def _glob(self, directory: str, pattern: str) -> Iterable[Path]:
+        path = self.mao_dir / directory
+        return sorted(path.glob(pattern)) if path.is_dir() else []
+
+    def collect(self, now: Optional[float] = None, dry_run: bool = False) -> GcReport:
+        """保持期間を過ぎたファイルを圧縮
+
+        Args:
+            now: 現在時刻（UNIX 秒、テスト用）
+            dry_run: 圧縮後のサイズを計算するだけでファイルは変更しない
+
+        Returns:
+            対象ごとの圧縮結果
+        """
+        now = time.time() if now is None else now
+        report = GcReport(dry_run=dry_run)
+        self._open_files = open_files(self.mao_dir) if self.mao_dir.is_dir() else set()
+        report.tiers.append(
+            self._compress_tier(
+                "sessions", self._glob("sessions", "*/chat.jsonl"), self.session_max_age, now, dry_run
+            )
+        )
+        report.tiers.append(
+            self._compress_tier("logs", self._glob("logs", "*.log"), self.log_max_age, now, dry_run)
+        )
+        report.tiers.append(
+            self._compress_tier(
+                "debug", self._glob("debug", "cto_response_*.txt"), self.debug_max_age, now, dry_run
+            )
+        )
+        return report
+
+    def _in_use(self, path: Path) -> bool:
+        """他のプロセスが開いているかどうか（collect() の開始時点）"""
+        return path.resolve() in self._open_files
+
+    def _compress_tier(
+        self,
+        name: str,
+        paths: Iterable[Path],
+        max_age: Optional[float],
+        now: float,
+        dry_run: bool,
+    ) -> TierReport:
+        tier = TierReport(name)
+        if max_age is None:
+            return tier
+
+        for path in paths:
+            lock = FileLock(path, exclusive=True)
+            try:
+                stat = path.stat()
+                if now - stat.st_mtime < max_age:
+                    continue
+                if self._in_use(path) or not lock.acquire(blocking=False):
+                    self.logger.info(f"Skipping {path}: in use")
+                    continue
+                packed = compress(path.read_bytes(), self.compression)
+                # 再作成できる補助ファイル（セッションのオフセットインデックス）
+                extras = [path.with_suffix(".idx")] if name == "sessions" else []
+                extras = [extra for extra in extras if extra.exists()]
+
+                current = path.stat()
+                if (current.st_mtime_ns, current.st_size) != (stat.st_mtime_ns, stat.st_size):
+                    self.logger.info(f"Skipping {path}: modified while compressing")
+                    continue
+
+                tier.files += 1
+                tier.bytes_before += stat.st_size + sum(extra.stat().st_size for extra in extras)
+                tier.bytes_after += len(packed)
+                if dry_run:
+                    continue
+
+                self._replace(path, packed, stat)
+                for extra in extras:
+                    extra.unlink()
+            except Exception as e:
+                self.logger.error(f"Failed to compress {path}: {e}")
+            finally:
+                lock.release()
+        if tier.files:
+            self.logger.info(
+                f"Compressed {tier.files} {name} files, reclaimed {tier.reclaimed} bytes"
+                + (" (dry run)" if dry_run else "")
+            )
+        return tier
+
+    def _replace(self, path: Path, packed: bytes, stat: os.stat_result) -> None:
+        """圧縮版を書き込んでから元のファイルを削除（更新日時は引き継ぐ）"""
+        target = path.with_name(path.name + self.suffix)
+        temp_file = target.with_name(target.name + ".tmp")
+        with open(temp_file, "wb") as f:
+            f.write(packed)
+        os.utime(temp_file, (stat.st_atime, stat.st_mtime))
+        os.replace(temp_file, target)
+        path.unlink()
@@ -8,6 +8,7 @@ from typing import Optional, Callable, Dict, Any, List
 from datetime import datetime
 import uuid
 
+from mao.orchestrator.fs_watcher import DirectoryWatcher
 from mao.orchestrator.task_queue import TaskQueue, Task, TaskStatus
 from mao.orchestrator.cto_decision import (
     CTODecisionEngine,
@@ -28,13 +29,15 @@ class CTOOrchestrator:
         num_agents: int = 8,
         poll_interval: float = 2.0,
         logger: Optional[logging.Logger] = None,
+        prefetch: int = 1,
     ):
         """
         Args:
             project_path: プロジェクトパス
             num_agents: エージェント数
-            poll_interval: ポーリング間隔（秒）
+            poll_interval: inotify が使えない環境でのポーリング間隔（秒）
             logger: ロガー
+            prefetch: 1エージェントに先渡しするタスク数（TaskQueue を参照）
         """
         self.project_path = project_path
         self.num_agents = num_agents
@@ -42,7 +45,7 @@ class CTOOrchestrator:
         self.logger = logger or logging.getLogger(__name__)
 
         # タスクキュー
-        self.task_queue = TaskQueue(project_path, logger=logger)
+        self.task_queue = TaskQueue(project_path, logger=logger, prefetch=prefetch)
 
         # 判断エンジン
         self.decision_engine = CTODecisionEngine(logger=logger)
@@ -57,6 +60,8 @@ class CTOOrchestrator:
         # 監視タスク
         self._monitoring_task: Optional[asyncio.Task] = None
         self._running = False
+        # 処理中の結果（ロール -> タスク）
+        self._processing: Dict[str, asyncio.Task] = {}
 
         # 承認待ちリクエスト
         self.pending_approvals: Dict[str, ApprovalRequest] = {}
@@ -109,23 +114,64 @@ class CTOOrchestrator:
         self.logger.info("CTO monitoring stopped")
 
     async def _monitoring_loop(self) -> None:
-        """監視ループのメイン処理"""
-        while self._running:
-            try:
-                # 完了済みエージェントの結果を確認
-                completed_roles = self.task_queue.list_completed_results()
-
-                for role in completed_roles:
-                    await self._process_agent_result(role)
+        """監視ループのメイン処理
 
-                # ポーリング間隔待機
-                await asyncio.sleep(self.poll_interval)
+        reports/ の変更（inotify、使えない環境では poll_interval ごとの比較）と
+        同一プロセスの submit_result() を待機し、結果が届いたら即座に処理する。
+        変更がない間は何もしない。
+        """
+        loop = asyncio.get_running_loop()
+        watcher = self.task_queue.watch_results(
+            poll_interval=self.poll_interval, logger=self.logger
+        )
+        watcher.start()
+
+        def on_result(role: str) -> None:
+            # submit_result は別スレッドから呼ばれることもある
+            loop.call_soon_threadsafe(watcher.notify)
+
+        self.task_queue.add_result_listener(on_result)
+        try:
+            while self._running:
+                try:
+                    # 完了済みエージェントの結果を並行して処理
+                    for role in self.task_queue.list_completed_reports():
+                        if role not in self._processing:
+                            self._processing[role] = asyncio.create_task(
+                                self._process_role(role, watcher)
+                            )
+
+                    await watcher.wait()
+
+                except asyncio.CancelledError:
+                    break
+                except Exception as e:
+                    self.logger.error(f"Error in monitoring loop: {e}", exc_info=True)
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            self.task_queue.remove_result_listener(on_result)
+            watcher.close()
+            for task in list(self._processing.values()):
+                task.cancel()
+            self._processing.clear()
+
+    async def _process_role(self, role: str, watcher: DirectoryWatcher) -> None:
+        """1エージェントの結果を処理（同じロールは同時に1つまで）
+
+        処理に失敗した場合は拾い直さない（同じ結果で失敗をくり返さないため）。
+        次の結果は reports/ の変更で通知される。
+        """
+        try:
+            await self._process_agent_result(role)
+        except Exception as e:
+            self.logger.error(f"Error processing result from {role}: {e}", exc_info=True)
+            return
+        finally:
+            self._processing.pop(role, None)
 
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                self.logger.error(f"Error in monitoring loop: {e}", exc_info=True)
-                await asyncio.sleep(self.poll_interval)
+        # 処理中に同じロールの次の結果が届いていれば拾い直す
+        if self.task_queue.has_result(role):
+            watcher.notify()
 
     async def _process_agent_result(self, role: str) -> None:
         """エージェントの結果を処理
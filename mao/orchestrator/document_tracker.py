@@ -1,5 +1,7 @@
 """
 Document Tracker - 実装とドキュメントの同期を支援
+
+SQLite へのアクセスは AsyncDatabase 経由（イベントループをブロックしない）。
 """
 import sqlite3
 from pathlib import Path
@@ -7,6 +9,8 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 import logging
 
+from mao.orchestrator.async_db import AsyncDatabase
+
 
 class DocumentTracker:
     """ドキュメント追跡マネージャー
@@ -33,17 +37,15 @@ class DocumentTracker:
         self.db_dir.mkdir(parents=True, exist_ok=True)
         self.db_path = self.db_dir / "document_tracking.db"
 
-        # 接続
-        self.conn: Optional[sqlite3.Connection] = None
-        self._init_database()
+        # 書き込みスレッド + 読み込み接続プール
+        self.db: Optional[AsyncDatabase] = AsyncDatabase(
+            self.db_path, init=self._init_database, logger=self.logger
+        )
 
-    def _init_database(self) -> None:
+    def _init_database(self, conn: sqlite3.Connection) -> None:
         """データベース初期化"""
-        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-
         # テーブル作成
-        self.conn.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS document_tracking (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -62,17 +64,17 @@ class DocumentTracker:
 
         # 既存のテーブルに行数カラムを追加（マイグレーション）
         try:
-            self.conn.execute("ALTER TABLE document_tracking ADD COLUMN line_start INTEGER")
+            conn.execute("ALTER TABLE document_tracking ADD COLUMN line_start INTEGER")
         except sqlite3.OperationalError:
             pass  # カラムが既に存在する場合
 
         try:
-            self.conn.execute("ALTER TABLE document_tracking ADD COLUMN line_end INTEGER")
+            conn.execute("ALTER TABLE document_tracking ADD COLUMN line_end INTEGER")
         except sqlite3.OperationalError:
             pass  # カラムが既に存在する場合
 
         # セッション情報テーブル
-        self.conn.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS tracking_sessions (
                 session_id TEXT PRIMARY KEY,
@@ -85,9 +87,9 @@ class DocumentTracker:
             """
         )
 
-        self.conn.commit()
+        conn.commit()
 
-    def start_session(
+    async def start_session(
         self,
         session_id: str,
         title: str,
@@ -104,22 +106,24 @@ class DocumentTracker:
             成功したかどうか
         """
         try:
-            self.conn.execute(
-                """
-                INSERT OR REPLACE INTO tracking_sessions
-                (session_id, title, description, started_at, status)
-                VALUES (?, ?, ?, ?, 'active')
-                """,
-                (session_id, title, description, datetime.utcnow().isoformat())
+            await self.db.execute(
+                "document.start_session",
+                lambda conn: conn.execute(
+                    """
+                    INSERT OR REPLACE INTO tracking_sessions
+                    (session_id, title, description, started_at, status)
+                    VALUES (?, ?, ?, ?, 'active')
+                    """,
+                    (session_id, title, description, datetime.utcnow().isoformat())
+                ),
             )
-            self.conn.commit()
             self.logger.info(f"Started tracking session: {session_id}")
             return True
         except Exception as e:
             self.logger.error(f"Failed to start session: {e}")
             return False
 
-    def add_document(
+    async def add_document(
         self,
         session_id: str,
         document_path: str,
@@ -142,22 +146,24 @@ class DocumentTracker:
             成功したかどうか
         """
         try:
-            self.conn.execute(
-                """
-                INSERT INTO document_tracking
-                (session_id, document_path, reason, section, line_start, line_end, tracked_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (session_id, document_path, reason, section, line_start, line_end, datetime.utcnow().isoformat())
+            await self.db.execute(
+                "document.add",
+                lambda conn: conn.execute(
+                    """
+                    INSERT INTO document_tracking
+                    (session_id, document_path, reason, section, line_start, line_end, tracked_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (session_id, document_path, reason, section, line_start, line_end, datetime.utcnow().isoformat())
+                ),
             )
-            self.conn.commit()
             self.logger.info(f"Added document to tracking: {document_path}")
             return True
         except Exception as e:
             self.logger.error(f"Failed to add document: {e}")
             return False
 
-    def mark_updated(
+    async def mark_updated(
         self,
         session_id: str,
         document_path: str,
@@ -174,22 +180,24 @@ class DocumentTracker:
             成功したかどうか
         """
         try:
-            self.conn.execute(
-                """
-                UPDATE document_tracking
-                SET updated = 1, update_notes = ?
-                WHERE session_id = ? AND document_path = ?
-                """,
-                (update_notes, session_id, document_path)
+            await self.db.execute(
+                "document.mark_updated",
+                lambda conn: conn.execute(
+                    """
+                    UPDATE document_tracking
+                    SET updated = 1, update_notes = ?
+                    WHERE session_id = ? AND document_path = ?
+                    """,
+                    (update_notes, session_id, document_path)
+                ),
             )
-            self.conn.commit()
             self.logger.info(f"Marked document as updated: {document_path}")
             return True
         except Exception as e:
             self.logger.error(f"Failed to mark document: {e}")
             return False
 
-    def get_tracked_documents(self, session_id: str) -> List[Dict[str, Any]]:
+    async def get_tracked_documents(self, session_id: str) -> List[Dict[str, Any]]:
         """追跡中のドキュメント一覧を取得
 
         Args:
@@ -199,17 +207,20 @@ class DocumentTracker:
             ドキュメントリスト
         """
         try:
-            cursor = self.conn.execute(
-                """
-                SELECT * FROM document_tracking
-                WHERE session_id = ?
-                ORDER BY tracked_at
-                """,
-                (session_id,)
+            rows = await self.db.read(
+                "document.tracked",
+                lambda conn: conn.execute(
+                    """
+                    SELECT * FROM document_tracking
+                    WHERE session_id = ?
+                    ORDER BY tracked_at
+                    """,
+                    (session_id,)
+                ).fetchall(),
             )
 
             documents = []
-            for row in cursor:
+            for row in rows:
                 documents.append({
                     "id": row["id"],
                     "document_path": row["document_path"],
@@ -227,7 +238,7 @@ class DocumentTracker:
             self.logger.error(f"Failed to get tracked documents: {e}")
             return []
 
-    def get_pending_updates(self, session_id: str) -> List[Dict[str, Any]]:
+    async def get_pending_updates(self, session_id: str) -> List[Dict[str, Any]]:
         """未更新のドキュメント一覧を取得
 
         Args:
@@ -237,17 +248,20 @@ class DocumentTracker:
             未更新ドキュメントリスト
         """
         try:
-            cursor = self.conn.execute(
-                """
-                SELECT * FROM document_tracking
-                WHERE session_id = ? AND updated = 0
-                ORDER BY tracked_at
-                """,
-                (session_id,)
+            rows = await self.db.read(
+                "document.pending",
+                lambda conn: conn.execute(
+                    """
+                    SELECT * FROM document_tracking
+                    WHERE session_id = ? AND updated = 0
+                    ORDER BY tracked_at
+                    """,
+                    (session_id,)
+                ).fetchall(),
             )
 
             documents = []
-            for row in cursor:
+            for row in rows:
                 documents.append({
                     "id": row["id"],
                     "document_path": row["document_path"],
@@ -263,7 +277,7 @@ class DocumentTracker:
             self.logger.error(f"Failed to get pending updates: {e}")
             return []
 
-    def complete_session(self, session_id: str) -> bool:
+    async def complete_session(self, session_id: str) -> bool:
         """追跡セッションを完了
 
         Args:
@@ -273,22 +287,24 @@ class DocumentTracker:
             成功したかどうか
         """
         try:
-            self.conn.execute(
-                """
-                UPDATE tracking_sessions
-                SET status = 'completed', completed_at = ?
-                WHERE session_id = ?
-                """,
-                (datetime.utcnow().isoformat(), session_id)
+            await self.db.execute(
+                "document.complete_session",
+                lambda conn: conn.execute(
+                    """
+                    UPDATE tracking_sessions
+                    SET status = 'completed', completed_at = ?
+                    WHERE session_id = ?
+                    """,
+                    (datetime.utcnow().isoformat(), session_id)
+                ),
             )
-            self.conn.commit()
             self.logger.info(f"Completed tracking session: {session_id}")
             return True
         except Exception as e:
             self.logger.error(f"Failed to complete session: {e}")
             return False
 
-    def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
+    async def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
         """セッション情報を取得
 
         Args:
@@ -298,15 +314,17 @@ class DocumentTracker:
             セッション情報
         """
         try:
-            cursor = self.conn.execute(
-                """
-                SELECT * FROM tracking_sessions
-                WHERE session_id = ?
-                """,
-                (session_id,)
+            row = await self.db.read(
+                "document.session_info",
+                lambda conn: conn.execute(
+                    """
+                    SELECT * FROM tracking_sessions
+                    WHERE session_id = ?
+                    """,
+                    (session_id,)
+                ).fetchone(),
             )
 
-            row = cursor.fetchone()
             if row:
                 return {
                     "session_id": row["session_id"],
@@ -321,23 +339,26 @@ class DocumentTracker:
             self.logger.error(f"Failed to get session info: {e}")
             return None
 
-    def get_active_sessions(self) -> List[Dict[str, Any]]:
+    async def get_active_sessions(self) -> List[Dict[str, Any]]:
         """アクティブなセッション一覧を取得
 
         Returns:
             セッションリスト
         """
         try:
-            cursor = self.conn.execute(
-                """
-                SELECT * FROM tracking_sessions
-                WHERE status = 'active'
-                ORDER BY started_at DESC
-                """
+            rows = await self.db.read(
+                "document.active_sessions",
+                lambda conn: conn.execute(
+                    """
+                    SELECT * FROM tracking_sessions
+                    WHERE status = 'active'
+                    ORDER BY started_at DESC
+                    """
+                ).fetchall(),
             )
 
             sessions = []
-            for row in cursor:
+            for row in rows:
                 sessions.append({
                     "session_id": row["session_id"],
                     "title": row["title"],
@@ -351,7 +372,7 @@ class DocumentTracker:
             return []
 
     def close(self) -> None:
-        """データベース接続を閉じる"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        """データベース接続を閉じる（未処理の書き込みは実行する）"""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
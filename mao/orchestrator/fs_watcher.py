@@ -0,0 +1,179 @@
+"""
+Filesystem change notification for queue directories
+
+Linux では inotify を使用し、変更があるまで一切の処理を行わない。
+inotify が使えない環境では os.scandir による mtime/サイズ比較でポーリングする。
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import sys
+from pathlib import Path
+from typing import Optional, List, Tuple, FrozenSet
+import logging
+
+
+# inotify イベントマスク（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# 書き終わったファイルだけを通知する（書き込み途中のファイルを読ませない）
+COMPLETE_WRITE_MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    """inotify を提供する libc をロード"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not (hasattr(libc, "inotify_init1") and hasattr(libc, "inotify_add_watch")):
+        return None
+    return libc
+
+
+class DirectoryWatcher:
+    """ディレクトリの変更を非同期に待機する
+
+    使い方:
+        watcher = DirectoryWatcher([queue_dir])
+        watcher.start()
+        while True:
+            await watcher.wait()
+            ...  # 変更を処理
+    """
+
+    def __init__(
+        self,
+        paths: List[Path],
+        poll_interval: float = 1.0,
+        logger: Optional[logging.Logger] = None,
+        use_inotify: bool = True,
+        mask: int = WATCH_MASK,
+    ):
+        """
+        Args:
+            paths: 監視するディレクトリ
+            poll_interval: フォールバック時のポーリング間隔（秒）
+            logger: ロガー
+            use_inotify: inotify を使用するか（False で常にポーリング）
+            mask: inotify で待機するイベント（ポーリング時は無視）
+        """
+        self.paths = list(paths)
+        self.poll_interval = poll_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.use_inotify = use_inotify
+        self.mask = mask
+
+        self._event = asyncio.Event()
+        self._inotify_fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._signature: Optional[FrozenSet[Tuple[str, int, int]]] = None
+
+    @property
+    def backend(self) -> str:
+        """使用中の通知方式（inotify / poll）"""
+        return "inotify" if self._inotify_fd is not None else "poll"
+
+    def start(self) -> None:
+        """監視を開始（イベントループ上で呼び出す）"""
+        self._loop = asyncio.get_running_loop()
+        if self.use_inotify and self._start_inotify():
+            return
+        self._signature = self._scan()
+
+    def _start_inotify(self) -> bool:
+        """inotify による監視を開始"""
+        libc = _load_libc()
+        if libc is None:
+            return False
+
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            self.logger.debug(f"inotify_init1 failed: errno={ctypes.get_errno()}")
+            return False
+
+        try:
+            for path in self.paths:
+                wd = libc.inotify_add_watch(fd, os.fsencode(str(path)), self.mask)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {path}")
+            self._loop.add_reader(fd, self._on_inotify_readable)
+        except (OSError, NotImplementedError) as e:
+            self.logger.debug(f"Falling back to polling: {e}")
+            os.close(fd)
+            return False
+
+        self._inotify_fd = fd
+        return True
+
+    def _on_inotify_readable(self) -> None:
+        """inotify イベントを読み捨てて待機中のタスクを起こす"""
+        try:
+            while os.read(self._inotify_fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            self.logger.error(f"inotify read error: {e}")
+        self._event.set()
+
+    def _scan(self) -> FrozenSet[Tuple[str, int, int]]:
+        """ディレクトリのエントリ名・mtime・サイズのスナップショット"""
+        entries = set()
+        for path in self.paths:
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.add((entry.path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                continue
+        return frozenset(entries)
+
+    def notify(self) -> None:
+        """同一プロセス内の書き込みを即座に通知"""
+        self._event.set()
+
+    async def wait(self) -> None:
+        """次の変更まで待機"""
+        if self._loop is None:
+            self.start()
+
+        if self._inotify_fd is not None:
+            await self._event.wait()
+            self._event.clear()
+            return
+
+        while True:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            signature = self._scan()
+            changed = signature != self._signature
+            self._signature = signature
+            if self._event.is_set() or changed:
+                self._event.clear()
+                return
+
+    def close(self) -> None:
+        """監視を終了"""
+        if self._inotify_fd is not None:
+            if self._loop is not None:
+                self._loop.remove_reader(self._inotify_fd)
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
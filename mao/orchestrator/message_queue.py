@@ -1,15 +1,20 @@
 """
 Message queue system for agent communication
 """
-import yaml
 import asyncio
+import heapq
+import itertools
+import os
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Callable
+from typing import Optional, Dict, Any, Iterator, List, Callable, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict
 from enum import Enum
 import logging
 
+from mao.orchestrator.codec import get_codec, read_document, write_document
+from mao.orchestrator.message_store import SegmentLogStore, create_message_store
+
 
 class MessageType(str, Enum):
     """メッセージタイプ"""
@@ -76,18 +81,238 @@ class Message:
         return cls(**data)
 
 
+# 優先度の並び順（小さいほど先）
+PRIORITY_ORDER = {
+    MessagePriority.URGENT: 0,
+    MessagePriority.HIGH: 1,
+    MessagePriority.MEDIUM: 2,
+    MessagePriority.LOW: 3,
+}
+
+# インデックスキー: (受信者, メッセージタイプ or None, 優先度 or None)
+IndexKey = Tuple[str, Optional[MessageType], Optional[MessagePriority]]
+
+
+class MessageIndex:
+    """未処理メッセージのインメモリインデックス
+
+    受信者 × メッセージタイプ × 優先度の組み合わせごとに
+    (優先度, タイムスタンプ) 順のヒープを持つ。削除は遅延評価で、
+    ヒープ先頭に来た時点で古いエントリを捨てる。
+    """
+
+    # 無効エントリがこの数を超えたらヒープを再構築
+    COMPACT_SLACK = 32
+
+    def __init__(self):
+        self._messages: Dict[str, Message] = {}
+        self._seqs: Dict[str, int] = {}
+        self._heaps: Dict[IndexKey, List[Tuple[int, str, int, str]]] = {}
+        self._live: Dict[IndexKey, int] = {}
+        self._receivers: Dict[str, int] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._messages
+
+    @staticmethod
+    def _keys(message: Message) -> List[IndexKey]:
+        receiver = message.receiver
+        message_type = message.message_type
+        priority = message.priority
+        return [
+            (receiver, None, None),
+            (receiver, message_type, None),
+            (receiver, None, priority),
+            (receiver, message_type, priority),
+        ]
+
+    def _is_live(self, entry: Tuple[int, str, int, str]) -> bool:
+        return self._seqs.get(entry[3]) == entry[2]
+
+    def add(self, message: Message) -> None:
+        """メッセージを追加（O(log n)）"""
+        if message.message_id in self._messages:
+            return
+
+        seq = next(self._counter)
+        entry = (PRIORITY_ORDER.get(message.priority, 2), message.timestamp, seq, message.message_id)
+        self._messages[message.message_id] = message
+        self._seqs[message.message_id] = seq
+        self._receivers[message.receiver] = self._receivers.get(message.receiver, 0) + 1
+
+        for key in self._keys(message):
+            heapq.heappush(self._heaps.setdefault(key, []), entry)
+            self._live[key] = self._live.get(key, 0) + 1
+
+    def remove(self, message_id: str) -> Optional[Message]:
+        """メッセージを削除（ヒープからは遅延削除）"""
+        message = self._messages.pop(message_id, None)
+        if message is None:
+            return None
+        del self._seqs[message_id]
+
+        self._receivers[message.receiver] -= 1
+        if not self._receivers[message.receiver]:
+            del self._receivers[message.receiver]
+
+        for key in self._keys(message):
+            self._live[key] -= 1
+            heap = self._heaps[key]
+            if not self._live[key]:
+                del self._heaps[key]
+                del self._live[key]
+            elif len(heap) > 2 * self._live[key] + self.COMPACT_SLACK:
+                self._heaps[key] = [entry for entry in heap if self._is_live(entry)]
+                heapq.heapify(self._heaps[key])
+        return message
+
+    def get(self, message_id: str) -> Optional[Message]:
+        """メッセージIDから取得"""
+        return self._messages.get(message_id)
+
+    def peek(
+        self,
+        receiver: str,
+        message_type: Optional[MessageType] = None,
+        priority: Optional[MessagePriority] = None,
+    ) -> Optional[Message]:
+        """条件に合う最優先のメッセージを取得（償却 O(log n)）"""
+        heap = self._heaps.get((receiver, message_type, priority))
+        while heap:
+            if self._is_live(heap[0]):
+                return self._messages[heap[0][3]]
+            heapq.heappop(heap)
+        return None
+
+    def _walk(self, heaps: List[List[Tuple[int, str, int, str]]]) -> Iterator[Tuple[int, str, int, str]]:
+        """ヒープを並べ替えずに優先度順に辿る（先頭 k 件まで O(k log k)、無効エントリは飛ばす）
+
+        ヒープの親は子より小さいので、取り出した位置の子だけを候補に加えればよい。
+        """
+        frontier = [(heap[0], i, 0) for i, heap in enumerate(heaps) if heap]
+        heapq.heapify(frontier)
+        while frontier:
+            entry, i, position = heapq.heappop(frontier)
+            heap = heaps[i]
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], i, child))
+            if self._is_live(entry):
+                yield entry
+
+    def list(
+        self,
+        receiver: Optional[str] = None,
+        message_type: Optional[MessageType] = None,
+        priority: Optional[MessagePriority] = None,
+        limit: Optional[int] = None,
+    ) -> List[Message]:
+        """条件に合うメッセージを優先度順・タイムスタンプ順で取得
+
+        ヒープを先頭から辿るので、limit 件なら O(limit log limit) で受信者全体は並べ替えない。
+        """
+        receivers = [receiver] if receiver else list(self._receivers)
+        heaps = [
+            self._heaps[key]
+            for key in ((name, message_type, priority) for name in receivers)
+            if key in self._heaps
+        ]
+        entries = itertools.islice(self._walk(heaps), limit)
+        return [self._messages[entry[3]] for entry in entries]
+
+    def count(self, receiver: str) -> int:
+        """受信者の未処理メッセージ数"""
+        return self._receivers.get(receiver, 0)
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        self._messages.clear()
+        self._seqs.clear()
+        self._heaps.clear()
+        self._live.clear()
+        self._receivers.clear()
+
+
+class ConsumerGroup:
+    """MessageQueue の名前付きコンシューマーグループ
+
+    同じ受信者のストリームを複数のグループがそれぞれのカーソルで読む。
+    グループの読み取り・確認は他のグループや mark_as_processed に影響しない。
+    """
+
+    def __init__(self, queue: "MessageQueue", receiver: str, name: str):
+        """
+        Args:
+            queue: メッセージキュー
+            receiver: 受信者
+            name: グループ名
+        """
+        self.queue = queue
+        self.receiver = receiver
+        self.name = name
+        self._group = queue.store.consumer_group(receiver, name)
+
+    async def read(self, max_count: Optional[int] = None) -> List[Message]:
+        """未配信のメッセージを到着順に取得
+
+        Args:
+            max_count: 最大件数
+
+        Returns:
+            メッセージのリスト
+        """
+        messages = []
+        for data in self._group.read(max_count):
+            try:
+                messages.append(Message.from_dict(dict(data)))
+            except Exception as e:
+                self.queue.logger.error(f"Failed to load message {data.get('message_id')}: {e}")
+                # 読めないメッセージで止まらないよう確認済みにする
+                self._group.ack([data.get("message_id", "")])
+        return messages
+
+    async def ack(self, message_ids: List[str]) -> int:
+        """メッセージを確認済みにしてカーソルを進める
+
+        Args:
+            message_ids: メッセージIDのリスト
+
+        Returns:
+            確認したメッセージ数
+        """
+        return self._group.ack(message_ids)
+
+    @property
+    def pending_count(self) -> int:
+        """配信済み・未確認のメッセージ数"""
+        return self._group.pending_count()
+
+
 class MessageQueue:
-    """YAMLベースのメッセージキュー"""
+    """ファイルベースのメッセージキュー
+
+    永続化はプラガブルなストア（mao.orchestrator.message_store）に委譲する。
+    デフォルトは追記専用セグメントログ、"yaml" で従来の1メッセージ1ファイル形式、
+    "redis" で複数プロセス・複数ホスト間で共有する Redis Stream。
+    """
 
     def __init__(
         self,
         project_path: Optional[Path] = None,
         logger: Optional[logging.Logger] = None,
+        backend: str = "log",
+        store_options: Optional[Dict[str, Any]] = None,
     ):
         """
         Args:
             project_path: プロジェクトパス（.maoディレクトリの親）
             logger: ロガー
+            backend: ストアバックエンド（log / yaml / redis）
+            store_options: ストア固有のオプション（例: {"fsync": True}）
         """
         self.project_path = project_path or Path.cwd()
         self.logger = logger or logging.getLogger(__name__)
@@ -96,10 +321,19 @@ class MessageQueue:
         self.queue_dir = self.project_path / ".mao" / "queue"
         self.messages_dir = self.queue_dir / "messages"
         self.processed_dir = self.queue_dir / "processed"
+        self.log_dir = self.queue_dir / "log"
+        # log ストアに取り込んだ旧形式の YAML メッセージの移動先
+        self.migrated_dir = self.queue_dir / "migrated"
+
+        # ストア
+        self.store = create_message_store(
+            backend, self.queue_dir, logger=self.logger, **(store_options or {})
+        )
+        if self.store.name == SegmentLogStore.name:
+            self._import_yaml_messages()
 
-        # ディレクトリ作成
-        self.messages_dir.mkdir(parents=True, exist_ok=True)
-        self.processed_dir.mkdir(parents=True, exist_ok=True)
+        # 未処理メッセージのインデックス（初回アクセス時にストアから再構築）
+        self._index = MessageIndex()
 
         # メッセージカウンター
         self._message_counter = 0
@@ -108,12 +342,82 @@ class MessageQueue:
         # メッセージハンドラー
         self._handlers: Dict[str, List[Callable]] = {}
 
+        # コンシューマーグループ（(受信者, グループ名) -> グループ）
+        self._groups: Dict[Tuple[str, str], ConsumerGroup] = {}
+
+        # start_polling 中の受信者ごとのウォッチャー
+        self._watchers: Dict[str, List[Any]] = {}
+
+    @property
+    def backend(self) -> str:
+        """ストアバックエンド名"""
+        return self.store.name
+
+    def _import_yaml_messages(self) -> None:
+        """messages/ に残っている未処理の YAML メッセージを log ストアに取り込む
+
+        log がデフォルトになる前のバージョン（yaml ストア）で送られ、まだ処理されて
+        いないメッセージを取りこぼさないため。取り込んだファイルは migrated/ に移す。
+        読めないファイルはそのまま残す。
+        """
+        if not self.messages_dir.is_dir():
+            return
+        message_files = sorted(self.messages_dir.glob("*.yaml"))
+        if not message_files:
+            return
+
+        records, imported = [], []
+        for message_file in message_files:
+            try:
+                data = read_document(message_file)
+            except Exception as e:
+                self.logger.error(f"Failed to import message from {message_file}: {e}")
+                continue
+            data.setdefault("message_id", message_file.stem)
+            records.append(data)
+            imported.append(message_file)
+        if not records:
+            return
+
+        self.store.append_many(records)
+        self.migrated_dir.mkdir(parents=True, exist_ok=True)
+        for message_file in imported:
+            os.replace(message_file, self.migrated_dir / message_file.name)
+        self.logger.warning(
+            f"Imported {len(records)} pending messages from {self.messages_dir} "
+            f"into the log store (originals moved to {self.migrated_dir})"
+        )
+
     def _generate_message_id(self) -> str:
         """メッセージIDを生成"""
         self._message_counter += 1
         timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
         return f"msg-{timestamp}-{self._message_counter:04d}"
 
+    def _refresh(self, receiver: Optional[str] = None) -> None:
+        """ストアの変更をビューに反映"""
+        for event in self.store.refresh(receiver):
+            if event.op == "put":
+                try:
+                    message = Message.from_dict(event.data)
+                except Exception as e:
+                    self.logger.error(f"Failed to load message {event.message_id}: {e}")
+                    continue
+                self._index.add(message)
+            else:
+                self._index.remove(event.message_id)
+
+    def _find_receiver(self, message_id: str) -> Optional[str]:
+        """未処理メッセージの受信者を検索"""
+        message = self._index.get(message_id)
+        return message.receiver if message else None
+
+    def _notify(self, receivers: List[str]) -> None:
+        """同一プロセス内の購読者を即座に起こす"""
+        for receiver in receivers:
+            for watcher in self._watchers.get(receiver, []):
+                watcher.notify()
+
     async def send_message(
         self,
         message_type: MessageType,
@@ -149,19 +453,58 @@ class MessageQueue:
                 metadata=metadata,
             )
 
-            # YAMLファイルに保存
-            message_file = self.messages_dir / f"{message_id}.yaml"
-            with open(message_file, "w") as f:
-                yaml.dump(message.to_dict(), f, default_flow_style=False, allow_unicode=True)
+            self.store.append(message.to_dict())
+            self._notify([receiver])
 
             self.logger.info(f"Message sent: {message_id} ({sender} -> {receiver})")
             return message_id
 
+    async def send_messages(self, batch: List[Dict[str, Any]]) -> List[str]:
+        """複数のメッセージをまとめて送信
+
+        受信者ごとに1回の書き込みにまとめる（ロック取得・ログ出力も1回）。
+
+        Args:
+            batch: send_message の引数と同じキーを持つ辞書のリスト
+                （message_type, sender, receiver, content, priority, metadata）
+
+        Returns:
+            メッセージIDのリスト（batch と同じ順序）
+        """
+        if not batch:
+            return []
+
+        async with self._lock:
+            messages = [
+                Message(
+                    message_id=self._generate_message_id(),
+                    message_type=item["message_type"],
+                    sender=item["sender"],
+                    receiver=item["receiver"],
+                    content=item["content"],
+                    priority=item.get("priority", MessagePriority.MEDIUM),
+                    metadata=item.get("metadata"),
+                )
+                for item in batch
+            ]
+
+            self.store.append_many([message.to_dict() for message in messages])
+
+            receivers = list(dict.fromkeys(message.receiver for message in messages))
+            self._notify(receivers)
+
+            self.logger.info(
+                f"Messages sent: {len(messages)} ({messages[0].message_id}..{messages[-1].message_id}, "
+                f"{len(receivers)} receivers)"
+            )
+            return [message.message_id for message in messages]
+
     async def get_messages(
         self,
         receiver: Optional[str] = None,
         message_type: Optional[MessageType] = None,
         priority: Optional[MessagePriority] = None,
+        limit: Optional[int] = None,
     ) -> List[Message]:
         """メッセージを取得
 
@@ -169,42 +512,35 @@ class MessageQueue:
             receiver: 受信者（指定しない場合は全て）
             message_type: メッセージタイプでフィルタ
             priority: 優先度でフィルタ
+            limit: 最大件数（優先度の高い順。Noneの場合は全て）
 
         Returns:
             メッセージのリスト
         """
-        messages = []
-
-        for message_file in sorted(self.messages_dir.glob("*.yaml")):
-            try:
-                with open(message_file) as f:
-                    data = yaml.safe_load(f)
-
-                message = Message.from_dict(data)
+        # 前回以降に追加された分だけを読み込む
+        self._refresh(receiver)
 
-                # フィルタ適用
-                if receiver and message.receiver != receiver:
-                    continue
-                if message_type and message.message_type != message_type:
-                    continue
-                if priority and message.priority != priority:
-                    continue
+        # 優先度順、タイムスタンプ順
+        return self._index.list(receiver, message_type, priority, limit=limit)
 
-                messages.append(message)
+    async def next_message(
+        self,
+        receiver: str,
+        message_type: Optional[MessageType] = None,
+        priority: Optional[MessagePriority] = None,
+    ) -> Optional[Message]:
+        """最優先の未処理メッセージを取得（処理済みにはしない）
 
-            except Exception as e:
-                self.logger.error(f"Failed to load message from {message_file}: {e}")
-
-        # 優先度順、タイムスタンプ順にソート
-        priority_order = {
-            MessagePriority.URGENT: 0,
-            MessagePriority.HIGH: 1,
-            MessagePriority.MEDIUM: 2,
-            MessagePriority.LOW: 3,
-        }
-        messages.sort(key=lambda m: (priority_order.get(m.priority, 2), m.timestamp))
+        Args:
+            receiver: 受信者
+            message_type: メッセージタイプでフィルタ
+            priority: 優先度でフィルタ
 
-        return messages
+        Returns:
+            メッセージ、なければNone
+        """
+        self._refresh(receiver)
+        return self._index.peek(receiver, message_type, priority)
 
     async def mark_as_processed(self, message_id: str) -> bool:
         """メッセージを処理済みとしてマーク
@@ -215,17 +551,50 @@ class MessageQueue:
         Returns:
             成功したかどうか
         """
-        message_file = self.messages_dir / f"{message_id}.yaml"
-        if not message_file.exists():
-            return False
+        receiver = self._find_receiver(message_id)
+        if receiver is None:
+            self._refresh()
+            receiver = self._find_receiver(message_id)
+            if receiver is None:
+                return False
 
-        # processedディレクトリに移動
-        processed_file = self.processed_dir / f"{message_id}.yaml"
-        message_file.rename(processed_file)
+        if not self.store.ack(receiver, message_id):
+            return False
+        self._index.remove(message_id)
 
         self.logger.info(f"Message marked as processed: {message_id}")
         return True
 
+    async def mark_processed_many(self, message_ids: List[str]) -> int:
+        """複数のメッセージをまとめて処理済みとしてマーク
+
+        受信者ごとに1回の書き込みにまとめる。
+
+        Args:
+            message_ids: メッセージIDのリスト
+
+        Returns:
+            処理済みにしたメッセージ数
+        """
+        if any(self._find_receiver(message_id) is None for message_id in message_ids):
+            self._refresh()
+
+        by_receiver: Dict[str, List[str]] = {}
+        for message_id in message_ids:
+            receiver = self._find_receiver(message_id)
+            if receiver is not None:
+                by_receiver.setdefault(receiver, []).append(message_id)
+
+        marked = 0
+        for receiver, ids in by_receiver.items():
+            for message_id in self.store.ack_many(receiver, ids):
+                self._index.remove(message_id)
+                marked += 1
+
+        if marked:
+            self.logger.info(f"Messages marked as processed: {marked}")
+        return marked
+
     async def delete_message(self, message_id: str) -> bool:
         """メッセージを削除
 
@@ -235,26 +604,18 @@ class MessageQueue:
         Returns:
             成功したかどうか
         """
-        message_file = self.messages_dir / f"{message_id}.yaml"
-        if not message_file.exists():
-            # processedディレクトリもチェック
-            message_file = self.processed_dir / f"{message_id}.yaml"
-            if not message_file.exists():
-                return False
+        receiver = self._find_receiver(message_id)
+        if not self.store.delete(message_id, receiver=receiver):
+            return False
 
-        message_file.unlink()
+        self._index.remove(message_id)
         self.logger.info(f"Message deleted: {message_id}")
         return True
 
     async def clear_all_messages(self) -> None:
-        """全メッセージをクリア"""
-        # 未処理メッセージ
-        for message_file in self.messages_dir.glob("*.yaml"):
-            message_file.unlink()
-
-        # 処理済みメッセージ
-        for message_file in self.processed_dir.glob("*.yaml"):
-            message_file.unlink()
+        """全メッセージをクリア（未処理・処理済み）"""
+        self.store.clear()
+        self._index.clear()
 
         self.logger.info("All messages cleared")
 
@@ -273,41 +634,94 @@ class MessageQueue:
             self._handlers[message_type.value] = []
         self._handlers[message_type.value].append(handler)
 
+    def consumer_group(self, receiver: str, name: str) -> ConsumerGroup:
+        """コンシューマーグループを取得
+
+        Args:
+            receiver: 受信者
+            name: グループ名（例: dashboard, monitor, orchestrator）
+
+        Returns:
+            コンシューマーグループ
+
+        Raises:
+            ValueError: バックエンドがコンシューマーグループに対応しない場合（yaml）
+        """
+        key = (receiver, name)
+        if key not in self._groups:
+            self._groups[key] = ConsumerGroup(self, receiver, name)
+        return self._groups[key]
+
+    def delete_consumer_group(self, receiver: str, name: str) -> bool:
+        """コンシューマーグループを削除（読まれなくなったグループがコンパクションを止めないように）
+
+        Args:
+            receiver: 受信者
+            name: グループ名
+
+        Returns:
+            グループが存在したかどうか
+
+        Raises:
+            ValueError: バックエンドがコンシューマーグループに対応しない場合（yaml）
+        """
+        self._groups.pop((receiver, name), None)
+        return self.store.delete_consumer_group(receiver, name)
+
+    async def _dispatch(self, message: Message) -> None:
+        """登録済みハンドラーを実行"""
+        handlers = self._handlers.get(message.message_type.value, [])
+        for handler in handlers:
+            try:
+                if asyncio.iscoroutinefunction(handler):
+                    await handler(message)
+                else:
+                    handler(message)
+            except Exception as e:
+                self.logger.error(f"Handler error for message {message.message_id}: {e}")
+
     async def process_messages(
         self,
         receiver: str,
         mark_processed: bool = True,
+        group: Optional[str] = None,
     ) -> int:
         """受信者のメッセージを処理
 
         Args:
             receiver: 受信者
             mark_processed: 処理済みとしてマークするか
+            group: コンシューマーグループ名（指定時はグループのカーソルで読み、
+                ハンドラー実行後に ack する。mark_processed は無視される。log / redis のみ）
 
         Returns:
             処理したメッセージ数
+
+        Raises:
+            ValueError: group を指定し、バックエンドがコンシューマーグループに対応しない場合
         """
+        if group is not None:
+            consumer_group = self.consumer_group(receiver, group)
+            messages = await consumer_group.read()
+            messages.sort(key=lambda m: (PRIORITY_ORDER.get(m.priority, 2), m.timestamp))
+            for message in messages:
+                await self._dispatch(message)
+            if messages:
+                await consumer_group.ack([message.message_id for message in messages])
+            return len(messages)
+
         messages = await self.get_messages(receiver=receiver)
         processed_count = 0
 
         for message in messages:
             # ハンドラーを実行
-            handlers = self._handlers.get(message.message_type.value, [])
-            for handler in handlers:
-                try:
-                    if asyncio.iscoroutinefunction(handler):
-                        await handler(message)
-                    else:
-                        handler(message)
-                except Exception as e:
-                    self.logger.error(f"Handler error for message {message.message_id}: {e}")
-
-            # 処理済みとしてマーク
-            if mark_processed:
-                await self.mark_as_processed(message.message_id)
-
+            await self._dispatch(message)
             processed_count += 1
 
+        # 処理済みとしてまとめてマーク
+        if mark_processed and messages:
+            await self.mark_processed_many([message.message_id for message in messages])
+
         return processed_count
 
     async def start_polling(
@@ -315,38 +729,108 @@ class MessageQueue:
         receiver: str,
         interval: float = 1.0,
         mark_processed: bool = True,
+        group: Optional[str] = None,
     ) -> None:
-        """メッセージポーリングを開始
+        """メッセージの購読を開始
+
+        ストアの変更通知（ファイル系: inotify、redis: XREAD BLOCK）で起動し、変更がない間は何もしない。
+        inotify が使えない環境では interval ごとにディレクトリの mtime を比較する。
 
         Args:
             receiver: 受信者
-            interval: ポーリング間隔（秒）
+            interval: フォールバック時のポーリング間隔（秒）
             mark_processed: 処理済みとしてマークするか
+            group: コンシューマーグループ名（process_messages を参照）
+        """
+        watcher = self.store.create_watcher(receiver, poll_interval=interval, logger=self.logger)
+        watcher.start()
+        self._watchers.setdefault(receiver, []).append(watcher)
+        self.logger.info(
+            f"Starting message subscription for {receiver} "
+            f"(notify={watcher.backend}, interval={interval}s)"
+        )
+
+        try:
+            while True:
+                try:
+                    await self.process_messages(
+                        receiver=receiver, mark_processed=mark_processed, group=group
+                    )
+                    await watcher.wait()
+                except asyncio.CancelledError:
+                    self.logger.info(f"Polling stopped for {receiver}")
+                    break
+                except Exception as e:
+                    self.logger.error(f"Polling error for {receiver}: {e}")
+                    await asyncio.sleep(interval)
+        finally:
+            self._watchers[receiver].remove(watcher)
+            watcher.close()
+
+    async def compact(self) -> Dict[str, int]:
+        """処理済みメッセージをアーカイブし、保持ポリシーを適用
+
+        Returns:
+            アーカイブ・削除した件数など（キーはストアによって異なる）
         """
-        self.logger.info(f"Starting message polling for {receiver} (interval={interval}s)")
+        async with self._lock:
+            result = self.store.compact()
+
+        if any(result.values()):
+            summary = ", ".join(f"{key}={value}" for key, value in result.items())
+            self.logger.info(f"Message store compacted: {summary}")
+        return result
 
+    async def start_compaction(self, interval: float = 300.0) -> None:
+        """定期的なコンパクションを開始
+
+        Args:
+            interval: 実行間隔（秒）
+        """
         while True:
             try:
-                await self.process_messages(receiver=receiver, mark_processed=mark_processed)
                 await asyncio.sleep(interval)
+                await self.compact()
             except asyncio.CancelledError:
-                self.logger.info(f"Polling stopped for {receiver}")
                 break
             except Exception as e:
-                self.logger.error(f"Polling error for {receiver}: {e}")
-                await asyncio.sleep(interval)
+                self.logger.error(f"Compaction error: {e}")
+
+    async def export(self, output_dir: Path, codec: str = "yaml") -> int:
+        """未処理メッセージを1メッセージ1ファイルで書き出す（人間・エージェント向け）
+
+        Args:
+            output_dir: 出力ディレクトリ（<receiver>/<message_id>.yaml）
+            codec: 出力形式（デフォルト YAML）
+
+        Returns:
+            書き出したメッセージ数
+        """
+        output_codec = get_codec(codec)
+        async with self._lock:
+            self._refresh()
+            messages = self._index.list()
+
+        for message in messages:
+            receiver_dir = output_dir / message.receiver
+            receiver_dir.mkdir(parents=True, exist_ok=True)
+            write_document(receiver_dir, message.message_id, message.to_dict(), output_codec)
+        return len(messages)
 
     def get_stats(self) -> Dict[str, Any]:
-        """統計情報を取得
+        """統計情報を取得（ストアのカウンターから取得、ディレクトリは走査しない）
 
         Returns:
             統計情報
         """
-        unprocessed_count = len(list(self.messages_dir.glob("*.yaml")))
-        processed_count = len(list(self.processed_dir.glob("*.yaml")))
+        counts = self.store.stats()
+        unprocessed_count = counts["unprocessed"]
+        processed_count = counts["processed"]
 
         return {
             "unprocessed": unprocessed_count,
             "processed": processed_count,
+            "archived": counts.get("archived", 0),
             "total": unprocessed_count + processed_count,
+            "backend": self.backend,
         }
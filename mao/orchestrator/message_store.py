@@ -0,0 +1,1113 @@
+"""
+Message storage backends for MessageQueue
+
+- SegmentLogStore: 受信者ごとの追記専用セグメントログ（デフォルト）
+- YamlFileStore: 1メッセージ1YAMLファイル（デバッグ・エクスポート用）
+- RedisMessageStore: Redis Stream（mao.orchestrator.redis_backend、redis パッケージが必要）
+
+ストアは永続化と変更フィードのみを担当し、未処理メッセージのビューは
+MessageQueue 側が保持する。
+"""
+import gzip
+import json
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, List, Set, Tuple
+from urllib.parse import quote, unquote
+import logging
+
+from mao.orchestrator.codec import DEFAULT_CODEC, get_codec, read_document, write_document
+from mao.orchestrator.fs_watcher import DirectoryWatcher
+
+
+@dataclass
+class StoreEvent:
+    """ストアの変更イベント
+
+    op:
+        put: 未処理メッセージが追加された
+        ack: メッセージが処理済みになった
+        del: メッセージが削除された
+    """
+
+    op: str
+    message_id: str
+    receiver: str
+    data: Optional[Dict[str, Any]] = None
+
+
+class MessageStore(ABC):
+    """メッセージストアの基底クラス"""
+
+    name: str = ""
+
+    def __init__(self, queue_dir: Path, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            queue_dir: キューディレクトリ（.mao/queue）
+            logger: ロガー
+        """
+        self.queue_dir = queue_dir
+        self.logger = logger or logging.getLogger(__name__)
+
+    @abstractmethod
+    def append(self, data: Dict[str, Any]) -> None:
+        """メッセージを追加
+
+        Args:
+            data: Message.to_dict() の結果
+        """
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """複数メッセージを追加
+
+        Args:
+            records: Message.to_dict() の結果のリスト
+        """
+        for data in records:
+            self.append(data)
+
+    @abstractmethod
+    def refresh(self, receiver: Optional[str] = None) -> List[StoreEvent]:
+        """前回の refresh 以降の変更を読み込む
+
+        Args:
+            receiver: 受信者（指定しない場合は全受信者）
+
+        Returns:
+            変更イベントのリスト
+        """
+
+    @abstractmethod
+    def ack(self, receiver: str, message_id: str) -> bool:
+        """メッセージを処理済みにする
+
+        Returns:
+            成功したかどうか
+        """
+
+    def ack_many(self, receiver: str, message_ids: List[str]) -> List[str]:
+        """同じ受信者の複数メッセージを処理済みにする
+
+        Returns:
+            処理済みにしたメッセージIDのリスト
+        """
+        return [message_id for message_id in message_ids if self.ack(receiver, message_id)]
+
+    @abstractmethod
+    def delete(self, message_id: str, receiver: Optional[str] = None) -> bool:
+        """メッセージを削除（未処理・処理済みのどちらでも可）
+
+        Returns:
+            成功したかどうか
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """全メッセージを削除"""
+
+    @abstractmethod
+    def watch_paths(self, receiver: str) -> List[Path]:
+        """受信者宛ての書き込みで変更されるディレクトリ
+
+        Args:
+            receiver: 受信者
+
+        Returns:
+            監視対象ディレクトリのリスト
+        """
+
+    def create_watcher(
+        self,
+        receiver: str,
+        poll_interval: float = 1.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> Any:
+        """受信者宛ての書き込みを待機するウォッチャーを作成
+
+        Args:
+            receiver: 受信者
+            poll_interval: ポーリング間隔（秒）
+            logger: ロガー
+
+        Returns:
+            start() / wait() / notify() / close() を持つウォッチャー
+        """
+        return DirectoryWatcher(
+            self.watch_paths(receiver), poll_interval=poll_interval, logger=logger
+        )
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """件数を取得
+
+        Returns:
+            unprocessed / processed の件数
+        """
+
+    def compact(self) -> Dict[str, int]:
+        """処理済みメッセージのアーカイブと保持ポリシーの適用
+
+        Returns:
+            アーカイブ・削除した件数など（対応しないストアは空）
+        """
+        return {}
+
+    @abstractmethod
+    def consumer_group(self, receiver: str, group: str) -> "StoreConsumerGroup":
+        """受信者ストリームのコンシューマーグループを開く
+
+        Args:
+            receiver: 受信者
+            group: グループ名
+
+        Returns:
+            コンシューマーグループ
+
+        Raises:
+            ValueError: コンシューマーグループに対応しないバックエンドの場合
+        """
+
+    @abstractmethod
+    def delete_consumer_group(self, receiver: str, group: str) -> bool:
+        """コンシューマーグループを削除（カーソルがコンパクションを止めなくなる）
+
+        Args:
+            receiver: 受信者
+            group: グループ名
+
+        Returns:
+            グループが存在したかどうか
+
+        Raises:
+            ValueError: コンシューマーグループに対応しないバックエンドの場合
+        """
+
+
+class StoreConsumerGroup(ABC):
+    """受信者ストリームを独立したカーソルで読むコンシューマーグループ
+
+    read で配信したメッセージは ack されるまでカーソルが進まない。
+    ack 前にプロセスが落ちた場合、次に開いたグループが同じメッセージを再配信する
+    （at-least-once）。
+    """
+
+    def __init__(self, receiver: str, name: str):
+        self.receiver = receiver
+        self.name = name
+
+    @abstractmethod
+    def read(self, max_count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """未配信のメッセージを到着順に取得
+
+        Args:
+            max_count: 最大件数
+
+        Returns:
+            Message.to_dict() 形式の辞書のリスト
+        """
+
+    @abstractmethod
+    def ack(self, message_ids: List[str]) -> int:
+        """配信済みメッセージを確認し、カーソルを進める
+
+        Returns:
+            確認したメッセージ数
+        """
+
+    @abstractmethod
+    def pending_count(self) -> int:
+        """配信済み・未確認のメッセージ数"""
+
+
+@dataclass
+class RetentionPolicy:
+    """アーカイブ済みメッセージの保持ポリシー
+
+    いずれかの上限を超えた場合、古いアーカイブセグメントから削除する。
+    None の項目は無制限。
+
+    group_max_idle_seconds を過ぎても確認（ack）のないコンシューマーグループは放棄された
+    ものとしてコンパクション時に削除する（残っているとカーソル以降をアーカイブできない）。
+    """
+
+    max_age_seconds: Optional[float] = None
+    max_messages: Optional[int] = None
+    max_bytes: Optional[int] = None
+    group_max_idle_seconds: Optional[float] = None
+
+
+@dataclass
+class _Partition:
+    """受信者ごとのログパーティション"""
+
+    receiver: str
+    path: Path
+    segment: int = 0  # 読み取り中のセグメント番号
+    position: int = 0  # 読み取り中セグメント内のバイトオフセット
+    write_segment: int = 0  # 追記先セグメント番号
+    # メッセージID -> put レコードのあるセグメント番号
+    pending: Dict[str, int] = field(default_factory=dict)
+    processed: Dict[str, int] = field(default_factory=dict)
+    # アーカイブ済みの最後のセグメント番号（meta.json）
+    archived_through: int = -1
+    archived_messages: int = 0
+    archives: List[Dict[str, Any]] = field(default_factory=list)
+    meta_mtime_ns: int = 0
+    # このインスタンスが書き込んだ後、まだ読み込んでいない
+    dirty: bool = False
+
+
+class SegmentLogStore(MessageStore):
+    """追記専用セグメントログ
+
+    レイアウト:
+        .mao/queue/log/<receiver>/00000000.log
+        .mao/queue/log/<receiver>/00000001.log  ...
+        .mao/queue/log/<receiver>/meta.json        アーカイブ情報・件数
+        .mao/queue/archive/<receiver>/00000000.log.gz
+
+    各行は JSON の1レコード（put / ack / del）。codec="msgpack" では MessagePack の
+    レコードを連結したセグメント（*.mpk）になる。受信者ごとに読み取りオフセットを
+    保持し、refresh は前回のオフセット以降に追記されたバイトだけを読む。
+    バッチ操作はパーティションごとに1回の write（fsync=True なら1回の fsync）にまとめる。
+
+    compact は全メッセージが処理済みになった古いセグメントを gzip アーカイブに移し、
+    RetentionPolicy に従って古いアーカイブを削除する。起動時に読むのは
+    アーカイブされていないセグメントだけなので、起動コストは履歴の長さに依存しない。
+    """
+
+    name = "log"
+    META_FILE = "meta.json"
+
+    def __init__(
+        self,
+        queue_dir: Path,
+        logger: Optional[logging.Logger] = None,
+        segment_max_bytes: int = 1024 * 1024,
+        fsync: bool = False,
+        retention: Optional[RetentionPolicy] = None,
+        codec: str = DEFAULT_CODEC,
+    ):
+        """
+        Args:
+            queue_dir: キューディレクトリ（.mao/queue）
+            logger: ロガー
+            segment_max_bytes: セグメントをロールするサイズ
+            fsync: 書き込みごとに fsync するか
+            retention: アーカイブの保持ポリシー（dict も可）
+            codec: レコードのエンコード形式（json / msgpack）
+        """
+        super().__init__(queue_dir, logger)
+        self.codec = get_codec(codec)
+        if not self.codec.supports_stream:
+            raise ValueError(f"{codec} codec cannot be used for the message log")
+        self.segment_suffix = self.codec.segment_suffix
+        self.archive_suffix = self.segment_suffix + ".gz"
+        self.log_dir = queue_dir / "log"
+        self.groups_dir = queue_dir / "groups"
+        self.archive_dir = queue_dir / "archive"
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync = fsync
+        if isinstance(retention, dict):
+            retention = RetentionPolicy(**retention)
+        self.retention = retention or RetentionPolicy()
+        self._partitions: Dict[str, _Partition] = {}
+
+        # 読み込み済みで refresh がまだ返していないイベント
+        self._unreported: List[StoreEvent] = []
+
+        # 件数カウンター（全パーティション合計）
+        self._unprocessed = 0
+        self._processed = 0
+        self._archived = 0
+        # stats() の初回に全パーティションを読み込んだか
+        self._loaded = False
+
+    # --- パーティション管理 ---
+
+    @staticmethod
+    def _encode_receiver(receiver: str) -> str:
+        """受信者名をディレクトリ名に変換"""
+        name = quote(receiver, safe="")
+        if name.startswith("."):
+            name = "%2E" + name[1:]
+        return name
+
+    def _segment_path(self, partition: _Partition, segment: int) -> Path:
+        return partition.path / f"{segment:08d}{self.segment_suffix}"
+
+    def _archive_path(self, partition: _Partition, segment: int) -> Path:
+        return (
+            self.archive_dir
+            / self._encode_receiver(partition.receiver)
+            / f"{segment:08d}{self.archive_suffix}"
+        )
+
+    def _list_segments(self, path: Path) -> List[int]:
+        """パーティション内のセグメント番号一覧（昇順）"""
+        segments = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    stem, ext = os.path.splitext(entry.name)
+                    if ext == self.segment_suffix and stem.isdigit():
+                        segments.append(int(stem))
+        except FileNotFoundError:
+            pass
+        return sorted(segments)
+
+    def _partition(self, receiver: str) -> _Partition:
+        """パーティションを取得（初回はディスクから位置を決定）"""
+        partition = self._partitions.get(receiver)
+        if partition is None:
+            path = self.log_dir / self._encode_receiver(receiver)
+            path.mkdir(parents=True, exist_ok=True)
+            partition = _Partition(receiver=receiver, path=path)
+            self._sync_meta(partition)
+            segments = self._list_segments(path)
+            first_segment = partition.archived_through + 1
+            partition.segment = segments[0] if segments else first_segment
+            partition.write_segment = segments[-1] if segments else first_segment
+            self._partitions[receiver] = partition
+        return partition
+
+    def _discover_partitions(self) -> List[_Partition]:
+        """ログディレクトリ上の全パーティションを取得"""
+        try:
+            with os.scandir(self.log_dir) as entries:
+                names = [entry.name for entry in entries if entry.is_dir()]
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            receiver = unquote(name)
+            if receiver not in self._partitions:
+                self._partition(receiver)
+        return list(self._partitions.values())
+
+    # --- meta.json ---
+
+    def _sync_meta(self, partition: _Partition) -> None:
+        """他インスタンスが更新した meta.json を取り込む（mtime が変わった時のみ読む）"""
+        meta_file = partition.path / self.META_FILE
+        try:
+            mtime_ns = meta_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = 0
+        if mtime_ns == partition.meta_mtime_ns:
+            return
+
+        meta: Dict[str, Any] = {}
+        if mtime_ns:
+            try:
+                with open(meta_file) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.error(f"Failed to load {meta_file}: {e}")
+                return
+
+        partition.meta_mtime_ns = mtime_ns
+        archived_messages = int(meta.get("archived_messages", 0))
+        self._archived += archived_messages - partition.archived_messages
+        partition.archived_messages = archived_messages
+        partition.archived_through = int(meta.get("archived_through", -1))
+        partition.archives = list(meta.get("archives", []))
+
+        # 他インスタンスがアーカイブした処理済みメッセージを件数から外す
+        for message_id, segment in list(partition.processed.items()):
+            if segment <= partition.archived_through:
+                del partition.processed[message_id]
+                self._processed -= 1
+
+    def _save_meta(self, partition: _Partition) -> None:
+        """meta.json をアトミックに保存"""
+        meta_file = partition.path / self.META_FILE
+        tmp_file = partition.path / f"{self.META_FILE}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(
+                {
+                    "archived_through": partition.archived_through,
+                    "archived_messages": partition.archived_messages,
+                    "archives": partition.archives,
+                },
+                f,
+            )
+        os.replace(tmp_file, meta_file)
+        partition.meta_mtime_ns = meta_file.stat().st_mtime_ns
+
+    # --- 書き込み ---
+
+    def _active_segment(self, partition: _Partition) -> int:
+        """追記先セグメントを決定（他インスタンスのロールにも追従）"""
+        while self._segment_path(partition, partition.write_segment + 1).exists():
+            partition.write_segment += 1
+        try:
+            size = self._segment_path(partition, partition.write_segment).stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size >= self.segment_max_bytes:
+            partition.write_segment += 1
+        return partition.write_segment
+
+    def _write_records(self, partition: _Partition, records: List[Dict[str, Any]]) -> None:
+        """レコードをパーティションに追記"""
+        payload = self.codec.encode_many(records)
+        segment = self._active_segment(partition)
+        with open(self._segment_path(partition, segment), "ab") as f:
+            f.write(payload)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        partition.dirty = True
+
+    def append(self, data: Dict[str, Any]) -> None:
+        self.append_many([data])
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        by_receiver: Dict[str, List[Dict[str, Any]]] = {}
+        for data in records:
+            by_receiver.setdefault(data["receiver"], []).append({"op": "put", "message": data})
+
+        for receiver, partition_records in by_receiver.items():
+            self._write_records(self._partition(receiver), partition_records)
+
+    def ack(self, receiver: str, message_id: str) -> bool:
+        return bool(self.ack_many(receiver, [message_id]))
+
+    def ack_many(self, receiver: str, message_ids: List[str]) -> List[str]:
+        partition = self._partition(receiver)
+        self._read_partition(partition)
+        acked = [message_id for message_id in dict.fromkeys(message_ids)
+                 if message_id in partition.pending]
+        if acked:
+            self._write_records(partition, [{"op": "ack", "id": message_id} for message_id in acked])
+        return acked
+
+    def delete(self, message_id: str, receiver: Optional[str] = None) -> bool:
+        if receiver is not None:
+            partitions = [self._partition(receiver)]
+        else:
+            partitions = self._discover_partitions()
+
+        for partition in partitions:
+            self._read_partition(partition)
+            if message_id in partition.pending or message_id in partition.processed:
+                self._write_records(partition, [{"op": "del", "id": message_id}])
+                return True
+        return False
+
+    def watch_paths(self, receiver: str) -> List[Path]:
+        return [self._partition(receiver).path]
+
+    def clear(self) -> None:
+        for partition in self._discover_partitions():
+            for segment in self._list_segments(partition.path):
+                self._segment_path(partition, segment).unlink(missing_ok=True)
+            (partition.path / self.META_FILE).unlink(missing_ok=True)
+        for archive_file in self.archive_dir.glob(f"*/*{self.archive_suffix}"):
+            archive_file.unlink(missing_ok=True)
+        for cursor_file in self.groups_dir.glob("*/*.json"):
+            cursor_file.unlink(missing_ok=True)
+        self._partitions.clear()
+        self._unreported.clear()
+        self._unprocessed = self._processed = self._archived = 0
+
+    # --- 読み取り ---
+
+    def _apply(self, partition: _Partition, record: Dict[str, Any]) -> Optional[StoreEvent]:
+        """レコードをパーティション状態に適用"""
+        op = record.get("op")
+        if op == "put":
+            data = record["message"]
+            message_id = data["message_id"]
+            if message_id not in partition.pending:
+                self._unprocessed += 1
+            partition.pending[message_id] = partition.segment
+            return StoreEvent("put", message_id, partition.receiver, data)
+
+        message_id = record.get("id", "")
+        if op == "ack":
+            if message_id not in partition.pending:
+                return None
+            del partition.pending[message_id]
+            partition.processed[message_id] = partition.segment
+            self._unprocessed -= 1
+            self._processed += 1
+            return StoreEvent("ack", message_id, partition.receiver)
+        if op == "del":
+            if partition.pending.pop(message_id, None) is not None:
+                self._unprocessed -= 1
+            elif partition.processed.pop(message_id, None) is not None:
+                self._processed -= 1
+            else:
+                return None
+            return StoreEvent("del", message_id, partition.receiver)
+
+        self.logger.warning(f"Unknown log record in {partition.path}: {record}")
+        return None
+
+    def _reset_partition(self, partition: _Partition) -> List[StoreEvent]:
+        """セグメントが消えた（clearされた）パーティションを初期化"""
+        events = [
+            StoreEvent("del", message_id, partition.receiver)
+            for message_id in partition.pending
+        ]
+        self._unprocessed -= len(partition.pending)
+        self._processed -= len(partition.processed)
+        partition.pending.clear()
+        partition.processed.clear()
+
+        segments = self._list_segments(partition.path)
+        first_segment = partition.archived_through + 1
+        partition.segment = segments[0] if segments else first_segment
+        partition.write_segment = segments[-1] if segments else first_segment
+        partition.position = 0
+        return events
+
+    def _skip_archived(self, partition: _Partition) -> List[StoreEvent]:
+        """他インスタンスがアーカイブしたセグメントを読み飛ばす
+
+        アーカイブされるのは put が全て処理済みになったセグメントだけなので、
+        アーカイブ範囲に put があるメッセージは処理済みとして扱える。
+        """
+        events = []
+        for message_id, segment in list(partition.pending.items()):
+            if segment <= partition.archived_through:
+                del partition.pending[message_id]
+                self._unprocessed -= 1
+                events.append(StoreEvent("ack", message_id, partition.receiver))
+
+        later = [s for s in self._list_segments(partition.path) if s > partition.archived_through]
+        partition.segment = later[0] if later else partition.archived_through + 1
+        partition.position = 0
+        return events
+
+    def _parse_chunk(
+        self, chunk: bytes, segment_path: Path
+    ) -> Tuple[List[Tuple[Dict[str, Any], int]], int]:
+        """読み込んだバイト列を完結したレコードごとに変換
+
+        書き込み途中の末尾レコードは消費しない。
+
+        Returns:
+            ((レコード, チャンク先頭からのレコード末尾オフセット) のリスト, 消費したバイト数)
+        """
+        def on_error(e: Exception) -> None:
+            self.logger.error(f"Corrupted log record in {segment_path}: {e}")
+
+        return self.codec.decode_stream(chunk, on_error)
+
+    def _read_partition(self, partition: _Partition) -> None:
+        """前回のオフセット以降のレコードを読み込む
+
+        変更イベントは次の refresh で返すために蓄積する。
+        """
+        events = self._unreported
+        partition.dirty = False
+        self._sync_meta(partition)
+
+        while True:
+            segment_path = self._segment_path(partition, partition.segment)
+            try:
+                with open(segment_path, "rb") as f:
+                    f.seek(partition.position)
+                    chunk = f.read()
+            except FileNotFoundError:
+                if partition.segment <= partition.archived_through:
+                    events.extend(self._skip_archived(partition))
+                    continue
+                if partition.position == 0 and not partition.pending and not partition.processed:
+                    # まだ何も書かれていない
+                    return
+                events.extend(self._reset_partition(partition))
+                continue
+
+            records, consumed = self._parse_chunk(chunk, segment_path)
+            for record, _ in records:
+                try:
+                    event = self._apply(partition, record)
+                except KeyError as e:
+                    self.logger.error(f"Corrupted log record in {segment_path}: {e}")
+                    continue
+                if event:
+                    events.append(event)
+            partition.position += consumed
+
+            if consumed == len(chunk) and self._segment_path(
+                partition, partition.segment + 1
+            ).exists():
+                partition.segment += 1
+                partition.position = 0
+                continue
+            return
+
+    # --- コンパクション・保持 ---
+
+    def _group_floor(self, partition: _Partition, now: float) -> Tuple[Optional[int], Optional[str]]:
+        """コンシューマーグループのカーソルが指す最小セグメントとそのグループ名
+
+        保持ポリシーの group_max_idle_seconds を過ぎてカーソルが更新されていない
+        グループは削除し、最小値に含めない。
+        """
+        floor, floor_group = None, None
+        max_idle = self.retention.group_max_idle_seconds
+        group_dir = self.groups_dir / self._encode_receiver(partition.receiver)
+        for cursor_file in group_dir.glob("*.json"):
+            group = unquote(cursor_file.stem)
+            try:
+                idle = now - cursor_file.stat().st_mtime
+                if max_idle is not None and idle > max_idle:
+                    cursor_file.unlink()
+                    self.logger.warning(
+                        f"Removed consumer group '{group}' of {partition.receiver}: "
+                        f"no ack for {idle:.0f}s"
+                    )
+                    continue
+                with open(cursor_file) as f:
+                    segment = int(json.load(f)["segment"])
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            if floor is None or segment < floor:
+                floor, floor_group = segment, group
+        return floor, floor_group
+
+    def _compact_partition(self, partition: _Partition, now: float) -> Dict[str, int]:
+        """パーティションの処理済みセグメントをアーカイブし、保持ポリシーを適用"""
+        result = {"archived_segments": 0, "archived_messages": 0,
+                  "removed_archives": 0, "reclaimed_bytes": 0}
+        self._read_partition(partition)
+
+        pending_floor = min(partition.pending.values(), default=None)
+        group_floor, floor_group = self._group_floor(partition, now)
+
+        # 古い順に、全 put が処理済みで読み終えた封印済みセグメントだけをアーカイブする
+        for segment in self._list_segments(partition.path):
+            if segment >= partition.segment or segment >= partition.write_segment:
+                break
+            if pending_floor is not None and segment >= pending_floor:
+                break
+            if group_floor is not None and segment >= group_floor:
+                self.logger.warning(
+                    f"Consumer group '{floor_group}' of {partition.receiver} is holding back "
+                    f"compaction at segment {group_floor}; delete it with delete_consumer_group() "
+                    f"if it is no longer read"
+                )
+                break
+
+            segment_path = self._segment_path(partition, segment)
+            archive_path = self._archive_path(partition, segment)
+            archive_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(segment_path, "rb") as src, gzip.open(archive_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+            archived_ids = [mid for mid, seg in partition.processed.items() if seg == segment]
+            for message_id in archived_ids:
+                del partition.processed[message_id]
+            self._processed -= len(archived_ids)
+            self._archived += len(archived_ids)
+
+            archive_bytes = archive_path.stat().st_size
+            result["reclaimed_bytes"] += segment_path.stat().st_size - archive_bytes
+            partition.archives.append({
+                "segment": segment,
+                "messages": len(archived_ids),
+                "bytes": archive_bytes,
+                "archived_at": now,
+            })
+            partition.archived_messages += len(archived_ids)
+            partition.archived_through = segment
+            # 他インスタンスが読み飛ばせるよう、セグメント削除前に meta を保存
+            self._save_meta(partition)
+            segment_path.unlink()
+
+            result["archived_segments"] += 1
+            result["archived_messages"] += len(archived_ids)
+
+        removed = self._apply_retention(partition, now)
+        if removed:
+            result["removed_archives"] += len(removed)
+            result["reclaimed_bytes"] += sum(archive["bytes"] for archive in removed)
+            self._save_meta(partition)
+        return result
+
+    def _apply_retention(self, partition: _Partition, now: float) -> List[Dict[str, Any]]:
+        """保持ポリシーを超えた古いアーカイブを削除"""
+        policy = self.retention
+        archives = partition.archives
+        total_messages = sum(archive["messages"] for archive in archives)
+        total_bytes = sum(archive["bytes"] for archive in archives)
+
+        removed = []
+        while archives:
+            oldest = archives[0]
+            expired = (
+                policy.max_age_seconds is not None
+                and now - oldest["archived_at"] > policy.max_age_seconds
+            )
+            over_count = policy.max_messages is not None and total_messages > policy.max_messages
+            over_size = policy.max_bytes is not None and total_bytes > policy.max_bytes
+            if not (expired or over_count or over_size):
+                break
+
+            archives.pop(0)
+            self._archive_path(partition, oldest["segment"]).unlink(missing_ok=True)
+            total_messages -= oldest["messages"]
+            total_bytes -= oldest["bytes"]
+            partition.archived_messages -= oldest["messages"]
+            self._archived -= oldest["messages"]
+            removed.append(oldest)
+        return removed
+
+    def compact(self) -> Dict[str, int]:
+        """処理済みセグメントのアーカイブと保持ポリシーの適用
+
+        Returns:
+            archived_segments / archived_messages / removed_archives / reclaimed_bytes
+        """
+        now = time.time()
+        totals = {"archived_segments": 0, "archived_messages": 0,
+                  "removed_archives": 0, "reclaimed_bytes": 0}
+        for partition in self._discover_partitions():
+            for key, value in self._compact_partition(partition, now).items():
+                totals[key] += value
+        return totals
+
+    def read_archive(self, receiver: str) -> Iterator[Dict[str, Any]]:
+        """アーカイブ済みメッセージを古い順に読む
+
+        Args:
+            receiver: 受信者
+
+        Yields:
+            Message.to_dict() 形式の辞書
+        """
+        partition = self._partition(receiver)
+        self._sync_meta(partition)
+        for archive in partition.archives:
+            archive_path = self._archive_path(partition, archive["segment"])
+            try:
+                with gzip.open(archive_path, "rb") as f:
+                    records, _ = self._parse_chunk(f.read(), archive_path)
+            except FileNotFoundError:
+                continue
+            for record, _ in records:
+                if record.get("op") == "put":
+                    yield record["message"]
+
+    def refresh(self, receiver: Optional[str] = None) -> List[StoreEvent]:
+        if receiver is not None:
+            self._read_partition(self._partition(receiver))
+        else:
+            for partition in self._discover_partitions():
+                self._read_partition(partition)
+
+        events, self._unreported = self._unreported, []
+        return events
+
+    def consumer_group(self, receiver: str, group: str) -> "LogConsumerGroup":
+        return LogConsumerGroup(self, self._partition(receiver), group)
+
+    def delete_consumer_group(self, receiver: str, group: str) -> bool:
+        cursor_file = (
+            self.groups_dir / self._encode_receiver(receiver) / f"{self._encode_receiver(group)}.json"
+        )
+        try:
+            cursor_file.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """件数を取得（ディレクトリは走査せず、メモリ上のカウンターを返す）
+
+        全パーティションを読むのは初回だけ。以降はこのインスタンスが書き込んだ
+        パーティションだけを読み進める。他インスタンスの書き込みは refresh() で反映される。
+        """
+        if not self._loaded:
+            self._loaded = True
+            for partition in self._discover_partitions():
+                self._read_partition(partition)
+        else:
+            for partition in list(self._partitions.values()):
+                if partition.dirty:
+                    self._read_partition(partition)
+        return {
+            "unprocessed": self._unprocessed,
+            "processed": self._processed + self._archived,
+            "archived": self._archived,
+        }
+
+
+class LogConsumerGroup(StoreConsumerGroup):
+    """SegmentLogStore 上のコンシューマーグループ
+
+    カーソル（セグメント番号・バイトオフセット）を
+    .mao/queue/groups/<receiver>/<group>.json に永続化する。
+    ack は順不同でよく、確認済みの連続した先頭部分だけカーソルが進む。
+    """
+
+    def __init__(self, store: SegmentLogStore, partition: _Partition, name: str):
+        super().__init__(partition.receiver, name)
+        self.store = store
+        self.partition = partition
+        self.cursor_file = (
+            store.groups_dir
+            / store._encode_receiver(partition.receiver)
+            / f"{store._encode_receiver(name)}.json"
+        )
+
+        # 確認済みカーソル（永続化される位置）
+        self.segment, self.position = self._load_cursor()
+        # 読み取り位置（配信済み・未確認を含む）
+        self._read_segment, self._read_position = self.segment, self.position
+        # 配信済み・未確認: メッセージID -> レコード末尾の位置（配信順）
+        self._inflight: Dict[str, Tuple[int, int]] = {}
+        self._acked: Set[str] = set()
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        try:
+            with open(self.cursor_file) as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["position"])
+        except FileNotFoundError:
+            segments = self.store._list_segments(self.partition.path)
+            return (segments[0] if segments else 0), 0
+        except (ValueError, KeyError, TypeError) as e:
+            self.store.logger.error(f"Invalid cursor file {self.cursor_file}: {e}")
+            return 0, 0
+
+    def _save_cursor(self) -> None:
+        """カーソルをアトミックに保存"""
+        self.cursor_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cursor_file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump({"segment": self.segment, "position": self.position}, f)
+        os.replace(tmp_file, self.cursor_file)
+
+    def _skip_missing_segment(self) -> bool:
+        """読み取り位置のセグメントが消えていれば次の既存セグメントへ進む"""
+        for segment in self.store._list_segments(self.partition.path):
+            if segment > self._read_segment:
+                self._read_segment, self._read_position = segment, 0
+                return True
+        return False
+
+    def read(self, max_count: Optional[int] = None) -> List[Dict[str, Any]]:
+        messages: List[Dict[str, Any]] = []
+
+        while max_count is None or len(messages) < max_count:
+            segment_path = self.store._segment_path(self.partition, self._read_segment)
+            try:
+                with open(segment_path, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if self._read_position > size:
+                        # clear 後に作り直されたセグメント
+                        self._read_position = 0
+                    f.seek(self._read_position)
+                    chunk = f.read()
+            except FileNotFoundError:
+                if self._skip_missing_segment():
+                    continue
+                break
+
+            records, consumed = self.store._parse_chunk(chunk, segment_path)
+            base = self._read_position
+            for record, record_end in records:
+                self._read_position = base + record_end
+                if record.get("op") != "put":
+                    continue
+                data = record["message"]
+                self._inflight[data["message_id"]] = (self._read_segment, self._read_position)
+                messages.append(data)
+                if max_count is not None and len(messages) >= max_count:
+                    break
+            else:
+                self._read_position = base + consumed
+                if consumed == len(chunk) and self.store._segment_path(
+                    self.partition, self._read_segment + 1
+                ).exists():
+                    self._read_segment += 1
+                    self._read_position = 0
+                    continue
+                break
+
+        # 配信済みメッセージがなければ読み取り位置までカーソルを進める
+        if not self._inflight and (self._read_segment, self._read_position) != (
+            self.segment,
+            self.position,
+        ):
+            self.segment, self.position = self._read_segment, self._read_position
+            self._save_cursor()
+
+        return messages
+
+    def ack(self, message_ids: List[str]) -> int:
+        acked = 0
+        for message_id in message_ids:
+            if message_id in self._inflight and message_id not in self._acked:
+                self._acked.add(message_id)
+                acked += 1
+
+        # 先頭から連続して確認済みの分だけカーソルを進める
+        advanced = False
+        for message_id in list(self._inflight):
+            if message_id not in self._acked:
+                break
+            self.segment, self.position = self._inflight.pop(message_id)
+            self._acked.discard(message_id)
+            advanced = True
+
+        if advanced:
+            if not self._inflight:
+                self.segment, self.position = self._read_segment, self._read_position
+            self._save_cursor()
+        return acked
+
+    def pending_count(self) -> int:
+        return len(self._inflight) - len(self._acked)
+
+
+class YamlFileStore(MessageStore):
+    """1メッセージ1YAMLファイルのストア（デバッグ・エクスポート用）
+
+    レイアウト:
+        .mao/queue/messages/<message_id>.yaml   未処理
+        .mao/queue/processed/<message_id>.yaml  処理済み
+    """
+
+    name = "yaml"
+
+    def __init__(self, queue_dir: Path, logger: Optional[logging.Logger] = None):
+        super().__init__(queue_dir, logger)
+        self.messages_dir = queue_dir / "messages"
+        self.processed_dir = queue_dir / "processed"
+        self.messages_dir.mkdir(parents=True, exist_ok=True)
+        self.processed_dir.mkdir(parents=True, exist_ok=True)
+
+        self._codec = get_codec("yaml")
+
+        # 読み込み済みファイル -> 受信者
+        self._known: Dict[str, str] = {}
+
+    def append(self, data: Dict[str, Any]) -> None:
+        write_document(self.messages_dir, data["message_id"], data, self._codec)
+
+    def refresh(self, receiver: Optional[str] = None) -> List[StoreEvent]:
+        events: List[StoreEvent] = []
+        current = set()
+
+        for message_file in sorted(self.messages_dir.glob("*.yaml")):
+            message_id = message_file.stem
+            current.add(message_id)
+            if message_id in self._known:
+                continue
+
+            try:
+                data = read_document(message_file)
+            except Exception as e:
+                self.logger.error(f"Failed to load message from {message_file}: {e}")
+                continue
+
+            self._known[message_id] = data.get("receiver", "")
+            events.append(StoreEvent("put", message_id, self._known[message_id], data))
+
+        for message_id in list(self._known):
+            if message_id not in current:
+                events.append(StoreEvent("ack", message_id, self._known.pop(message_id)))
+
+        return events
+
+    def ack(self, receiver: str, message_id: str) -> bool:
+        message_file = self.messages_dir / f"{message_id}.yaml"
+        if not message_file.exists():
+            return False
+
+        # processedディレクトリに移動
+        message_file.rename(self.processed_dir / f"{message_id}.yaml")
+        self._known.pop(message_id, None)
+        return True
+
+    def delete(self, message_id: str, receiver: Optional[str] = None) -> bool:
+        message_file = self.messages_dir / f"{message_id}.yaml"
+        if not message_file.exists():
+            # processedディレクトリもチェック
+            message_file = self.processed_dir / f"{message_id}.yaml"
+            if not message_file.exists():
+                return False
+
+        message_file.unlink()
+        self._known.pop(message_id, None)
+        return True
+
+    def watch_paths(self, receiver: str) -> List[Path]:
+        return [self.messages_dir]
+
+    def _groups_unsupported(self, receiver: str, group: str) -> ValueError:
+        # ack でファイルを processed/ に移すため、グループごとのカーソルを持てない
+        return ValueError(
+            f"The {self.name} message queue backend does not support consumer groups "
+            f"(group '{group}' for '{receiver}'); use the log or redis backend"
+        )
+
+    def consumer_group(self, receiver: str, group: str) -> StoreConsumerGroup:
+        raise self._groups_unsupported(receiver, group)
+
+    def delete_consumer_group(self, receiver: str, group: str) -> bool:
+        raise self._groups_unsupported(receiver, group)
+
+    def clear(self) -> None:
+        for message_file in self.messages_dir.glob("*.yaml"):
+            message_file.unlink()
+        for message_file in self.processed_dir.glob("*.yaml"):
+            message_file.unlink()
+        self._known.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "unprocessed": len(list(self.messages_dir.glob("*.yaml"))),
+            "processed": len(list(self.processed_dir.glob("*.yaml"))),
+        }
+
+
+# バックエンド名 -> ストアクラス
+MESSAGE_STORE_BACKENDS = {
+    SegmentLogStore.name: SegmentLogStore,
+    YamlFileStore.name: YamlFileStore,
+}
+
+
+def create_message_store(
+    backend: str,
+    queue_dir: Path,
+    logger: Optional[logging.Logger] = None,
+    **options: Any,
+) -> MessageStore:
+    """バックエンド名からストアを作成
+
+    Args:
+        backend: バックエンド名（log / yaml / redis）
+        queue_dir: キューディレクトリ
+        logger: ロガー
+        **options: ストア固有のオプション（segment_max_bytes, fsync など）
+
+    Returns:
+        メッセージストア
+    """
+    if backend == "redis":
+        # redis パッケージはこのバックエンドを選んだときだけ必要
+        from mao.orchestrator.redis_backend import RedisMessageStore
+
+        return RedisMessageStore(queue_dir, logger=logger, **options)
+
+    store_class = MESSAGE_STORE_BACKENDS.get(backend)
+    if store_class is None:
+        raise ValueError(
+            f"Unknown message queue backend: {backend} "
+            f"(available: {', '.join([*MESSAGE_STORE_BACKENDS, 'redis'])})"
+        )
+    return store_class(queue_dir, logger=logger, **options)
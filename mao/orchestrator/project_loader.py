@@ -7,6 +7,7 @@ import yaml
 from pydantic import BaseModel, Field
 
 from mao.config import ConfigLoader
+from mao.orchestrator.agent_metrics import MetricsRetention
 
 
 class AgentConfig(BaseModel):
@@ -19,6 +20,66 @@ class AgentConfig(BaseModel):
 class StateConfig(BaseModel):
     """State management configuration"""
     backend: str = "sqlite"  # sqlite or redis
+    flush_interval: float = 0.5  # write-behind flush interval in seconds (0 = write every update)
+    # agent metrics time series retention (seconds): raw samples, 1-minute and 1-hour rollups
+    metrics_raw_retention: float = 3600
+    metrics_minute_retention: float = 24 * 3600
+    metrics_hour_retention: float = 30 * 24 * 3600
+
+    def metrics_retention(self) -> MetricsRetention:
+        """Retention for StateManager(metrics_retention=...)"""
+        return MetricsRetention(
+            raw_seconds=self.metrics_raw_retention,
+            minute_seconds=self.metrics_minute_retention,
+            hour_seconds=self.metrics_hour_retention,
+        )
+
+
+class RedisConfig(BaseModel):
+    """Redis connection (used by the redis state/queue backends)"""
+    url: str = "redis://localhost:6379/0"
+    key_prefix: Optional[str] = None  # default: derived from the project path
+
+
+class RetentionConfig(BaseModel):
+    """Retention policy for processed messages"""
+    max_age_seconds: Optional[float] = None
+    max_messages: Optional[int] = None
+    max_bytes: Optional[int] = None
+    # consumer groups without an ack for this long are deleted so they stop blocking compaction
+    group_max_idle_seconds: Optional[float] = None
+
+
+class QueueConfig(BaseModel):
+    """Message queue configuration"""
+    backend: str = "log"  # log, yaml or redis
+    codec: str = "json"  # log backend record format: json or msgpack
+    segment_max_bytes: int = 1024 * 1024
+    fsync: bool = False
+    retention: RetentionConfig = Field(default_factory=RetentionConfig)
+
+    def store_options(self, redis: RedisConfig) -> Dict[str, Any]:
+        """MessageQueue に渡すストア固有のオプション"""
+        retention = self.retention.model_dump()
+        if self.backend == "redis":
+            return {"url": redis.url, "key_prefix": redis.key_prefix, "retention": retention}
+        if self.backend == "log":
+            return {
+                "codec": self.codec,
+                "segment_max_bytes": self.segment_max_bytes,
+                "fsync": self.fsync,
+                "retention": retention,
+            }
+        return {}
+
+
+class ColdStorageConfig(BaseModel):
+    """Compression of old sessions, logs and debug dumps (mao gc)"""
+    compression: str = "zstd"  # zstd (gzip when the zstandard package is missing) or gzip
+    # seconds since the last modification before a file is compressed (null = never)
+    session_max_age: Optional[float] = 30 * 24 * 3600
+    log_max_age: Optional[float] = 7 * 24 * 3600
+    debug_max_age: Optional[float] = 7 * 24 * 3600
 
 
 class LoggingConfig(BaseModel):
@@ -60,6 +121,8 @@ class TmuxGridConfig(BaseModel):
 class TmuxConfig(BaseModel):
     """Tmux configuration"""
     grid: TmuxGridConfig = Field(default_factory=TmuxGridConfig)
+    # Seconds a pane status snapshot (one list-panes call) is reused
+    snapshot_ttl: float = 1.0
 
 
 class ExecutionConfig(BaseModel):
@@ -81,6 +144,9 @@ class ProjectConfig(BaseModel):
     default_language: str = "python"
     agents: AgentConfig = Field(default_factory=AgentConfig)
     state: StateConfig = Field(default_factory=StateConfig)
+    queue: QueueConfig = Field(default_factory=QueueConfig)
+    redis: RedisConfig = Field(default_factory=RedisConfig)
+    cold_storage: ColdStorageConfig = Field(default_factory=ColdStorageConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
     security: SecurityConfig = Field(default_factory=SecurityConfig)
 
@@ -0,0 +1,614 @@
+"""
+Redis backends for MessageQueue and StateManager
+
+- RedisMessageStore: 受信者ごとの Redis Stream（put / ack / del）+ 未処理ハッシュ
+- RedisStateStore: エージェント状態のハッシュ + Pub/Sub 変更通知
+
+複数の MAO プロセスが同じ Redis を指定すると、キューと状態を共有できる。
+キーはプロジェクトパスから導出したプレフィックスで分離する。
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable
+
+import redis
+import logging
+
+from mao.orchestrator.message_store import (
+    MessageStore,
+    RetentionPolicy,
+    StoreConsumerGroup,
+    StoreEvent,
+)
+
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+
+# コンシューマーグループより古くても、この時間内のエントリはトリムしない（ミリ秒）
+STREAM_TAIL_GRACE_MS = 5 * 60 * 1000
+
+
+def default_key_prefix(project_path: Path) -> str:
+    """プロジェクトパスからキープレフィックスを生成"""
+    digest = hashlib.sha1(str(project_path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return f"mao:{digest}"
+
+
+def _connect(url: Optional[str], client: Optional[redis.Redis]) -> redis.Redis:
+    if client is not None:
+        return client
+    return redis.Redis.from_url(url or DEFAULT_REDIS_URL, decode_responses=True)
+
+
+class RedisMessageStore(MessageStore):
+    """Redis Stream ベースのメッセージストア
+
+    キー:
+        <prefix>:queue:stream:<receiver>     変更ストリーム（op=put/ack/del）
+        <prefix>:queue:pending:<receiver>    未処理メッセージ（ID -> JSON）
+        <prefix>:queue:processed:<receiver>  処理済みメッセージ（ID -> 処理時刻）
+        <prefix>:queue:receivers             受信者の集合
+        <prefix>:queue:stats                 件数カウンター
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        queue_dir: Path,
+        logger: Optional[logging.Logger] = None,
+        url: Optional[str] = None,
+        key_prefix: Optional[str] = None,
+        client: Optional[redis.Redis] = None,
+        retention: Optional[RetentionPolicy] = None,
+    ):
+        """
+        Args:
+            queue_dir: キューディレクトリ（キープレフィックスの導出に使用）
+            logger: ロガー
+            url: Redis URL
+            key_prefix: キープレフィックス（省略時はプロジェクトパスから生成）
+            client: Redis クライアント（テスト用。decode_responses=True であること）
+            retention: 処理済みメッセージの保持ポリシー（dict も可）
+        """
+        super().__init__(queue_dir, logger)
+        self.client = _connect(url, client)
+        self.prefix = key_prefix or default_key_prefix(queue_dir.parent.parent)
+        if isinstance(retention, dict):
+            retention = RetentionPolicy(**retention)
+        self.retention = retention or RetentionPolicy()
+
+        # 受信者 -> 最後に読んだストリームID
+        self._last_ids: Dict[str, str] = {}
+        self._unreported: List[StoreEvent] = []
+
+    # --- キー ---
+
+    def _stream_key(self, receiver: str) -> str:
+        return f"{self.prefix}:queue:stream:{receiver}"
+
+    def _pending_key(self, receiver: str) -> str:
+        return f"{self.prefix}:queue:pending:{receiver}"
+
+    def _processed_key(self, receiver: str) -> str:
+        return f"{self.prefix}:queue:processed:{receiver}"
+
+    @property
+    def _receivers_key(self) -> str:
+        return f"{self.prefix}:queue:receivers"
+
+    @property
+    def _stats_key(self) -> str:
+        return f"{self.prefix}:queue:stats"
+
+    def _receivers(self) -> List[str]:
+        return sorted(self.client.smembers(self._receivers_key))
+
+    # --- 書き込み ---
+
+    def append(self, data: Dict[str, Any]) -> None:
+        self.append_many([data])
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        for data in records:
+            payload = json.dumps(data, ensure_ascii=False)
+            receiver = data["receiver"]
+            pipe.xadd(self._stream_key(receiver), {"op": "put", "id": data["message_id"], "data": payload})
+            pipe.hset(self._pending_key(receiver), data["message_id"], payload)
+            pipe.sadd(self._receivers_key, receiver)
+        pipe.hincrby(self._stats_key, "unprocessed", len(records))
+        pipe.execute()
+
+    def ack(self, receiver: str, message_id: str) -> bool:
+        return bool(self.ack_many(receiver, [message_id]))
+
+    def ack_many(self, receiver: str, message_ids: List[str]) -> List[str]:
+        message_ids = list(dict.fromkeys(message_ids))
+        if not message_ids:
+            return []
+
+        # 未処理ハッシュからの削除と ack イベントの追加を1つのトランザクションで行う。
+        # WATCH しておき、確認後に他プロセスが変更していれば（二重 ack など）やり直す
+        pending_key = self._pending_key(receiver)
+        with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    pipe.watch(pending_key)
+                    present = pipe.hmget(pending_key, message_ids)
+                    acked = [
+                        message_id
+                        for message_id, data in zip(message_ids, present, strict=True)
+                        if data is not None
+                    ]
+                    if not acked:
+                        pipe.unwatch()
+                        return []
+
+                    now = time.time()
+                    pipe.multi()
+                    pipe.hdel(pending_key, *acked)
+                    for message_id in acked:
+                        pipe.xadd(self._stream_key(receiver), {"op": "ack", "id": message_id})
+                        pipe.hset(self._processed_key(receiver), message_id, now)
+                    pipe.hincrby(self._stats_key, "unprocessed", -len(acked))
+                    pipe.hincrby(self._stats_key, "processed", len(acked))
+                    pipe.execute()
+                    return acked
+                except redis.WatchError:
+                    continue
+
+    def delete(self, message_id: str, receiver: Optional[str] = None) -> bool:
+        receivers = [receiver] if receiver is not None else self._receivers()
+        for name in receivers:
+            for key, counter in (
+                (self._pending_key(name), "unprocessed"),
+                (self._processed_key(name), "processed"),
+            ):
+                # ack_many と同じく、削除と del イベントを1つのトランザクションで行う
+                with self.client.pipeline(transaction=True) as pipe:
+                    while True:
+                        try:
+                            pipe.watch(key)
+                            if not pipe.hexists(key, message_id):
+                                pipe.unwatch()
+                                break
+                            pipe.multi()
+                            pipe.hdel(key, message_id)
+                            pipe.xadd(self._stream_key(name), {"op": "del", "id": message_id})
+                            pipe.hincrby(self._stats_key, counter, -1)
+                            pipe.execute()
+                            return True
+                        except redis.WatchError:
+                            continue
+        return False
+
+    def clear(self) -> None:
+        keys = [self._receivers_key, self._stats_key]
+        for receiver in self._receivers():
+            keys.extend([
+                self._stream_key(receiver),
+                self._pending_key(receiver),
+                self._processed_key(receiver),
+            ])
+        self.client.delete(*keys)
+        self._last_ids.clear()
+        self._unreported.clear()
+
+    # --- 読み取り ---
+
+    def _open(self, receiver: str) -> None:
+        """初回アクセス時に未処理ハッシュからビューを構築し、ストリームの末尾から追従する"""
+        if receiver in self._last_ids:
+            return
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(self._pending_key(receiver))
+        pipe.xrevrange(self._stream_key(receiver), count=1)
+        pending, last = pipe.execute()
+
+        self._last_ids[receiver] = last[0][0] if last else "0-0"
+        for message_id in sorted(pending):
+            self._unreported.append(
+                StoreEvent("put", message_id, receiver, json.loads(pending[message_id]))
+            )
+
+    def _read(self, receiver: str) -> None:
+        """前回のストリームID以降のエントリを読み込む"""
+        self._open(receiver)
+        response = self.client.xread({self._stream_key(receiver): self._last_ids[receiver]})
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                self._last_ids[receiver] = entry_id
+                op = fields.get("op")
+                if op == "put":
+                    data = json.loads(fields["data"])
+                    self._unreported.append(StoreEvent("put", fields["id"], receiver, data))
+                elif op in ("ack", "del"):
+                    self._unreported.append(StoreEvent(op, fields["id"], receiver))
+
+    def refresh(self, receiver: Optional[str] = None) -> List[StoreEvent]:
+        receivers = [receiver] if receiver is not None else self._receivers()
+        for name in receivers:
+            self._read(name)
+
+        events, self._unreported = self._unreported, []
+        return events
+
+    def stats(self) -> Dict[str, int]:
+        counts = self.client.hgetall(self._stats_key)
+        return {
+            "unprocessed": int(counts.get("unprocessed", 0)),
+            "processed": int(counts.get("processed", 0)),
+        }
+
+    # --- 通知・グループ ---
+
+    def watch_paths(self, receiver: str) -> List[Path]:
+        return []
+
+    def create_watcher(
+        self,
+        receiver: str,
+        poll_interval: float = 1.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> "RedisStreamWatcher":
+        return RedisStreamWatcher(
+            self.client, self._stream_key(receiver), poll_interval=poll_interval, logger=logger
+        )
+
+    def consumer_group(self, receiver: str, group: str) -> "RedisConsumerGroup":
+        return RedisConsumerGroup(self, receiver, group)
+
+    def delete_consumer_group(self, receiver: str, group: str) -> bool:
+        try:
+            return bool(self.client.xgroup_destroy(self._stream_key(receiver), group))
+        except redis.ResponseError:
+            # ストリームがない
+            return False
+
+    # --- コンパクション ---
+
+    def _trim_floor(self, receiver: str) -> str:
+        """ストリームから削除してよい境界ID（これより古いエントリを削除）"""
+        stream_key = self._stream_key(receiver)
+        grace_floor = int(time.time() * 1000) - STREAM_TAIL_GRACE_MS
+        floor_ms = grace_floor
+
+        try:
+            groups = self.client.xinfo_groups(stream_key)
+        except redis.ResponseError:
+            groups = []
+        max_idle = self.retention.group_max_idle_seconds
+        floor_group = None
+        for group in groups:
+            name = group["name"]
+            if max_idle is not None and self._group_idle(stream_key, name) > max_idle:
+                self.client.xgroup_destroy(stream_key, name)
+                self.logger.warning(f"Removed consumer group '{name}' of {receiver}: no ack for over {max_idle:.0f}s")
+                continue
+            summary = self.client.xpending(stream_key, name)
+            oldest = summary.get("min") or group.get("last-delivered-id") or "0-0"
+            oldest_ms = int(str(oldest).split("-")[0])
+            if oldest_ms < floor_ms:
+                floor_ms, floor_group = oldest_ms, name
+        if floor_group is not None:
+            self.logger.warning(
+                f"Consumer group '{floor_group}' of {receiver} is holding back stream trimming; "
+                f"delete it with delete_consumer_group() if it is no longer read"
+            )
+        return f"{floor_ms}-0"
+
+    def _group_idle(self, stream_key: str, group: str) -> float:
+        """グループのコンシューマーが最後に読み書きしてからの秒数（作成直後でまだ読んでいなければ 0）"""
+        consumers = self.client.xinfo_consumers(stream_key, group)
+        return min((consumer["idle"] / 1000 for consumer in consumers), default=0.0)
+
+    def compact(self) -> Dict[str, int]:
+        """ストリームのトリムと処理済みメッセージへの保持ポリシー適用
+
+        RetentionPolicy の max_bytes は Redis では使用しない。
+
+        Returns:
+            trimmed_entries / removed_messages の件数
+        """
+        result = {"trimmed_entries": 0, "removed_messages": 0}
+        policy = self.retention
+        now = time.time()
+
+        for receiver in self._receivers():
+            # 全グループが確認済み・かつ猶予期間を過ぎたストリームエントリを削除
+            trimmed = self.client.xtrim(self._stream_key(receiver), minid=self._trim_floor(receiver))
+            result["trimmed_entries"] += trimmed
+
+            # 処理済みメッセージに保持ポリシーを適用
+            processed = self.client.hgetall(self._processed_key(receiver))
+            ordered = sorted(processed.items(), key=lambda item: float(item[1]))
+            expired = []
+            if policy.max_age_seconds is not None:
+                expired = [mid for mid, acked_at in ordered
+                           if now - float(acked_at) > policy.max_age_seconds]
+            if policy.max_messages is not None and len(ordered) - len(expired) > policy.max_messages:
+                overflow = len(ordered) - policy.max_messages
+                expired = [mid for mid, _ in ordered[:overflow]]
+            if expired:
+                pipe = self.client.pipeline(transaction=True)
+                pipe.hdel(self._processed_key(receiver), *expired)
+                pipe.hincrby(self._stats_key, "processed", -len(expired))
+                pipe.execute()
+                result["removed_messages"] += len(expired)
+        return result
+
+
+class RedisConsumerGroup(StoreConsumerGroup):
+    """Redis Stream のネイティブなコンシューマーグループ
+
+    グループ名をコンシューマー名としても使う。再オープン時は PEL（配信済み・未確認）
+    から再配信するため at-least-once になる。
+    """
+
+    def __init__(self, store: RedisMessageStore, receiver: str, name: str):
+        super().__init__(receiver, name)
+        self.client = store.client
+        self.stream_key = store._stream_key(receiver)
+        try:
+            self.client.xgroup_create(self.stream_key, name, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        self._replay = True
+        # メッセージID -> ストリームエントリID
+        self._entry_ids: Dict[str, str] = {}
+
+    def _collect(self, response: Any, messages: List[Dict[str, Any]]) -> None:
+        bookkeeping = []
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                if not fields or fields.get("op") != "put":
+                    # ack/del やトリム済みのエントリは配信対象外
+                    bookkeeping.append(entry_id)
+                    continue
+                self._entry_ids[fields["id"]] = entry_id
+                messages.append(json.loads(fields["data"]))
+        if bookkeeping:
+            self.client.xack(self.stream_key, self.name, *bookkeeping)
+
+    def read(self, max_count: Optional[int] = None) -> List[Dict[str, Any]]:
+        messages: List[Dict[str, Any]] = []
+        if self._replay:
+            self._replay = False
+            response = self.client.xreadgroup(self.name, self.name, {self.stream_key: "0"})
+            self._collect(response, messages)
+            if max_count is not None and len(messages) >= max_count:
+                return messages
+
+        count = None if max_count is None else max_count - len(messages)
+        response = self.client.xreadgroup(self.name, self.name, {self.stream_key: ">"}, count=count)
+        self._collect(response, messages)
+        return messages
+
+    def ack(self, message_ids: List[str]) -> int:
+        entry_ids = [self._entry_ids.pop(mid) for mid in message_ids if mid in self._entry_ids]
+        if not entry_ids:
+            return 0
+        return self.client.xack(self.stream_key, self.name, *entry_ids)
+
+    def pending_count(self) -> int:
+        return len(self._entry_ids)
+
+
+class RedisStreamWatcher:
+    """Redis Stream への追記を XREAD BLOCK で待機する（DirectoryWatcher と同じインターフェース）"""
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        stream_key: str,
+        poll_interval: float = 1.0,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            client: Redis クライアント
+            stream_key: 監視するストリームのキー
+            poll_interval: XREAD のブロック時間（秒）
+            logger: ロガー
+        """
+        self.client = client
+        self.stream_key = stream_key
+        self.poll_interval = poll_interval
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._event = asyncio.Event()
+        self._last_id = "0-0"
+        self._read_task: Optional[asyncio.Future] = None
+
+    def start(self) -> None:
+        """現在のストリーム末尾から監視を開始"""
+        last = self.client.xrevrange(self.stream_key, count=1)
+        self._last_id = last[0][0] if last else "0-0"
+
+    def _blocking_read(self) -> bool:
+        response = self.client.xread(
+            {self.stream_key: self._last_id}, count=1, block=int(self.poll_interval * 1000)
+        )
+        if not response:
+            return False
+        # 溜まった分はまとめて処理されるので末尾まで進める
+        last = self.client.xrevrange(self.stream_key, count=1)
+        self._last_id = last[0][0] if last else response[0][1][-1][0]
+        return True
+
+    def notify(self) -> None:
+        """同一プロセス内の書き込みを即座に通知"""
+        self._event.set()
+
+    async def wait(self) -> None:
+        """次の追記まで待機"""
+        while True:
+            if self._event.is_set():
+                self._event.clear()
+                return
+
+            if self._read_task is None:
+                self._read_task = asyncio.ensure_future(asyncio.to_thread(self._blocking_read))
+            event_task = asyncio.ensure_future(self._event.wait())
+            try:
+                done, _ = await asyncio.wait(
+                    {self._read_task, event_task}, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                event_task.cancel()
+
+            if self._read_task in done:
+                task, self._read_task = self._read_task, None
+                try:
+                    changed = task.result()
+                except redis.RedisError as e:
+                    self.logger.error(f"Redis watch error: {e}")
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                if changed:
+                    self._event.clear()
+                    return
+
+    def close(self) -> None:
+        """監視を終了（ブロック中の XREAD は poll_interval 以内に終わる）"""
+        self._read_task = None
+
+
+class RedisStateStore:
+    """StateManager 用の Redis バックエンド
+
+    キー:
+        <prefix>:state:<session_id>          エージェント状態（agent_id -> JSON）
+        <prefix>:state:<session_id>:changes  変更通知チャンネル
+    """
+
+    def __init__(
+        self,
+        project_path: Path,
+        session_id: Optional[str] = None,
+        url: Optional[str] = None,
+        key_prefix: Optional[str] = None,
+        client: Optional[redis.Redis] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            project_path: プロジェクトパス（キープレフィックスの導出に使用）
+            session_id: セッションID
+            url: Redis URL
+            key_prefix: キープレフィックス
+            client: Redis クライアント（テスト用。decode_responses=True であること）
+            logger: ロガー
+        """
+        self.client = _connect(url, client)
+        self.logger = logger or logging.getLogger(__name__)
+        prefix = key_prefix or default_key_prefix(project_path)
+        self.hash_key = f"{prefix}:state:{session_id or '_'}"
+        self.channel = f"{self.hash_key}:changes"
+
+        # 自分が発行した通知を無視するための識別子
+        self.origin = uuid.uuid4().hex
+        self._pubsub: Optional[redis.client.PubSub] = None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """全エージェントの状態を取得"""
+        return {
+            agent_id: json.loads(payload)
+            for agent_id, payload in self.client.hgetall(self.hash_key).items()
+        }
+
+    def _publish(self, pipe: Any, op: str, agent_id: str = "", state: Any = None) -> None:
+        pipe.publish(
+            self.channel,
+            json.dumps({"op": op, "agent_id": agent_id, "state": state, "origin": self.origin},
+                       ensure_ascii=False),
+        )
+
+    def save(self, agent_id: str, state: Dict[str, Any]) -> None:
+        """状態を保存して変更を通知"""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(self.hash_key, agent_id, json.dumps(state, ensure_ascii=False))
+        self._publish(pipe, "set", agent_id, state)
+        pipe.execute()
+
+    def save_many(self, states: Dict[str, Dict[str, Any]]) -> None:
+        """複数の状態を1回の往復で保存"""
+        if not states:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(
+            self.hash_key,
+            mapping={aid: json.dumps(s, ensure_ascii=False) for aid, s in states.items()},
+        )
+        for agent_id, state in states.items():
+            self._publish(pipe, "set", agent_id, state)
+        pipe.execute()
+
+    def delete(self, agent_id: str) -> None:
+        """状態を削除して変更を通知"""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hdel(self.hash_key, agent_id)
+        self._publish(pipe, "del", agent_id)
+        pipe.execute()
+
+    def clear(self) -> None:
+        """全状態を削除して変更を通知"""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self.hash_key)
+        self._publish(pipe, "clear")
+        pipe.execute()
+
+    def subscribe(self) -> None:
+        """変更通知の購読を開始（load より前に呼ぶと取りこぼしがない）"""
+        if self._pubsub is None:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(self.channel)
+
+    def get_change(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """他プロセスからの変更通知を1件待つ（ブロッキング）
+
+        Returns:
+            {"op", "agent_id", "state"}、タイムアウト時や自分の通知ならNone
+        """
+        if self._pubsub is None:
+            return None
+        message = self._pubsub.get_message(timeout=timeout)
+        if not message or message.get("type") != "message":
+            return None
+        change = json.loads(message["data"])
+        if change.get("origin") == self.origin:
+            return None
+        return change
+
+    async def listen(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """変更通知をイベントループ上のコールバックに渡し続ける"""
+        self.subscribe()
+        while True:
+            try:
+                change = await asyncio.to_thread(self.get_change, 1.0)
+            except asyncio.CancelledError:
+                break
+            except redis.RedisError as e:
+                self.logger.error(f"Redis state subscription error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if change:
+                callback(change)
+
+    def close(self) -> None:
+        """購読を終了"""
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
@@ -0,0 +1,527 @@
+"""
+Session catalog - セッション一覧のインデックス
+
+.mao/sessions/catalog.db に各セッションのメタデータ（metadata.json のヘッダー）を
+updated_at のインデックス付きで保持する。SessionManager がメタデータの
+チェックポイント・削除のたびに更新するため、一覧・最新セッションの取得・
+シェル補完はセッション数ではなく取得件数に比例するコストで済む。
+
+全セッションのチャット履歴は FTS5 の全文検索インデックス（messages_fts）にも登録する。
+trigram トークナイザーなので日本語を含む部分文字列で検索でき、大文字・小文字は区別しない。
+SessionManager が add_message のたびに1件ずつ追加する。
+FTS5 の UNINDEXED 列（session_id・role）での絞り込みは全件の走査になるので、
+セッション・ロールごとの件数（session_roles）とメッセージ番号（message_roles）は
+通常のテーブルに持ち、統計とロールでの絞り込みはそちらを引く。
+
+カタログがない場合（初回）やスキーマが古い場合は既存のセッションディレクトリから作成する。
+
+アクセスは AsyncDatabase 経由。書き込み（upsert・削除・インデックス登録）は書き込みスレッドに
+依頼するだけで完了を待たないので、Textual のイベントループ上の add_message がディスクや
+ロック待ちで止まらない。依頼キューが満杯でも待たず（submit_nowait）、あふれた分はメモリに
+溜めて依頼順に書き込む。読み込みはそれまでに依頼した書き込みの完了を待ってから行う。
+同じ catalog.db を開くカタログはプロセス内で1つの AsyncDatabase を共有する。
+"""
+import atexit
+import json
+import logging
+import re
+import sqlite3
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mao.orchestrator import cold_storage
+from mao.orchestrator.async_db import AsyncDatabase
+from mao.orchestrator.codec import get_codec
+
+
+# catalog.db のスキーマバージョン（PRAGMA user_version）
+CATALOG_VERSION = 3
+
+CATALOG_FILE = "catalog.db"
+
+# trigram トークナイザーが索引で照合できる最短の語の長さ（より短い語は LIKE で照合）
+MIN_INDEXED_TERM = 3
+
+# 検索クエリ中の "フレーズ" または空白区切りの語
+_QUERY_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+# catalog.db のパス -> (共有している AsyncDatabase, 参照数)
+_databases: Dict[Path, Tuple[AsyncDatabase, int]] = {}
+_databases_lock = threading.Lock()
+
+
+@atexit.register
+def _close_databases() -> None:
+    """終了時に close() されなかったカタログの未処理の書き込みを実行する"""
+    with _databases_lock:
+        databases = [db for db, _ in _databases.values()]
+        _databases.clear()
+    for db in databases:
+        db.close()
+
+
+class SessionCatalog:
+    """セッションメタデータのカタログ（SQLite）"""
+
+    _UPSERT = """
+        INSERT OR REPLACE INTO sessions
+        (session_id, title, created_at, updated_at, message_count, metadata)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+
+    def __init__(self, sessions_dir: Path, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            sessions_dir: セッションディレクトリの親（.mao/sessions）
+            logger: ロガー
+        """
+        self.sessions_dir = sessions_dir
+        self.logger = logger or logging.getLogger(__name__)
+        self.db_path = (sessions_dir / CATALOG_FILE).resolve()
+
+        with _databases_lock:
+            db, references = _databases.get(self.db_path, (None, 0))
+            if db is None:
+                db = AsyncDatabase(self.db_path, init=self._migrate, logger=self.logger)
+            _databases[self.db_path] = (db, references + 1)
+        self.db: Optional[AsyncDatabase] = db
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """スキーマを作成し、初回はセッションディレクトリから作成する"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= CATALOG_VERSION:
+            return
+
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL DEFAULT '',
+                    created_at TEXT NOT NULL DEFAULT '',
+                    updated_at TEXT NOT NULL DEFAULT '',
+                    message_count INTEGER NOT NULL DEFAULT 0,
+                    metadata TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at)"
+            )
+            self._create_message_index(conn)
+            conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+        count = self._rebuild(conn)
+        if count:
+            self.logger.info(f"Built session catalog from {count} sessions")
+
+    def _create_message_index(self, conn: sqlite3.Connection) -> None:
+        """全文検索インデックスと、セッション・ロールごとのメッセージのテーブルを作成"""
+        columns = "content, role UNINDEXED, session_id UNINDEXED, seq UNINDEXED, timestamp UNINDEXED"
+        try:
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5({columns}, tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            # trigram は SQLite 3.34 以降
+            self.logger.warning("FTS5 trigram tokenizer is unavailable, falling back to unicode61")
+            conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5({columns})")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS indexed_sessions (
+                session_id TEXT PRIMARY KEY,
+                message_count INTEGER NOT NULL
+            )
+            """
+        )
+        # セッション・ロールごとのメッセージ番号と messages_fts の rowid
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS message_roles (
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                fts_rowid INTEGER NOT NULL,
+                PRIMARY KEY (session_id, role, seq)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS session_roles (
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                message_count INTEGER NOT NULL,
+                PRIMARY KEY (session_id, role)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def _write(self, query_type: str, fn: Callable[[sqlite3.Connection], Any]) -> Future:
+        """書き込みを書き込みスレッドに依頼する（完了は待たず、失敗はログに残す）"""
+        future = self.db.submit_nowait(query_type, fn)
+
+        def log_failure(done: Future) -> None:
+            if not done.cancelled() and done.exception() is not None:
+                self.logger.error(f"Session catalog write failed ({query_type}): {done.exception()}")
+
+        future.add_done_callback(log_failure)
+        return future
+
+    def _read(self, query_type: str, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """依頼済みの書き込みの完了を待ってから読み込む"""
+        self.db.wait()
+        return self.db.read_sync(query_type, fn)
+
+    def rebuild(self) -> int:
+        """セッションディレクトリの metadata.json と chat.jsonl からカタログを作り直す
+
+        Returns:
+            登録したセッション数
+        """
+        return self.db.submit("catalog.rebuild", self._rebuild).result()
+
+    def _rebuild(self, conn: sqlite3.Connection) -> int:
+        entries = []
+        for session_dir in sorted(self.sessions_dir.iterdir()):
+            metadata_file = session_dir / "metadata.json"
+            if not session_dir.is_dir() or not metadata_file.exists():
+                continue
+            try:
+                with open(metadata_file) as f:
+                    metadata = json.load(f)
+            except Exception as e:
+                self.logger.error(f"Failed to load metadata from {session_dir}: {e}")
+                continue
+            metadata.setdefault("session_id", session_dir.name)
+            entries.append(metadata)
+
+        with conn:
+            conn.execute("DELETE FROM sessions")
+            conn.execute("DELETE FROM messages_fts")
+            conn.execute("DELETE FROM indexed_sessions")
+            conn.execute("DELETE FROM message_roles")
+            conn.execute("DELETE FROM session_roles")
+            conn.executemany(self._UPSERT, [self._row(metadata) for metadata in entries])
+            for metadata in entries:
+                session_id = metadata["session_id"]
+                self._insert_messages(conn, session_id, 0, self._read_messages(session_id))
+        return len(entries)
+
+    def _read_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """セッションのチャット履歴（chat.jsonl またはその圧縮版、なければ旧形式の chat.json）を読む"""
+        session_dir = self.sessions_dir / session_id
+        try:
+            chat_file = session_dir / "chat.jsonl"
+            if cold_storage.exists(chat_file):
+                frames, _ = get_codec("json").decode_stream(cold_storage.read_bytes(chat_file))
+                return [record for record, _ in frames]
+            legacy_chat_file = session_dir / "chat.json"
+            if legacy_chat_file.exists():
+                with open(legacy_chat_file) as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.error(f"Failed to load chat history from {session_dir}: {e}")
+        return []
+
+    @staticmethod
+    def _row(metadata: Dict[str, Any]) -> tuple:
+        return (
+            metadata["session_id"],
+            metadata.get("title") or "",
+            metadata.get("created_at") or "",
+            metadata.get("updated_at") or "",
+            metadata.get("message_count") or 0,
+            json.dumps(metadata, ensure_ascii=False),
+        )
+
+    def upsert(self, metadata: Dict[str, Any]) -> None:
+        """セッションのメタデータを登録・更新（書き込みスレッドに依頼）
+
+        Args:
+            metadata: metadata.json の内容（session_id 必須）
+        """
+        row = self._row(metadata)
+        self._write("catalog.upsert", lambda conn: conn.execute(self._UPSERT, row))
+
+    def remove(self, session_id: str) -> None:
+        """セッションをカタログと全文検索インデックスから削除（書き込みスレッドに依頼）"""
+
+        def job(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._delete_messages(conn, session_id)
+
+        self._write("catalog.remove", job)
+
+    # --- 全文検索インデックス ---
+
+    @staticmethod
+    def _insert_messages(
+        conn: sqlite3.Connection, session_id: str, start: int, messages: List[Dict[str, Any]]
+    ) -> None:
+        roles: Dict[str, int] = {}
+        for seq, msg in enumerate(messages, start):
+            role = msg.get("role", "")
+            cursor = conn.execute(
+                "INSERT INTO messages_fts (content, role, session_id, seq, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (msg.get("content", ""), role, session_id, seq, msg.get("timestamp", "")),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO message_roles (session_id, role, seq, fts_rowid) VALUES (?, ?, ?, ?)",
+                (session_id, role, seq, cursor.lastrowid),
+            )
+            roles[role] = roles.get(role, 0) + 1
+        conn.executemany(
+            """
+            INSERT INTO session_roles (session_id, role, message_count) VALUES (?, ?, ?)
+            ON CONFLICT (session_id, role) DO UPDATE SET message_count = message_count + excluded.message_count
+            """,
+            [(session_id, role, count) for role, count in roles.items()],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO indexed_sessions (session_id, message_count) VALUES (?, ?)",
+            (session_id, start + len(messages)),
+        )
+
+    @staticmethod
+    def _delete_messages(conn: sqlite3.Connection, session_id: str) -> None:
+        # messages_fts は rowid で消す（session_id での絞り込みは全件の走査になる）
+        conn.execute(
+            "DELETE FROM messages_fts WHERE rowid IN (SELECT fts_rowid FROM message_roles WHERE session_id = ?)",
+            (session_id,),
+        )
+        conn.execute("DELETE FROM message_roles WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM session_roles WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM indexed_sessions WHERE session_id = ?", (session_id,))
+
+    def index_message(self, session_id: str, seq: int, message: Dict[str, Any]) -> None:
+        """メッセージを1件インデックスに追加（書き込みスレッドに依頼）
+
+        Args:
+            session_id: セッションID
+            seq: セッション内のメッセージ番号（0始まり）
+            message: ChatMessage.to_dict() の内容
+        """
+        self._write(
+            "catalog.index_message",
+            lambda conn: self._insert_messages(conn, session_id, seq, [message]),
+        )
+
+    def index_session(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        """セッションのメッセージをインデックスに登録し直す（書き込みスレッドに依頼）
+
+        Args:
+            session_id: セッションID
+            messages: ChatMessage.to_dict() のリスト（古い順）
+        """
+
+        def job(conn: sqlite3.Connection) -> None:
+            self._delete_messages(conn, session_id)
+            self._insert_messages(conn, session_id, 0, messages)
+
+        self._write("catalog.index_session", job)
+
+    def indexed_count(self, session_id: str) -> int:
+        """インデックスに登録済みのメッセージ数"""
+        row = self._read(
+            "catalog.indexed_count",
+            lambda conn: conn.execute(
+                "SELECT message_count FROM indexed_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone(),
+        )
+        return row["message_count"] if row else 0
+
+    def role_counts(self, session_id: str) -> Dict[str, int]:
+        """インデックスに登録済みのメッセージのロールごとの件数"""
+        rows = self._read(
+            "catalog.role_counts",
+            lambda conn: conn.execute(
+                "SELECT role, message_count FROM session_roles WHERE session_id = ?",
+                (session_id,),
+            ).fetchall(),
+        )
+        return {row["role"]: row["message_count"] for row in rows}
+
+    def message_seqs(self, session_id: str, role: str, limit: Optional[int] = None) -> List[int]:
+        """ロールが一致するメッセージのメッセージ番号（古い順）
+
+        Args:
+            session_id: セッションID
+            role: ロール
+            limit: 最大件数（最新からN件。None は全件）
+
+        Returns:
+            メッセージ番号のリスト
+        """
+        rows = self._read(
+            "catalog.message_seqs",
+            lambda conn: conn.execute(
+                """
+                SELECT seq FROM message_roles
+                WHERE session_id = ? AND role = ?
+                ORDER BY seq DESC
+                LIMIT ?
+                """,
+                (session_id, role, -1 if limit is None else limit),
+            ).fetchall(),
+        )
+        return sorted(int(row["seq"]) for row in rows)
+
+    @staticmethod
+    def _parse_query(query: str) -> Tuple[List[str], List[str]]:
+        """検索クエリを FTS5 で照合する語と LIKE で照合する語に分ける
+
+        "..." で囲んだ部分はフレーズ（空白を含めて連続する文字列）、それ以外は
+        空白区切りの語として扱い、すべてを AND で結ぶ。
+        """
+        indexed, scanned = [], []
+        for phrase, word in _QUERY_TERM.findall(query):
+            term = phrase or word
+            if len(term) >= MIN_INDEXED_TERM:
+                indexed.append('"' + term.replace('"', '""') + '"')
+            else:
+                scanned.append(term)
+        return indexed, scanned
+
+    def search(
+        self,
+        query: str,
+        role: Optional[str] = None,
+        session_id: Optional[str] = None,
+        limit: Optional[int] = 20,
+        highlight: Tuple[str, str] = ("[", "]"),
+    ) -> List[Dict[str, Any]]:
+        """全セッションのチャット履歴を全文検索（関連度順）
+
+        Args:
+            query: 検索クエリ（"..." でフレーズ検索、空白区切りの語は AND）
+            role: ロールでフィルタ（Noneの場合は全て）
+            session_id: セッションでフィルタ（Noneの場合は全セッション）
+            limit: 最大件数（None は全件）
+            highlight: スニペット中の一致箇所を囲む文字列
+
+        Returns:
+            session_id, title, seq, role, timestamp, content, snippet, rank を持つ辞書のリスト
+        """
+        indexed, scanned = self._parse_query(query)
+        if not indexed and not scanned:
+            return []
+
+        conditions, params = [], []
+        if indexed:
+            conditions.append("messages_fts MATCH ?")
+            params.append(" AND ".join(indexed))
+        for term in scanned:
+            conditions.append("messages_fts.content LIKE ? ESCAPE '\\'")
+            params.append("%" + re.sub(r"([%_\\])", r"\\\1", term) + "%")
+        if role:
+            conditions.append("messages_fts.role = ?")
+            params.append(role)
+        if session_id:
+            conditions.append("messages_fts.session_id = ?")
+            params.append(session_id)
+
+        # FTS5 で照合できる語がなければ関連度は計算できないので新しい順
+        if indexed:
+            rank = "bm25(messages_fts)"
+            snippet = "snippet(messages_fts, 0, ?, ?, '…', 64)"
+            snippet_params = list(highlight)
+        else:
+            rank = "0.0"
+            snippet = "substr(messages_fts.content, 1, 80)"
+            snippet_params = []
+
+        sql = f"""
+            SELECT messages_fts.session_id, sessions.title, messages_fts.seq, messages_fts.role,
+                   messages_fts.timestamp, messages_fts.content, {snippet} AS snippet, {rank} AS rank
+            FROM messages_fts
+            LEFT JOIN sessions ON sessions.session_id = messages_fts.session_id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY rank, messages_fts.timestamp DESC
+            LIMIT ?
+            """
+        params = snippet_params + params + [-1 if limit is None else limit]
+        rows = self._read("catalog.search", lambda conn: conn.execute(sql, params).fetchall())
+        return [dict(row) for row in rows]
+
+    def list(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """更新日時の降順でメタデータを取得
+
+        Args:
+            limit: 最大件数（None は全件）
+            offset: 読み飛ばす件数
+
+        Returns:
+            セッションメタデータのリスト
+        """
+        rows = self._read(
+            "catalog.list",
+            lambda conn: conn.execute(
+                "SELECT metadata FROM sessions ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset),
+            ).fetchall(),
+        )
+        return [json.loads(row["metadata"]) for row in rows]
+
+    def latest_id(self) -> Optional[str]:
+        """最も新しく更新されたセッションID"""
+        row = self._read(
+            "catalog.latest_id",
+            lambda conn: conn.execute(
+                "SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT 1"
+            ).fetchone(),
+        )
+        return row["session_id"] if row else None
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """セッションIDのメタデータ"""
+        row = self._read(
+            "catalog.get",
+            lambda conn: conn.execute(
+                "SELECT metadata FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone(),
+        )
+        return json.loads(row["metadata"]) if row else None
+
+    def find(self, suffix: str) -> Optional[Dict[str, Any]]:
+        """ID が suffix で終わる最新のセッション（CLI の短縮 ID 用）"""
+        if not suffix:
+            return None
+        row = self._read(
+            "catalog.find",
+            lambda conn: conn.execute(
+                """
+                SELECT metadata FROM sessions
+                WHERE substr(session_id, -length(?)) = ?
+                ORDER BY updated_at DESC LIMIT 1
+                """,
+                (suffix, suffix),
+            ).fetchone(),
+        )
+        return json.loads(row["metadata"]) if row else None
+
+    def count(self) -> int:
+        """登録されているセッション数"""
+        return self._read(
+            "catalog.count", lambda conn: conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        )
+
+    def wait(self) -> None:
+        """依頼済みの書き込みの完了を待つ"""
+        self.db.wait()
+
+    def close(self) -> None:
+        """カタログを閉じる（最後の参照なら未処理の書き込みを実行してから接続を閉じる）"""
+        if self.db is None:
+            return
+        with _databases_lock:
+            db, references = _databases.get(self.db_path, (None, 0))
+            if db is not self.db:
+                pass  # 終了処理で閉じ済み
+            elif references > 1:
+                _databases[self.db_path] = (db, references - 1)
+            else:
+                del _databases[self.db_path]
+                db.close()
+        self.db = None
@@ -1,14 +1,47 @@
 """
 Session management for chat history persistence
+
+チャット履歴は chat.jsonl に1メッセージ1行で追記する（追加のコストは履歴の長さに
+依存しない）。metadata.json は小さなヘッダーで、CHECKPOINT_MESSAGES 件または
+CHECKPOINT_SECONDS 秒ごと（とタイトル変更・クリア・close() 時）に書き直す。
+チェックポイント後に追記されたメッセージは読み込み時に chat.jsonl から数え直す。
+旧形式の chat.json は最初に開いたときに chat.jsonl へ移行する。
+追加したメッセージはカタログの全文検索インデックスにも登録する（search_history）。
+
+履歴は開いたときに全件を読み込まず、chat.idx（各メッセージの行の先頭オフセット）だけを
+読み込む。表示に必要な分だけ tail(n) / page(before=cursor) で chat.jsonl から読む。
+chat.idx が古い・壊れている場合は chat.jsonl の改行を走査して作り直す（JSON は解析しない）。
+mao gc で圧縮された chat.jsonl（cold_storage）はメモリ上に展開して読み、次の書き込みの前に戻す。
+開いている間は cold_storage.hold() で使用中にして、mao gc が圧縮しないようにする。
 """
+import io
 import json
+import os
+import shutil
+import time
 import uuid
+from array import array
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict
 import logging
 
+from mao.orchestrator import cold_storage
+from mao.orchestrator.codec import get_codec
+from mao.orchestrator.session_catalog import SessionCatalog
+
+
+# metadata.json を書き直す間隔（メッセージ数・秒）
+CHECKPOINT_MESSAGES = 50
+CHECKPOINT_SECONDS = 30.0
+
+# page() の既定の件数
+PAGE_SIZE = 50
+
+# chat.jsonl を走査するときの読み込み単位（バイト）
+SCAN_CHUNK = 1 << 20
+
 
 @dataclass
 class ChatMessage:
@@ -34,6 +67,20 @@ class ChatMessage:
         return cls(**data)
 
 
+@dataclass
+class ChatPage:
+    """チャット履歴の1ページ（古い順）"""
+
+    messages: List[ChatMessage]
+    # 先頭メッセージの番号。より古いページは page(before=cursor) で取得する
+    cursor: int
+
+    @property
+    def has_more(self) -> bool:
+        """より古いメッセージがあるかどうか"""
+        return self.cursor > 0
+
+
 class SessionManager:
     """チャットセッション管理"""
 
@@ -59,6 +106,9 @@ class SessionManager:
         self.sessions_dir = self.project_path / ".mao" / "sessions"
         self.sessions_dir.mkdir(parents=True, exist_ok=True)
 
+        # セッション一覧のインデックス（updated_at 順）
+        self.catalog = SessionCatalog(self.sessions_dir, logger=self.logger)
+
         # セッションID
         if session_id:
             self.session_id = session_id
@@ -71,14 +121,30 @@ class SessionManager:
         self.session_dir = self.sessions_dir / self.session_id
         self.session_dir.mkdir(parents=True, exist_ok=True)
 
-        # チャット履歴ファイル
-        self.chat_file = self.session_dir / "chat.json"
+        # チャット履歴ファイル（1行1メッセージ）
+        self.chat_file = self.session_dir / "chat.jsonl"
+        # 旧形式（全履歴を1つの JSON 配列で保存）
+        self.legacy_chat_file = self.session_dir / "chat.json"
+        # オフセットインデックス（各メッセージの行の先頭位置、uint64 の配列）
+        self.index_file = self.session_dir / "chat.idx"
+        self._codec = get_codec("json")
 
         # メタデータファイル
         self.metadata_file = self.session_dir / "metadata.json"
 
-        # メモリ内履歴
-        self.messages: List[ChatMessage] = []
+        # 開いている間は mao gc に chat.jsonl を圧縮させない
+        self._lock = cold_storage.hold(self.chat_file)
+
+        # メッセージ番号 -> chat.jsonl 内のオフセット と chat.jsonl のサイズ
+        self._offsets = array("Q")
+        self._size = 0
+        # ロールごとのメッセージ数（統計用。履歴は読まずに数える）
+        self._role_counts: Dict[str, int] = {}
+        # 圧縮された chat.jsonl を展開した内容（圧縮されていなければ None）
+        self._cold_data: Optional[bytes] = None
+        # 最後のチェックポイント以降に追記したメッセージ数と時刻
+        self._unsaved_messages = 0
+        self._checkpointed_at = time.monotonic()
 
         # セッションメタデータ
         self.metadata: Dict[str, Any] = {
@@ -95,7 +161,7 @@ class SessionManager:
         # 新規セッションの場合、タイトルが指定されていれば保存
         if self._initial_title and not self.metadata.get("title"):
             self.metadata["title"] = self._initial_title
-            self._save_session()
+            self._save_metadata()
 
     def _generate_session_id(self) -> str:
         """セッションIDを生成
@@ -109,16 +175,6 @@ class SessionManager:
 
     def _load_session(self) -> None:
         """セッションを読み込み"""
-        # チャット履歴を読み込み
-        if self.chat_file.exists():
-            try:
-                with open(self.chat_file) as f:
-                    data = json.load(f)
-                    self.messages = [ChatMessage.from_dict(msg) for msg in data]
-                    self.logger.info(f"Loaded {len(self.messages)} messages from session {self.session_id}")
-            except Exception as e:
-                self.logger.error(f"Failed to load chat history: {e}")
-
         # メタデータを読み込み
         if self.metadata_file.exists():
             try:
@@ -127,26 +183,334 @@ class SessionManager:
             except Exception as e:
                 self.logger.error(f"Failed to load metadata: {e}")
 
-    def _save_session(self) -> None:
-        """セッションを保存"""
-        # チャット履歴を保存
+        compressed = None if self.chat_file.exists() else cold_storage.find_compressed(self.chat_file)
+        if self.legacy_chat_file.exists() and not self.chat_file.exists() and not compressed:
+            self._migrate_legacy_chat()
+
+        # チャット履歴のオフセットインデックスを読み込み（メッセージ自体は読まない）
+        if compressed:
+            try:
+                self._open_cold_chat_log(compressed)
+                self.logger.info(f"Opened {self.message_count} compressed messages in session {self.session_id}")
+            except Exception as e:
+                self.logger.error(f"Failed to load compressed chat history: {e}")
+        elif self.chat_file.exists():
+            try:
+                self._open_chat_log()
+                self.logger.info(f"Opened {self.message_count} messages in session {self.session_id}")
+            except Exception as e:
+                self.logger.error(f"Failed to load chat history: {e}")
+
+        # チェックポイント後に追記されたメッセージをヘッダーに反映
+        if self.message_count and self.metadata.get("message_count") != self.message_count:
+            self.metadata["message_count"] = self.message_count
+            last = self.get_message(self.message_count - 1)
+            if last:
+                self.metadata["updated_at"] = max(self.metadata.get("updated_at", ""), last.timestamp)
+            # close() せずに終了した場合など。カタログの件数・更新日時も直す
+            self._write_metadata()
+
+        # 移行・クラッシュなどで全文検索インデックスとずれていれば登録し直す
+        if self.catalog.indexed_count(self.session_id) != self.message_count:
+            self._reindex()
+        try:
+            self._role_counts = self.catalog.role_counts(self.session_id)
+        except Exception as e:
+            self.logger.error(f"Failed to count messages: {e}")
+
+    def _reindex(self) -> None:
+        """全文検索インデックスのこのセッションの分を登録し直す"""
+        try:
+            self.catalog.index_session(self.session_id, [msg.to_dict() for msg in self.messages])
+        except Exception as e:
+            self.logger.error(f"Failed to index chat history: {e}")
+
+    def _open_chat_log(self) -> None:
+        """途切れた末尾の行を切り詰め、オフセットインデックスを読み込む
+
+        chat.idx が chat.jsonl の途中までしかなければ残りを走査して追加し、
+        chat.jsonl と矛盾していれば全体を走査して作り直す。
+        """
+        self._size = self._truncate_torn_tail()
+
+        offsets = self._read_index()
+        if offsets is None:
+            offsets = self._scan_offsets(0)
+            self._offsets = offsets
+            self._write_index()
+            return
+
+        # インデックス作成後に追記された行（chat.jsonl への追記直後にクラッシュした場合など）
+        scan_from = self._line_end(offsets[-1]) if offsets else 0
+        missing = self._scan_offsets(scan_from)
+        offsets.extend(missing)
+        self._offsets = offsets
+        if missing:
+            with open(self.index_file, "ab") as f:
+                f.write(missing.tobytes())
+
+    def _open_cold_chat_log(self, compressed: Path) -> None:
+        """圧縮された chat.jsonl をメモリ上に展開し、オフセットを求める"""
+        self._cold_data = cold_storage.read_bytes(compressed)
+        self._size = len(self._cold_data)
+        self._offsets = self._scan_offsets(0)
+
+    def _thaw(self) -> None:
+        """圧縮された chat.jsonl を展開して戻す（書き込みの前に呼ぶ）"""
+        compressed = cold_storage.find_compressed(self.chat_file)
+        if compressed is None:
+            return
+        if self._cold_data is None:
+            # 開いた後に mao gc で圧縮された
+            self._cold_data = cold_storage.read_bytes(compressed)
+        temp_file = self.chat_file.with_suffix(".jsonl.tmp")
+        with open(temp_file, "wb") as f:
+            f.write(self._cold_data)
+        os.replace(temp_file, self.chat_file)
+        compressed.unlink()
+        self._cold_data = None
+        self._write_index()
+        self.logger.info(f"Decompressed chat history of session {self.session_id}")
+
+    def _open_log(self):
+        """chat.jsonl（圧縮されていれば展開済みの内容）を読み込み用に開く"""
+        if self._cold_data is not None:
+            return io.BytesIO(self._cold_data)
+        return open(self.chat_file, "rb")
+
+    def _truncate_torn_tail(self) -> int:
+        """書き込み途中で途切れた末尾の行を切り詰める
+
+        Returns:
+            切り詰め後の chat.jsonl のサイズ
+        """
+        size = self.chat_file.stat().st_size
+        valid = 0
+        with open(self.chat_file, "rb") as f:
+            end = size
+            while end > 0:
+                start = max(0, end - SCAN_CHUNK)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    valid = start + newline + 1
+                    break
+                end = start
+
+        if valid < size:
+            self.logger.warning(
+                f"Truncating incomplete chat record in {self.chat_file} ({size - valid} bytes)"
+            )
+            with open(self.chat_file, "r+b") as f:
+                f.truncate(valid)
+        return valid
+
+    def _read_index(self) -> Optional[array]:
+        """chat.idx を読み込む（ない・chat.jsonl と矛盾している場合は None）"""
+        try:
+            data = self.index_file.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        offsets = array("Q")
+        if len(data) % offsets.itemsize:
+            return None
+        offsets.frombytes(data)
+        if not offsets:
+            return offsets
+        # 最後のオフセットが chat.jsonl 内の行の先頭を指していること
+        last = offsets[-1]
+        if last >= self._size:
+            return None
+        if last:
+            with open(self.chat_file, "rb") as f:
+                f.seek(last - 1)
+                if f.read(1) != b"\n":
+                    return None
+        return offsets
+
+    def _line_end(self, offset: int) -> int:
+        """offset から始まる行の次の行の先頭位置"""
+        with self._open_log() as f:
+            f.seek(offset)
+            position = offset
+            while True:
+                chunk = f.read(SCAN_CHUNK)
+                if not chunk:
+                    return self._size
+                newline = chunk.find(b"\n")
+                if newline >= 0:
+                    return position + newline + 1
+                position += len(chunk)
+
+    def _scan_offsets(self, start: int) -> array:
+        """start 以降の空でない行の先頭オフセットを改行の走査で求める"""
+        offsets = array("Q")
+        line_start = start
+        with self._open_log() as f:
+            f.seek(start)
+            position = start
+            while True:
+                chunk = f.read(SCAN_CHUNK)
+                if not chunk:
+                    break
+                newline = chunk.find(b"\n")
+                while newline >= 0:
+                    line_end = position + newline
+                    if line_end > line_start:
+                        offsets.append(line_start)
+                    line_start = line_end + 1
+                    newline = chunk.find(b"\n", newline + 1)
+                position += len(chunk)
+        return offsets
+
+    def _write_index(self) -> None:
+        """chat.idx 全体を書き直す（一時ファイルから置き換え）"""
+        temp_file = self.index_file.with_suffix(".idx.tmp")
+        with open(temp_file, "wb") as f:
+            f.write(self._offsets.tobytes())
+        os.replace(temp_file, self.index_file)
+
+    def _read_range(self, start: int, end: int) -> List[ChatMessage]:
+        """メッセージ番号 start 以上 end 未満のメッセージを chat.jsonl から読む"""
+        if start >= end:
+            return []
+        begin = self._offsets[start]
+        stop = self._offsets[end] if end < len(self._offsets) else self._size
+        try:
+            with self._open_log() as f:
+                f.seek(begin)
+                data = f.read(stop - begin)
+        except Exception as e:
+            self.logger.error(f"Failed to read chat history: {e}")
+            return []
+        frames, _ = self._codec.decode_stream(
+            data,
+            lambda e: self.logger.warning(f"Skipped corrupted chat record in {self.chat_file}: {e}"),
+        )
+        return [ChatMessage.from_dict(record) for record, _ in frames]
+
+    def _read_seqs(self, seqs: List[int]) -> List[ChatMessage]:
+        """指定したメッセージ番号のメッセージだけを chat.jsonl から読む"""
+        chunks = []
+        try:
+            with self._open_log() as f:
+                for seq in seqs:
+                    if not 0 <= seq < self.message_count:
+                        continue
+                    begin = self._offsets[seq]
+                    stop = self._offsets[seq + 1] if seq + 1 < len(self._offsets) else self._size
+                    f.seek(begin)
+                    chunks.append(f.read(stop - begin))
+        except Exception as e:
+            self.logger.error(f"Failed to read chat history: {e}")
+            return []
+        frames, _ = self._codec.decode_stream(
+            b"".join(chunks),
+            lambda e: self.logger.warning(f"Skipped corrupted chat record in {self.chat_file}: {e}"),
+        )
+        return [ChatMessage.from_dict(record) for record, _ in frames]
+
+    def _migrate_legacy_chat(self) -> None:
+        """chat.json（JSON 配列）を chat.jsonl に移行"""
+        try:
+            with open(self.legacy_chat_file) as f:
+                messages = [ChatMessage.from_dict(msg) for msg in json.load(f)]
+            self._rewrite_chat_log(messages)
+            self.legacy_chat_file.unlink()
+            self.logger.info(
+                f"Migrated {len(messages)} messages of session {self.session_id} to chat.jsonl"
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to migrate chat history: {e}")
+
+    def _rewrite_chat_log(self, messages: List[ChatMessage]) -> None:
+        """chat.jsonl と chat.idx 全体を書き直す（移行・インポート・クリア用。一時ファイルから置き換え）"""
+        compressed = cold_storage.find_compressed(self.chat_file)
+        offsets = array("Q")
+        size = 0
+        temp_file = self.chat_file.with_suffix(".jsonl.tmp")
+        with open(temp_file, "wb") as f:
+            for msg in messages:
+                data = self._codec.encode(msg.to_dict())
+                f.write(data)
+                offsets.append(size)
+                size += len(data)
+        os.replace(temp_file, self.chat_file)
+        if compressed:
+            compressed.unlink()
+        self._cold_data = None
+
+        self._offsets = offsets
+        self._size = size
+        self._write_index()
+
+        self._role_counts = {}
+        for msg in messages:
+            self._role_counts[msg.role] = self._role_counts.get(msg.role, 0) + 1
+
+    def _append_message(self, message: ChatMessage) -> None:
+        """chat.jsonl に1行、chat.idx にそのオフセットを追記"""
+        data = self._codec.encode(message.to_dict())
         try:
-            with open(self.chat_file, "w") as f:
-                data = [msg.to_dict() for msg in self.messages]
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            if not self.chat_file.exists():
+                self._thaw()
+            with open(self.chat_file, "ab") as f:
+                f.write(data)
+            self._offsets.append(self._size)
+            self._size += len(data)
+            self._role_counts[message.role] = self._role_counts.get(message.role, 0) + 1
+            # chat.idx への追記が失敗しても次に開いたときに走査して補う
+            with open(self.index_file, "ab") as f:
+                f.write(self._offsets[-1:].tobytes())
         except Exception as e:
             self.logger.error(f"Failed to save chat history: {e}")
 
-        # メタデータを保存
+    def _save_metadata(self) -> None:
+        """メタデータ（ヘッダー）を書き直す（チェックポイント）"""
+        self.metadata["updated_at"] = datetime.utcnow().isoformat()
+        self._write_metadata()
+
+    def _write_metadata(self) -> None:
+        """metadata.json とカタログを self.metadata の内容で書き直す（updated_at は変えない）"""
         try:
-            self.metadata["updated_at"] = datetime.utcnow().isoformat()
-            self.metadata["message_count"] = len(self.messages)
+            self.metadata["message_count"] = self.message_count
 
-            with open(self.metadata_file, "w") as f:
+            temp_file = self.metadata_file.with_suffix(".json.tmp")
+            with open(temp_file, "w") as f:
                 json.dump(self.metadata, f, indent=2, ensure_ascii=False)
+            os.replace(temp_file, self.metadata_file)
+            self.catalog.upsert(self.metadata)
+
+            self._unsaved_messages = 0
+            self._checkpointed_at = time.monotonic()
         except Exception as e:
             self.logger.error(f"Failed to save metadata: {e}")
 
+    def _save_session(self, messages: List[ChatMessage]) -> None:
+        """セッションを保存（チャット履歴全体の書き直しとチェックポイント）
+
+        Args:
+            messages: チャット履歴（古い順）
+        """
+        try:
+            self._rewrite_chat_log(messages)
+        except Exception as e:
+            self.logger.error(f"Failed to save chat history: {e}")
+        self._reindex()
+        self._save_metadata()
+
+    def checkpoint(self) -> None:
+        """未反映の追記があればメタデータを書き直す"""
+        if self._unsaved_messages:
+            self._save_metadata()
+
+    def close(self) -> None:
+        """セッションを閉じる（メタデータをチェックポイント）"""
+        self.checkpoint()
+        self.catalog.close()
+        self._lock.release()
+
     def add_message(
         self,
         role: str,
@@ -170,11 +534,70 @@ class SessionManager:
             metadata=metadata,
         )
 
-        self.messages.append(message)
-        self._save_session()
+        seq = self.message_count
+        self._append_message(message)
+        try:
+            self.catalog.index_message(self.session_id, seq, message.to_dict())
+        except Exception as e:
+            self.logger.error(f"Failed to index message: {e}")
+
+        # ヘッダーは一定件数・一定時間ごとにのみ書き直す（初回は作成する）
+        self._unsaved_messages += 1
+        if (
+            not self.metadata_file.exists()
+            or self._unsaved_messages >= CHECKPOINT_MESSAGES
+            or time.monotonic() - self._checkpointed_at >= CHECKPOINT_SECONDS
+        ):
+            self._save_metadata()
 
         return message
 
+    @property
+    def message_count(self) -> int:
+        """メッセージ数（履歴は読まない）"""
+        return len(self._offsets)
+
+    @property
+    def messages(self) -> List[ChatMessage]:
+        """全メッセージ（古い順）
+
+        アクセスのたびに履歴全体を読むので、表示には tail() / page()、
+        ロールでの絞り込みには get_messages(role=...)、件数には get_session_stats() を使う。
+        """
+        return self._read_range(0, self.message_count)
+
+    def get_message(self, seq: int) -> Optional[ChatMessage]:
+        """メッセージ番号（0始まり）のメッセージを取得
+
+        Args:
+            seq: メッセージ番号
+
+        Returns:
+            メッセージ（範囲外または読めない場合はNone）
+        """
+        if not 0 <= seq < self.message_count:
+            return None
+        messages = self._read_range(seq, seq + 1)
+        return messages[0] if messages else None
+
+    def page(self, before: Optional[int] = None, limit: int = PAGE_SIZE) -> ChatPage:
+        """メッセージ番号 before より前の最大 limit 件を取得
+
+        Args:
+            before: カーソル（前のページの cursor。Noneの場合は最新から）
+            limit: 取得する最大件数
+
+        Returns:
+            古い順のメッセージと、その先頭のメッセージ番号（次のカーソル）
+        """
+        end = self.message_count if before is None else max(0, min(before, self.message_count))
+        start = max(0, end - limit)
+        return ChatPage(messages=self._read_range(start, end), cursor=start)
+
+    def tail(self, n: int = PAGE_SIZE) -> ChatPage:
+        """最新の n 件を取得（page(limit=n) と同じ）"""
+        return self.page(limit=n)
+
     def get_messages(
         self,
         role: Optional[str] = None,
@@ -182,6 +605,9 @@ class SessionManager:
     ) -> List[ChatMessage]:
         """メッセージを取得
 
+        limit を指定した場合は該当する行だけを読む（ロールでのフィルタは
+        カタログのインデックスで該当するメッセージ番号を求める）。
+
         Args:
             role: ロールでフィルタ（Noneの場合は全て）
             limit: 取得する最大件数（最新からN件）
@@ -189,22 +615,25 @@ class SessionManager:
         Returns:
             メッセージのリスト
         """
-        messages = self.messages
+        if not role:
+            return self.tail(limit).messages if limit else self.messages
 
-        # ロールでフィルタ
-        if role:
-            messages = [msg for msg in messages if msg.role == role]
-
-        # 最新N件を取得
-        if limit:
-            messages = messages[-limit:]
-
-        return messages
+        try:
+            seqs = self.catalog.message_seqs(self.session_id, role, limit=limit or None)
+        except Exception as e:
+            self.logger.error(f"Failed to look up messages by role: {e}")
+            messages = [msg for msg in self.messages if msg.role == role]
+            return messages[-limit:] if limit else messages
+        return self._read_seqs(seqs)
 
     def clear_messages(self) -> None:
         """メッセージをクリア"""
-        self.messages.clear()
-        self._save_session()
+        try:
+            self._rewrite_chat_log([])
+        except Exception as e:
+            self.logger.error(f"Failed to clear chat history: {e}")
+        self._reindex()
+        self._save_metadata()
         self.logger.info(f"Cleared all messages in session {self.session_id}")
 
     def delete_session(self) -> bool:
@@ -215,16 +644,9 @@ class SessionManager:
         """
         try:
             if self.session_dir.exists():
-                # チャットファイルを削除
-                if self.chat_file.exists():
-                    self.chat_file.unlink()
-
-                # メタデータファイルを削除
-                if self.metadata_file.exists():
-                    self.metadata_file.unlink()
-
-                # セッションディレクトリを削除
-                self.session_dir.rmdir()
+                # チャット履歴・メタデータごとセッションディレクトリを削除
+                shutil.rmtree(self.session_dir)
+                self.catalog.remove(self.session_id)
 
                 self.logger.info(f"Deleted session {self.session_id}")
                 return True
@@ -233,31 +655,31 @@ class SessionManager:
 
         return False
 
-    def get_all_sessions(self) -> List[Dict[str, Any]]:
-        """全セッションのメタデータを取得
+    def get_all_sessions(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """全セッションのメタデータを取得（カタログから、更新日時の降順）
+
+        Args:
+            limit: 取得する最大件数（Noneの場合は全て）
 
         Returns:
             セッションメタデータのリスト
         """
-        sessions = []
+        return self.catalog.list(limit=limit)
 
-        for session_dir in sorted(self.sessions_dir.iterdir()):
-            if not session_dir.is_dir():
-                continue
+    def get_session_count(self) -> int:
+        """セッション数を取得"""
+        return self.catalog.count()
 
-            metadata_file = session_dir / "metadata.json"
-            if metadata_file.exists():
-                try:
-                    with open(metadata_file) as f:
-                        metadata = json.load(f)
-                        sessions.append(metadata)
-                except Exception as e:
-                    self.logger.error(f"Failed to load metadata from {session_dir}: {e}")
+    def find_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """IDが一致、またはIDの末尾が一致する（短縮ID）セッションのメタデータを取得
 
-        # 更新日時の降順でソート
-        sessions.sort(key=lambda s: s.get("updated_at", ""), reverse=True)
+        Args:
+            session_id: セッションID、またはその末尾
 
-        return sessions
+        Returns:
+            セッションメタデータ（見つからない場合はNone）
+        """
+        return self.catalog.get(session_id) or self.catalog.find(session_id)
 
     def get_latest_session_id(self) -> Optional[str]:
         """最新のセッションIDを取得
@@ -265,46 +687,70 @@ class SessionManager:
         Returns:
             最新のセッションID（存在しない場合はNone）
         """
-        sessions = self.get_all_sessions()
-        if sessions:
-            return sessions[0]["session_id"]
-        return None
+        while True:
+            session_id = self.catalog.latest_id()
+            if session_id is None or (self.sessions_dir / session_id).is_dir():
+                return session_id
+            # delete_session() を通さずにディレクトリが消されたセッション
+            self.logger.warning(f"Removing missing session {session_id} from catalog")
+            self.catalog.remove(session_id)
+
+    def rebuild_catalog(self) -> int:
+        """セッションディレクトリからカタログと全文検索インデックスを作り直す
+
+        Returns:
+            登録したセッション数
+        """
+        return self.catalog.rebuild()
 
     def search_messages(self, query: str) -> List[ChatMessage]:
-        """メッセージを検索
+        """このセッションのメッセージを検索（全文検索インデックスを使用）
 
         Args:
             query: 検索クエリ
 
         Returns:
-            マッチしたメッセージのリスト
+            マッチしたメッセージのリスト（古い順）
         """
-        query_lower = query.lower()
-        results = []
+        hits = self.catalog.search(query, session_id=self.session_id, limit=None)
+        messages = [self.get_message(seq) for seq in sorted(hit["seq"] for hit in hits)]
+        return [msg for msg in messages if msg]
 
-        for message in self.messages:
-            if query_lower in message.content.lower():
-                results.append(message)
+    def search_history(
+        self,
+        query: str,
+        role: Optional[str] = None,
+        limit: Optional[int] = 20,
+        highlight: Tuple[str, str] = ("[", "]"),
+    ) -> List[Dict[str, Any]]:
+        """全セッションのチャット履歴を全文検索
 
-        return results
+        Args:
+            query: 検索クエリ（"..." でフレーズ検索、空白区切りの語は AND）
+            role: ロールでフィルタ（Noneの場合は全て）
+            limit: 最大件数（Noneの場合は全て）
+            highlight: スニペット中の一致箇所を囲む文字列
+
+        Returns:
+            関連度順の検索結果（SessionCatalog.search を参照）
+        """
+        return self.catalog.search(query, role=role, limit=limit, highlight=highlight)
 
     def get_session_stats(self) -> Dict[str, Any]:
         """セッション統計を取得
 
+        ロールごとの件数は読み込み時にカタログから求め、追加のたびに数える（履歴は読まない）。
+
         Returns:
             統計情報
         """
-        user_messages = sum(1 for msg in self.messages if msg.role == "user")
-        cto_messages = sum(1 for msg in self.messages if msg.role == "cto")
-        system_messages = sum(1 for msg in self.messages if msg.role == "system")
-
         return {
             "session_id": self.session_id,
             "title": self.metadata.get("title", ""),
-            "total_messages": len(self.messages),
-            "user_messages": user_messages,
-            "cto_messages": cto_messages,
-            "system_messages": system_messages,
+            "total_messages": self.message_count,
+            "user_messages": self._role_counts.get("user", 0),
+            "cto_messages": self._role_counts.get("cto", 0),
+            "system_messages": self._role_counts.get("system", 0),
             "created_at": self.metadata.get("created_at"),
             "updated_at": self.metadata.get("updated_at"),
         }
@@ -316,7 +762,7 @@ class SessionManager:
             title: セッションタイトル
         """
         self.metadata["title"] = title
-        self._save_session()
+        self._save_metadata()
         self.logger.info(f"Updated session title: {title}")
 
     def get_title(self) -> str:
@@ -369,11 +815,12 @@ class SessionManager:
                 self.metadata = import_data["metadata"]
 
             # メッセージを復元
+            messages = self.messages
             if "messages" in import_data:
-                self.messages = [ChatMessage.from_dict(msg) for msg in import_data["messages"]]
+                messages = [ChatMessage.from_dict(msg) for msg in import_data["messages"]]
 
             # セッションを保存
-            self._save_session()
+            self._save_session(messages)
 
             self.logger.info(f"Imported session from {import_file}")
             return True
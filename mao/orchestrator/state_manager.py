@@ -1,16 +1,37 @@
 """
 Agent state management system
+
+メモリ内の状態が常に正で、永続化（SQLite / Redis）はその写し。
+flush_interval > 0 の場合は write-behind: 更新をエージェントごとにまとめて保持し、
+flush_interval 秒ごと（と close() 時）に1トランザクションで書き込む。
+クラッシュ時に失われるのは最大で1回分のフラッシュ間隔の更新のみ。
+
+統計（get_stats）はセッションごとの集計を更新時に差分で保ち、O(1) で返す。
+集計の version は変更のたびに増えるため、呼び出し側は再描画を省略できる。
+
+SQLite へのアクセスは AsyncDatabase（書き込みスレッド + 読み込み接続プール）経由で行い、
+イベントループ上のコルーチンが SQLite を待ってブロックしないようにする。
+
+SQLite の場合は更新ごとに tokens_used / cost / status のサンプルも記録し、
+AgentMetricsStore（agent_metrics.py）が同じトランザクションでロールアップする。
 """
 import asyncio
 import sqlite3
 import json
+import time
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Callable, Optional, Dict, Any, List, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict
 from enum import Enum
 import logging
 
+from mao.orchestrator.async_db import AsyncDatabase
+from mao.orchestrator.agent_metrics import AgentMetricsStore, MetricSample, MetricsRetention
+
+# agent_states テーブルのスキーマバージョン（PRAGMA user_version）
+SCHEMA_VERSION = 2
+
 
 class AgentStatus(str, Enum):
     """エージェントの状態"""
@@ -60,6 +81,43 @@ class AgentState:
         return cls(**data)
 
 
+# get_stats() で稼働中とみなすステータス
+ACTIVE_STATUSES = (AgentStatus.ACTIVE, AgentStatus.THINKING)
+
+
+@dataclass
+class SessionStats:
+    """セッションの集計（状態の追加・削除のたびに差分で更新する）"""
+
+    total_agents: int = 0
+    active_agents: int = 0
+    total_tokens: int = 0
+    total_cost: float = 0.0
+    version: int = 0  # 変更のたびに増える
+
+    def apply(self, state: AgentState, sign: int) -> None:
+        """状態の寄与を加える（sign=1）または取り除く（sign=-1）"""
+        self.total_agents += sign
+        if state.status in ACTIVE_STATUSES:
+            self.active_agents += sign
+        self.total_tokens += sign * state.tokens_used
+        self.total_cost += sign * state.cost
+        if self.total_agents == 0:
+            # 浮動小数点の誤差を持ち越さない
+            self.total_tokens = 0
+            self.total_cost = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """get_stats() の形式に変換"""
+        return {
+            "total_agents": self.total_agents,
+            "active_agents": self.active_agents,
+            "total_tokens": self.total_tokens,
+            "total_cost": self.total_cost,
+            "version": self.version,
+        }
+
+
 class StateManager:
     """エージェント状態管理マネージャー"""
 
@@ -69,6 +127,10 @@ class StateManager:
         use_sqlite: bool = True,
         logger: Optional[logging.Logger] = None,
         session_id: Optional[str] = None,
+        redis_url: Optional[str] = None,
+        redis_options: Optional[Dict[str, Any]] = None,
+        flush_interval: float = 0.0,
+        metrics_retention: Optional[MetricsRetention] = None,
     ):
         """
         Args:
@@ -76,85 +138,145 @@ class StateManager:
             use_sqlite: SQLiteを使用するか（Falseの場合はメモリのみ）
             logger: ロガー
             session_id: セッションID（セッション間でエージェントを分離）
+            redis_url: Redis URL（指定時は SQLite の代わりに Redis で状態を共有）
+            redis_options: RedisStateStore のオプション（key_prefix, client）
+            flush_interval: write-behind のフラッシュ間隔（秒）。0 なら更新ごとに書き込む
+            metrics_retention: メトリクス時系列の保持期間（SQLite の場合のみ記録）
         """
         self.project_path = project_path or Path.cwd()
-        self.use_sqlite = use_sqlite
+        self.use_redis = redis_url is not None or bool(redis_options)
+        self.use_sqlite = use_sqlite and not self.use_redis
         self.logger = logger or logging.getLogger(__name__)
         self.session_id = session_id
+        self.flush_interval = flush_interval
 
-        # メモリ内状態（高速アクセス用）
+        # メモリ内状態（現在のセッションのみ、agent_id -> 状態）
         self._states: Dict[str, AgentState] = {}
+        # _states の集計（_set_state / _reset_states で更新）
+        self._stats = SessionStats()
         self._lock = asyncio.Lock()
 
-        # SQLite接続
+        # write-behind: 未書き込みの変更（agent_id -> 状態、None は削除）
+        self._pending: Dict[str, Optional[AgentState]] = {}
+        self._pending_clear = False
+        self._flush_task: Optional[asyncio.Task] = None
+        # 未書き込みのメトリクスサンプル（更新順）
+        self._pending_samples: List[MetricSample] = []
+
+        # SQLite（書き込みスレッド + 読み込み接続プール）
         self.db_path: Optional[Path] = None
-        self.conn: Optional[sqlite3.Connection] = None
+        self.db: Optional[AsyncDatabase] = None
+        self.metrics_retention = metrics_retention
+        self.metrics: Optional[AgentMetricsStore] = None
+
+        # Redis（他プロセスの変更は Pub/Sub で _states に反映）
+        self._redis = None
+        self._sync_task: Optional[asyncio.Task] = None
 
         if self.use_sqlite:
             self._init_database()
+        elif self.use_redis:
+            self._init_redis(redis_url, redis_options or {})
 
-    def _make_key(self, agent_id: str) -> str:
-        """エージェント状態のキーを生成（session_id:agent_id）
+    @property
+    def _session_key(self) -> str:
+        """データベース上のセッションキー（セッションIDなしは空文字）"""
+        return self.session_id or ""
 
-        Args:
-            agent_id: エージェントID
-
-        Returns:
-            セッションIDを含むキー
-        """
-        if self.session_id:
-            return f"{self.session_id}:{agent_id}"
-        return agent_id
+    @property
+    def conn(self) -> Optional[sqlite3.Connection]:
+        """書き込み用の SQLite 接続（書き込みスレッドが所有。診断用）"""
+        return self.db.writer_conn if self.db is not None else None
 
     def _init_database(self) -> None:
-        """データベースを初期化"""
+        """データベースを初期化（起動時のみ同期的に待つ）"""
         mao_dir = self.project_path / ".mao"
         mao_dir.mkdir(parents=True, exist_ok=True)
 
         self.db_path = mao_dir / "agent_states.db"
+        self.db = AsyncDatabase(self.db_path, init=self._init_schema, logger=self.logger)
 
-        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-
-        # テーブル作成
-        self.conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS agent_states (
-                agent_id TEXT PRIMARY KEY,
-                role TEXT NOT NULL,
-                status TEXT NOT NULL,
-                current_task TEXT,
-                tokens_used INTEGER DEFAULT 0,
-                cost REAL DEFAULT 0.0,
-                last_updated TEXT,
-                error_message TEXT,
-                worktree_path TEXT
-            )
-            """
-        )
+        # 現在のセッションのみ読み込む（過去のセッション数に依存しない）
+        self._load_from_database()
 
-        # マイグレーション: worktree_path カラムを追加（存在しない場合）
-        try:
-            self.conn.execute(
-                "ALTER TABLE agent_states ADD COLUMN worktree_path TEXT"
+    def _init_schema(self, conn: sqlite3.Connection) -> None:
+        """スキーマの移行とメトリクスストアの作成（書き込み用接続）"""
+        self._migrate(conn)
+        self.metrics = AgentMetricsStore(conn, retention=self.metrics_retention, logger=self.logger)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """スキーマを最新バージョンに移行（PRAGMA user_version で管理）
+
+        - v1: agent_id が主キー（セッション間で上書きされる）
+        - v2: (session_id, agent_id) が主キー + セカンダリインデックス
+        """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        with conn:
+            columns = {
+                row["name"] for row in conn.execute("PRAGMA table_info(agent_states)")
+            }
+            if columns and "session_id" not in columns:
+                # v1 のデータはセッションなし（空文字）として引き継ぐ
+                conn.execute("ALTER TABLE agent_states RENAME TO agent_states_v1")
+
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agent_states (
+                    session_id TEXT NOT NULL DEFAULT '',
+                    agent_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    current_task TEXT,
+                    tokens_used INTEGER DEFAULT 0,
+                    cost REAL DEFAULT 0.0,
+                    last_updated TEXT,
+                    error_message TEXT,
+                    worktree_path TEXT,
+                    PRIMARY KEY (session_id, agent_id)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_states_status "
+                "ON agent_states (session_id, status)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_states_last_updated "
+                "ON agent_states (last_updated)"
             )
-            self.conn.commit()
-        except sqlite3.OperationalError:
-            # カラムが既に存在する場合
-            pass
 
-        self.conn.commit()
+            if columns and "session_id" not in columns:
+                worktree = "worktree_path" if "worktree_path" in columns else "NULL"
+                conn.execute(
+                    f"""
+                    INSERT OR REPLACE INTO agent_states
+                    (session_id, agent_id, role, status, current_task, tokens_used, cost,
+                     last_updated, error_message, worktree_path)
+                    SELECT '', agent_id, role, status, current_task, tokens_used, cost,
+                           last_updated, error_message, {worktree}
+                    FROM agent_states_v1
+                    """
+                )
+                conn.execute("DROP TABLE agent_states_v1")
+                self.logger.info("Migrated agent_states to schema v2 (session_id, agent_id)")
 
-        # 既存データを読み込み
-        self._load_from_database()
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
     def _load_from_database(self) -> None:
-        """データベースから状態を読み込み"""
-        if not self.conn:
+        """データベースから現在のセッションの状態を読み込み"""
+        if self.db is None:
             return
 
-        cursor = self.conn.execute("SELECT * FROM agent_states")
-        for row in cursor:
+        rows = self.db.read_sync(
+            "state.load",
+            lambda conn: conn.execute(
+                "SELECT * FROM agent_states WHERE session_id = ?", (self._session_key,)
+            ).fetchall(),
+        )
+        for row in rows:
             state = AgentState(
                 agent_id=row["agent_id"],
                 role=row["role"],
@@ -164,8 +286,266 @@ class StateManager:
                 cost=row["cost"] or 0.0,
                 last_updated=row["last_updated"] or "",
                 error_message=row["error_message"],
+                worktree_path=row["worktree_path"] or "",
             )
-            self._states[state.agent_id] = state
+            self._set_state(state.agent_id, state)
+
+    def _set_state(self, agent_id: str, state: Optional[AgentState]) -> None:
+        """メモリ内状態を置き換え、集計を差分で更新
+
+        Args:
+            agent_id: エージェントID
+            state: 新しい状態（None は削除）
+        """
+        previous = self._states.pop(agent_id, None)
+        if previous is None and state is None:
+            return
+        if previous is not None:
+            self._stats.apply(previous, -1)
+        if state is not None:
+            self._states[agent_id] = state
+            self._stats.apply(state, 1)
+        self._stats.version += 1
+
+    def _reset_states(self) -> None:
+        """メモリ内状態と集計をクリア"""
+        self._states.clear()
+        self._stats = SessionStats(version=self._stats.version + 1)
+
+    @property
+    def stats_version(self) -> int:
+        """状態が変わるたびに増えるカウンター（再描画の要否の判定用）"""
+        return self._stats.version
+
+    def _init_redis(self, redis_url: Optional[str], options: Dict[str, Any]) -> None:
+        """Redis バックエンドを初期化"""
+        from mao.orchestrator.redis_backend import RedisStateStore
+
+        self._redis = RedisStateStore(
+            self.project_path,
+            session_id=self.session_id,
+            url=redis_url,
+            logger=self.logger,
+            **options,
+        )
+        # 読み込み中の変更を取りこぼさないよう、先に購読する
+        self._redis.subscribe()
+        for agent_id, data in self._redis.load().items():
+            self._set_state(agent_id, AgentState.from_dict(data))
+
+    def _ensure_sync(self) -> None:
+        """Redis の変更通知の受信を開始（イベントループ上で呼び出す）"""
+        if self._redis is not None and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._redis.listen(self._apply_remote_change))
+
+    def _apply_remote_change(self, change: Dict[str, Any]) -> None:
+        """他プロセスによる状態の変更をメモリ内状態に反映
+
+        Args:
+            change: {"op": set/del/clear, "agent_id", "state"}
+        """
+        op = change.get("op")
+        if op == "set":
+            self._set_state(change["agent_id"], AgentState.from_dict(change["state"]))
+        elif op == "del":
+            self._set_state(change["agent_id"], None)
+        elif op == "clear":
+            self._reset_states()
+
+    async def _write(self, agent_id: str, state: Optional[AgentState]) -> None:
+        """変更を永続化（write-behind の場合は次のフラッシュまで保持）
+
+        Args:
+            agent_id: エージェントID
+            state: 新しい状態（None は削除）
+        """
+        if self.flush_interval > 0:
+            self._pending[agent_id] = state
+            self._ensure_flusher()
+        else:
+            await self._persist_async({agent_id: state}, clear=False)
+
+    def _split_changes(
+        self, changes: Dict[str, Optional[AgentState]]
+    ) -> Tuple[Dict[str, AgentState], List[str]]:
+        saved = {aid: state for aid, state in changes.items() if state is not None}
+        deleted = [aid for aid, state in changes.items() if state is None]
+        return saved, deleted
+
+    def _persist(self, changes: Dict[str, Optional[AgentState]], clear: bool) -> None:
+        """変更を1トランザクションで書き込み、完了を待つ（同期。close() 用）
+
+        Args:
+            changes: agent_id -> 状態（None は削除）
+            clear: 先に全状態を削除するか
+        """
+        saved, deleted = self._split_changes(changes)
+        if self.use_sqlite and self.db is not None:
+            samples, self._pending_samples = self._pending_samples, []
+            try:
+                self.db.submit(
+                    "state.persist", self._sqlite_job(saved, deleted, clear, samples)
+                ).result()
+            except Exception:
+                self._pending_samples = samples + self._pending_samples
+                raise
+        elif self._redis is not None:
+            self._persist_redis(saved, deleted, clear)
+
+    async def _persist_async(self, changes: Dict[str, Optional[AgentState]], clear: bool) -> None:
+        """変更を1トランザクションで書き込む（SQLite は書き込みスレッドで実行）
+
+        Args:
+            changes: agent_id -> 状態（None は削除）
+            clear: 先に全状態を削除するか
+        """
+        saved, deleted = self._split_changes(changes)
+        if self.use_sqlite and self.db is not None:
+            samples, self._pending_samples = self._pending_samples, []
+            try:
+                await self.db.execute(
+                    "state.persist", self._sqlite_job(saved, deleted, clear, samples)
+                )
+            except Exception:
+                self._pending_samples = samples + self._pending_samples
+                raise
+        elif self._redis is not None:
+            self._persist_redis(saved, deleted, clear)
+
+    def _persist_redis(self, saved: Dict[str, AgentState], deleted: List[str], clear: bool) -> None:
+        if clear:
+            self._redis.clear()
+        self._redis.save_many({aid: state.to_dict() for aid, state in saved.items()})
+        for agent_id in deleted:
+            self._redis.delete(agent_id)
+
+    def _sqlite_job(
+        self,
+        saved: Dict[str, AgentState],
+        deleted: List[str],
+        clear: bool,
+        samples: List[MetricSample],
+    ) -> Callable[[sqlite3.Connection], None]:
+        """状態とメトリクスサンプルを書き込む関数（書き込みスレッドのトランザクション内で実行）
+
+        メトリクスの増分の基準（最後のサンプル）はコミットできてから進める。失敗したら
+        戻すので、再試行したサンプルも同じ増分で記録される。
+        """
+        session = self._session_key
+
+        def job(conn: sqlite3.Connection) -> None:
+            try:
+                write(conn)
+                conn.commit()
+            except BaseException:
+                if self.metrics is not None:
+                    self.metrics.discard_uncommitted()
+                raise
+            if self.metrics is not None:
+                self.metrics.mark_committed()
+
+        def write(conn: sqlite3.Connection) -> None:
+            if clear:
+                conn.execute("DELETE FROM agent_states WHERE session_id = ?", (session,))
+            if saved:
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO agent_states
+                    (session_id, agent_id, role, status, current_task, tokens_used, cost, last_updated, error_message, worktree_path)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            session,
+                            state.agent_id,
+                            state.role,
+                            state.status.value,
+                            state.current_task,
+                            state.tokens_used,
+                            state.cost,
+                            state.last_updated,
+                            state.error_message,
+                            state.worktree_path,
+                        )
+                        for state in saved.values()
+                    ],
+                )
+            if deleted:
+                conn.executemany(
+                    "DELETE FROM agent_states WHERE session_id = ? AND agent_id = ?",
+                    [(session, agent_id) for agent_id in deleted],
+                )
+            if samples and self.metrics is not None:
+                self.metrics.record_many(session, samples)
+
+        return job
+
+    def _take_pending(self) -> Tuple[Dict[str, Optional[AgentState]], bool]:
+        changes, clear = self._pending, self._pending_clear
+        self._pending, self._pending_clear = {}, False
+        return changes, clear
+
+    def _restore_pending(self, changes: Dict[str, Optional[AgentState]], clear: bool) -> None:
+        # 書き込めなかった変更は次のフラッシュで再試行（新しい変更を優先）
+        changes.update(self._pending)
+        self._pending = changes
+        self._pending_clear = self._pending_clear or clear
+
+    def _has_pending(self) -> bool:
+        return bool(self._pending or self._pending_clear or self._pending_samples)
+
+    def flush(self) -> int:
+        """未書き込みの変更を書き込み、完了を待つ（同期）
+
+        Returns:
+            書き込んだエージェント数
+        """
+        if not self._has_pending():
+            return 0
+
+        changes, clear = self._take_pending()
+        try:
+            self._persist(changes, clear)
+        except Exception:
+            self._restore_pending(changes, clear)
+            raise
+        return len(changes)
+
+    async def flush_async(self) -> int:
+        """未書き込みの変更を書き込む（イベントループをブロックしない）
+
+        Returns:
+            書き込んだエージェント数
+        """
+        if not self._has_pending():
+            return 0
+
+        changes, clear = self._take_pending()
+        try:
+            await self._persist_async(changes, clear)
+        except Exception:
+            self._restore_pending(changes, clear)
+            raise
+        return len(changes)
+
+    def _ensure_flusher(self) -> None:
+        """write-behind のフラッシュタスクを開始（イベントループ上でのみ）"""
+        if self._flush_task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        """flush_interval ごとに変更を書き込む"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_async()
+            except Exception as e:
+                self.logger.error(f"Failed to flush agent states: {e}")
 
     async def update_state(
         self,
@@ -203,31 +583,15 @@ class StateManager:
                 worktree_path=worktree_path,
             )
 
-            # セッションIDを含むキーを使用
-            key = self._make_key(agent_id)
-            self._states[key] = state
-
-            # SQLiteに保存
-            if self.use_sqlite and self.conn:
-                self.conn.execute(
-                    """
-                    INSERT OR REPLACE INTO agent_states
-                    (agent_id, role, status, current_task, tokens_used, cost, last_updated, error_message, worktree_path)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        agent_id,
-                        role,
-                        status.value,
-                        current_task,
-                        tokens_used,
-                        cost,
-                        state.last_updated,
-                        error_message,
-                        worktree_path,
-                    ),
+            self._set_state(agent_id, state)
+            if self.metrics is not None:
+                self._pending_samples.append(
+                    MetricSample(agent_id, time.time(), tokens_used, cost, status.value)
                 )
-                self.conn.commit()
+
+            if self._redis is not None:
+                self._ensure_sync()
+            await self._write(agent_id, state)
 
     async def get_state(self, agent_id: str) -> Optional[AgentState]:
         """エージェント状態を取得
@@ -238,9 +602,9 @@ class StateManager:
         Returns:
             エージェント状態（存在しない場合はNone）
         """
+        self._ensure_sync()
         async with self._lock:
-            key = self._make_key(agent_id)
-            return self._states.get(key)
+            return self._states.get(agent_id)
 
     async def get_all_states(self) -> List[AgentState]:
         """全エージェント状態を取得（現在のセッションのみ）
@@ -248,17 +612,10 @@ class StateManager:
         Returns:
             エージェント状態のリスト
         """
+        self._ensure_sync()
         async with self._lock:
-            if self.session_id:
-                # 現在のセッションのエージェントのみ
-                prefix = f"{self.session_id}:"
-                return [
-                    state for key, state in self._states.items()
-                    if key.startswith(prefix)
-                ]
-            else:
-                # セッションIDなしの場合は全て返す（後方互換性）
-                return list(self._states.values())
+            # メモリには現在のセッションの状態のみを保持している
+            return list(self._states.values())
 
     async def clear_state(self, agent_id: str) -> None:
         """エージェント状態をクリア
@@ -267,57 +624,102 @@ class StateManager:
             agent_id: エージェントID
         """
         async with self._lock:
-            key = self._make_key(agent_id)
-            if key in self._states:
-                del self._states[key]
+            self._set_state(agent_id, None)
 
-            if self.use_sqlite and self.conn:
-                self.conn.execute("DELETE FROM agent_states WHERE agent_id = ?", (agent_id,))
-                self.conn.commit()
+            await self._write(agent_id, None)
 
     async def clear_all_states(self) -> None:
-        """全エージェント状態をクリア"""
+        """現在のセッションの全エージェント状態をクリア"""
         async with self._lock:
-            self._states.clear()
+            self._reset_states()
 
-            if self.use_sqlite and self.conn:
-                self.conn.execute("DELETE FROM agent_states")
-                self.conn.commit()
+            if self.flush_interval > 0:
+                self._pending.clear()
+                self._pending_clear = True
+                self._ensure_flusher()
+            else:
+                await self._persist_async({}, clear=True)
 
     def get_stats(self) -> Dict[str, Any]:
         """統計情報を取得（現在のセッションのみ）
 
+        更新時に保っている集計を返すため、エージェント数に依存しない。
+
         Returns:
-            統計情報
+            統計情報（version は変更のたびに増える）
         """
-        # 現在のセッションのエージェントのみを対象
-        if self.session_id:
-            prefix = f"{self.session_id}:"
-            session_states = [
-                state for key, state in self._states.items()
-                if key.startswith(prefix)
-            ]
-        else:
-            session_states = list(self._states.values())
+        return self._stats.to_dict()
+
+    async def get_metrics(
+        self,
+        window: float = 3600,
+        rate_window: float = 300,
+        agent_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """現在のセッションのメトリクス時系列（ダッシュボード・CLI 表示用）
+
+        ロールアップのみを読み込み用接続で読む。メトリクスを記録していない場合
+        （メモリのみ・Redis）は空。
 
-        total_tokens = sum(state.tokens_used for state in session_states)
-        total_cost = sum(state.cost for state in session_states)
+        Args:
+            window: スパークラインとステータス滞在時間の期間（秒）
+            rate_window: スループット・コスト消費率の期間（秒）
+            agent_id: エージェントID（None は全エージェントの合計）
 
-        active_count = sum(
-            1
-            for state in session_states
-            if state.status in (AgentStatus.ACTIVE, AgentStatus.THINKING)
+        Returns:
+            tokens_per_minute, cost_per_hour, token_series（1分ごと）, status_seconds
+        """
+        if self.metrics is None or self.db is None:
+            return {}
+        session = self._session_key
+        now = time.time()
+        metrics = self.metrics
+
+        def query(conn: sqlite3.Connection) -> Dict[str, Any]:
+            rates = metrics.rates(
+                session, window=rate_window, agent_id=agent_id, now=now, conn=conn
+            )
+            return {
+                **rates,
+                "token_series": metrics.series(
+                    session, "tokens", window=window, agent_id=agent_id, now=now, conn=conn
+                ),
+                "status_seconds": metrics.status_durations(
+                    session, window=window, agent_id=agent_id, now=now, conn=conn
+                ),
+            }
+
+        return await self.db.read("metrics.query", query)
+
+    async def get_metric_agents(self) -> List[str]:
+        """現在のセッションでメトリクスのあるエージェントID"""
+        if self.metrics is None or self.db is None:
+            return []
+        session = self._session_key
+        return await self.db.read(
+            "metrics.agents", lambda conn: self.metrics.agents(session, conn=conn)
         )
 
-        return {
-            "total_agents": len(session_states),
-            "active_agents": active_count,
-            "total_tokens": total_tokens,
-            "total_cost": total_cost,
-        }
+    def get_db_latency(self) -> Dict[str, Dict[str, Any]]:
+        """SQLite のクエリ種別ごとのレイテンシ（AsyncDatabase.latency_stats()）"""
+        return self.db.latency_stats() if self.db is not None else {}
 
     def close(self) -> None:
-        """リソースをクリーンアップ"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        """リソースをクリーンアップ（未書き込みの変更は書き込む）"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        try:
+            self.flush()
+        except Exception as e:
+            self.logger.error(f"Failed to flush agent states on close: {e}")
+
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+        if self._redis is not None:
+            self._redis.close()
+            self._redis = None
+        if self.db is not None:
+            self.db.close()
+            self.db = None
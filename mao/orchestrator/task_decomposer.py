@@ -7,6 +7,8 @@ import logging
 from pathlib import Path
 from typing import List, TYPE_CHECKING
 
+from mao.orchestrator.task_graph import parse_dependencies
+
 if TYPE_CHECKING:
     from mao.orchestrator.task_dispatcher import TaskDispatcher, SubTask
 
@@ -57,6 +59,7 @@ tasks:
     role: agent_role
     priority: high|medium|low
     description: Detailed description
+    depends_on: []  # ids of tasks that must finish first (independent tasks run in parallel)
 ```
 """
 
@@ -137,13 +140,15 @@ tasks:
                     description = task_data.get("description") or task_data.get("title", "")
                     role = task_data.get("role", "general")
                     priority = task_data.get("priority", "medium")
+                    depends_on = parse_dependencies(task_data.get("depends_on"))
 
                     subtask = SubTask(
-                        subtask_id=subtask_id,
+                        subtask_id=str(subtask_id),
                         parent_task_id=parent_task_id,
                         description=description,
                         role=role,
                         priority=priority,
+                        depends_on=depends_on,
                     )
                     subtasks.append(subtask)
 
@@ -178,14 +183,11 @@ tasks:
         subtasks = []
 
         for idx in range(num_agents):
-            subtask_id = f"{task_id}-sub{idx + 1}"
-            agent_id = f"agent-{idx + 1}"
-
+            # エージェントは固定しない（assign_tasks_to_agents で空いたエージェントに割り当てる）
             subtask = SubTask(
-                subtask_id=subtask_id,
+                subtask_id=f"{task_id}-sub{idx + 1}",
                 parent_task_id=task_id,
                 description=task_description,
-                agent_id=agent_id,
             )
             subtasks.append(subtask)
 
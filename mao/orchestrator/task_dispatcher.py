@@ -11,11 +11,14 @@ if TYPE_CHECKING:
     from mao.orchestrator.agent_executor import AgentExecutor
     from mao.orchestrator.agent_logger import AgentLogger
 
+from mao.orchestrator.codec import find_document, list_documents, read_document
 from mao.orchestrator.message_queue import MessageQueue
 from mao.orchestrator.skill_manager import SkillManager
 from mao.orchestrator.skill_formatter import SkillFormatter
 from mao.orchestrator.task_decomposer import TaskDecomposerMixin
+from mao.orchestrator.task_queue import TaskQueue
 from mao.orchestrator.task_reporter import TaskReporterMixin
+from mao.orchestrator.task_scheduler import WorkStealingScheduler
 
 
 class SubTask:
@@ -29,6 +32,7 @@ class SubTask:
         agent_id: Optional[str] = None,
         role: str = "general",
         priority: str = "medium",
+        depends_on: Optional[List[str]] = None,
     ):
         self.subtask_id = subtask_id
         self.parent_task_id = parent_task_id
@@ -36,6 +40,7 @@ class SubTask:
         self.agent_id = agent_id
         self.role = role  # エージェントの役割
         self.priority = priority  # タスクの優先度
+        self.depends_on = list(depends_on or [])  # 先に完了している必要があるサブタスクID
         self.status = "pending"
         self.created_at = datetime.utcnow().isoformat()
         self.result: Optional[str] = None
@@ -49,6 +54,7 @@ class SubTask:
             "agent_id": self.agent_id,
             "role": self.role,
             "priority": self.priority,
+            "depends_on": self.depends_on,
             "status": self.status,
             "created_at": self.created_at,
             "result": self.result,
@@ -63,6 +69,7 @@ class TaskDispatcher(TaskDecomposerMixin, TaskReporterMixin):
         project_path: Optional[Path] = None,
         max_agents: int = 8,
         executor: Optional[Any] = None,
+        message_queue: Optional[MessageQueue] = None,
     ):
         self.roles = self._load_roles()
         self.max_agents = max_agents
@@ -83,8 +90,15 @@ class TaskDispatcher(TaskDecomposerMixin, TaskReporterMixin):
         # 現在のタスク管理
         self.current_subtasks: List[SubTask] = []
 
-        # メッセージキュー
-        self.message_queue = MessageQueue(project_path=self.project_path)
+        # サブタスクは空いたエージェント（agent-1 ... agent-N）から順に取る
+        self.task_queue = TaskQueue(self.project_path)
+        self.scheduler = WorkStealingScheduler(
+            self.task_queue,
+            agents=[f"agent-{idx + 1}" for idx in range(max_agents)],
+        )
+
+        # メッセージキュー（共有するキューを渡せる）
+        self.message_queue = message_queue or MessageQueue(project_path=self.project_path)
 
         # スキル管理
         self.skill_manager = SkillManager(self.project_path) if self.project_path else None
@@ -270,45 +284,35 @@ class TaskDispatcher(TaskDecomposerMixin, TaskReporterMixin):
         return agent_config
 
     def assign_tasks_to_agents(self, subtasks: List[SubTask]) -> None:
-        """サブタスクをエージェントに割り当て（YAMLファイルに書き込み）"""
-        for subtask in subtasks:
-            if subtask.agent_id:
-                self._write_agent_task(subtask.agent_id, subtask)
-
-    def _write_agent_task(self, agent_id: str, subtask: SubTask) -> None:
-        """エージェント用のタスクファイルを書き込み"""
-        task_file = self.tasks_dir / f"{agent_id}.yaml"
-
-        task_data = {
-            "task": subtask.to_dict(),
-            "assigned_at": datetime.utcnow().isoformat(),
-        }
-
-        with open(task_file, "w") as f:
-            yaml.dump(task_data, f, default_flow_style=False, allow_unicode=True)
+        """サブタスクをスケジューラーに渡し、空いているエージェントに割り当て（タスクファイルに書き込み）"""
+        self.scheduler.submit_many(subtasks)
+        self.scheduler.dispatch()
 
     def read_agent_result(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """エージェントの結果を読み込み"""
-        result_file = self.results_dir / f"{agent_id}.yaml"
+        result_file = find_document(self.results_dir, agent_id)
 
-        if not result_file.exists():
+        if result_file is None:
             return None
 
-        with open(result_file) as f:
-            return yaml.safe_load(f)
+        return read_document(result_file)
 
     def collect_agent_results(self) -> Dict[str, Any]:
-        """すべてのエージェントの結果を収集"""
+        """すべてのエージェントの結果を収集し、空いたエージェントに次のサブタスクを割り当て
+
+        Returns:
+            サブタスクID -> 結果タスク（辞書）
+        """
         results = {}
 
-        for subtask in self.current_subtasks:
-            if subtask.agent_id:
-                result = self.read_agent_result(subtask.agent_id)
-                if result:
-                    results[subtask.agent_id] = result
-                    subtask.status = "completed"
-                    subtask.result = result.get("result")
+        for agent_id in list(self.scheduler.throughput):
+            task = self.task_queue.get_result(agent_id)
+            if task is None:
+                continue
+            self.scheduler.record_result(task)
+            results[task.task_id] = task.to_dict()
 
+        self.scheduler.dispatch()
         return results
 
     def update_dashboard(self, task_id: str, task_description: str, status: str) -> None:
@@ -330,7 +334,7 @@ class TaskDispatcher(TaskDecomposerMixin, TaskReporterMixin):
 
         for subtask in self.current_subtasks:
             agent_status = subtask.status
-            content += f"- **{subtask.agent_id}**: {agent_status}\n"
+            content += f"- **{subtask.agent_id or 'unassigned'}**: {agent_status}\n"
             content += f"  - Task: {subtask.description}\n"
             if subtask.result:
                 content += f"  - Result: {subtask.result[:100]}...\n"
@@ -343,9 +347,12 @@ class TaskDispatcher(TaskDecomposerMixin, TaskReporterMixin):
     def clear_queue(self) -> None:
         """キューをクリア"""
         # タスクファイルを削除
-        for task_file in self.tasks_dir.glob("*.yaml"):
+        for task_file in list_documents(self.tasks_dir):
             task_file.unlink()
 
         # 結果ファイルを削除
-        for result_file in self.results_dir.glob("*.yaml"):
+        for result_file in list_documents(self.results_dir):
             result_file.unlink()
+
+        # バックログ・取得済みの記録も削除
+        self.task_queue.cleanup()
@@ -0,0 +1,205 @@
+"""
+Task graph - 依存関係（depends_on）付きサブタスクの DAG
+
+依存先がすべて完了したタスクを「実行可能」として返す。実行側は実行可能なタスクを
+空いているエージェントで同時に起動し、承認・完了のたびに complete() で後続タスクを解放する。
+総実行時間はタスク数の合計ではなくクリティカルパスに近づく。
+"""
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def parse_dependencies(value: Any) -> List[str]:
+    """depends_on の値をノードIDのリストに正規化
+
+    "task-1" / 1 / ["task-1", 2] / "task-1, task-2" のいずれも受け付ける。
+    """
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+class TaskNodeStatus(str, Enum):
+    """ノードのステータス"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class TaskNode:
+    """DAG のノード"""
+    node_id: str
+    depends_on: List[str] = field(default_factory=list)
+    status: TaskNodeStatus = TaskNodeStatus.PENDING
+    data: Any = None  # 実行側のタスク（dict / SubTask など）
+
+
+class TaskGraph:
+    """依存関係付きタスクの DAG"""
+
+    def __init__(self):
+        # 追加順を保持（実行可能なタスクは追加順に返す）
+        self.nodes: Dict[str, TaskNode] = {}
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add(
+        self,
+        node_id: str,
+        depends_on: Optional[Iterable[str]] = None,
+        data: Any = None,
+    ) -> TaskNode:
+        """ノードを追加
+
+        まだ追加されていないノードにも依存できる（後から追加されるまで実行可能にならない）。
+
+        Args:
+            node_id: ノードID
+            depends_on: 依存先のノードIDのリスト
+            data: 実行側のタスク
+
+        Returns:
+            追加したノード
+
+        Raises:
+            ValueError: ノードIDが重複している、または依存関係が循環している場合
+        """
+        if node_id in self.nodes:
+            raise ValueError(f"Duplicate task id: {node_id}")
+
+        node = TaskNode(
+            node_id=node_id,
+            depends_on=list(dict.fromkeys(depends_on or [])),
+            data=data,
+        )
+        self.nodes[node_id] = node
+
+        cycle = self._find_cycle(node_id)
+        if cycle:
+            del self.nodes[node_id]
+            raise ValueError(f"Dependency cycle: {' -> '.join(cycle)}")
+        return node
+
+    def _find_cycle(self, start: str) -> Optional[List[str]]:
+        """start から依存をたどって start に戻る経路を探す"""
+        stack = [(start, [start])]
+        visited = set()
+        while stack:
+            node_id, path = stack.pop()
+            node = self.nodes.get(node_id)
+            if node is None:
+                continue
+            for dependency in node.depends_on:
+                if dependency == start:
+                    return path + [start]
+                if dependency not in visited:
+                    visited.add(dependency)
+                    stack.append((dependency, path + [dependency]))
+        return None
+
+    def get(self, node_id: str) -> Optional[TaskNode]:
+        """ノードを取得"""
+        return self.nodes.get(node_id)
+
+    def is_ready(self, node_id: str) -> bool:
+        """未実行で、依存先がすべて完了しているか"""
+        node = self.nodes.get(node_id)
+        if node is None or node.status != TaskNodeStatus.PENDING:
+            return False
+        return all(
+            dependency in self.nodes
+            and self.nodes[dependency].status == TaskNodeStatus.COMPLETED
+            for dependency in node.depends_on
+        )
+
+    def ready(self) -> List[TaskNode]:
+        """実行可能なノードのリスト（追加順）"""
+        return [node for node_id, node in self.nodes.items() if self.is_ready(node_id)]
+
+    def start(self, node_id: str) -> None:
+        """ノードを実行中にする"""
+        self.nodes[node_id].status = TaskNodeStatus.RUNNING
+
+    def complete(self, node_id: str) -> List[TaskNode]:
+        """ノードを完了にして、新たに実行可能になったノードを返す
+
+        Args:
+            node_id: ノードID
+
+        Returns:
+            このノードの完了で実行可能になったノードのリスト
+        """
+        node = self.nodes.get(node_id)
+        if node is None or node.status == TaskNodeStatus.COMPLETED:
+            return []
+        node.status = TaskNodeStatus.COMPLETED
+        return [
+            dependent
+            for dependent_id, dependent in self.nodes.items()
+            if node_id in dependent.depends_on and self.is_ready(dependent_id)
+        ]
+
+    def fail(self, node_id: str) -> List[TaskNode]:
+        """ノードを失敗にする（依存しているノードは実行されない）
+
+        Args:
+            node_id: ノードID
+
+        Returns:
+            実行できなくなったノード（推移的な依存元を含む）
+        """
+        node = self.nodes.get(node_id)
+        if node is None:
+            return []
+        node.status = TaskNodeStatus.FAILED
+        return self.blocked_by(node_id)
+
+    def blocked_by(self, node_id: str) -> List[TaskNode]:
+        """node_id に（推移的に）依存している未実行ノード"""
+        blocked: Dict[str, TaskNode] = {}
+        frontier = [node_id]
+        while frontier:
+            current = frontier.pop()
+            for dependent_id, dependent in self.nodes.items():
+                if current in dependent.depends_on and dependent_id not in blocked:
+                    if dependent.status == TaskNodeStatus.PENDING:
+                        blocked[dependent_id] = dependent
+                    frontier.append(dependent_id)
+        return list(blocked.values())
+
+    def running_count(self) -> int:
+        """実行中のノード数"""
+        return sum(1 for node in self.nodes.values() if node.status == TaskNodeStatus.RUNNING)
+
+    def is_finished(self) -> bool:
+        """実行中のノードも実行可能なノードもない（完了、または失敗で止まった）"""
+        return self.running_count() == 0 and not self.ready()
+
+    def counts(self) -> Dict[str, int]:
+        """ステータスごとのノード数"""
+        counts = {status.value: 0 for status in TaskNodeStatus}
+        for node in self.nodes.values():
+            counts[node.status.value] += 1
+        return counts
+
+    def critical_path(self) -> List[str]:
+        """最長の依存チェーン（各タスクを同じ所要時間とみなした場合のクリティカルパス）"""
+        longest: Dict[str, List[str]] = {}
+
+        def visit(node_id: str) -> List[str]:
+            if node_id not in longest:
+                node = self.nodes[node_id]
+                chains = [visit(d) for d in node.depends_on if d in self.nodes]
+                longest[node_id] = max(chains, key=len, default=[]) + [node_id]
+            return longest[node_id]
+
+        return max((visit(node_id) for node_id in self.nodes), key=len, default=[])
@@ -1,19 +1,40 @@
 """
-YAML-based task queue for inter-agent communication
+File-based task queue for inter-agent communication
 
 Based on the pattern from multi-agent-shogun:
-- Manager writes tasks to queue/tasks/<agent-id>.yaml
+- Manager writes tasks to queue/tasks/<agent-id>.json
 - Agents poll for their task file
-- Agents write reports to queue/reports/<agent-id>.yaml
+- Agents write reports to queue/reports/<agent-id>.json
+
+エージェントごとに順序付きのバックログ（queue/backlog/<agent-id>/）を持ち、
+タスクファイルが空いて in-flight 数が prefetch 未満になると先頭を自動で昇格する。
+結果の提出・取得で次のタスクがすぐに渡るので、CTO を経由する必要がない。
+
+ファイルは mao.orchestrator.codec で書き込む（デフォルト JSON lines）。
+エージェントや CTO が書いた .yaml ファイルも読み込める。
 """
-import yaml
+import itertools
+import os
+import shutil
 import time
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Callable, Optional, Dict, Any, List, Tuple
+from urllib.parse import quote
 from dataclasses import dataclass, asdict
 from enum import Enum
 import logging
 
+from mao.orchestrator.codec import (
+    DEFAULT_CODEC,
+    codec_for_path,
+    find_document,
+    get_codec,
+    list_documents,
+    read_document,
+    write_document,
+)
+from mao.orchestrator.fs_watcher import COMPLETE_WRITE_MASK, DirectoryWatcher
+
 
 class TaskStatus(str, Enum):
     """タスクステータス"""
@@ -55,57 +76,181 @@ class Task:
 
 
 class TaskQueue:
-    """YAMLベースのタスクキュー"""
+    """ファイルベースのタスクキュー"""
 
     def __init__(
         self,
         project_path: Path,
         logger: Optional[logging.Logger] = None,
+        codec: str = DEFAULT_CODEC,
+        prefetch: int = 1,
     ):
         """
         Args:
             project_path: プロジェクトルートパス
             logger: ロガー
+            codec: 書き込み形式（json / msgpack / yaml）
+            prefetch: 1エージェントに同時に渡すタスク数（取得済み + タスクファイル）
         """
+        if prefetch < 1:
+            raise ValueError("prefetch must be at least 1")
+
         self.project_path = project_path
         self.logger = logger or logging.getLogger(__name__)
+        self.codec = get_codec(codec)
+        self.prefetch = prefetch
 
         # キューディレクトリ
         self.queue_dir = project_path / ".mao" / "queue"
         self.tasks_dir = self.queue_dir / "tasks"
         self.reports_dir = self.queue_dir / "reports"
+        self.backlog_dir = self.queue_dir / "backlog"
+        self.inflight_dir = self.queue_dir / "inflight"
+        # 読み込めなかったバックログのタスク
+        self.failed_dir = self.queue_dir / "failed"
 
         # ディレクトリ作成
         self.tasks_dir.mkdir(parents=True, exist_ok=True)
         self.reports_dir.mkdir(parents=True, exist_ok=True)
 
-    def assign_task(self, task: Task) -> bool:
-        """タスクをエージェントに割り当て
+        # 同一ナノ秒に追加したタスクの順序付け用
+        self._sequence = itertools.count()
+
+        # submit_result() の通知先（同一プロセス内）
+        self._result_listeners: List[Callable[[str], None]] = []
+
+        # 読み込めなかった結果ファイル -> そのときの (mtime_ns, サイズ)
+        self._undecodable_results: Dict[Path, Tuple[int, int]] = {}
+
+    def add_result_listener(self, listener: Callable[[str], None]) -> None:
+        """結果が提出されたときに呼ばれるコールバックを登録
+
+        同一プロセス内の submit_result() のみ通知される。別プロセス（エージェント）が
+        書いた結果は watch_results() で検知する。
 
         Args:
-            task: 割り当てるタスク
+            listener: 結果を提出したロール名を受け取るコールバック
+        """
+        self._result_listeners.append(listener)
+
+    def remove_result_listener(self, listener: Callable[[str], None]) -> None:
+        """コールバックの登録を解除"""
+        if listener in self._result_listeners:
+            self._result_listeners.remove(listener)
+
+    def watch_results(
+        self,
+        poll_interval: float = 1.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> DirectoryWatcher:
+        """結果ディレクトリ（reports/）の変更を待機するウォッチャーを作成
+
+        inotify では書き終わったファイル（close_write / moved_to）でのみ起きる。
+        エージェントが結果ファイルを直接書いている途中で読まないため。
+
+        Args:
+            poll_interval: inotify が使えない場合のポーリング間隔（秒）
+            logger: ロガー
 
         Returns:
-            成功したかどうか
+            DirectoryWatcher（start() はイベントループ上で呼び出す）
+        """
+        return DirectoryWatcher(
+            [self.reports_dir],
+            poll_interval=poll_interval,
+            logger=logger or self.logger,
+            mask=COMPLETE_WRITE_MASK,
+        )
+
+    def _role_dir(self, base: Path, role: str) -> Path:
+        path = base / role
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    @staticmethod
+    def _task_stem(task_id: str) -> str:
+        return quote(task_id, safe="")
+
+    def _decode_claimed(self, role: str, entry: Path, claimed: Path) -> Optional[Task]:
+        """rename で確保したバックログのタスクを読み込む
+
+        読み込めなければ failed/<role>/ に移して None を返す（.claimed のまま残さない）。
         """
         try:
-            # タスクファイルのパス
-            task_file = self.tasks_dir / f"{task.role}.yaml"
+            return Task.from_dict(codec_for_path(entry).decode(claimed.read_bytes()))
+        except Exception as e:
+            failed = self._role_dir(self.failed_dir, role) / entry.name
+            os.replace(claimed, failed)
+            self.logger.error(f"Failed to decode backlog task {entry}, moved to {failed}: {e}")
+            return None
 
-            # 既にタスクがある場合は警告
-            if task_file.exists():
-                self.logger.warning(
-                    f"Task file already exists for {task.role}, overwriting"
-                )
+    def _promote(self, role: str) -> Optional[Task]:
+        """バックログの先頭をタスクファイルに昇格
 
-            # タスクをYAMLとして書き込み
+        タスクファイルが空で、取得済みタスクが prefetch 未満の場合のみ。
+
+        Returns:
+            昇格したタスク、なければNone
+        """
+        if self.has_task(role) or self.in_flight(role) >= self.prefetch:
+            return None
+
+        backlog_dir = self.backlog_dir / role
+        for entry in list_documents(backlog_dir):
+            # 先頭を rename で確保（他プロセスと同じタスクを昇格しない）
+            claimed = entry.with_name(f".{entry.name}.claimed")
+            try:
+                os.rename(entry, claimed)
+            except FileNotFoundError:
+                continue
+
+            task = self._decode_claimed(role, entry, claimed)
+            if task is None:
+                continue
             task.status = TaskStatus.ASSIGNED
             task.assigned_at = time.time()
+            try:
+                write_document(self.tasks_dir, role, task.to_dict(), self.codec, exclusive=True)
+            except FileExistsError:
+                # 他プロセスが先にタスクファイルを書いた
+                os.rename(claimed, entry)
+                return None
+            claimed.unlink()
 
-            with task_file.open("w", encoding="utf-8") as f:
-                yaml.dump(task.to_dict(), f, allow_unicode=True)
+            self.logger.info(f"Task promoted from backlog for {role}: {task.task_id}")
+            return task
+        return None
 
-            self.logger.info(f"Task assigned to {task.role}: {task.task_id}")
+    def _finish(self, role: str, task_id: str) -> None:
+        """取得済みタスクの記録を削除"""
+        marker = find_document(self.inflight_dir / role, self._task_stem(task_id))
+        if marker is not None:
+            marker.unlink(missing_ok=True)
+
+    def assign_task(self, task: Task) -> bool:
+        """タスクをエージェントに割り当て
+
+        Args:
+            task: 割り当てるタスク
+
+        Returns:
+            成功したかどうか
+        """
+        try:
+            # バックログの末尾に追加（実行中のタスクを上書きしない）
+            task.status = TaskStatus.PENDING
+            stem = f"{time.time_ns():020d}-{next(self._sequence):06d}"
+            write_document(
+                self._role_dir(self.backlog_dir, task.role), stem, task.to_dict(), self.codec
+            )
+
+            if self._promote(task.role) is None:
+                self.logger.info(
+                    f"Task queued for {task.role}: {task.task_id} "
+                    f"(backlog: {self.backlog_size(task.role)})"
+                )
+            else:
+                self.logger.info(f"Task assigned to {task.role}: {task.task_id}")
             return True
 
         except Exception as e:
@@ -122,21 +267,26 @@ class TaskQueue:
             タスク、なければNone
         """
         try:
-            task_file = self.tasks_dir / f"{role}.yaml"
+            task_file = find_document(self.tasks_dir, role, self.codec)
 
-            if not task_file.exists():
+            if task_file is None:
                 return None
 
-            # YAMLを読み込み
-            with task_file.open("r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
+            task = Task.from_dict(read_document(task_file))
 
-            task = Task.from_dict(data)
-
-            # タスクファイルを削除（取得済み）
-            task_file.unlink()
+            # 取得済みとして記録（rename なので同じタスクを2回渡さない）
+            inflight_file = self._role_dir(self.inflight_dir, role) / (
+                self._task_stem(task.task_id) + task_file.suffix
+            )
+            try:
+                os.rename(task_file, inflight_file)
+            except FileNotFoundError:
+                return None
 
             self.logger.info(f"Task retrieved by {role}: {task.task_id}")
+
+            # prefetch に余裕があれば次のタスクを先に渡しておく
+            self._promote(role)
             return task
 
         except Exception as e:
@@ -153,13 +303,19 @@ class TaskQueue:
             成功したかどうか
         """
         try:
-            result_file = self.reports_dir / f"{task.role}.yaml"
-
-            # 結果をYAMLとして書き込み
-            with result_file.open("w", encoding="utf-8") as f:
-                yaml.dump(task.to_dict(), f, allow_unicode=True)
+            write_document(self.reports_dir, task.role, task.to_dict(), self.codec)
 
             self.logger.info(f"Result submitted by {task.role}: {task.task_id}")
+
+            # CTO を待たずに次のタスクを渡す
+            self._finish(task.role, task.task_id)
+            self._promote(task.role)
+
+            for listener in list(self._result_listeners):
+                try:
+                    listener(task.role)
+                except Exception as e:
+                    self.logger.error(f"Result listener failed: {e}")
             return True
 
         except Exception as e:
@@ -176,27 +332,144 @@ class TaskQueue:
             結果タスク、なければNone
         """
         try:
-            result_file = self.reports_dir / f"{role}.yaml"
+            result_file = find_document(self.reports_dir, role, self.codec)
 
-            if not result_file.exists():
+            if result_file is None:
                 return None
 
-            # YAMLを読み込み
-            with result_file.open("r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
+            stat = result_file.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+            previous = self._undecodable_results.get(result_file)
+            if previous == signature:
+                # 前回読めなかったときから変わっていない
+                return None
 
-            task = Task.from_dict(data)
+            try:
+                task = Task.from_dict(read_document(result_file))
+            except Exception as e:
+                if previous is None:
+                    # 書き込み途中かもしれないので、書き直されるまで残す
+                    self._undecodable_results[result_file] = signature
+                    self.logger.warning(f"Failed to decode result {result_file}, will retry after it changes: {e}")
+                    return None
+                # 書き直されても読めない結果は退避する（残すと結果の通知のたびに同じ失敗をくり返す）
+                del self._undecodable_results[result_file]
+                failed = self._role_dir(self.failed_dir, role) / result_file.name
+                os.replace(result_file, failed)
+                self.logger.error(f"Failed to decode result {result_file}, moved to {failed}: {e}")
+                return None
+            self._undecodable_results.pop(result_file, None)
 
             # 結果ファイルを削除（取得済み）
             result_file.unlink()
 
             self.logger.info(f"Result retrieved for {role}: {task.task_id}")
+
+            # エージェントが結果ファイルを直接書いた場合もここで次のタスクを渡す
+            self._finish(role, task.task_id)
+            self._promote(role)
             return task
 
         except Exception as e:
             self.logger.error(f"Failed to get result for {role}: {e}")
             return None
 
+    def complete_task(self, task: Task) -> Optional[Task]:
+        """ワーカー用：結果を提出して次のタスクを取得
+
+        Args:
+            task: 完了したタスク
+
+        Returns:
+            次のタスク、なければNone
+        """
+        if not self.submit_result(task):
+            return None
+        return self.get_task(task.role)
+
+    def release(self, role: str, task_id: str) -> Optional[Task]:
+        """マネージャー用：取得済みタスクを結果ファイルなしで完了にする
+
+        マネージャーがエージェントの完了を直接検知する場合（ダッシュボードの承認など）に使う。
+        取得済みの記録を削除して、バックログの次のタスクを渡す。
+
+        Args:
+            role: ロール名
+            task_id: 完了したタスクID
+
+        Returns:
+            タスクファイルに入った次のタスク、なければNone
+        """
+        self._finish(role, task_id)
+        return self._promote(role)
+
+    def steal(self, role: str) -> Optional[Task]:
+        """バックログの末尾（最も後に積まれたタスク）を取り出す
+
+        work stealing 用。取り出したタスクはバックログから削除されるので、
+        別のエージェントに assign_task() し直す。
+
+        Args:
+            role: 奪われる側のロール名
+
+        Returns:
+            取り出したタスク、なければNone
+        """
+        for entry in reversed(list_documents(self.backlog_dir / role)):
+            # 昇格と同じく rename で確保（他プロセスと同じタスクを取り出さない）
+            claimed = entry.with_name(f".{entry.name}.claimed")
+            try:
+                os.rename(entry, claimed)
+            except FileNotFoundError:
+                continue
+
+            task = self._decode_claimed(role, entry, claimed)
+            if task is None:
+                continue
+            claimed.unlink()
+            self.logger.info(f"Task stolen from {role} backlog: {task.task_id}")
+            return task
+        return None
+
+    def backlog(self, role: str) -> List[Task]:
+        """バックログのタスクを順番に取得（タスクファイル・取得済みは含まない）
+
+        Args:
+            role: ロール名
+
+        Returns:
+            タスクのリスト
+        """
+        tasks = []
+        for entry in list_documents(self.backlog_dir / role):
+            try:
+                tasks.append(Task.from_dict(read_document(entry)))
+            except FileNotFoundError:
+                continue
+        return tasks
+
+    def backlog_size(self, role: str) -> int:
+        """バックログのタスク数
+
+        Args:
+            role: ロール名
+
+        Returns:
+            タスク数
+        """
+        return len(list_documents(self.backlog_dir / role))
+
+    def in_flight(self, role: str) -> int:
+        """取得済みで結果が未提出のタスク数
+
+        Args:
+            role: ロール名
+
+        Returns:
+            タスク数
+        """
+        return len(list_documents(self.inflight_dir / role))
+
     def has_task(self, role: str) -> bool:
         """タスクが存在するかチェック
 
@@ -206,8 +479,7 @@ class TaskQueue:
         Returns:
             タスクが存在するか
         """
-        task_file = self.tasks_dir / f"{role}.yaml"
-        return task_file.exists()
+        return find_document(self.tasks_dir, role, self.codec) is not None
 
     def has_result(self, role: str) -> bool:
         """結果が存在するかチェック
@@ -218,8 +490,7 @@ class TaskQueue:
         Returns:
             結果が存在するか
         """
-        result_file = self.reports_dir / f"{role}.yaml"
-        return result_file.exists()
+        return find_document(self.reports_dir, role, self.codec) is not None
 
     def list_pending_tasks(self) -> List[str]:
         """未処理タスクのリストを取得
@@ -227,7 +498,7 @@ class TaskQueue:
         Returns:
             ロール名のリスト
         """
-        return [f.stem for f in self.tasks_dir.glob("*.yaml")]
+        return list(dict.fromkeys(f.stem for f in list_documents(self.tasks_dir)))
 
     def list_completed_reports(self) -> List[str]:
         """完了済み結果のリストを取得
@@ -235,14 +506,17 @@ class TaskQueue:
         Returns:
             ロール名のリスト
         """
-        return [f.stem for f in self.reports_dir.glob("*.yaml")]
+        return list(dict.fromkeys(f.stem for f in list_documents(self.reports_dir)))
 
     def cleanup(self) -> None:
         """キューをクリーンアップ（全タスク・結果を削除）"""
-        for task_file in self.tasks_dir.glob("*.yaml"):
+        for task_file in list_documents(self.tasks_dir):
             task_file.unlink()
 
-        for result_file in self.reports_dir.glob("*.yaml"):
+        for result_file in list_documents(self.reports_dir):
             result_file.unlink()
 
+        shutil.rmtree(self.backlog_dir, ignore_errors=True)
+        shutil.rmtree(self.inflight_dir, ignore_errors=True)
+
         self.logger.info("Task queue cleaned up")
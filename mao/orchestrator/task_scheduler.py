@@ -0,0 +1,357 @@
+"""
+Work-stealing scheduler - サブタスクを空いているエージェントに割り当てる
+
+サブタスクを作成時に特定の agent-N に固定すると、遅いエージェントがいる間
+他のペインが遊んでしまう。スケジューラーは共有のレディキュー（SubTask.priority 順）
+を持ち、TaskQueue のタスクファイルが空いたエージェントにだけ次のサブタスクを渡す。
+
+- pull: 空いたエージェントはレディキューの先頭を取る
+- depends_on: 依存先がすべて完了するまでレディキューに入れない（TaskGraph）
+- steal: レディキューが空なら、最もバックログが多いエージェントの TaskQueue
+  バックログ末尾（assign() で実行中のエージェントに積まれたタスクのうち最も後のもの）
+  を奪って実行する
+
+エージェントごとのスループット（完了数・稼働時間・稼働率）を記録し、stats() で返す。
+
+TaskDispatcher がエージェントペイン（agent-1 ... agent-N）を登録したスケジューラーを持つ。
+ダッシュボードは依存先が完了したタスクを submit() / assign() で渡し、dispatch() の後に
+claim() で取得したタスクをそのエージェントのペインで起動して、承認・失敗時に finish() で
+エージェントを空きに戻す。
+"""
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from mao.orchestrator.task_graph import TaskGraph
+from mao.orchestrator.task_queue import Task, TaskQueue, TaskStatus
+
+if TYPE_CHECKING:
+    from mao.orchestrator.task_dispatcher import SubTask
+
+
+# SubTask.priority の並び順（小さいほど先）
+SUBTASK_PRIORITY_ORDER = {
+    "urgent": 0,
+    "high": 1,
+    "medium": 2,
+    "low": 3,
+}
+
+
+@dataclass
+class AgentThroughput:
+    """エージェントごとのスループット"""
+    agent_id: str
+    registered_at: float
+    completed: int = 0
+    failed: int = 0
+    stolen: int = 0  # 他のエージェントから奪ったタスク数
+    busy_seconds: float = 0.0
+    # 実行中のタスク ID -> 割り当て時刻
+    running: Dict[str, float] = field(default_factory=dict)
+
+    def utilization(self, now: float) -> float:
+        """登録からの経過時間に対する稼働時間の割合（0.0 - 1.0）"""
+        elapsed = now - self.registered_at
+        if elapsed <= 0:
+            return 0.0
+        busy = self.busy_seconds + sum(now - started for started in self.running.values())
+        return min(busy / elapsed, 1.0)
+
+    def tasks_per_minute(self, now: float) -> float:
+        """1分あたりの完了タスク数"""
+        elapsed = now - self.registered_at
+        if elapsed <= 0:
+            return 0.0
+        return (self.completed + self.failed) * 60.0 / elapsed
+
+
+class WorkStealingScheduler:
+    """共有レディキューと work stealing によるサブタスクスケジューラー"""
+
+    def __init__(
+        self,
+        task_queue: TaskQueue,
+        agents: Optional[List[str]] = None,
+        logger: Optional[logging.Logger] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            task_queue: タスクキュー
+            agents: エージェント ID のリスト（agent-1, agent-2, etc.）
+            logger: ロガー
+            clock: 稼働時間の計測に使う時計
+        """
+        self.task_queue = task_queue
+        self.logger = logger or logging.getLogger(__name__)
+        self._clock = clock
+
+        # (優先度, 投入順, サブタスクID) のヒープ
+        self._ready: List[Tuple[int, int, str]] = []
+        self._sequence = itertools.count()
+        self.subtasks: Dict[str, "SubTask"] = {}
+        # 依存関係（依存先が未完了のサブタスクはレディキューに入れない）
+        self.graph = TaskGraph()
+        self.throughput: Dict[str, AgentThroughput] = {}
+
+        for agent_id in agents or []:
+            self.register_agent(agent_id)
+
+    def register_agent(self, agent_id: str) -> None:
+        """エージェントを登録（登録済みなら何もしない）"""
+        if agent_id not in self.throughput:
+            self.throughput[agent_id] = AgentThroughput(
+                agent_id=agent_id, registered_at=self._clock()
+            )
+
+    def unregister_agent(self, agent_id: str) -> None:
+        """エージェントの登録を解除（以降はタスクを割り当てない）"""
+        self.throughput.pop(agent_id, None)
+
+    def submit(self, subtask: "SubTask") -> None:
+        """サブタスクを追加
+
+        依存先（SubTask.depends_on）がすべて完了していればレディキューに入れ、
+        そうでなければ完了を待つ。SubTask.agent_id は割り当て時に実際のエージェントで
+        上書きされる。
+
+        Args:
+            subtask: サブタスク
+
+        Raises:
+            ValueError: サブタスクIDが重複している、または依存関係が循環している場合
+        """
+        self.graph.add(subtask.subtask_id, subtask.depends_on, data=subtask)
+        self.subtasks[subtask.subtask_id] = subtask
+        subtask.status = "pending"
+        if self.graph.is_ready(subtask.subtask_id):
+            self._push_ready(subtask)
+
+    def _push_ready(self, subtask: "SubTask") -> None:
+        rank = SUBTASK_PRIORITY_ORDER.get(subtask.priority, SUBTASK_PRIORITY_ORDER["medium"])
+        heapq.heappush(self._ready, (rank, next(self._sequence), subtask.subtask_id))
+
+    def submit_many(self, subtasks: List["SubTask"]) -> None:
+        """複数のサブタスクを追加（submit を参照）"""
+        for subtask in subtasks:
+            self.submit(subtask)
+
+    def assign(self, subtask: "SubTask", agent_id: str) -> bool:
+        """サブタスクを特定のエージェントに割り当て
+
+        レディキューを通さずにエージェントの TaskQueue に積む。エージェントが実行中なら
+        バックログに入り、先に空いたエージェントに奪われることがある（steal）。
+        依存関係は解決済みであること（SubTask.depends_on は使わない）。
+
+        Args:
+            subtask: サブタスク
+            agent_id: 割り当てるエージェントID
+
+        Returns:
+            成功したかどうか
+
+        Raises:
+            ValueError: サブタスクIDが重複している場合
+        """
+        self.graph.add(subtask.subtask_id, [], data=subtask)
+        self.subtasks[subtask.subtask_id] = subtask
+        subtask.agent_id = agent_id
+        subtask.status = "pending"
+        task = Task(task_id=subtask.subtask_id, role=agent_id, prompt=subtask.description)
+        return self.task_queue.assign_task(task)
+
+    def ready_count(self) -> int:
+        """レディキューのサブタスク数"""
+        return len(self._ready)
+
+    def is_idle(self, agent_id: str) -> bool:
+        """エージェントが次のタスクを受け取れるか
+
+        タスクファイルが空で、バックログがなく、取得済みタスクが prefetch 未満の場合。
+        """
+        return (
+            not self.task_queue.has_task(agent_id)
+            and self.task_queue.backlog_size(agent_id) == 0
+            and self.task_queue.in_flight(agent_id) < self.task_queue.prefetch
+        )
+
+    def idle_agents(self) -> List[str]:
+        """次のタスクを受け取れるエージェントのリスト（登録順）"""
+        return [agent_id for agent_id in self.throughput if self.is_idle(agent_id)]
+
+    def dispatch(self) -> List[Tuple[str, str]]:
+        """空いているエージェントにタスクを割り当て
+
+        Returns:
+            (エージェントID, タスクID) のリスト
+        """
+        assigned = []
+        for agent_id in self.idle_agents():
+            task_id = self._pull(agent_id) or self._steal(agent_id)
+            if task_id is None:
+                break
+            assigned.append((agent_id, task_id))
+        return assigned
+
+    def _pull(self, agent_id: str) -> Optional[str]:
+        """レディキューの先頭をエージェントに割り当て"""
+        while self._ready:
+            _, _, subtask_id = heapq.heappop(self._ready)
+            subtask = self.subtasks.get(subtask_id)
+            if subtask is None:
+                continue
+
+            task = Task(task_id=subtask.subtask_id, role=agent_id, prompt=subtask.description)
+            if not self.task_queue.assign_task(task):
+                # 書き込みに失敗したら戻して次の機会に回す
+                self._push_ready(subtask)
+                return None
+
+            self.graph.start(subtask_id)
+            subtask.agent_id = agent_id
+            subtask.status = "in_progress"
+            self._started(agent_id, task.task_id)
+            self.logger.info(f"Scheduled {subtask_id} on {agent_id}")
+            return task.task_id
+        return None
+
+    def _steal(self, agent_id: str) -> Optional[str]:
+        """最もバックログが多いエージェントからタスクを奪う"""
+        victims = sorted(
+            (
+                (self.task_queue.backlog_size(other), other)
+                for other in self.throughput
+                if other != agent_id
+            ),
+            reverse=True,
+        )
+        for size, victim in victims:
+            if size == 0:
+                break
+            task = self.task_queue.steal(victim)
+            if task is None:
+                continue
+
+            task.role = agent_id
+            if not self.task_queue.assign_task(task):
+                # 奪ったタスクは元のエージェントに戻す
+                task.role = victim
+                self.task_queue.assign_task(task)
+                return None
+
+            subtask = self.subtasks.get(task.task_id)
+            if subtask is not None:
+                subtask.agent_id = agent_id
+                subtask.status = "in_progress"
+                self.graph.start(task.task_id)
+            self._started(agent_id, task.task_id)
+            self.throughput[agent_id].stolen += 1
+            self.logger.info(f"{agent_id} stole {task.task_id} from {victim}")
+            return task.task_id
+        return None
+
+    def _started(self, agent_id: str, task_id: str) -> None:
+        stats = self.throughput.get(agent_id)
+        if stats is not None:
+            stats.running[task_id] = self._clock()
+
+    def claim(self, agent_id: str) -> Optional[Task]:
+        """エージェントのタスクファイルのタスクを取得済みにする
+
+        エージェントの代わりに呼び出し側がタスクを起動する場合（ダッシュボードが
+        ペインで claude を起動するなど）に、TaskQueue.get_task() の代わりに使う。
+
+        Args:
+            agent_id: エージェントID
+
+        Returns:
+            取得したタスク、なければNone
+        """
+        task = self.task_queue.get_task(agent_id)
+        if task is None:
+            return None
+
+        subtask = self.subtasks.get(task.task_id)
+        if subtask is not None and subtask.status == "pending":
+            # assign() で割り当てたタスクはここで実行中になる
+            subtask.agent_id = agent_id
+            subtask.status = "in_progress"
+            self.graph.start(task.task_id)
+        stats = self.throughput.get(agent_id)
+        if stats is not None and task.task_id not in stats.running:
+            self._started(agent_id, task.task_id)
+        return task
+
+    def finish(self, task: Task) -> None:
+        """claim() したタスクを完了・失敗にして、エージェントを空きに戻す
+
+        結果ファイルを経由せずに record_result() し、バックログの次のタスクを渡す。
+
+        Args:
+            task: 完了したタスク（task.status が FAILED なら失敗）
+        """
+        self.task_queue.release(task.role, task.task_id)
+        self.record_result(task)
+
+    def record_result(self, task: Task) -> None:
+        """タスク結果を記録してスループットを更新
+
+        TaskQueue.get_result() で取得した結果を渡す。
+
+        Args:
+            task: 結果タスク
+        """
+        stats = self.throughput.get(task.role)
+        if stats is not None:
+            started = stats.running.pop(task.task_id, None)
+            if started is not None:
+                stats.busy_seconds += self._clock() - started
+            if task.status == TaskStatus.FAILED:
+                stats.failed += 1
+            else:
+                stats.completed += 1
+
+        subtask = self.subtasks.get(task.task_id)
+        if subtask is None:
+            return
+
+        if task.status == TaskStatus.FAILED:
+            subtask.status = "failed"
+            subtask.result = task.error
+            blocked = self.graph.fail(task.task_id)
+            if blocked:
+                self.logger.warning(
+                    f"{task.task_id} failed; blocked dependents: "
+                    f"{', '.join(node.node_id for node in blocked)}"
+                )
+            return
+
+        subtask.status = "completed"
+        subtask.result = task.result
+        # 依存先が揃ったサブタスクをレディキューに入れる
+        for node in self.graph.complete(task.task_id):
+            self._push_ready(node.data)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """エージェントごとのスループット（ダッシュボード表示用）
+
+        Returns:
+            エージェントID -> 統計情報
+        """
+        now = self._clock()
+        return {
+            agent_id: {
+                "completed": stats.completed,
+                "failed": stats.failed,
+                "stolen": stats.stolen,
+                "running": len(stats.running),
+                "busy_seconds": stats.busy_seconds,
+                "utilization": stats.utilization(now),
+                "tasks_per_minute": stats.tasks_per_minute(now),
+            }
+            for agent_id, stats in self.throughput.items()
+        }
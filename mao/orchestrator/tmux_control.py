@@ -0,0 +1,265 @@
+"""
+tmux control mode client - tmux -C による常駐接続
+
+TmuxManager がペインの操作・状態取得のたびに tmux プロセスを起動すると、エージェントを
+毎秒ポーリングするだけで毎秒数十回の fork/exec が発生する。TmuxControlClient は
+`tmux -C attach-session` を1つだけ起動し、標準入力にコマンドを1行ずつ書き込んで、
+標準出力の %begin ... %end / %error ブロックを送信順に応答として対応付ける。
+
+- 応答: command() は Future を返す。同期コードは run()、コルーチンは execute() を使う
+- ペイン出力: %output 通知をデコードして add_output_listener() のリスナーに配信する
+- ウィンドウサイズに影響しないよう ignore-size フラグ付きで接続する（tmux 3.2 以降）
+"""
+import asyncio
+import collections
+import logging
+import re
+import subprocess
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional
+
+# ペイン出力のリスナー: (pane_id, 出力のバイト列)
+OutputListener = Callable[[str, bytes], None]
+
+# %output の8進エスケープ（制御文字とバックスラッシュ）
+_OCTAL_ESCAPE = re.compile(rb"\\([0-7]{3})")
+
+# ダブルクォート内でエスケープが必要な文字
+_QUOTE_ESCAPES = {
+    "\\": "\\\\",
+    '"': '\\"',
+    "$": "\\$",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\t": "\\t",
+    "\x1b": "\\e",
+}
+
+
+@dataclass
+class TmuxResult:
+    """tmux コマンドの結果（subprocess.CompletedProcess 相当）"""
+    returncode: int
+    stdout: str
+    stderr: str = ""
+
+
+def quote(arg: str) -> str:
+    """tmux のコマンド構文でそのまま1つの引数になるようにクォート"""
+    escaped = []
+    for char in arg:
+        if char in _QUOTE_ESCAPES:
+            escaped.append(_QUOTE_ESCAPES[char])
+        elif char < " " or char == "\x7f":
+            escaped.append(f"\\u{ord(char):04x}")
+        else:
+            escaped.append(char)
+    return '"' + "".join(escaped) + '"'
+
+
+def decode_output(data: bytes) -> bytes:
+    """%output の値（8進エスケープ）を元のバイト列に戻す"""
+    return _OCTAL_ESCAPE.sub(lambda match: bytes([int(match.group(1), 8)]), data)
+
+
+class TmuxControlClient:
+    """tmux -C の常駐クライアント（コマンドと応答の多重化）"""
+
+    def __init__(
+        self,
+        session_name: str,
+        timeout: float = 5.0,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            session_name: 接続する tmux セッション名
+            timeout: 接続・応答待ちのタイムアウト（秒）
+            logger: ロガー
+        """
+        self.session_name = session_name
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._process: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        # 送信順の応答待ち（送信と追加は同じロックで行い、順序を保つ）
+        self._pending: Deque[Future] = collections.deque()
+        self._lock = threading.Lock()
+        self._listeners: List[OutputListener] = []
+        self._ready = threading.Event()
+        self._exited = False
+        self._closed = False
+
+    def start(self) -> None:
+        """tmux -C を起動して接続を待つ
+
+        Raises:
+            RuntimeError: 接続できない（セッションがない、tmux が古いなど）
+        """
+        self._process = subprocess.Popen(
+            ["tmux", "-u", "-C", "attach-session", "-t", self.session_name, "-f", "ignore-size"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._reader = threading.Thread(
+            target=self._read_loop, name="mao-tmux-control", daemon=True
+        )
+        self._reader.start()
+
+        # attach-session 自体の応答ブロックが届けば接続済み
+        if not self._ready.wait(self.timeout) or not self.alive:
+            self.close()
+            raise RuntimeError(f"Failed to attach tmux control client to '{self.session_name}'")
+        self.logger.info(f"Attached tmux control client to '{self.session_name}'")
+
+    @property
+    def alive(self) -> bool:
+        """接続中かどうか"""
+        return (
+            not self._closed
+            and not self._exited
+            and self._process is not None
+            and self._process.poll() is None
+        )
+
+    # --- コマンド ---
+
+    def command(self, *args: str) -> Future:
+        """コマンドを送信
+
+        Args:
+            args: tmux のコマンドと引数（例: "send-keys", "-t", "%1", "ls", "C-m"）
+
+        Returns:
+            TmuxResult を返す Future
+
+        Raises:
+            RuntimeError: 接続していない
+        """
+        line = " ".join([args[0], *(quote(arg) for arg in args[1:])]) + "\n"
+        future: Future = Future()
+        with self._lock:
+            if not self.alive:
+                raise RuntimeError("tmux control client is not connected")
+            self._pending.append(future)
+            try:
+                self._process.stdin.write(line.encode("utf-8"))
+                self._process.stdin.flush()
+            except OSError as e:
+                self._pending.remove(future)
+                raise RuntimeError(f"tmux control client is not connected: {e}") from e
+        return future
+
+    def run(self, *args: str, timeout: Optional[float] = None) -> TmuxResult:
+        """コマンドを送信して応答を待つ（同期）"""
+        return self.command(*args).result(timeout or self.timeout)
+
+    async def execute(self, *args: str) -> TmuxResult:
+        """コマンドを送信して応答を待つ（イベントループをブロックしない）"""
+        return await asyncio.wait_for(asyncio.wrap_future(self.command(*args)), self.timeout)
+
+    # --- ペイン出力 ---
+
+    def add_output_listener(self, listener: OutputListener) -> Callable[[], None]:
+        """%output 通知のリスナーを登録（読み込みスレッドから呼ばれる）
+
+        Returns:
+            登録を解除する関数
+        """
+        self._listeners.append(listener)
+
+        def remove() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return remove
+
+    def _dispatch_output(self, line: bytes) -> None:
+        # %output %<pane_id> <value>
+        try:
+            _, pane_id, value = line.split(b" ", 2)
+        except ValueError:
+            return
+        data = decode_output(value)
+        for listener in list(self._listeners):
+            try:
+                listener(pane_id.decode(), data)
+            except Exception as e:
+                self.logger.error(f"tmux output listener failed: {e}")
+
+    # --- 読み込みスレッド ---
+
+    def _read_loop(self) -> None:
+        """標準出力を読み、応答ブロックを Future に、通知をリスナーに振り分ける"""
+        block: Optional[List[bytes]] = None
+        header: List[bytes] = []
+        try:
+            for raw in self._process.stdout:
+                line = raw.rstrip(b"\n")
+                if block is not None:
+                    # %end / %error は %begin と同じ時刻・番号・フラグを持つ
+                    tag, _, rest = line.partition(b" ")
+                    if tag in (b"%end", b"%error") and rest.split(b" ") == header:
+                        self._finish_block(block, header, failed=tag == b"%error")
+                        block = None
+                    else:
+                        block.append(line)
+                elif line.startswith(b"%begin "):
+                    header = line.split(b" ")[1:]
+                    block = []
+                elif line.startswith(b"%output "):
+                    if self._listeners:
+                        self._dispatch_output(line)
+                elif line.startswith(b"%exit"):
+                    break
+        except Exception as e:
+            self.logger.error(f"tmux control client reader failed: {e}")
+        finally:
+            self._exited = True
+            self._ready.set()
+            self._fail_pending("tmux control client exited")
+
+    def _finish_block(self, block: List[bytes], header: List[bytes], failed: bool) -> None:
+        # flags が 1 のブロックだけがこのクライアントから送ったコマンドの応答
+        if len(header) < 3 or header[2] != b"1":
+            # それ以外は attach-session 自体の応答（失敗なら接続できていない）
+            if failed:
+                self._exited = True
+            self._ready.set()
+            return
+        output = "".join(line.decode("utf-8", "replace") + "\n" for line in block)
+        result = TmuxResult(1, "", output) if failed else TmuxResult(0, output)
+        with self._lock:
+            future = self._pending.popleft() if self._pending else None
+        if future is not None and future.set_running_or_notify_cancel():
+            future.set_result(result)
+
+    def _fail_pending(self, reason: str) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, collections.deque()
+        for future in pending:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError(reason))
+
+    def close(self) -> None:
+        """接続を閉じる（応答待ちのコマンドは RuntimeError になる）"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self._process.wait(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join(timeout=self.timeout)
+        self._fail_pending("tmux control client closed")
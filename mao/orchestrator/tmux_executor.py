@@ -4,13 +4,36 @@ Tmux Executor Mixin - 実行・ログ管理
 import subprocess
 import shlex
 import re
+import time
 from pathlib import Path
 from typing import Dict, Optional, Any, TYPE_CHECKING
 
+from mao.orchestrator import cold_storage
+
 if TYPE_CHECKING:
     from mao.orchestrator.tmux_manager import TmuxManager
 
 
+# アイドル状態とみなすシェル
+IDLE_SHELLS = ["bash", "zsh", "sh", "fish", "ksh"]
+
+# snapshot() で取得するペインの情報（list-panes -F の書式）
+SNAPSHOT_FORMAT = "|||".join([
+    "#{pane_id}",
+    "#{session_name}",
+    "#{window_index}",
+    "#{pane_index}",
+    "#{pane_current_command}",
+    "#{pane_pid}",
+    "#{pane_active}",
+    "#{pane_dead}",
+    "#{history_size}",
+    # ペイン単位の活動時刻（対応していない tmux では空。window_activity はウィンドウ単位で、
+    # グリッドの全ペインが同じ値になるので使わない）
+    "#{pane_activity}",
+])
+
+
 class TmuxExecutorMixin:
     """実行・ログ管理を担当するミックスイン"""
 
@@ -113,25 +136,8 @@ class TmuxExecutorMixin:
         Returns:
             プロセス実行中ならTrue
         """
-        try:
-            # tmux display-message でペインの実行状態を取得
-            # pane_in_mode: コピーモードなど特殊モードにいるか
-            # pane_current_command: 現在実行中のコマンド
-            result = subprocess.run(
-                ["tmux", "display-message", "-p", "-t", pane_id, "#{pane_current_command}"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            current_command = result.stdout.strip()
-
-            # シェル以外のコマンドが実行中ならbusy
-            # bash, zsh, sh などはアイドル状態
-            idle_shells = ["bash", "zsh", "sh", "fish", "ksh"]
-            return current_command not in idle_shells
-
-        except subprocess.CalledProcessError:
-            return False
+        status = self.pane_snapshot(pane_id)
+        return bool(status and status["busy"])
 
     def get_pane_content(self: "TmuxManager", pane_id: str, lines: int = 100) -> str:
         """ペインの内容を取得
@@ -144,57 +150,106 @@ class TmuxExecutorMixin:
             ペインの内容
         """
         try:
-            result = subprocess.run(
-                ["tmux", "capture-pane", "-p", "-t", pane_id, "-S", f"-{lines}"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            result = self._tmux("capture-pane", "-p", "-t", pane_id, "-S", f"-{lines}", check=True)
             return result.stdout
         except subprocess.CalledProcessError as e:
             self.logger.error(f"Failed to capture pane content: {e}")
             return ""
 
-    def get_pane_status(self: "TmuxManager", pane_id: str) -> Dict[str, Any]:
-        """ペインの詳細ステータスを取得
+    def snapshot(self: "TmuxManager", max_age: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """全ペインの状態を1回の tmux list-panes -a で取得
+
+        結果は snapshot_ttl 秒キャッシュする。ペインの作成・削除時はキャッシュを破棄する。
 
         Args:
-            pane_id: ペインID
+            max_age: キャッシュを使う最大の経過秒数（Noneの場合は snapshot_ttl、0 で必ず取得）
 
         Returns:
-            ステータス情報の辞書
+            pane_id（%N 形式）-> ステータス情報の辞書。last_activity は常駐接続で最後に出力を
+            受け取った時刻か tmux の #{pane_activity}（UNIX 秒）で、どちらもなければ None
         """
+        max_age = self.snapshot_ttl if max_age is None else max_age
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._snapshot_at < max_age:
+            return self._snapshot
+
         try:
-            # 複数の情報を一度に取得
-            result = subprocess.run(
-                [
-                    "tmux", "display-message", "-p", "-t", pane_id,
-                    "#{pane_current_command}|||#{pane_pid}|||#{pane_active}|||#{pane_dead}"
-                ],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            result = self._tmux("list-panes", "-a", "-F", SNAPSHOT_FORMAT, check=True)
+        except subprocess.CalledProcessError as e:
+            # サーバーが起動していない（ペインがない）場合も失敗する
+            self.logger.debug(f"Failed to list panes: {e}")
+            result = None
+
+        panes: Dict[str, Dict[str, Any]] = {}
+        targets: Dict[str, str] = {}
+        for line in result.stdout.splitlines() if result else []:
+            parts = line.split("|||")
+            if len(parts) < 10:
+                continue
+            (pane_id, session, window, index, command, pid, active, dead,
+             history_size, pane_activity) = parts[:10]
+            target = f"{session}:{window}.{index}"
+            panes[pane_id] = {
+                "pane_id": pane_id,
+                "target": target,
+                "current_command": command,
+                "pid": int(pid) if pid.isdigit() else None,
+                "active": active == "1",
+                "dead": dead == "1",
+                "busy": command not in IDLE_SHELLS,
+                "history_size": int(history_size) if history_size.isdigit() else 0,
+                "last_activity": self._pane_activity.get(
+                    pane_id, float(pane_activity) if pane_activity.isdigit() else None
+                ),
+            }
+            targets[target] = pane_id
+
+        self._snapshot = panes
+        self._snapshot_targets = targets
+        self._snapshot_at = now
+        return panes
+
+    def pane_snapshot(
+        self: "TmuxManager", pane_id: str, max_age: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """snapshot() から1つのペインの状態を取得
+
+        Args:
+            pane_id: ペインID（%N 形式または session:window.pane 形式）
+            max_age: snapshot() と同じ
+
+        Returns:
+            ステータス情報の辞書、ペインがなければNone
+        """
+        panes = self.snapshot(max_age)
+        return panes.get(self._snapshot_targets.get(pane_id, pane_id))
+
+    def invalidate_snapshot(self: "TmuxManager") -> None:
+        """snapshot() のキャッシュを破棄"""
+        self._snapshot = None
+
+    def get_pane_status(self: "TmuxManager", pane_id: str) -> Dict[str, Any]:
+        """ペインの詳細ステータスを取得（snapshot() のキャッシュを使う）
 
-            parts = result.stdout.strip().split("|||")
-            if len(parts) >= 4:
-                return {
-                    "current_command": parts[0],
-                    "pid": int(parts[1]) if parts[1].isdigit() else None,
-                    "active": parts[2] == "1",
-                    "dead": parts[3] == "1",
-                    "busy": parts[0] not in ["bash", "zsh", "sh", "fish", "ksh"]
-                }
+        Args:
+            pane_id: ペインID
 
-        except (subprocess.CalledProcessError, ValueError) as e:
-            self.logger.error(f"Failed to get pane status: {e}")
+        Returns:
+            ステータス情報の辞書
+        """
+        status = self.pane_snapshot(pane_id)
+        if status is not None:
+            return dict(status)
 
+        self.logger.error(f"Failed to get pane status: pane {pane_id} not found")
         return {
             "current_command": None,
             "pid": None,
             "active": False,
             "dead": True,
-            "busy": False
+            "busy": False,
+            "history_size": 0,
+            "last_activity": None,
         }
 
     def enable_pane_logging(self: "TmuxManager", pane_id: str, log_file: Path) -> bool:
@@ -213,13 +268,10 @@ class TmuxExecutorMixin:
             # pipe-pane で出力を tee に送る
             # -o: 追記モード
             # tee -a: ログファイルに追記しつつ、ペインにも表示
-            subprocess.run(
-                [
-                    "tmux", "pipe-pane", "-t", pane_id,
-                    "-o", f"tee -a {safe_log_file}"
-                ],
-                check=True
-            )
+            self._tmux("pipe-pane", "-t", pane_id, "-o", f"tee -a {safe_log_file}", check=True)
+            # tee が書き込んでいる間は mao gc に圧縮させない
+            if pane_id not in self._log_locks:
+                self._log_locks[pane_id] = cold_storage.hold(log_file)
 
             self.logger.info(f"Enabled pipe-pane for {pane_id} -> {log_file}")
             return True
@@ -238,10 +290,10 @@ class TmuxExecutorMixin:
             成功したかどうか
         """
         try:
-            subprocess.run(
-                ["tmux", "pipe-pane", "-t", pane_id],
-                check=True
-            )
+            self._tmux("pipe-pane", "-t", pane_id, check=True)
+            lock = self._log_locks.pop(pane_id, None)
+            if lock:
+                lock.release()
 
             self.logger.info(f"Disabled pipe-pane for {pane_id}")
             return True
@@ -342,8 +394,8 @@ class TmuxExecutorMixin:
         try:
             # ログファイルから最新の出力を読み取り
             content = ""
-            if log_file.exists():
-                content = log_file.read_text(encoding="utf-8", errors="ignore")
+            if cold_storage.exists(log_file):
+                content = cold_storage.read_text(log_file, errors="ignore")
 
             if not content:
                 # ログファイルがない場合はペインから直接取得
@@ -1,130 +1,123 @@
 """
 Tmux Grid Layout Mixin - グリッドレイアウト管理
+
+グリッドは CTO + エージェント数のペインを tiled レイアウトで並べる。作成に必要なコマンド
+（セッション作成、オプション設定、分割、タイトル設定）は ";" でつないで1回の tmux 起動で
+実行する。
 """
 import subprocess
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable, List, Sequence, Tuple
 
 if TYPE_CHECKING:
     from mao.orchestrator.tmux_manager import TmuxManager
 
 
-class TmuxGridMixin:
-    """グリッドレイアウトを担当するミックスイン"""
+# ペイン1つに必要な最小サイズ（境界線とタイトル行を含む）
+MIN_PANE_WIDTH = 20
+MIN_PANE_HEIGHT = 5
 
-    def create_session_with_grid(self: "TmuxManager") -> bool:
-        """3×3グリッドレイアウトでセッションを作成（multi-agent-shogun風）"""
-        try:
-            # 1. セッション作成（大きめのウィンドウサイズで）
-            subprocess.run(
-                [
-                    "tmux",
-                    "new-session",
-                    "-d",
-                    "-s",
-                    self.session_name,
-                    "-n",
-                    "multiagent",
-                    "-x", str(self.grid_width),
-                    "-y", str(self.grid_height),
-                ],
-                check=True,
-            )
 
-            # ペインの境界にタイトルを表示する設定
-            subprocess.run(
-                ["tmux", "set-option", "-t", self.session_name, "pane-border-status", "top"],
-                check=True,
-            )
-            subprocess.run(
-                ["tmux", "set-option", "-t", self.session_name, "pane-border-format",
-                 "#[fg=cyan,bold] #{pane_title} "],
-                check=True,
-            )
+def grid_shape(panes: int) -> Tuple[int, int]:
+    """ペイン数に対するグリッドの (行数, 列数)（tmux の tiled レイアウトと同じ計算）"""
+    rows = columns = 1
+    while rows * columns < panes:
+        rows += 1
+        if rows * columns < panes:
+            columns += 1
+    return rows, columns
 
-            # 2. 3×3グリッド作成（9ペイン）
-            # 方法: まず3行作成、次に各行を3列に分割
 
-            # ステップ1: 縦に2回分割して3行作る
-            subprocess.run(
-                ["tmux", "split-window", "-v", "-t", f"{self.session_name}:0.0"],
-                check=True,
-            )
-            subprocess.run(
-                ["tmux", "split-window", "-v", "-t", f"{self.session_name}:0.0"],
-                check=True,
-            )
+def chain(commands: Iterable[Sequence[str]]) -> List[str]:
+    """複数の tmux コマンドを ";" でつなぎ、1回の tmux 起動の引数にする
 
-            # ステップ2: 各行を横に2回分割して3列にする
-            # 1行目（pane 0）を3列に
-            subprocess.run(
-                ["tmux", "split-window", "-h", "-t", f"{self.session_name}:0.0"],
-                check=True,
-            )
-            subprocess.run(
-                ["tmux", "split-window", "-h", "-t", f"{self.session_name}:0.1"],
-                check=True,
-            )
+    Returns:
+        tmux に渡す引数（先頭の "tmux" は含まない）
+    """
+    args: List[str] = []
+    for command in commands:
+        if args:
+            args.append(";")
+        # 末尾の ";" はコマンドの区切りと解釈されるのでエスケープする
+        args.extend(arg[:-1] + "\\;" if arg.endswith(";") else arg for arg in command)
+    return args
 
-            # 2行目（pane 3）を3列に
-            subprocess.run(
-                ["tmux", "split-window", "-h", "-t", f"{self.session_name}:0.3"],
-                check=True,
-            )
-            subprocess.run(
-                ["tmux", "split-window", "-h", "-t", f"{self.session_name}:0.4"],
-                check=True,
-            )
-
-            # 3行目（pane 6）を3列に
-            subprocess.run(
-                ["tmux", "split-window", "-h", "-t", f"{self.session_name}:0.6"],
-                check=True,
-            )
-            subprocess.run(
-                ["tmux", "split-window", "-h", "-t", f"{self.session_name}:0.7"],
-                check=True,
-            )
-
-            # 3. レイアウトを均等に調整
-            subprocess.run(
-                ["tmux", "select-layout", "-t", f"{self.session_name}:0", "tiled"],
-                check=True,
-            )
-
-            # 4. 各ペインに役割を割り当て
-            roles = ["cto"] + [f"agent-{i}" for i in range(1, self.num_agents + 1)]
 
-            for idx, role in enumerate(roles):
-                pane_id = f"{self.session_name}:0.{idx}"
-                self.grid_panes[role] = pane_id
+def pane_title(role: str) -> str:
+    """ペインの境界に表示するタイトル"""
+    if role == "cto":
+        return "🛡️ CTO"
+    return f"🔧 {role.upper()}"
 
-                # ペインタイトルを設定
-                role_display = {
-                    "cto": "🛡️ CTO",
-                    "agent-1": "🔧 AGENT-1",
-                    "agent-2": "🔧 AGENT-2",
-                    "agent-3": "🔧 AGENT-3",
-                    "agent-4": "🔧 AGENT-4",
-                    "agent-5": "🔧 AGENT-5",
-                    "agent-6": "🔧 AGENT-6",
-                    "agent-7": "🔧 AGENT-7",
-                    "agent-8": "🔧 AGENT-8",
-                }.get(role, role.upper())
 
-                subprocess.run(
-                    ["tmux", "select-pane", "-t", pane_id, "-T", role_display],
-                    check=True,
-                )
+class TmuxGridMixin:
+    """グリッドレイアウトを担当するミックスイン"""
 
-                # ペインをクリア（何も表示しない）
-                self._send_to_pane(pane_id, "clear")
+    def _grid_commands(self: "TmuxManager", roles: List[str]) -> List[List[str]]:
+        """グリッドセッションを作成する tmux コマンド列"""
+        window = f"{self.session_name}:0"
+        rows, columns = grid_shape(len(roles))
+        # ペインが最小サイズを下回らないようにウィンドウを広げる
+        width = max(self.grid_width, columns * MIN_PANE_WIDTH)
+        height = max(self.grid_height, rows * MIN_PANE_HEIGHT)
+
+        commands = [
+            [
+                "new-session", "-d", "-s", self.session_name, "-n", "multiagent",
+                "-x", str(width), "-y", str(height),
+            ],
+            # ペインの境界にタイトルを表示する設定
+            ["set-option", "-t", self.session_name, "pane-border-status", "top"],
+            [
+                "set-option", "-t", self.session_name, "pane-border-format",
+                "#[fg=cyan,bold] #{pane_title} ",
+            ],
+        ]
+
+        # 分割のたびに均等に並べ直し、分割するペインの大きさを保つ
+        for _ in roles[1:]:
+            commands.append(["split-window", "-d", "-t", f"{window}.0"])
+            commands.append(["select-layout", "-t", window, "tiled"])
+
+        # tiled レイアウトはペイン番号順に左上から並ぶ
+        for idx, role in enumerate(roles):
+            pane_id = f"{window}.{idx}"
+            commands.append(["select-pane", "-t", pane_id, "-T", pane_title(role)])
+            commands.append(["send-keys", "-t", pane_id, "clear", "C-m"])
+        return commands
 
-            return True
+    def create_session_with_grid(self: "TmuxManager") -> bool:
+        """CTO + エージェント数のペインを並べたグリッドでセッションを作成（multi-agent-shogun風）"""
+        roles = ["cto"] + [f"agent-{i}" for i in range(1, self.num_agents + 1)]
+        rows, columns = grid_shape(len(roles))
+        if self.session_exists():
+            self.logger.error(f"tmux session '{self.session_name}' already exists")
+            return False
 
+        try:
+            subprocess.run(
+                ["tmux", *chain(self._grid_commands(roles))],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
         except subprocess.CalledProcessError as e:
-            self.logger.error(f"Failed to create grid session: {e}")
+            self.logger.error(f"Failed to create grid session: {e} {e.stderr.strip()}")
+            # 途中で失敗したセッションは残さない
+            subprocess.run(
+                ["tmux", "kill-session", "-t", self.session_name], capture_output=True
+            )
             return False
 
+        self._control_retry_at = 0.0
+        self.invalidate_snapshot()
+        self.grid_panes = {
+            role: f"{self.session_name}:0.{idx}" for idx, role in enumerate(roles)
+        }
+        self.logger.info(
+            f"Created {rows}x{columns} grid session '{self.session_name}' with {len(roles)} panes"
+        )
+        return True
+
     def set_layout(self: "TmuxManager", layout: str = "tiled") -> None:
         """レイアウトを変更
 
@@ -132,8 +125,6 @@ class TmuxGridMixin:
             layout: tiled, even-horizontal, even-vertical, main-horizontal, main-vertical
         """
         try:
-            subprocess.run(
-                ["tmux", "select-layout", "-t", f"{self.session_name}:0", layout]
-            )
+            self._tmux("select-layout", "-t", f"{self.session_name}:0", layout)
         except subprocess.CalledProcessError:
             pass
@@ -1,16 +1,28 @@
 """
 tmux session management for agent visualization
+
+セッション作成後のコマンドは tmux -C の常駐接続（TmuxControlClient）で送り、
+接続できない場合だけ tmux プロセスを起動する。
 """
+import asyncio
 import subprocess
 import shlex
 import logging
-from typing import Optional, Dict
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
+from mao.orchestrator.cold_storage import FileLock
+from mao.orchestrator.tmux_control import OutputListener, TmuxControlClient, TmuxResult
 from mao.orchestrator.tmux_grid import TmuxGridMixin
 from mao.orchestrator.tmux_executor import TmuxExecutorMixin
 
 
+# 常駐接続に失敗した後、再接続を試みるまでの間隔（秒）
+CONTROL_RETRY_INTERVAL = 5.0
+
+
 class TmuxManager(TmuxGridMixin, TmuxExecutorMixin):
     """tmuxセッションを管理してエージェントごとにペインを作成"""
 
@@ -21,6 +33,8 @@ class TmuxManager(TmuxGridMixin, TmuxExecutorMixin):
         grid_width: int = 240,
         grid_height: int = 60,
         num_agents: int = 8,
+        use_control_mode: bool = True,
+        snapshot_ttl: float = 1.0,
         logger: Optional[logging.Logger] = None,
     ):
         self.session_name = session_name
@@ -32,6 +46,147 @@ class TmuxManager(TmuxGridMixin, TmuxExecutorMixin):
         self.grid_panes: Dict[str, str] = {}  # role -> pane_id (grid mode)
         self.logger = logger or logging.getLogger(__name__)
 
+        # tmux -C の常駐接続（use_control_mode=False なら毎回 tmux を起動する）
+        self.use_control_mode = use_control_mode
+        self.control: Optional[TmuxControlClient] = None
+        self._control_retry_at = 0.0
+        self._output_listeners: List[OutputListener] = []
+        self._subscriptions: Dict[int, Callable[[], None]] = {}
+        # 常駐接続で最後に出力を受け取った時刻（UNIX 秒、pane_id -> 時刻）
+        self._pane_activity: Dict[str, float] = {}
+        # pipe-pane で書き込み中のログを mao gc から守るロック（pane_id -> ロック）
+        self._log_locks: Dict[str, FileLock] = {}
+
+        # snapshot() のキャッシュ
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshot: Optional[Dict[str, Dict[str, Any]]] = None
+        self._snapshot_targets: Dict[str, str] = {}
+        self._snapshot_at = 0.0
+
+    def _control_client(self) -> Optional[TmuxControlClient]:
+        """接続済みの常駐クライアント（なければ接続を試みる。失敗後はしばらく試みない）"""
+        if self.control is not None and self.control.alive:
+            return self.control
+        if not self.use_control_mode or time.monotonic() < self._control_retry_at:
+            return None
+
+        if self.control is not None:
+            self.control.close()
+            self.control = None
+        client = TmuxControlClient(self.session_name, logger=self.logger)
+        try:
+            client.start()
+        except (RuntimeError, OSError) as e:
+            self.logger.debug(f"tmux control mode unavailable: {e}")
+            self._control_retry_at = time.monotonic() + CONTROL_RETRY_INTERVAL
+            return None
+        client.add_output_listener(self._dispatch_output)
+        self.control = client
+        return client
+
+    def _tmux(self, *args: str, check: bool = False) -> TmuxResult:
+        """tmux コマンドを実行（常駐接続があればそれを使い、なければ tmux を起動）
+
+        Args:
+            args: tmux のコマンドと引数
+            check: 失敗時に subprocess.CalledProcessError を送出する
+
+        Returns:
+            コマンドの結果
+        """
+        result = None
+        client = self._control_client()
+        if client is not None:
+            try:
+                future = client.command(*args)
+            except RuntimeError as e:
+                # 送信前に切断を検出した（コマンドは実行されていない）
+                self.logger.debug(f"tmux control client disconnected, falling back to subprocess: {e}")
+            else:
+                try:
+                    result = future.result(client.timeout)
+                except (RuntimeError, FutureTimeoutError) as e:
+                    # 送信済みのコマンドは実行された可能性があるので再実行しない。
+                    # 応答の対応付けがずれるため接続は作り直す
+                    self.logger.error(f"tmux control command failed: {args[0]}: {e!r}")
+                    self.close()
+                    self._control_retry_at = 0.0
+                    result = TmuxResult(1, "", f"tmux control command failed: {e!r}\n")
+
+        if result is None:
+            completed = subprocess.run(["tmux", *args], capture_output=True, text=True)
+            result = TmuxResult(completed.returncode, completed.stdout, completed.stderr)
+
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(
+                result.returncode, ["tmux", *args], result.stdout, result.stderr
+            )
+        return result
+
+    def close(self) -> None:
+        """常駐接続を閉じる（セッションはそのまま）"""
+        if self.control is not None:
+            self.control.close()
+            self.control = None
+
+    def _dispatch_output(self, pane_id: str, data: bytes) -> None:
+        self._pane_activity[pane_id] = time.time()
+        for listener in list(self._output_listeners):
+            try:
+                listener(pane_id, data)
+            except Exception as e:
+                self.logger.error(f"Pane output listener failed: {e}")
+
+    def add_output_listener(self, listener: OutputListener) -> Callable[[], None]:
+        """ペイン出力（%output 通知）のリスナーを登録
+
+        リスナーは常駐接続の読み込みスレッドから (pane_id, バイト列) で呼ばれる。
+        常駐接続がない間は呼ばれない。
+
+        Returns:
+            登録を解除する関数
+        """
+        self._output_listeners.append(listener)
+        self._control_client()
+
+        def remove() -> None:
+            if listener in self._output_listeners:
+                self._output_listeners.remove(listener)
+
+        return remove
+
+    def subscribe_output(
+        self, pane_id: Optional[str] = None, maxsize: int = 1000
+    ) -> "asyncio.Queue[Tuple[str, bytes]]":
+        """ペイン出力を asyncio.Queue で受け取る（イベントループ内で呼ぶ）
+
+        Args:
+            pane_id: 対象のペインID（Noneの場合は全ペイン）
+            maxsize: キューの上限（満杯の間の出力は捨てる）
+
+        Returns:
+            (pane_id, バイト列) が入るキュー
+        """
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Tuple[str, bytes]]" = asyncio.Queue(maxsize=maxsize)
+
+        def put(item: Tuple[str, bytes]) -> None:
+            if not queue.full():
+                queue.put_nowait(item)
+
+        def listener(pane: str, data: bytes) -> None:
+            if pane_id is None or pane == pane_id:
+                loop.call_soon_threadsafe(put, (pane, data))
+
+        self._subscriptions[id(queue)] = self.add_output_listener(listener)
+        return queue
+
+    def unsubscribe_output(self, queue: "asyncio.Queue[Tuple[str, bytes]]") -> None:
+        """subscribe_output() の購読を解除"""
+        remove = self._subscriptions.pop(id(queue), None)
+        if remove:
+            remove()
+
     def is_tmux_available(self) -> bool:
         """tmuxが利用可能かチェック"""
         try:
@@ -42,6 +197,9 @@ class TmuxManager(TmuxGridMixin, TmuxExecutorMixin):
 
     def session_exists(self) -> bool:
         """セッションが存在するかチェック"""
+        # 常駐接続はセッションが破棄されると切れる
+        if self.control is not None and self.control.alive:
+            return True
         try:
             result = subprocess.run(
                 ["tmux", "has-session", "-t", self.session_name], capture_output=True
@@ -73,6 +231,8 @@ class TmuxManager(TmuxGridMixin, TmuxExecutorMixin):
                 ],
                 check=True,
             )
+            # 作成前の接続失敗で再接続を待たない
+            self._control_retry_at = 0.0
 
             # 最初のペインに説明を表示
             self._send_to_pane("0", self._get_header())
@@ -89,24 +249,20 @@ class TmuxManager(TmuxGridMixin, TmuxExecutorMixin):
         """エージェント用のペインを作成"""
         try:
             # 新しいペインを分割して作成
-            result = subprocess.run(
-                [
-                    "tmux",
-                    "split-window",
-                    "-t",
-                    f"{self.session_name}:0",
-                    "-d",  # detached
-                    "-P",  # print pane ID
-                    "-F",
-                    "#{pane_id}",
-                ],
-                capture_output=True,
-                text=True,
+            result = self._tmux(
+                "split-window",
+                "-t",
+                f"{self.session_name}:0",
+                "-d",  # detached
+                "-P",  # print pane ID
+                "-F",
+                "#{pane_id}",
                 check=True,
             )
 
             pane_id = result.stdout.strip()
             self.panes[agent_id] = pane_id
+            self.invalidate_snapshot()
 
             # ペインにヘッダーと tail コマンドを送信
             header = f"""
@@ -127,9 +283,7 @@ Waiting for agent to start...
             )
 
             # レイアウトを整理（tiled layout）
-            subprocess.run(
-                ["tmux", "select-layout", "-t", f"{self.session_name}:0", "tiled"]
-            )
+            self._tmux("select-layout", "-t", f"{self.session_name}:0", "tiled")
 
             return pane_id
 
@@ -142,23 +296,33 @@ Waiting for agent to start...
         if agent_id in self.panes:
             pane_id = self.panes[agent_id]
             try:
-                subprocess.run(["tmux", "kill-pane", "-t", pane_id])
+                self._tmux("kill-pane", "-t", pane_id)
                 del self.panes[agent_id]
+                lock = self._log_locks.pop(pane_id, None)
+                if lock:
+                    lock.release()
+                self.invalidate_snapshot()
             except subprocess.CalledProcessError:
                 pass
 
     def destroy_session(self) -> None:
         """セッションを破棄"""
         if self.session_exists():
+            self.close()
+            self.invalidate_snapshot()
             try:
                 subprocess.run(["tmux", "kill-session", "-t", self.session_name])
                 self.logger.info(f"✓ tmux session '{self.session_name}' destroyed")
             except subprocess.CalledProcessError as e:
                 self.logger.error(f"Failed to destroy session: {e}")
+        # ペインと一緒に tee も終了している
+        for lock in self._log_locks.values():
+            lock.release()
+        self._log_locks.clear()
 
     def _send_to_pane(self, pane_id: str, command: str) -> None:
         """ペインにコマンドを送信"""
-        subprocess.run(["tmux", "send-keys", "-t", pane_id, command, "C-m"])
+        self._tmux("send-keys", "-t", pane_id, command, "C-m")
 
     def _get_header(self) -> str:
         """最初のペイン用のヘッダー"""
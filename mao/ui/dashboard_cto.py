@@ -6,6 +6,8 @@ import logging
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+from mao.orchestrator import cold_storage
+from mao.orchestrator.cold_storage import FileLock
 from mao.orchestrator.state_manager import AgentStatus
 
 if TYPE_CHECKING:
@@ -19,6 +21,7 @@ class DashboardCTOMixin:
     _cto_started: bool = False
     _cto_monitor_task: asyncio.Task = None
     _cto_log_file: Path = None
+    _cto_log_lock: FileLock = None
 
     async def send_to_cto_interactive(self: "InteractiveDashboard", message: str) -> None:
         """CTOにメッセージを送信（インタラクティブモード - tmuxペイン経由）
@@ -51,7 +54,8 @@ class DashboardCTOMixin:
         try:
             # 初回: claudeを起動
             if not self._cto_started:
-                # ログファイルを初期化
+                # ログファイルを初期化（ダッシュボードの実行中は mao gc に圧縮させない）
+                self._cto_log_lock = cold_storage.hold(self._cto_log_file)
                 self._cto_log_file.write_text("", encoding="utf-8")
 
                 success = self.tmux_manager.start_cto_with_output_capture(
@@ -105,27 +109,26 @@ class DashboardCTOMixin:
 
         while self._cto_started:
             try:
-                if self._cto_log_file and self._cto_log_file.exists():
-                    with open(self._cto_log_file, 'r', encoding="utf-8", errors="ignore") as f:
-                        f.seek(last_position)
-                        new_content = f.read()
+                if self._cto_log_file and cold_storage.exists(self._cto_log_file):
+                    new_data = cold_storage.read_bytes(self._cto_log_file, offset=last_position)
+                    new_content = new_data.decode("utf-8", errors="ignore")
 
-                        if new_content:
-                            # ダッシュボードのCTOチャットに追加
-                            if self.cto_chat_panel:
-                                self.cto_chat_panel.chat_widget.append_streaming_chunk(new_content)
+                    if new_content:
+                        # ダッシュボードのCTOチャットに追加
+                        if self.cto_chat_panel:
+                            self.cto_chat_panel.chat_widget.append_streaming_chunk(new_content)
 
-                            # [MAO_AGENT_SPAWN]ブロックをパース
-                            await self._extract_agent_spawns(new_content)
+                        # [MAO_AGENT_SPAWN]ブロックをパース
+                        await self._extract_agent_spawns(new_content)
 
-                            # フィードバックを抽出
-                            self._extract_feedbacks(new_content)
+                        # フィードバックを抽出
+                        self._extract_feedbacks(new_content)
 
-                            # Feedback完了を検知
-                            if self.feedback_branch and "[FEEDBACK_COMPLETED]" in new_content:
-                                await self._handle_feedback_completion(new_content)
+                        # Feedback完了を検知
+                        if self.feedback_branch and "[FEEDBACK_COMPLETED]" in new_content:
+                            await self._handle_feedback_completion(new_content)
 
-                        last_position = f.tell()
+                    last_position += len(new_data)
 
                 await asyncio.sleep(0.5)
 
@@ -340,6 +343,15 @@ summary: 変更内容の要約
 
    **各タスクごとに1回 `/spawn-agent` を呼び出してください。**
 
+   **依存関係:** 他のタスクの完了が必要なタスクには `--id` と `--depends_on` を指定してください。
+   依存のないタスクは並列に実行され、依存先が承認されると後続タスクが開始されます。
+
+   ```
+   /spawn-agent --task "ログインAPIを実装" --role coder_backend --id api
+   /spawn-agent --task "ログイン画面を実装" --role coder_backend --id ui
+   /spawn-agent --task "ログイン機能の統合テストを作成" --role tester --depends_on api,ui
+   ```
+
    **モデル選択ガイド:**
    - **opus**: 複雑な実装、重要な判断、アーキテクチャ設計
    - **sonnet**: 通常の実装タスク（推奨、バランス型）
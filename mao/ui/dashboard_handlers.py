@@ -4,12 +4,13 @@ Dashboard Handlers Mixin - イベントハンドラ・アクション
 import asyncio
 import subprocess
 from pathlib import Path
-from typing import Dict, Any, TYPE_CHECKING
+from typing import Dict, Any, List, Tuple, TYPE_CHECKING
 
 from textual.containers import VerticalScroll
 from textual.widgets import TabbedContent, TabPane
 
 from mao.ui.widgets import SimpleLogViewer
+from mao.ui.widgets.cto_chat import ChatMessage
 
 if TYPE_CHECKING:
     from mao.ui.dashboard_interactive import InteractiveDashboard
@@ -18,6 +19,16 @@ if TYPE_CHECKING:
 class DashboardHandlersMixin:
     """イベントハンドラとアクションを担当するミックスイン"""
 
+    def _load_older_chat(self: "InteractiveDashboard", before: int) -> Tuple[List[ChatMessage], int]:
+        """CTOチャットのスクロールバック用に、カーソルより古い履歴を1ページ読む"""
+        page = self.session_manager.page(before=before)
+        messages = [
+            ChatMessage.from_record(msg.role, msg.content, msg.timestamp)
+            for msg in page.messages
+            if msg.role in ("user", "cto")
+        ]
+        return messages, page.cursor
+
     def on_mount(self: "InteractiveDashboard") -> None:
         """マウント時の処理"""
         # ウィジェットにボーダータイトルを設定
@@ -46,27 +57,23 @@ class DashboardHandlersMixin:
         if self.cto_chat_panel:
             self.cto_chat_panel.set_send_callback(self.on_cto_message_send)
 
-            # セッション履歴を読み込んで表示
-            session_messages = self.session_manager.get_messages()
-            if session_messages:
+            # セッション履歴を読み込んで表示（最新10件のみ読み込み、古い分はスクロールバックで読む）
+            message_count = self.session_manager.message_count
+            if message_count:
                 # 既存セッションを継続している場合
                 self.cto_chat_panel.add_system_message(
-                    f"📚 セッション継続: {self.session_manager.session_id[-12:]} ({len(session_messages)} messages)"
+                    f"📚 セッション継続: {self.session_manager.session_id[-12:]} ({message_count} messages)"
                 )
 
-                # 履歴を復元（最新10件のみ表示）
-                recent_messages = session_messages[-10:] if len(session_messages) > 10 else session_messages
-                for msg in recent_messages:
+                recent = self.session_manager.tail(10)
+                for msg in recent.messages:
                     if msg.role == "user":
                         self.cto_chat_panel.chat_widget.add_user_message(msg.content)
                     elif msg.role == "cto":
                         self.cto_chat_panel.chat_widget.add_cto_message(msg.content)
                     # system メッセージはスキップ（ノイズになるため）
 
-                if len(session_messages) > 10:
-                    self.cto_chat_panel.add_system_message(
-                        f"💡 {len(session_messages) - 10}件の古いメッセージを省略しました"
-                    )
+                self.cto_chat_panel.chat_widget.set_history(recent.cursor, self._load_older_chat)
             else:
                 # 新規セッション
                 self.cto_chat_panel.add_system_message(
@@ -96,11 +103,16 @@ class DashboardHandlersMixin:
         # メッセージハンドラーを登録
         self._register_message_handlers()
 
-        # メッセージポーリングを開始
+        # メッセージ購読を開始（変更通知で起動、intervalはフォールバック用）
         self._message_polling_task = asyncio.create_task(
             self.message_queue.start_polling(receiver="cto", interval=1.0)
         )
 
+        # 処理済みメッセージのバックグラウンドコンパクション
+        self._message_compaction_task = asyncio.create_task(
+            self.message_queue.start_compaction()
+        )
+
     def on_cto_message_send(self: "InteractiveDashboard", message: str):
         """ユーザーがCTOにメッセージを送信"""
         # コマンドをチェック
@@ -140,6 +152,7 @@ class DashboardHandlersMixin:
             feedback = parts[2] if len(parts) > 2 else None
 
             # 承認処理
+            item = self.approval_queue.get_item(approval_id)
             success = self.approval_queue.approve(approval_id, feedback)
 
             if success:
@@ -152,9 +165,8 @@ class DashboardHandlersMixin:
                 if self.approval_queue_widget:
                     self.approval_queue_widget.remove_agent_approval(approval_id)
 
-                # 次のタスクを開始
-                self.current_task_index += 1
-                await self._start_next_task()
+                # 依存先が揃ったタスクを開始
+                await self._complete_task(item.task_number if item else None)
             else:
                 if self.cto_chat_panel:
                     self.cto_chat_panel.add_system_message(
@@ -299,13 +311,18 @@ class DashboardHandlersMixin:
                 agent_id="cto",
             )
 
-        # エージェントを再起動
-        await self._spawn_task_agent(
+        # 同じエージェントのペインで再起動（タスクはまだそのエージェントが取得している）
+        started = await self._spawn_task_agent(
+            agent_id=item.agent_id,
             task_description=enhanced_description,
             role=item.role,
             model=item.model,
             task_number=item.task_number,
         )
+        if not started:
+            # 再起動できなければ失敗扱いにしてペインを空ける
+            self._fail_task(item.task_number)
+            await self._start_ready_tasks()
 
     def action_quit(self: "InteractiveDashboard") -> None:
         """アプリケーションを終了（全リソースをクリーンアップ）"""
@@ -314,6 +331,8 @@ class DashboardHandlersMixin:
             self._update_task.cancel()
         if self._message_polling_task:
             self._message_polling_task.cancel()
+        if self._message_compaction_task:
+            self._message_compaction_task.cancel()
 
         # Phase 3 追加: 未承認アイテムを警告
         pending_items = self.approval_queue.get_pending_items()
@@ -342,6 +361,10 @@ class DashboardHandlersMixin:
 
             self.state_manager.close()
 
+        # チャット履歴のメタデータを確定
+        if self.session_manager:
+            self.session_manager.close()
+
         # Phase 3 追加: タスクキューをクリア
         if self.task_dispatcher:
             self.task_dispatcher.clear_queue()
@@ -379,7 +402,7 @@ class DashboardHandlersMixin:
             self.log_viewer_widget.add_log("画面を更新しました", level="INFO")
 
         # 状態を手動で更新
-        asyncio.create_task(self._update_from_state_manager())
+        asyncio.create_task(self._update_from_state_manager(force=True))
 
         if self.header_widget:
             self.header_widget.refresh_display()
@@ -515,10 +538,8 @@ class DashboardHandlersMixin:
                 f"✅ リクエスト {request_id} を承認しました"
             )
 
-        # 8. 次のタスクを開始（シーケンシャルモード）
-        if self.sequential_mode:
-            self.current_task_index += 1
-            await self._start_next_task()
+        # 8. 依存先が揃ったタスクを開始
+        await self._complete_task(approval_item.task_number)
 
     def on_reject_request(self: "InteractiveDashboard", request_id: str) -> None:
         """承認リクエストを却下
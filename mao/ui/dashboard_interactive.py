@@ -28,6 +28,8 @@ from mao.orchestrator.message_queue import MessageQueue
 from mao.orchestrator.session_manager import SessionManager
 from mao.orchestrator.feedback_manager import FeedbackManager
 from mao.orchestrator.task_dispatcher import TaskDispatcher
+from mao.orchestrator.task_graph import TaskGraph
+from mao.orchestrator.task_queue import Task
 
 # Mixins
 from mao.ui.dashboard_parser import DashboardParserMixin
@@ -272,10 +274,32 @@ class InteractiveDashboard(
         # CTOはtmuxペインで動作
         self.cto_active = False
 
-        # TaskDispatcher（MAOロール読み込み）
+        # 引数の redis_url は状態管理とメッセージキューの両方で config.redis.url より優先する
+        self.redis_config = (
+            config.redis.model_copy(update={"url": redis_url}) if redis_url else config.redis
+        )
+
+        # メッセージキュー（バックエンドは .mao/config.yaml の queue セクションで選択）
+        self.message_queue = MessageQueue(
+            project_path=project_path,
+            backend=config.queue.backend,
+            store_options=config.queue.store_options(self.redis_config),
+        )
+
+        # TaskDispatcher（MAOロール読み込み、エージェントペインごとにタスクを割り当てる）
+        grid_panes = getattr(tmux_manager, "grid_panes", None)
+        agent_panes = (
+            [role for role in grid_panes if role.startswith("agent-")]
+            if isinstance(grid_panes, dict)
+            else []
+        )
         self.task_dispatcher = TaskDispatcher(
             project_path=project_path,
+            message_queue=self.message_queue,
+            **({"max_agents": len(agent_panes)} if agent_panes else {}),
         )
+        # 前回のセッションの割り当て（取得済みの記録など）が残っているとペインが空かない
+        self.task_dispatcher.task_queue.cleanup()
 
         # MAOロール定義をロード
         self.available_roles = self.task_dispatcher.roles
@@ -284,17 +308,16 @@ class InteractiveDashboard(
         # エージェント管理
         self.agents: Dict[str, Dict[str, Any]] = {}
 
-        # メッセージキュー
-        self.message_queue = MessageQueue(project_path=project_path)
-
         # 承認キュー（エージェント完了タスクの承認管理）
         from mao.orchestrator.approval_queue import ApprovalQueue
         self.approval_queue = ApprovalQueue(project_path=project_path)
 
-        # タスクキュー（順次実行用）
+        # タスクキュー（依存関係に従って並列実行、空いたエージェントペインが順に取る）
         self.task_queue: List[Dict[str, Any]] = []
-        self.current_task_index = 0
-        self.sequential_mode = True  # シーケンシャル実行モード
+        self.task_graph = TaskGraph()
+        self.running_tasks: Dict[str, Task] = {}  # タスク番号 -> 実行中のエージェントのタスク
+        self.task_ids: Dict[str, int] = {}  # タスクの "id" -> タスク番号
+        self.sequential_mode = False  # True なら依存関係に関係なく1つずつ実行
 
         # セッション管理（session_id が指定されている場合はそれを使用、なければ新規作成）
         if self._provided_session_id:
@@ -327,8 +350,15 @@ class InteractiveDashboard(
         self.state_manager = StateManager(
             project_path=project_path,
             use_sqlite=True,
-            session_id=self.session_manager.session_id
+            session_id=self.session_manager.session_id,
+            redis_url=self.redis_config.url if self.use_redis else None,
+            redis_options={"key_prefix": config.redis.key_prefix} if self.use_redis else None,
+            flush_interval=config.state.flush_interval,
+            metrics_retention=config.state.metrics_retention(),
         )
+        # 最後に描画した StateManager.stats_version（変わらなければ再描画しない）
+        self._state_version = -1
+        self._metrics_refreshed_at = 0.0
 
         # フィードバック管理
         self.feedback_manager = FeedbackManager(project_path=project_path)
@@ -339,6 +369,7 @@ class InteractiveDashboard(
         # 更新タスク
         self._update_task: Optional[asyncio.Task] = None
         self._message_polling_task: Optional[asyncio.Task] = None
+        self._message_compaction_task: Optional[asyncio.Task] = None
 
     def _setup_work_directory(self) -> Path:
         """作業ディレクトリを設定
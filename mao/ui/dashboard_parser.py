@@ -5,7 +5,9 @@ from datetime import datetime
 import asyncio
 import re
 import json
-from typing import TYPE_CHECKING
+from typing import List, TYPE_CHECKING
+
+from mao.orchestrator.task_graph import parse_dependencies
 
 if TYPE_CHECKING:
     from mao.ui.dashboard_interactive import InteractiveDashboard
@@ -88,7 +90,11 @@ class DashboardParserMixin:
         # タスクサマリーを作成
         task_summaries = []
 
-        for idx, match in enumerate(matches, 1):
+        # 応答内の番号（ブロックの順番、1始まり）を通し番号にずらす
+        offset = self._task_number_offset()
+
+        for position, match in enumerate(matches, start=1):
+            idx = offset + position
             try:
                 # JSONをパース
                 agent_data = json.loads(match.strip())
@@ -117,15 +123,24 @@ class DashboardParserMixin:
                         )
                     continue
 
-                # タスクをキューに追加
-                self.task_queue.append({
-                    'task_num': idx,
-                    'description': task_description,
-                    'role': role,
-                    'model': model,
-                    'priority': priority,
-                    'status': 'queued',
-                })
+                # タスクをキューに追加（depends_on はタスク番号または "id"）
+                queued = self._queue_task(
+                    {
+                        'task_num': idx,
+                        'id': agent_data.get("id"),
+                        'description': task_description,
+                        'role': role,
+                        'model': model,
+                        'priority': priority,
+                        'agent': agent_data.get("agent") or None,
+                        'status': 'queued',
+                    },
+                    depends_on=self._batch_dependencies(
+                        parse_dependencies(agent_data.get("depends_on")), offset
+                    ),
+                )
+                if not queued:
+                    continue
 
                 task_summaries.append({
                     'num': idx,
@@ -169,15 +184,9 @@ class DashboardParserMixin:
                 total_count=len(task_summaries),
             )
 
-        # シーケンシャルモードの場合、最初のタスクを開始
-        if self.sequential_mode and self.task_queue and len(matches) > 0:
-            if self.log_viewer_widget:
-                self.log_viewer_widget.add_log(
-                    f"🎯 シーケンシャルモード: タスク1/{len(self.task_queue)}を開始",
-                    level="INFO",
-                    agent_id="cto",
-                )
-            await self._start_next_task()
+        # 依存先のないタスクを並列に開始
+        if task_summaries:
+            await self._start_ready_tasks()
 
     async def _extract_and_spawn_tasks(self: "InteractiveDashboard", text: str) -> None:
         """CTOの応答からタスク指示を抽出してエージェントを起動
@@ -237,6 +246,9 @@ class DashboardParserMixin:
         # タスクサマリーを作成してTask Infoを更新
         task_summaries = []
 
+        # 応答内の番号を通し番号にずらす（前の応答のタスクと重複しないように）
+        offset = self._task_number_offset()
+
         for task_num, task_content in tasks:
             # Role/ロール を抽出（ハイフン付きロール名に対応）
             role_match = re.search(r'(?:Role|ロール)[:：]\s*(\S+)', task_content, re.IGNORECASE)
@@ -246,10 +258,32 @@ class DashboardParserMixin:
             model_match = re.search(r'(?:Model|モデル)[:：]\s*(\S+)', task_content, re.IGNORECASE)
             model = model_match.group(1) if model_match else "sonnet"
 
+            # 依存先のタスク番号を抽出（Depends on: Task 1, 2）
+            depends_match = re.search(
+                r'(?:Depends on|依存)[:：]\s*(.+)', task_content, re.IGNORECASE
+            )
+            depends_on = self._batch_dependencies(
+                re.findall(r'\d+', depends_match.group(1)) if depends_match else [], offset
+            )
+
             # タスク説明を抽出（最初の行）
             task_lines = task_content.strip().split('\n')
             task_description = task_lines[0].strip()
 
+            # タスクをキューに追加
+            queued = self._queue_task(
+                {
+                    'task_num': offset + int(task_num),
+                    'description': task_description,
+                    'role': role,
+                    'model': model,
+                    'status': 'queued',
+                },
+                depends_on=depends_on,
+            )
+            if not queued:
+                continue
+
             # サマリーに追加
             task_summaries.append({
                 'num': task_num,
@@ -257,15 +291,6 @@ class DashboardParserMixin:
                 'role': role,
             })
 
-            # タスクをキューに追加
-            self.task_queue.append({
-                'task_num': int(task_num),
-                'description': task_description,
-                'role': role,
-                'model': model,
-                'status': 'queued',
-            })
-
             if self.log_viewer_widget:
                 self.log_viewer_widget.add_log(
                     f"📋 タスク{task_num}をキューに追加: {role} ({model})",
@@ -293,15 +318,34 @@ class DashboardParserMixin:
                 total_count=len(task_summaries),
             )
 
-        # シーケンシャルモードの場合、最初のタスクを開始
-        if self.sequential_mode and self.task_queue:
-            if self.log_viewer_widget:
-                self.log_viewer_widget.add_log(
-                    f"🎯 シーケンシャルモード: タスク1/{len(self.task_queue)}を開始",
-                    level="INFO",
-                    agent_id="cto",
-                )
-            await self._start_next_task()
+        # 依存先のないタスクを並列に開始
+        if self.task_queue:
+            await self._start_ready_tasks()
+
+    def _task_number_offset(self: "InteractiveDashboard") -> int:
+        """この応答のタスク番号に足す値（これまでの最大のタスク番号）"""
+        return max((task['task_num'] for task in self.task_queue), default=0)
+
+    def _batch_dependencies(
+        self: "InteractiveDashboard", dependencies: List[str], offset: int
+    ) -> List[str]:
+        """depends_on の番号を応答内の番号（1始まり）として通し番号に変換
+
+        どちらの形式でも番号は同じ応答内のタスクを指す。前の応答のタスクには "id" で依存する。
+
+        Args:
+            dependencies: 依存先のタスク番号 / ID のリスト
+            offset: この応答のタスク番号に足す値
+
+        Returns:
+            通し番号 / ID のリスト
+        """
+        return [
+            str(offset + int(dependency))
+            if dependency.isdigit() and dependency not in self.task_ids
+            else dependency
+            for dependency in dependencies
+        ]
 
     def _extract_feedbacks(self: "InteractiveDashboard", text: str) -> None:
         """テキストからフィードバックを抽出して保存
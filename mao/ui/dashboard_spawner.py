@@ -3,9 +3,11 @@ Dashboard Spawner Mixin - エージェントの起動・実行（tmux必須）
 """
 from datetime import datetime
 import asyncio
-from typing import Optional, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
 from mao.orchestrator.state_manager import AgentStatus
+from mao.orchestrator.task_dispatcher import SubTask
+from mao.orchestrator.task_queue import TaskStatus
 
 if TYPE_CHECKING:
     from mao.ui.dashboard_interactive import InteractiveDashboard
@@ -16,18 +18,23 @@ class DashboardSpawnerMixin:
 
     async def _spawn_task_agent(
         self: "InteractiveDashboard",
+        agent_id: str,
         task_description: str,
         role: str,
         model: Optional[str] = None,
         task_number: Optional[int] = None,
-    ) -> None:
+    ) -> bool:
         """Taskエージェントを起動する
 
         Args:
+            agent_id: タスクを取得したエージェント（tmux グリッドのペインのロール名 agent-N）
             task_description: タスクの説明
             role: MAOロール名 (coder_backend, reviewer, tester, planner, researcher, auditor, etc.)
             model: 使用するモデル（Noneの場合はロールのデフォルトモデルを使用）
-            task_number: タスク番号（シーケンシャルモード用）
+            task_number: タスク番号（タスクキュー・依存グラフ用）
+
+        Returns:
+            ペインで claude を起動できたかどうか
         """
         # ロール定義を取得
         role_config = self.available_roles.get(role)
@@ -38,17 +45,27 @@ class DashboardSpawnerMixin:
                     level="ERROR",
                     agent_id="cto",
                 )
-            return
+            return False
 
         # モデル決定（指定なしの場合はロールのデフォルト）
         if model is None:
             model = role_config.get("model", "claude-sonnet-4-20250514")
 
-        # エージェントIDを生成
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        agent_num = len([a for a in self.agents if a.startswith("agent-")]) + 1
-        agent_id = f"agent-{agent_num}"
-        pane_role = f"agent-{agent_num}"  # tmux grid paneのロール名
+        # ペインを再利用するので、worktree のブランチはタスクごとに分ける
+        previous = self.agents.get(agent_id)
+        worker_id = f"{agent_id}-task{task_number}" if task_number is not None else agent_id
+
+        # 最初の await の前にエージェントを確保する（並列に起動するタスクと取り合わない）
+        # pane_id は起動に成功してから入れるので、それまでは完了チェックの対象にならない
+        self.agents[agent_id] = {
+            "role": role,
+            "pane_id": None,
+            "task": task_description,
+            "model": model,
+            "task_number": task_number,
+            "start_time": datetime.utcnow().isoformat(),
+        }
+        started = False
 
         if self.log_viewer_widget:
             self.log_viewer_widget.add_log(
@@ -79,10 +96,10 @@ class DashboardSpawnerMixin:
             agent_worktree = None
             agent_branch = None
             if self.feedback_branch and self.worktree_manager:
-                agent_branch = f"{self.feedback_branch}-{agent_id}"
+                agent_branch = f"{self.feedback_branch}-{worker_id}"
                 agent_worktree = self.worktree_manager.create_worker_worktree(
                     parent_branch=self.feedback_branch,
-                    agent_id=agent_id
+                    worker_id=worker_id,
                 )
 
                 if agent_worktree:
@@ -110,9 +127,14 @@ class DashboardSpawnerMixin:
                 log_file = self.project_path / ".mao" / "logs" / f"{agent_id}_{timestamp}.log"
                 log_file.parent.mkdir(parents=True, exist_ok=True)
 
+                # 前のタスクの claude がペインに残っていれば終了させる
+                if previous and previous.get("pane_id"):
+                    self.tmux_manager.send_prompt_to_claude_pane(previous["pane_id"], "/exit")
+                    await asyncio.sleep(1)
+
                 # ペインに割り当て（ログファイル指定）
                 pane_id = self.tmux_manager.assign_agent_to_pane(
-                    role=pane_role,
+                    role=agent_id,
                     agent_id=agent_id,
                     work_dir=work_dir,
                     log_file=log_file
@@ -169,7 +191,7 @@ Branch: {agent_branch}
                                 level="ERROR",
                                 agent_id="cto",
                             )
-                        return
+                        return False
 
                     # 2. claude起動待ち
                     await asyncio.sleep(3)
@@ -184,17 +206,13 @@ Branch: {agent_branch}
                             agent_id="cto",
                         )
 
-                    self.agents[agent_id] = {
-                        "role": role,
+                    self.agents[agent_id].update({
                         "pane_id": pane_id,
-                        "task": task_description,
                         "worktree": agent_worktree,
                         "branch": agent_branch,
-                        "model": model,
-                        "task_number": task_number,
-                        "start_time": datetime.utcnow().isoformat(),
                         "log_file": log_file,
-                    }
+                    })
+                    started = True
 
                     if self.log_viewer_widget:
                         self.log_viewer_widget.add_log(
@@ -217,7 +235,7 @@ Branch: {agent_branch}
                         level="ERROR",
                         agent_id="cto",
                     )
-                return
+                return False
 
         except Exception as e:
             if self.log_viewer_widget:
@@ -227,43 +245,209 @@ Branch: {agent_branch}
                     agent_id="cto",
                 )
 
-    async def _start_next_task(self: "InteractiveDashboard") -> None:
-        """次のタスクを開始"""
-        if self.current_task_index >= len(self.task_queue):
-            # 全タスク完了
-            if self.log_viewer_widget:
+        finally:
+            # 起動できなかったらエージェントの確保を戻す
+            if not started:
+                self.agents.pop(agent_id, None)
+
+        return started
+
+    def _queue_task(
+        self: "InteractiveDashboard",
+        task: Dict[str, Any],
+        depends_on: Optional[List[str]] = None,
+    ) -> bool:
+        """タスクをキューと依存グラフに追加
+
+        depends_on にはタスク番号、またはタスクの "id" を指定する。
+        未知の依存先は無視する（存在しないタスクを待ち続けないため）。
+
+        Args:
+            task: タスク（task_num, description, role, model, ...）
+            depends_on: 依存先のタスク番号 / ID のリスト
+
+        Returns:
+            追加できたかどうか
+        """
+        task_num = task['task_num']
+        if task.get('id'):
+            self.task_ids[str(task['id'])] = task_num
+
+        dependencies = []
+        for dependency in depends_on or []:
+            resolved = self.task_ids.get(dependency, dependency)
+            if str(resolved) in self.task_graph:
+                dependencies.append(str(resolved))
+            elif self.log_viewer_widget:
                 self.log_viewer_widget.add_log(
-                    "🎉 全タスクが完了しました！",
-                    level="INFO",
+                    f"⚠️ タスク{task_num}: 未知の依存先 '{dependency}' を無視します",
+                    level="WARN",
                     agent_id="cto",
                 )
-            return
-
-        # 現在のタスクを取得
-        current_task = self.task_queue[self.current_task_index]
-        current_task['status'] = 'in_progress'
 
-        if self.log_viewer_widget:
-            self.log_viewer_widget.add_log(
-                f"▶️ タスク{current_task['task_num']}を開始: {current_task['description'][:50]}...",
-                level="INFO",
-                agent_id="cto",
-            )
-
-        # エージェントを起動
         try:
-            await self._spawn_task_agent(
-                task_description=current_task['description'],
-                role=current_task['role'],
-                model=current_task['model'],
-                task_number=current_task['task_num'],
-            )
-        except Exception as e:
+            self.task_graph.add(str(task_num), dependencies, data=task)
+        except ValueError as e:
             if self.log_viewer_widget:
                 self.log_viewer_widget.add_log(
-                    f"❌ タスク{current_task['task_num']}の起動に失敗: {str(e)}",
+                    f"❌ タスク{task_num}を追加できません: {e}",
                     level="ERROR",
                     agent_id="cto",
                 )
-            import traceback
-            traceback.print_exc()
+            return False
+
+        task['depends_on'] = [int(d) for d in dependencies]
+        self.task_queue.append(task)
+        return True
+
+    async def _start_ready_tasks(self: "InteractiveDashboard") -> None:
+        """依存先が完了したタスクをスケジューラーに渡し、空いたエージェントで起動
+
+        タスクは優先度順に、空いているエージェントペインが取る。"agent" を指定した
+        タスクはそのエージェントのバックログに積まれ、先に空いたエージェントが奪うこともある。
+        sequential_mode の場合は1つずつ起動する。
+        """
+        scheduler = self.task_dispatcher.scheduler
+
+        ready = self.task_graph.ready()
+        if self.sequential_mode:
+            ready = ready[:max(1 - self.task_graph.running_count(), 0)]
+
+        for node in ready:
+            task = node.data
+            self.task_graph.start(node.node_id)
+            subtask = SubTask(
+                subtask_id=node.node_id,
+                parent_task_id=self.session_manager.session_id,
+                description=task['description'],
+                role=task['role'],
+                priority=task.get('priority') or "medium",
+            )
+            if task.get('agent') in scheduler.throughput:
+                if not scheduler.assign(subtask, task['agent']):
+                    self._fail_task(task['task_num'])
+            else:
+                scheduler.submit(subtask)
+
+        # 起動に失敗したエージェントは空きに戻るので、取るタスクがなくなるまで繰り返す
+        while True:
+            scheduler.dispatch()
+            claimed = []
+            for agent_id in list(scheduler.throughput):
+                running = scheduler.claim(agent_id)
+                if running is not None:
+                    claimed.append((agent_id, running))
+            if not claimed:
+                break
+
+            # 取得したタスクをすべて開始済みにしてから、エージェントを同時に起動する
+            tasks = []
+            for agent_id, running in claimed:
+                task = self.task_graph.get(running.task_id).data
+                task['status'] = 'in_progress'
+                self.running_tasks[running.task_id] = running
+                tasks.append(task)
+
+                if self.log_viewer_widget:
+                    self.log_viewer_widget.add_log(
+                        f"▶️ タスク{task['task_num']}を{agent_id}で開始: {task['description'][:50]}...",
+                        level="INFO",
+                        agent_id="cto",
+                    )
+
+            results = await asyncio.gather(
+                *(
+                    self._spawn_task_agent(
+                        agent_id=agent_id,
+                        task_description=task['description'],
+                        role=task['role'],
+                        model=task['model'],
+                        task_number=task['task_num'],
+                    )
+                    for (agent_id, _), task in zip(claimed, tasks, strict=True)
+                ),
+                return_exceptions=True,
+            )
+
+            # 起動できなかったタスクは失敗扱い（後続タスクは実行しない）
+            for task, result in zip(tasks, results, strict=True):
+                if isinstance(result, BaseException):
+                    if self.log_viewer_widget:
+                        self.log_viewer_widget.add_log(
+                            f"❌ タスク{task['task_num']}の起動に失敗: {result!r}",
+                            level="ERROR",
+                            agent_id="cto",
+                        )
+                if result is not True:
+                    self._fail_task(task['task_num'])
+
+        if self.task_queue and self.task_graph.is_finished():
+            counts = self.task_graph.counts()
+            if self.log_viewer_widget:
+                if counts["completed"] == len(self.task_graph):
+                    self.log_viewer_widget.add_log(
+                        "🎉 全タスクが完了しました！",
+                        level="INFO",
+                        agent_id="cto",
+                    )
+                else:
+                    self.log_viewer_widget.add_log(
+                        f"⚠️ 実行できるタスクがありません "
+                        f"(完了: {counts['completed']}, 失敗: {counts['failed']}, "
+                        f"待機中: {counts['pending']})",
+                        level="WARN",
+                        agent_id="cto",
+                    )
+
+    async def _complete_task(self: "InteractiveDashboard", task_number: Optional[int]) -> None:
+        """タスクを完了にして、依存先が揃ったタスクを起動
+
+        Args:
+            task_number: 承認されたタスクの番号
+        """
+        if task_number is not None:
+            node = self.task_graph.get(str(task_number))
+            if node is not None:
+                node.data['status'] = 'completed'
+                self._release_agent(node.node_id, TaskStatus.COMPLETED)
+                released = self.task_graph.complete(node.node_id)
+                if released and self.log_viewer_widget:
+                    self.log_viewer_widget.add_log(
+                        f"🔓 タスク{task_number}の完了で実行可能: "
+                        f"{', '.join(n.node_id for n in released)}",
+                        level="INFO",
+                        agent_id="cto",
+                    )
+        await self._start_ready_tasks()
+
+    def _fail_task(self: "InteractiveDashboard", task_number: int) -> None:
+        """タスクを失敗にする（依存しているタスクは実行しない）
+
+        Args:
+            task_number: タスク番号
+        """
+        node = self.task_graph.get(str(task_number))
+        if node is None:
+            return
+        node.data['status'] = 'failed'
+        self._release_agent(node.node_id, TaskStatus.FAILED)
+        blocked = self.task_graph.fail(node.node_id)
+        if blocked and self.log_viewer_widget:
+            self.log_viewer_widget.add_log(
+                f"⚠️ タスク{task_number}の失敗により実行されません: "
+                f"{', '.join(n.node_id for n in blocked)}",
+                level="WARN",
+                agent_id="cto",
+            )
+
+    def _release_agent(self: "InteractiveDashboard", node_id: str, status: TaskStatus) -> None:
+        """タスクを実行していたエージェントを空きに戻す（スループットを記録）
+
+        Args:
+            node_id: タスクのノードID（タスク番号）
+            status: タスクの結果（COMPLETED / FAILED）
+        """
+        running = self.running_tasks.pop(node_id, None)
+        if running is not None:
+            running.status = status
+            self.task_dispatcher.scheduler.finish(running)
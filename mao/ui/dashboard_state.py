@@ -3,8 +3,10 @@ Dashboard State Mixin - 状態管理・定期更新
 """
 import asyncio
 import subprocess
+import time
 from typing import TYPE_CHECKING
 
+from mao.orchestrator import cold_storage
 from mao.orchestrator.message_queue import Message, MessageType
 from mao.ui.widgets import ApprovalRequest, RiskLevel
 
@@ -12,6 +14,14 @@ if TYPE_CHECKING:
     from mao.ui.dashboard_interactive import InteractiveDashboard
 
 
+# 状態が変わらなくてもメトリクス（スループット・スパークライン）を更新する間隔（秒）
+METRICS_REFRESH_INTERVAL = 10.0
+
+# ペインに出力がなくても完了を再チェックする猶予（秒）
+# pipe-pane のログ書き込みは出力より遅れることがあり、活動時刻は秒単位のこともある
+COMPLETION_RECHECK_GRACE = 2.0
+
+
 class DashboardStateMixin:
     """状態管理を担当するミックスイン"""
 
@@ -29,12 +39,27 @@ class DashboardStateMixin:
                     self.log_viewer_widget.add_log(f"更新エラー: {e}", level="ERROR")
                 await asyncio.sleep(1.0)
 
-    async def _update_from_state_manager(self: "InteractiveDashboard") -> None:
-        """StateManagerから状態を読み込んでUIを更新"""
-        states = await self.state_manager.get_all_states()
+    async def _update_from_state_manager(
+        self: "InteractiveDashboard", force: bool = False
+    ) -> None:
+        """StateManagerから状態を読み込んでUIを更新
+
+        状態が変わっていなければ（StateManager.stats_version が同じなら）再描画しない。
+        メトリクスの時系列は時間とともに変わるため METRICS_REFRESH_INTERVAL ごとに更新する。
+
+        Args:
+            force: 変更がなくても再描画する
+        """
+        stats = self.state_manager.get_stats()
+        changed = force or stats["version"] != self._state_version
+        self._state_version = stats["version"]
+
+        now = time.monotonic()
+        refresh_metrics = changed or now - self._metrics_refreshed_at >= METRICS_REFRESH_INTERVAL
 
         # エージェント一覧を更新
-        if self.agent_list_widget:
+        if changed and self.agent_list_widget:
+            states = await self.state_manager.get_all_states()
             for state in states:
                 # 新しいエージェントのログタブを追加
                 if state.agent_id not in self.log_viewers_by_agent:
@@ -49,8 +74,7 @@ class DashboardStateMixin:
                 )
 
         # ヘッダーを更新
-        if self.header_widget:
-            stats = self.state_manager.get_stats()
+        if changed and self.header_widget:
             self.header_widget.update_task_info(
                 task_description=self.initial_prompt or "タスク実行中",
                 active_count=stats["active_agents"],
@@ -58,17 +82,19 @@ class DashboardStateMixin:
             )
 
         # メトリクスを更新
-        if self.metrics_widget:
-            stats = self.state_manager.get_stats()
+        if refresh_metrics and self.metrics_widget:
+            self._metrics_refreshed_at = now
             self.metrics_widget.update_metrics(
                 total_agents=stats["total_agents"],
                 active_agents=stats["active_agents"],
                 total_tokens=stats["total_tokens"],
                 estimated_cost=stats["total_cost"],
+                agent_utilization=self.task_dispatcher.scheduler.stats(),
+                **await self.state_manager.get_metrics(window=30 * 60),
             )
 
-        # エージェント完了を監視（シーケンシャルモードのみ）
-        if self.sequential_mode and self.tmux_manager:
+        # エージェント完了を監視
+        if self.tmux_manager:
             await self._check_agent_completion()
 
     async def _check_agent_completion(self: "InteractiveDashboard") -> None:
@@ -76,7 +102,10 @@ class DashboardStateMixin:
 
         インタラクティブモードではclaudeが常に動いているため、is_pane_busy()ではなく
         出力パターン（[MAO_TASK_COMPLETE]など）で完了を検知する。
+        ペインの状態は snapshot() の1回の list-panes で取得し、前回のチェック以降に出力が
+        ないペインはログを読み直さない。
         """
+        now = time.time()
         for agent_id, agent_info in list(self.agents.items()):
             pane_id = agent_info.get("pane_id")
             log_file = agent_info.get("log_file")
@@ -88,6 +117,18 @@ class DashboardStateMixin:
             if agent_info.get("status") == "awaiting_approval":
                 continue
 
+            # 前回のチェック以降に出力がなければスキップ（活動時刻がわからなければ毎回チェック）
+            pane = self.tmux_manager.pane_snapshot(pane_id)
+            checked_at = agent_info.get("completion_checked_at")
+            if (
+                pane is not None
+                and pane["last_activity"] is not None
+                and checked_at is not None
+                and pane["last_activity"] < checked_at - COMPLETION_RECHECK_GRACE
+            ):
+                continue
+            agent_info["completion_checked_at"] = now
+
             # 完了パターンを検出（is_pane_busy()ではなく出力パターンで判断）
             completion = None
             if log_file:
@@ -101,9 +142,9 @@ class DashboardStateMixin:
                 # ログファイルから出力を取得（pipe-paneで記録されている）
                 log_file = agent_info.get("log_file")
                 output = ""
-                if log_file and log_file.exists():
+                if log_file and cold_storage.exists(log_file):
                     try:
-                        output = log_file.read_text(encoding="utf-8", errors="ignore")
+                        output = cold_storage.read_text(log_file, errors="ignore")
                     except Exception as e:
                         # フォールバック: ペインから直接取得
                         output = self.tmux_manager.get_pane_content(pane_id, lines=200)
@@ -4,7 +4,7 @@ from textual.containers import Container, Vertical, VerticalScroll
 from textual._context import NoActiveAppError
 from rich.text import Text
 from collections import deque
-from typing import Deque, Callable, Optional, List, Dict
+from typing import Deque, Callable, Optional, List, Dict, Tuple
 import datetime
 
 
@@ -39,6 +39,22 @@ class ChatMessage:
 
         return text
 
+    @classmethod
+    def from_record(cls, role: str, content: str, timestamp: str) -> "ChatMessage":
+        """セッション履歴のメッセージから作成（timestamp は UTC の ISO 形式）"""
+        try:
+            sent_at = datetime.datetime.fromisoformat(timestamp)
+            if sent_at.tzinfo is None:
+                sent_at = sent_at.replace(tzinfo=datetime.timezone.utc)
+            sent_at = sent_at.astimezone()
+        except ValueError:
+            sent_at = None
+        return cls(role, content, sent_at)
+
+
+# 古いメッセージの読み込み関数: カーソルを受け取り、それより古いメッセージ（古い順）と新しいカーソルを返す
+HistoryLoader = Callable[[int], Tuple[List[ChatMessage], int]]
+
 
 class CTOChatWidget(Static, can_focus=True):
     """CTOとのチャットウィジェット"""
@@ -57,6 +73,10 @@ class CTOChatWidget(Static, can_focus=True):
         self._streaming_message: Optional[ChatMessage] = None
         self._streaming_buffer: str = ""
         self._thinking_text: str = ""  # 途中経過テキスト
+        # スクロールバックで読み込んだ古いメッセージ（会話履歴には含めない）
+        self.older_messages: List[ChatMessage] = []
+        self._history_loader: Optional[HistoryLoader] = None
+        self._history_cursor: int = 0
 
     def add_user_message(self, message: str):
         """ユーザーメッセージを追加"""
@@ -137,6 +157,62 @@ class CTOChatWidget(Static, can_focus=True):
             # システムメッセージは履歴に含めない
         return history
 
+    def set_history(self, cursor: int, loader: HistoryLoader):
+        """スクロールバックで読み込む古いメッセージの取得元を設定
+
+        Args:
+            cursor: 表示済みの最も古いメッセージの番号（0 なら古いメッセージはない）
+            loader: カーソルより古いメッセージの1ページと新しいカーソルを返す関数
+        """
+        self._history_cursor = cursor
+        self._history_loader = loader
+        self.refresh_display()
+
+    @property
+    def has_older_messages(self) -> bool:
+        """まだ読み込んでいない古いメッセージがあるかどうか"""
+        return self._history_loader is not None and self._history_cursor > 0
+
+    def load_older_messages(self) -> int:
+        """古いメッセージを1ページ読み込んで先頭に追加
+
+        Returns:
+            追加したメッセージ数
+        """
+        if not self.has_older_messages:
+            return 0
+        messages, self._history_cursor = self._history_loader(self._history_cursor)
+        self.older_messages[:0] = messages
+
+        # 読み込む前に見ていた位置がずれないよう、増えた高さの分だけスクロールする
+        scroll = self.parent if isinstance(self.parent, VerticalScroll) else None
+        previous_height = scroll.virtual_size.height if scroll else 0
+        self.refresh_display(scroll_end=False)
+        if scroll:
+            self.call_after_refresh(
+                lambda: scroll.scroll_to(
+                    y=scroll.virtual_size.height - previous_height, animate=False
+                )
+            )
+        return len(messages)
+
+    def _load_older_at_top(self) -> None:
+        """最上部から上にスクロールしようとしたら古いメッセージを読み込む"""
+        scroll = self.parent if isinstance(self.parent, VerticalScroll) else None
+        if scroll and scroll.scroll_y <= 0:
+            self.load_older_messages()
+
+    def action_scroll_up(self) -> None:
+        self._load_older_at_top()
+        super().action_scroll_up()
+
+    def action_page_up(self) -> None:
+        self._load_older_at_top()
+        super().action_page_up()
+
+    def on_mouse_scroll_up(self, event) -> None:
+        self._load_older_at_top()
+
     def set_thinking(self, text: str):
         """途中経過（thinking）を設定"""
         self._thinking_text = text
@@ -151,19 +227,34 @@ class CTOChatWidget(Static, can_focus=True):
         """メッセージ送信時のコールバックを設定"""
         self.on_send_callback = callback
 
-    def refresh_display(self):
-        """表示を更新"""
+    def refresh_display(self, scroll_end: bool = True):
+        """表示を更新
+
+        Args:
+            scroll_end: 更新後に最下部までスクロールするかどうか
+        """
         import logging
         logger = logging.getLogger("mao.ui.cto_chat")
 
         content = Text()
         content.append("[CTO Chat]\n", style="bold cyan")
 
-        if not self.messages and not self._streaming_message and not self._thinking_text:
+        if self.has_older_messages:
+            content.append(
+                f"↑ 古いメッセージが{self._history_cursor}件あります（上にスクロールで読み込み）\n",
+                style="dim",
+            )
+
+        if (
+            not self.messages
+            and not self.older_messages
+            and not self._streaming_message
+            and not self._thinking_text
+        ):
             content.append("CTOと対話できます。下のフィールドに入力してください。\n", style="dim")
         else:
-            # 通常のメッセージを表示
-            for msg in self.messages:
+            # 通常のメッセージを表示（スクロールバックで読み込んだ分が先）
+            for msg in [*self.older_messages, *self.messages]:
                 content.append(msg.format())
                 content.append("\n")
 
@@ -184,7 +275,8 @@ class CTOChatWidget(Static, can_focus=True):
             _ = self.app
             logger.debug(f"[CTOChat] refresh_display: Updating widget with {len(self.messages)} messages")
             self.update(content)
-            self.scroll_end(animate=False)
+            if scroll_end:
+                self.scroll_end(animate=False)
             logger.debug("[CTOChat] refresh_display: Update successful")
         except NoActiveAppError:
             # Appコンテキストがない場合はスキップ（テスト環境など）
@@ -6,6 +6,8 @@ from textual.app import ComposeResult
 from textual.containers import Container, Vertical
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 
+from mao.orchestrator.agent_metrics import sparkline
+
 
 class TaskProgressWidget(Static):
     """タスク進捗表示ウィジェット（改善版）"""
@@ -168,6 +170,12 @@ class MetricsWidget(Static):
             "failed_tasks": 0,
             "total_tokens": 0,
             "estimated_cost": 0.0,
+            # StateManager.get_metrics() の値
+            "tokens_per_minute": 0.0,
+            "cost_per_hour": 0.0,
+            "token_series": [],
+            # エージェントID -> WorkStealingScheduler.stats() の値
+            "agent_utilization": {},
         }
         # Claude API制限（概算）
         self.rate_limit_tokens_per_minute = 400_000  # Tier 2の例
@@ -197,6 +205,17 @@ class MetricsWidget(Static):
             lines.append(f"タスク: 0件")
         lines.append("")
 
+        # エージェントごとの稼働率
+        utilization = self.metrics.get("agent_utilization") or {}
+        if utilization:
+            lines.append("[bold]稼働率[/bold]")
+            for agent_id, stats in utilization.items():
+                lines.append(
+                    f"{agent_id}: {stats['utilization'] * 100:.0f}% "
+                    f"[dim]({stats['completed']}件, {stats['tasks_per_minute']:.1f}/分)[/dim]"
+                )
+            lines.append("")
+
         # Claude使用量
         lines.append("[bold cyan]Claude使用量[/bold cyan]")
         tokens = self.metrics['total_tokens']
@@ -216,6 +235,13 @@ class MetricsWidget(Static):
         else:
             lines.append(f"概算コスト: ${cost:.4f}")
 
+        # スループット（メトリクス時系列）
+        series = self.metrics.get("token_series") or []
+        if series:
+            lines.append(f"スループット: {self.metrics['tokens_per_minute']:,.0f}/分")
+            lines.append(f"消費ペース: ${self.metrics['cost_per_hour']:.2f}/時")
+            lines.append(f"[cyan]{sparkline(series)}[/cyan]")
+
         # 参考情報
         lines.append("")
         lines.append("[dim]※ 実際の使用量と制限は[/dim]")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Queue codec benchmark - YAML と JSON lines / msgpack のスループット比較
+
+Usage:
+    python3 scripts/bench_codec.py
+    python3 scripts/bench_codec.py --count 10000
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mao.orchestrator.codec import CODECS, get_codec  # noqa: E402
+from mao.orchestrator.message_queue import MessageQueue, MessageType  # noqa: E402
+
+
+def make_messages(count: int) -> List[Dict]:
+    """ベンチマーク用のメッセージ（Message.to_dict() と同じ形）"""
+    return [
+        {
+            "message_id": f"msg-20260201100000-{i:05d}",
+            "message_type": "task_completed",
+            "sender": f"agent-{i % 8}",
+            "receiver": "cto",
+            "content": f"Task {i} finished: updated 3 files, all tests passed. 完了しました。",
+            "priority": "medium",
+            "timestamp": "2026-02-01T10:00:00.000000",
+            "metadata": {"task_id": f"task-{i}", "files": ["a.py", "b.py", "c.py"]},
+        }
+        for i in range(count)
+    ]
+
+
+def timed(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench_codecs(messages: List[Dict]) -> None:
+    """エンコード + デコードのスループット"""
+    print(f"\n## Codec round trip ({len(messages)} records)\n")
+
+    # 従来のホットパス: yaml.dump / yaml.safe_load（pure Python）
+    def legacy_yaml():
+        for data in messages:
+            yaml.safe_load(yaml.dump(data, default_flow_style=False, allow_unicode=True))
+
+    results = {"yaml (legacy yaml.dump/safe_load)": timed(legacy_yaml)}
+
+    for name in CODECS:
+        try:
+            codec = get_codec(name)
+        except ImportError:
+            print(f"  (skipping {name}: not installed)")
+            continue
+
+        def round_trip(codec=codec):
+            for data in messages:
+                codec.decode(codec.encode(data))
+
+        results[name] = timed(round_trip)
+
+    _report(results, len(messages))
+
+
+def bench_queue(messages: List[Dict]) -> None:
+    """MessageQueue の送信 + 読み込み（ディスク込み）"""
+    print(f"\n## MessageQueue send + get_messages ({len(messages)} messages)\n")
+
+    configs = {"yaml backend (1 file per message)": ("yaml", {})}
+    configs["log backend, json"] = ("log", {"codec": "json"})
+    try:
+        get_codec("msgpack")
+        configs["log backend, msgpack"] = ("log", {"codec": "msgpack"})
+    except ImportError:
+        pass
+
+    results = {}
+    for label, (backend, options) in configs.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            async def run(backend=backend, options=options, tmp=tmp):
+                sender = MessageQueue(Path(tmp), backend=backend, store_options=options)
+                await sender.send_messages([
+                    {
+                        "message_type": MessageType.TASK_COMPLETED,
+                        "sender": data["sender"],
+                        "receiver": data["receiver"],
+                        "content": data["content"],
+                        "metadata": data["metadata"],
+                    }
+                    for data in messages
+                ])
+                # 別プロセス相当の新しいインスタンスで全件読み込み
+                reader = MessageQueue(Path(tmp), backend=backend, store_options=options)
+                received = await reader.get_messages("cto")
+                assert len(received) == len(messages)
+
+            results[label] = timed(lambda run=run: asyncio.run(run()))
+
+    _report(results, len(messages))
+
+
+def _report(results: Dict[str, float], count: int) -> None:
+    baseline = next(iter(results.values()))
+    print(f"  {'variant':<40} {'seconds':>9} {'msg/s':>10} {'speedup':>8}")
+    for label, seconds in results.items():
+        print(
+            f"  {label:<40} {seconds:>9.3f} {count / seconds:>10.0f} {baseline / seconds:>7.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue codec benchmark")
+    parser.add_argument("--count", type=int, default=10000, help="Number of messages")
+    args = parser.parse_args()
+
+    messages = make_messages(args.count)
+    bench_codecs(messages)
+    bench_queue(messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+tmux grid benchmark - グリッドセッション作成の所要時間
+
+Usage:
+    python3 scripts/bench_tmux_grid.py
+    python3 scripts/bench_tmux_grid.py --agents 4 8 15 --runs 10
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mao.orchestrator.tmux_manager import TmuxManager  # noqa: E402
+
+SESSION_NAME = "mao-bench-grid"
+
+
+def bench(num_agents: int, runs: int) -> List[float]:
+    """create_session_with_grid() の所要時間（秒）を runs 回計測"""
+    timings = []
+    for _ in range(runs):
+        manager = TmuxManager(
+            session_name=SESSION_NAME, use_grid_layout=True, num_agents=num_agents
+        )
+        manager.destroy_session()
+
+        start = time.perf_counter()
+        created = manager.create_session_with_grid()
+        timings.append(time.perf_counter() - start)
+
+        panes = subprocess.run(
+            ["tmux", "list-panes", "-t", f"{SESSION_NAME}:0", "-F", "#{pane_id}"],
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        manager.destroy_session()
+        if not created or len(panes) != num_agents + 1:
+            raise SystemExit(
+                f"num_agents={num_agents}: expected {num_agents + 1} panes, got {len(panes)}"
+            )
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    if not TmuxManager().is_tmux_available():
+        raise SystemExit("tmux is not available")
+
+    print(f"{'agents':>6}  {'panes':>5}  {'median':>9}  {'min':>9}")
+    for num_agents in args.agents:
+        timings = bench(num_agents, args.runs)
+        print(
+            f"{num_agents:>6}  {num_agents + 1:>5}  "
+            f"{statistics.median(timings) * 1000:>7.1f}ms  {min(timings) * 1000:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,25 @@ class TestInteractiveDashboardInitialization:
         assert dashboard.initial_prompt == "テストタスク"
         assert dashboard.tmux_manager is None
 
+    def test_redis_url_reaches_message_queue(self, tmp_path):
+        """引数の redis_url はメッセージキューのストアオプションにも渡す"""
+        config = ProjectConfig(
+            project_name="test",
+            queue={"backend": "redis"},
+            redis={"url": "redis://config:6379/0"},
+        )
+
+        with patch("mao.ui.dashboard_interactive.MessageQueue") as message_queue:
+            InteractiveDashboard(
+                project_path=tmp_path,
+                config=config,
+                redis_url="redis://explicit:6379/1",
+                tmux_manager=None,
+            )
+
+        assert message_queue.call_args.kwargs["backend"] == "redis"
+        assert message_queue.call_args.kwargs["store_options"]["url"] == "redis://explicit:6379/1"
+
     def test_dashboard_with_tmux_manager(self, tmp_path):
         """tmuxマネージャー付きダッシュボード初期化"""
         config = ProjectConfig(
@@ -321,3 +340,256 @@ security:
 
         # 設定が反映されている
         assert config.security.allow_unsafe_operations is True
+
+
+class TestTaskGraphExecution:
+    """依存関係付きタスクの並列実行テスト"""
+
+    def _dashboard(self, tmp_path, panes=None):
+        tmux_manager = None
+        if panes:
+            tmux_manager = Mock()
+            tmux_manager.grid_panes = {
+                "cto": "mao:0.0",
+                **{f"agent-{i}": f"mao:0.{i}" for i in range(1, panes + 1)},
+            }
+        dashboard = InteractiveDashboard(
+            project_path=tmp_path,
+            config=ProjectConfig(project_name="test", default_language="python"),
+            tmux_manager=tmux_manager,
+        )
+        dashboard.available_roles = {"coder_backend": {}, "tester": {}}
+        started = []
+
+        async def fake_spawn(agent_id, task_description, role, model=None, task_number=None):
+            started.append(task_number)
+            dashboard.agents[agent_id] = {"task_number": task_number}
+            return True
+
+        dashboard._spawn_task_agent = fake_spawn
+        return dashboard, started
+
+    @staticmethod
+    def _spawn_block(task, role, **extra):
+        import json
+
+        data = {"task": task, "role": role, **extra}
+        return f"[MAO_AGENT_SPAWN]\n{json.dumps(data)}\n[/MAO_AGENT_SPAWN]\n"
+
+    @pytest.mark.asyncio
+    async def test_independent_tasks_start_in_parallel(self, tmp_path):
+        """依存のないタスクは同時に起動し、依存先の承認で後続を起動する"""
+        dashboard, started = self._dashboard(tmp_path)
+
+        text = (
+            self._spawn_block("API", "coder_backend", id="api")
+            + self._spawn_block("UI", "coder_backend", id="ui")
+            + self._spawn_block("E2E", "tester", depends_on=["api", "ui"])
+        )
+        await dashboard._extract_agent_spawns(text)
+
+        assert started == [1, 2]
+
+        await dashboard._complete_task(1)
+        assert started == [1, 2]
+
+        await dashboard._complete_task(2)
+        assert started == [1, 2, 3]
+        assert dashboard.task_queue[2]["depends_on"] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_sequential_mode(self, tmp_path):
+        """sequential_mode では1つずつ起動する"""
+        dashboard, started = self._dashboard(tmp_path)
+        dashboard.sequential_mode = True
+
+        await dashboard._extract_agent_spawns(
+            self._spawn_block("API", "coder_backend") + self._spawn_block("UI", "coder_backend")
+        )
+        assert started == [1]
+
+        await dashboard._complete_task(1)
+        assert started == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_task_numbers_continue_across_responses(self, tmp_path):
+        """別の応答のタスクは通し番号になり、前の応答のタスクには id で依存できる"""
+        dashboard, started = self._dashboard(tmp_path)
+
+        await dashboard._extract_agent_spawns(self._spawn_block("API", "coder_backend", id="api"))
+        await dashboard._extract_agent_spawns(self._spawn_block("Test", "tester", depends_on="api"))
+
+        assert [task["task_num"] for task in dashboard.task_queue] == [1, 2]
+        assert started == [1]
+
+        await dashboard._complete_task(1)
+        assert started == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_dependency_numbers_are_batch_relative(self, tmp_path):
+        """depends_on の番号は両方の形式で同じ応答内のタスクを指す"""
+        dashboard, started = self._dashboard(tmp_path)
+
+        for _ in range(2):
+            await dashboard._extract_agent_spawns(
+                self._spawn_block("API", "coder_backend")
+                + self._spawn_block("Test", "tester", depends_on=1)
+            )
+        for _ in range(2):
+            await dashboard._extract_agent_spawns(
+                "Task 1: API\nRole: coder_backend\n\nTask 2: Test\nRole: tester\nDepends on: 1\n"
+            )
+
+        assert [task["task_num"] for task in dashboard.task_queue] == [1, 2, 3, 4, 5, 6, 7, 8]
+        assert [task["depends_on"] for task in dashboard.task_queue[1::2]] == [[1], [3], [5], [7]]
+        assert started == [1, 3, 5, 7]
+
+    @pytest.mark.asyncio
+    async def test_legacy_summary_skips_rejected_tasks(self, tmp_path):
+        """旧形式で追加できなかったタスクはサマリーに含めない"""
+        dashboard, started = self._dashboard(tmp_path)
+        dashboard.header_widget = Mock()
+
+        await dashboard._extract_agent_spawns(
+            "Task 1: API\nRole: coder_backend\n\nTask 1: Duplicate\nRole: coder_backend\n"
+        )
+
+        assert [task["description"] for task in dashboard.task_queue] == ["API"]
+        summary = dashboard.header_widget.update_task_info.call_args.kwargs
+        assert summary["total_count"] == 1
+        assert "Duplicate" not in summary["task_description"]
+
+    @pytest.mark.asyncio
+    async def test_tasks_wait_for_free_pane(self, tmp_path):
+        """ペイン数より多いタスクは、承認で空いたペインが優先度順に取る"""
+        dashboard, started = self._dashboard(tmp_path, panes=2)
+
+        await dashboard._extract_agent_spawns(
+            self._spawn_block("API", "coder_backend")
+            + self._spawn_block("UI", "coder_backend")
+            + self._spawn_block("Docs", "coder_backend", priority="low")
+            + self._spawn_block("Fix", "coder_backend", priority="high")
+        )
+        assert started == [4, 1]
+        assert dashboard.agents["agent-1"]["task_number"] == 4
+
+        await dashboard._complete_task(4)
+        assert started == [4, 1, 2]
+        assert dashboard.agents["agent-1"]["task_number"] == 2
+
+        stats = dashboard.task_dispatcher.scheduler.stats()
+        assert stats["agent-1"]["completed"] == 1
+        assert stats["agent-1"]["running"] == 1
+
+    @pytest.mark.asyncio
+    async def test_idle_pane_steals_pinned_task(self, tmp_path):
+        """実行中のペインに指定したタスクは、空いているペインが奪って実行する"""
+        dashboard, started = self._dashboard(tmp_path, panes=2)
+
+        await dashboard._extract_agent_spawns(
+            self._spawn_block("API", "coder_backend", agent="agent-1")
+            + self._spawn_block("UI", "coder_backend", agent="agent-1")
+        )
+
+        assert started == [1, 2]
+        assert dashboard.agents["agent-1"]["task_number"] == 1
+        assert dashboard.agents["agent-2"]["task_number"] == 2
+        assert dashboard.task_dispatcher.scheduler.stats()["agent-2"]["stolen"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_spawn_frees_pane(self, tmp_path):
+        """起動に失敗したタスクのペインは次のタスクに使う"""
+        dashboard, started = self._dashboard(tmp_path, panes=1)
+        spawn = dashboard._spawn_task_agent
+
+        async def flaky_spawn(agent_id, task_description, role, model=None, task_number=None):
+            if task_number == 1:
+                started.append(task_number)
+                return False
+            return await spawn(agent_id, task_description, role, model, task_number)
+
+        dashboard._spawn_task_agent = flaky_spawn
+
+        await dashboard._extract_agent_spawns(
+            self._spawn_block("API", "coder_backend") + self._spawn_block("UI", "coder_backend")
+        )
+
+        assert started == [1, 2]
+        assert dashboard.task_queue[0]["status"] == "failed"
+        assert dashboard.agents["agent-1"]["task_number"] == 2
+
+    @pytest.mark.asyncio
+    async def test_reused_pane_exits_previous_claude(self, tmp_path):
+        """空いたペインで次のタスクを起動する前に、前のタスクの claude を終了する"""
+        dashboard, _ = self._dashboard(tmp_path, panes=1)
+        del dashboard._spawn_task_agent
+        tmux = dashboard.tmux_manager
+        tmux.assign_agent_to_pane.return_value = "mao:0.1"
+        tmux.execute_claude_in_pane.return_value = True
+        dashboard.available_roles = {"coder_backend": {"model": "sonnet"}}
+
+        with patch("mao.ui.dashboard_spawner.asyncio.sleep", new=AsyncMock()):
+            await dashboard._extract_agent_spawns(
+                self._spawn_block("API", "coder_backend") + self._spawn_block("UI", "coder_backend")
+            )
+            assert dashboard.agents["agent-1"]["task_number"] == 1
+            tmux.send_prompt_to_claude_pane.assert_called_once()
+
+            await dashboard._complete_task(1)
+
+        assert dashboard.agents["agent-1"]["task_number"] == 2
+        prompts = [call.args[1] for call in tmux.send_prompt_to_claude_pane.call_args_list]
+        assert prompts[1] == "/exit"
+        assert tmux.assign_agent_to_pane.call_args.kwargs["role"] == "agent-1"
+
+    @pytest.mark.asyncio
+    async def test_ready_tasks_spawn_concurrently(self, tmp_path):
+        """実行可能なタスクのエージェントは1つずつ待たずに同時に起動する"""
+        dashboard, started = self._dashboard(tmp_path)
+        release = asyncio.Event()
+
+        async def slow_spawn(agent_id, task_description, role, model=None, task_number=None):
+            started.append(task_number)
+            await release.wait()
+            if task_number == 2:
+                raise RuntimeError("pane is gone")
+            dashboard.agents[agent_id] = {"task_number": task_number}
+            return True
+
+        dashboard._spawn_task_agent = slow_spawn
+        extract = asyncio.create_task(
+            dashboard._extract_agent_spawns(
+                self._spawn_block("API", "coder_backend") + self._spawn_block("UI", "coder_backend")
+            )
+        )
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+        assert started == [1, 2]
+        assert [task["status"] for task in dashboard.task_queue] == ["in_progress", "in_progress"]
+
+        release.set()
+        await extract
+        assert [task["status"] for task in dashboard.task_queue] == ["in_progress", "failed"]
+        assert dashboard.task_dispatcher.scheduler.is_idle("agent-2")
+
+    @pytest.mark.asyncio
+    async def test_spawn_reserves_agent_before_await(self, tmp_path):
+        """最初の await より前にエージェントを確保し、起動に失敗したら戻す"""
+        dashboard, _ = self._dashboard(tmp_path, panes=1)
+        del dashboard._spawn_task_agent
+        dashboard.available_roles = {"coder_backend": {"model": "sonnet"}}
+        dashboard.tmux_manager.assign_agent_to_pane.return_value = None
+        reserved = []
+
+        async def update_state(**kwargs):
+            reserved.append(dict(dashboard.agents["agent-1"]))
+
+        dashboard.state_manager.update_state = update_state
+
+        assert not await dashboard._spawn_task_agent(
+            agent_id="agent-1", task_description="API", role="coder_backend", task_number=1
+        )
+        assert reserved[0]["task_number"] == 1
+        assert reserved[0]["pane_id"] is None
+        assert "agent-1" not in dashboard.agents
@@ -0,0 +1,234 @@
+"""
+Tests for AgentMetricsStore
+"""
+import sqlite3
+
+import pytest
+
+from mao.orchestrator.agent_metrics import (
+    HOUR,
+    MINUTE,
+    AgentMetricsStore,
+    MetricSample,
+    MetricsRetention,
+    sparkline,
+)
+from mao.orchestrator.state_manager import AgentStatus, StateManager
+
+
+# 1時間バケットの境界
+T0 = 1_800_000_000.0 - 1_800_000_000.0 % HOUR
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = T0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(clock):
+    conn = sqlite3.connect(":memory:")
+    yield AgentMetricsStore(conn, clock=clock)
+    conn.close()
+
+
+def _record(store, *samples, session="s1"):
+    with store.conn:
+        store.record_many(session, [MetricSample(*sample) for sample in samples])
+    store.mark_committed()
+
+
+def _count(store, table):
+    return store.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class TestAgentMetricsStore:
+    """AgentMetricsStore のテスト"""
+
+    def test_rates_use_deltas(self, store, clock):
+        """累積値の差分からスループットとコスト消費率を計算する"""
+        _record(
+            store,
+            ("agent-1", T0, 1000, 0.1, "ACTIVE"),
+            ("agent-1", T0 + 60, 4000, 0.4, "ACTIVE"),
+            ("agent-2", T0 + 90, 500, 0.05, "THINKING"),
+        )
+        clock.now = T0 + 300
+
+        rates = store.rates("s1", window=300)
+        # 増分の合計: 1000 + 3000 + 500 トークン / 5分
+        assert rates["tokens_per_minute"] == pytest.approx(900)
+        assert rates["cost_per_hour"] == pytest.approx(0.45 * 12)
+        assert store.rates("s1", window=300, agent_id="agent-2")["tokens_per_minute"] == pytest.approx(100)
+        assert store.rates("other", window=300)["tokens_per_minute"] == 0
+
+    def test_counter_reset(self, store, clock):
+        """累積値が減ったら新しい値を増分とみなす"""
+        _record(
+            store,
+            ("agent-1", T0, 1000, 0.1, "ACTIVE"),
+            ("agent-1", T0 + 10, 200, 0.02, "ACTIVE"),
+        )
+        clock.now = T0 + 30
+
+        assert store.series("s1", window=MINUTE) == [1200]
+
+    def test_series_is_dense(self, store, clock):
+        """値のないバケットは 0 で埋める（古い順）"""
+        _record(
+            store,
+            ("agent-1", T0 + 5, 100, 0.0, "ACTIVE"),
+            ("agent-1", T0 + 125, 400, 0.0, "ACTIVE"),
+        )
+        clock.now = T0 + 150
+
+        assert store.series("s1", window=3 * MINUTE) == [100, 0, 300]
+        assert store.series("s1", resolution=HOUR, window=HOUR) == [400]
+        assert store.series("s1", "samples", window=3 * MINUTE) == [1, 0, 1]
+
+    def test_status_durations(self, store, clock):
+        """サンプル間の時間は前のサンプルの status に、現在までの時間は最後の status に計上"""
+        _record(
+            store,
+            ("agent-1", T0, 0, 0.0, "IDLE"),
+            ("agent-1", T0 + 90, 0, 0.0, "ACTIVE"),
+            ("agent-1", T0 + 150, 10, 0.0, "WAITING"),
+        )
+        clock.now = T0 + 200
+
+        durations = store.status_durations("s1", window=HOUR)
+        assert durations == pytest.approx({"IDLE": 90, "ACTIVE": 60, "WAITING": 50})
+
+    def test_raw_samples_expire(self, clock):
+        """生サンプルは保持期間後に削除されるが、ロールアップと最新サンプルは残る"""
+        conn = sqlite3.connect(":memory:")
+        store = AgentMetricsStore(
+            conn,
+            retention=MetricsRetention(raw_seconds=MINUTE, minute_seconds=10 * MINUTE),
+            clock=clock,
+        )
+        _record(
+            store,
+            ("agent-1", T0, 100, 0.0, "ACTIVE"),
+            ("agent-1", T0 + 10, 200, 0.0, "ACTIVE"),
+            ("agent-2", T0 + 20, 50, 0.0, "ACTIVE"),
+        )
+
+        clock.now = T0 + 5 * MINUTE
+        with conn:
+            store.compact()
+        assert _count(store, "agent_metric_samples") == 2
+        assert sum(store.series("s1", window=10 * MINUTE)) == 250
+
+        clock.now = T0 + 20 * MINUTE
+        with conn:
+            store.compact()
+        # 1分ロールアップは期限切れ、1時間ロールアップは残る
+        assert store.series("s1", window=20 * MINUTE) == [0] * 20
+        assert store.series("s1", resolution=HOUR, window=HOUR) == [250]
+        conn.close()
+
+    def test_state_survives_reopen(self, tmp_path, clock):
+        """再接続後も前回の最新サンプルから増分を計算する"""
+        path = tmp_path / "metrics.db"
+        conn = sqlite3.connect(str(path))
+        _record(AgentMetricsStore(conn, clock=clock), ("agent-1", T0, 1000, 0.0, "ACTIVE"))
+        conn.close()
+
+        conn = sqlite3.connect(str(path))
+        store = AgentMetricsStore(conn, clock=clock)
+        _record(store, ("agent-1", T0 + 30, 1500, 0.0, "ACTIVE"))
+        clock.now = T0 + 59
+
+        assert store.series("s1", window=MINUTE) == [1500]
+        assert store.agents("s1") == ["agent-1"]
+        conn.close()
+
+    def test_rolled_back_samples_are_recorded_again(self, store, clock):
+        """ロールバックした記録は増分の基準を進めず、再試行で同じ増分を記録する"""
+        _record(store, ("agent-1", T0, 1000, 0.0, "ACTIVE"))
+        with pytest.raises(sqlite3.OperationalError):
+            with store.conn:
+                store.record_many("s1", [MetricSample("agent-1", T0 + 10, 4000, 0.0, "ACTIVE")])
+                raise sqlite3.OperationalError("database is locked")
+        store.discard_uncommitted()
+
+        _record(store, ("agent-1", T0 + 10, 4000, 0.0, "ACTIVE"))
+        clock.now = T0 + 30
+
+        assert store.series("s1", window=MINUTE) == [4000]
+
+    def test_sparkline(self):
+        """値の大きさに応じたブロック文字"""
+        assert sparkline([0, 1, 2, 4]) == "▁▃▅█"
+        assert sparkline([0, 0]) == "▁▁"
+        assert sparkline([]) == ""
+
+
+class TestStateManagerMetrics:
+    """StateManager からのメトリクス記録のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_update_state_records_samples(self, tmp_path):
+        """状態の更新ごとにサンプルを記録する"""
+        manager = StateManager(project_path=tmp_path, session_id="s1")
+        await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=100)
+        await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=700)
+
+        metrics = await manager.get_metrics(window=MINUTE * 2)
+        assert sum(metrics["token_series"]) == 700
+        assert metrics["tokens_per_minute"] > 0
+        assert "ACTIVE" in metrics["status_seconds"]
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_samples_are_written_with_flush(self, tmp_path):
+        """write-behind の場合はフラッシュ時にまとめて書き込む"""
+        manager = StateManager(project_path=tmp_path, session_id="s1", flush_interval=60)
+        await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=100)
+        await manager.update_state("agent-1", "coder", AgentStatus.THINKING, tokens_used=300)
+
+        assert _count(manager.metrics, "agent_metric_samples") == 0
+        manager.flush()
+        assert _count(manager.metrics, "agent_metric_samples") == 2
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_memory_only_has_no_metrics(self):
+        """メモリのみの場合はメトリクスを記録しない"""
+        manager = StateManager(use_sqlite=False)
+        assert manager.metrics is None
+        assert await manager.get_metrics() == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_deltas(self, tmp_path):
+        """書き込みに失敗したフラッシュのサンプルは、再試行で同じ増分を記録する"""
+        manager = StateManager(project_path=tmp_path, session_id="s1", flush_interval=60)
+        await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=100)
+        manager.flush()
+        await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=700)
+
+        # ロールアップを書いた後、コミット前に失敗させる
+        manager.metrics.compact_interval = 0
+        compact = manager.metrics.compact
+
+        def failing_compact(now=None):
+            manager.metrics.compact = compact
+            raise sqlite3.OperationalError("database is locked")
+
+        manager.metrics.compact = failing_compact
+        with pytest.raises(sqlite3.OperationalError):
+            manager.flush()
+        manager.flush()
+
+        metrics = await manager.get_metrics(window=MINUTE * 2)
+        assert sum(metrics["token_series"]) == 700
+        manager.close()
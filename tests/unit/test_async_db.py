@@ -0,0 +1,160 @@
+"""
+Tests for AsyncDatabase
+"""
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from mao.orchestrator.async_db import AsyncDatabase, LatencyHistogram
+
+
+def _create(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TABLE IF NOT EXISTS items (name TEXT)")
+    conn.commit()
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = AsyncDatabase(tmp_path / "test.db", init=_create)
+    yield database
+    database.close()
+
+
+def _insert(name: str):
+    return lambda conn: conn.execute("INSERT INTO items (name) VALUES (?)", (name,)).lastrowid
+
+
+def _names(conn: sqlite3.Connection):
+    return [row["name"] for row in conn.execute("SELECT name FROM items ORDER BY rowid")]
+
+
+class TestAsyncDatabase:
+    """AsyncDatabase のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_write_then_read(self, db):
+        """書き込みスレッドで書き込み、読み込み用接続で読める"""
+        assert await db.execute("items.insert", _insert("a")) == 1
+        await db.execute("items.insert", _insert("b"))
+
+        assert await db.read("items.list", _names) == ["a", "b"]
+        assert db.read_sync("items.list", _names) == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_writes_run_off_the_loop(self, db):
+        """書き込みは書き込みスレッドで順番に実行される"""
+        threads = []
+
+        def job(conn):
+            threads.append(threading.current_thread().name)
+
+        await asyncio.gather(*(db.execute("noop", job) for _ in range(5)))
+
+        assert threads == ["mao-db-writer"] * 5
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_rolled_back(self, db):
+        """例外は呼び出し側に伝わり、そのトランザクションは取り消される"""
+        def broken(conn):
+            conn.execute("INSERT INTO items (name) VALUES ('lost')")
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            await db.execute("items.broken", broken)
+        await db.execute("items.insert", _insert("kept"))
+
+        assert await db.read("items.list", _names) == ["kept"]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_does_not_block_loop(self, tmp_path):
+        """キューが満杯でもイベントループは止まらない"""
+        db = AsyncDatabase(tmp_path / "test.db", init=_create, max_queue=1)
+        gate = threading.Event()
+        db.submit("gate", lambda conn: gate.wait(5))
+        db.submit("items.insert", _insert("queued"))  # キューを満杯にする
+
+        pending = asyncio.ensure_future(db.execute("items.insert", _insert("late")))
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert ticks == 5
+        assert not pending.done()
+
+        gate.set()
+        await pending
+        assert await db.read("items.list", _names) == ["queued", "late"]
+        db.close()
+
+    def test_submit_nowait_buffers_when_full(self, tmp_path):
+        """submit_nowait() はキューが満杯でも待たず、溜めた分も依頼順に書き込む"""
+        db = AsyncDatabase(tmp_path / "test.db", init=_create, max_queue=1)
+        gate = threading.Event()
+        db.submit("gate", lambda conn: gate.wait(5))
+        db.submit("items.insert", _insert("queued"))  # キューを満杯にする
+
+        futures = [db.submit_nowait("items.insert", _insert(str(i))) for i in range(5)]
+        assert not any(future.done() for future in futures)
+        assert db.queue_size() == 6
+
+        gate.set()
+        db.wait()
+        assert db.read_sync("items.list", _names) == ["queued", "0", "1", "2", "3", "4"]
+        db.close()
+
+    def test_close_runs_buffered_writes(self, tmp_path):
+        """close() は溜まっている書き込みも実行してから閉じる"""
+        db = AsyncDatabase(tmp_path / "test.db", init=_create, max_queue=1)
+        gate = threading.Event()
+        db.submit("gate", lambda conn: gate.wait(5))
+        for i in range(5):
+            db.submit_nowait("items.insert", _insert(str(i)))
+        gate.set()
+        db.close()
+
+        conn = sqlite3.connect(tmp_path / "test.db")
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 5
+        conn.close()
+
+    @pytest.mark.asyncio
+    async def test_latency_histograms(self, db):
+        """クエリ種別ごとにレイテンシを記録する"""
+        await db.execute("items.insert", _insert("a"))
+        await db.execute("items.insert", _insert("b"))
+        await db.read("items.list", _names)
+
+        stats = db.latency_stats()
+        assert stats["items.insert"]["count"] == 2
+        assert stats["items.list"]["count"] == 1
+        assert stats["items.insert"]["p95_ms"] <= stats["items.insert"]["max_ms"]
+        assert sum(stats["items.insert"]["buckets"].values()) == 2
+
+    def test_close_runs_pending_writes(self, tmp_path):
+        """close() は未処理の書き込みを実行してから閉じる"""
+        db = AsyncDatabase(tmp_path / "test.db", init=_create)
+        for i in range(10):
+            db.submit("items.insert", _insert(str(i)))
+        db.close()
+
+        conn = sqlite3.connect(tmp_path / "test.db")
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 10
+        conn.close()
+        with pytest.raises(RuntimeError):
+            db.submit("items.insert", _insert("x"))
+
+
+class TestLatencyHistogram:
+    """LatencyHistogram のテスト"""
+
+    def test_percentiles(self):
+        """パーセンタイルはバケット上限で近似する"""
+        histogram = LatencyHistogram()
+        for ms in [0.05] * 90 + [30] * 9 + [8000]:
+            histogram.record(ms)
+
+        assert histogram.percentile(50) == 0.1
+        assert histogram.percentile(95) == 50
+        assert histogram.percentile(100) == 8000
+        assert histogram.to_dict()["buckets"][">5000ms"] == 1
@@ -0,0 +1,137 @@
+"""
+Tests for queue file codecs
+"""
+import pytest
+
+from mao.orchestrator.codec import (
+    codec_for_path,
+    export_documents,
+    find_document,
+    get_codec,
+    list_documents,
+    read_document,
+    write_document,
+)
+
+
+RECORD = {"message_id": "msg-1", "content": "こんにちは", "metadata": {"files": ["a.py"]}}
+
+
+class TestCodecs:
+    """コーデックのテスト"""
+
+    @pytest.mark.parametrize("name", ["json", "yaml"])
+    def test_round_trip(self, name):
+        """エンコードしたものをデコードできる"""
+        codec = get_codec(name)
+        assert codec.decode(codec.encode(RECORD)) == RECORD
+
+    def test_json_is_one_line_per_record(self):
+        """JSON は1レコード1行"""
+        payload = get_codec("json").encode_many([RECORD, RECORD])
+
+        assert payload.count(b"\n") == 2
+        assert "こんにちは".encode("utf-8") in payload
+
+    def test_json_stream_keeps_partial_record(self):
+        """書き込み途中の末尾行は消費しない"""
+        codec = get_codec("json")
+        payload = codec.encode_many([RECORD, {"message_id": "msg-2"}])
+        chunk = payload[:-5]
+
+        frames, consumed = codec.decode_stream(chunk)
+
+        assert [record for record, _ in frames] == [RECORD]
+        assert consumed == len(codec.encode(RECORD))
+
+    def test_json_stream_skips_corrupted_line(self):
+        """壊れた行は読み飛ばしてコールバックに通知する"""
+        codec = get_codec("json")
+        errors = []
+        chunk = b"{broken\n" + codec.encode(RECORD)
+
+        frames, consumed = codec.decode_stream(chunk, errors.append)
+
+        assert [record for record, _ in frames] == [RECORD]
+        assert consumed == len(chunk)
+        assert len(errors) == 1
+
+    def test_msgpack_stream(self):
+        """msgpack のストリームも末尾の途中レコードを残す"""
+        pytest.importorskip("msgpack")
+        codec = get_codec("msgpack")
+        first = codec.encode(RECORD)
+        chunk = first + codec.encode({"message_id": "msg-2"})[:3]
+
+        frames, consumed = codec.decode_stream(chunk)
+
+        assert frames == [(RECORD, len(first))]
+        assert consumed == len(first)
+
+    def test_yaml_has_no_stream(self):
+        """YAML はログには使えない"""
+        codec = get_codec("yaml")
+        assert not codec.supports_stream
+        assert get_codec("json").supports_stream
+        with pytest.raises(ValueError, match="does not support streams"):
+            codec.decode_stream(b"")
+
+    def test_unknown_codec(self):
+        """未知のコーデック名はエラー"""
+        with pytest.raises(ValueError, match="Unknown codec"):
+            get_codec("xml")
+
+
+class TestDocuments:
+    """ドキュメントファイルのテスト"""
+
+    def test_write_and_read(self, tmp_path):
+        """デフォルトは JSON で書き込み、拡張子から読み込む"""
+        path = write_document(tmp_path, "agent-1", RECORD)
+
+        assert path.name == "agent-1.json"
+        assert read_document(path) == RECORD
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_reads_legacy_yaml(self, tmp_path):
+        """エージェントが書いた .yaml / .yml も読める"""
+        (tmp_path / "agent-1.yaml").write_text("task_id: t1\nstatus: COMPLETED\n")
+        (tmp_path / "agent-2.yml").write_text("task_id: t2\n")
+
+        assert read_document(find_document(tmp_path, "agent-1")) == {
+            "task_id": "t1",
+            "status": "COMPLETED",
+        }
+        assert codec_for_path(find_document(tmp_path, "agent-2")).name == "yaml"
+        assert [p.name for p in list_documents(tmp_path)] == ["agent-1.yaml", "agent-2.yml"]
+
+    def test_write_replaces_other_formats(self, tmp_path):
+        """同名の別形式ファイルは置き換えられる"""
+        (tmp_path / "agent-1.yaml").write_text("task_id: old\n")
+
+        write_document(tmp_path, "agent-1", {"task_id": "new"})
+
+        assert [p.name for p in list_documents(tmp_path)] == ["agent-1.json"]
+        assert read_document(find_document(tmp_path, "agent-1")) == {"task_id": "new"}
+
+    def test_exclusive_write_does_not_overwrite(self, tmp_path):
+        """exclusive=True は既存ファイル（形式を問わず）を上書きしない"""
+        (tmp_path / "agent-1.yaml").write_text("task_id: old\n")
+
+        with pytest.raises(FileExistsError):
+            write_document(tmp_path, "agent-1", {"task_id": "new"}, exclusive=True)
+
+        assert [p.name for p in tmp_path.iterdir()] == ["agent-1.yaml"]
+
+    def test_export_to_yaml(self, tmp_path):
+        """export_documents は YAML に変換してコピーする"""
+        source = tmp_path / "tasks"
+        source.mkdir()
+        write_document(source, "agent-1", RECORD)
+
+        count = export_documents(source, tmp_path / "export")
+
+        exported = tmp_path / "export" / "agent-1.yaml"
+        assert count == 1
+        assert "こんにちは" in exported.read_text(encoding="utf-8")
+        assert read_document(exported) == RECORD
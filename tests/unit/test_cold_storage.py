@@ -0,0 +1,225 @@
+"""
+Tests for ColdStorage
+"""
+import os
+import subprocess
+import time
+
+import pytest
+
+from mao.orchestrator import cold_storage
+from mao.orchestrator.cold_storage import DAY, ColdStorage
+from mao.orchestrator.session_manager import SessionManager
+
+
+def _age(path, days):
+    """ファイルの更新日時を days 日前にする"""
+    mtime = time.time() - days * DAY
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def project(tmp_path):
+    logs = tmp_path / ".mao" / "logs"
+    debug = tmp_path / ".mao" / "debug"
+    logs.mkdir(parents=True)
+    debug.mkdir(parents=True)
+    (logs / "old.log").write_text("old output\n" * 500)
+    (logs / "new.log").write_text("new output\n" * 500)
+    (debug / "cto_response_20260101_000000.txt").write_text("response " * 500)
+    _age(logs / "old.log", 10)
+    _age(debug / "cto_response_20260101_000000.txt", 10)
+    return tmp_path
+
+
+class TestColdStorage:
+    """ColdStorage のテスト"""
+
+    def test_compresses_old_files(self, project):
+        """保持期間を過ぎたファイルだけを圧縮し、元のパスで読める"""
+        storage = ColdStorage(project, compression="gzip")
+        report = storage.collect()
+
+        logs = project / ".mao" / "logs"
+        assert not (logs / "old.log").exists()
+        assert (logs / "old.log.gz").exists()
+        assert (logs / "new.log").exists()
+        assert cold_storage.read_text(logs / "old.log") == "old output\n" * 500
+
+        tiers = {tier.name: tier for tier in report.tiers}
+        assert tiers["logs"].files == 1
+        assert tiers["debug"].files == 1
+        assert tiers["sessions"].files == 0
+        assert report.reclaimed > 0
+        assert report.bytes_before - report.bytes_after == report.reclaimed
+
+    def test_keeps_mtime(self, project):
+        """圧縮後も更新日時を引き継ぐ"""
+        before = (project / ".mao" / "logs" / "old.log").stat().st_mtime
+        ColdStorage(project, compression="gzip").collect()
+
+        after = (project / ".mao" / "logs" / "old.log.gz").stat().st_mtime
+        assert after == pytest.approx(before)
+
+    def test_dry_run(self, project):
+        """dry run はサイズを計算するだけでファイルを変更しない"""
+        report = ColdStorage(project, compression="gzip").collect(dry_run=True)
+
+        assert report.files == 2
+        assert report.reclaimed > 0
+        assert (project / ".mao" / "logs" / "old.log").exists()
+        assert not (project / ".mao" / "logs" / "old.log.gz").exists()
+
+    def test_disabled_tier(self, project):
+        """保持期間が None の対象は圧縮しない"""
+        report = ColdStorage(project, compression="gzip", log_max_age=None).collect()
+
+        assert (project / ".mao" / "logs" / "old.log").exists()
+        assert report.files == 1
+
+    def test_skips_held_file(self, project):
+        """hold() で使用中のログ（pipe-pane・ダッシュボード）は圧縮しない"""
+        log = project / ".mao" / "logs" / "old.log"
+        lock = cold_storage.hold(log)
+        try:
+            ColdStorage(project, compression="gzip").collect()
+            assert log.exists()
+        finally:
+            lock.release()
+
+        ColdStorage(project, compression="gzip").collect()
+        assert not log.exists()
+
+    @pytest.mark.skipif(not os.path.isdir("/proc"), reason="requires /proc")
+    def test_skips_file_open_by_another_process(self, project):
+        """他のプロセス（pipe-pane の tee など）が開いているログは圧縮しない"""
+        log = project / ".mao" / "logs" / "old.log"
+        writer = subprocess.Popen(["sh", "-c", f"exec 3>>'{log}'; sleep 30"])
+        try:
+            deadline = time.time() + 5
+            while not cold_storage.open_files(project / ".mao") and time.time() < deadline:
+                time.sleep(0.01)
+            ColdStorage(project, compression="gzip").collect()
+            assert log.exists()
+            assert not (project / ".mao" / "logs" / "old.log.gz").exists()
+        finally:
+            writer.kill()
+            writer.wait()
+
+    def test_skips_file_modified_while_compressing(self, project, monkeypatch):
+        """圧縮している間に書き込まれたファイルは元のまま残す"""
+        log = project / ".mao" / "logs" / "old.log"
+        original = cold_storage.compress
+
+        def compress_while_appending(data, compression):
+            with open(log, "a") as f:
+                f.write("late output\n")
+            return original(data, compression)
+
+        monkeypatch.setattr(cold_storage, "compress", compress_while_appending)
+        report = ColdStorage(project, compression="gzip", debug_max_age=None).collect()
+
+        assert report.files == 0
+        assert log.read_text().endswith("late output\n")
+        assert not (project / ".mao" / "logs" / "old.log.gz").exists()
+
+    def test_read_from_offset(self, project):
+        """offset 以降だけを読める（圧縮版も同じ位置から）"""
+        log = project / ".mao" / "logs" / "old.log"
+        assert cold_storage.read_text(log, offset=11) == "old output\n" * 499
+        ColdStorage(project, compression="gzip").collect()
+        assert cold_storage.read_text(log, offset=11) == "old output\n" * 499
+
+    def test_compression_fallback(self, monkeypatch):
+        """zstandard がなければ gzip を使う"""
+        monkeypatch.setattr(cold_storage, "zstandard", None)
+        assert cold_storage.resolve_compression("zstd") == "gzip"
+        with pytest.raises(ValueError):
+            cold_storage.resolve_compression("lz4")
+
+    def test_missing_file(self, tmp_path):
+        """元のファイルも圧縮版もなければ FileNotFoundError"""
+        assert not cold_storage.exists(tmp_path / "none.log")
+        with pytest.raises(FileNotFoundError):
+            cold_storage.read_bytes(tmp_path / "none.log")
+
+
+class TestColdSessions:
+    """圧縮されたセッションのテスト"""
+
+    def _compressed_session(self, tmp_path):
+        manager = SessionManager(project_path=tmp_path, session_id="cold")
+        for i in range(3):
+            manager.add_message("user", f"message {i}")
+        manager.close()
+        _age(manager.chat_file, 60)
+
+        ColdStorage(tmp_path, compression="gzip").collect()
+        assert not manager.chat_file.exists()
+        assert not manager.index_file.exists()
+        return manager
+
+    def test_reads_compressed_session(self, tmp_path):
+        """圧縮されたセッションをそのまま読める"""
+        self._compressed_session(tmp_path)
+
+        manager = SessionManager(project_path=tmp_path, session_id="cold")
+        assert manager.message_count == 3
+        assert [m.content for m in manager.tail(2).messages] == ["message 1", "message 2"]
+        assert manager.search_messages("message 0")[0].content == "message 0"
+        # 読むだけなら展開したファイルは書き出さない
+        assert not manager.chat_file.exists()
+
+    def test_append_decompresses(self, tmp_path):
+        """追記するときは圧縮を解いてから書き込む"""
+        compressed = self._compressed_session(tmp_path)
+
+        manager = SessionManager(project_path=tmp_path, session_id="cold")
+        manager.add_message("cto", "reply")
+
+        assert manager.chat_file.exists()
+        assert cold_storage.find_compressed(compressed.chat_file) is None
+        reopened = SessionManager(project_path=tmp_path, session_id="cold")
+        assert [m.content for m in reopened.messages] == [
+            "message 0",
+            "message 1",
+            "message 2",
+            "reply",
+        ]
+
+    def test_open_session_is_not_compressed(self, tmp_path):
+        """開いているセッションは圧縮せず、閉じた後に圧縮する"""
+        manager = SessionManager(project_path=tmp_path, session_id="open")
+        manager.add_message("user", "before gc")
+        _age(manager.chat_file, 60)
+        report = ColdStorage(tmp_path, compression="gzip").collect()
+
+        assert report.files == 0
+        assert manager.chat_file.exists()
+        manager.add_message("user", "after gc")
+        assert [m.content for m in manager.messages] == ["before gc", "after gc"]
+
+        manager.close()
+        _age(manager.chat_file, 60)
+        assert ColdStorage(tmp_path, compression="gzip").collect().files == 1
+        assert not manager.chat_file.exists()
+
+    def test_compressed_without_lock(self, tmp_path, monkeypatch):
+        """ロックのない環境で開いている間に圧縮されても追記で履歴を失わない"""
+        monkeypatch.setattr(cold_storage, "fcntl", None)
+        manager = SessionManager(project_path=tmp_path, session_id="open")
+        manager.add_message("user", "before gc")
+        _age(manager.chat_file, 60)
+        ColdStorage(tmp_path, compression="gzip").collect()
+
+        manager.add_message("user", "after gc")
+        assert [m.content for m in manager.messages] == ["before gc", "after gc"]
+
+    def test_catalog_rebuild_reads_compressed(self, tmp_path):
+        """カタログを作り直すときも圧縮された履歴を検索インデックスに登録する"""
+        manager = self._compressed_session(tmp_path)
+        for path in manager.sessions_dir.glob("catalog.db*"):
+            path.unlink()
+
+        reopened = SessionManager(project_path=tmp_path, session_id="other")
+        assert len(reopened.search_history("message")) == 3
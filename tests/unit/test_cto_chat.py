@@ -0,0 +1,48 @@
+"""
+Tests for CTOChatWidget
+"""
+from mao.ui.widgets.cto_chat import ChatMessage, CTOChatWidget
+
+
+class TestCTOChatScrollback:
+    """CTOChatWidget のテスト（スクロールバックでの履歴読み込み）"""
+
+    def _loader(self, calls):
+        history = [ChatMessage("user", f"old {i}") for i in range(5)]
+
+        def load(before):
+            calls.append(before)
+            start = max(0, before - 2)
+            return history[start:before], start
+
+        return load
+
+    def test_load_older_messages(self):
+        """カーソルより古いページを先頭に追加し、会話履歴には含めない"""
+        calls = []
+        widget = CTOChatWidget()
+        widget.add_user_message("latest")
+        widget.set_history(5, self._loader(calls))
+
+        assert widget.load_older_messages() == 2
+        assert widget.load_older_messages() == 2
+        assert [msg.message for msg in widget.older_messages] == ["old 1", "old 2", "old 3", "old 4"]
+        assert calls == [5, 3]
+
+        assert widget.load_older_messages() == 1
+        assert not widget.has_older_messages
+        assert widget.load_older_messages() == 0
+        assert widget.get_conversation_history() == [{"role": "user", "content": "latest"}]
+
+    def test_no_history(self):
+        """取得元がなければ何も読み込まない"""
+        widget = CTOChatWidget()
+        assert not widget.has_older_messages
+        assert widget.load_older_messages() == 0
+
+    def test_from_record(self):
+        """UTC の ISO 形式のタイムスタンプをローカル時刻に変換する"""
+        msg = ChatMessage.from_record("cto", "hi", "2026-01-01T00:00:00")
+        assert msg.sender == "cto"
+        assert msg.timestamp.utcoffset() is not None
+        assert ChatMessage.from_record("user", "hi", "broken").timestamp is not None
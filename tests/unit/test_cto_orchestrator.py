@@ -0,0 +1,126 @@
+"""
+Tests for CTOOrchestrator
+"""
+import asyncio
+import sys
+
+import pytest
+
+from mao.orchestrator.codec import write_document
+from mao.orchestrator.cto_orchestrator import CTOOrchestrator
+from mao.orchestrator.task_queue import Task, TaskStatus
+
+
+def _result(role: str, task_id: str) -> Task:
+    return Task(
+        task_id=task_id,
+        role=role,
+        prompt="Update README wording",
+        status=TaskStatus.COMPLETED,
+        result="Updated README",
+    )
+
+
+async def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("timed out")
+        await asyncio.sleep(0.01)
+
+
+class TestMonitoring:
+    """結果監視ループのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_submit_result_wakes_loop(self, tmp_path):
+        """submit_result の通知で poll_interval を待たずに処理する"""
+        orchestrator = CTOOrchestrator(tmp_path, num_agents=2, poll_interval=30.0)
+        approved = []
+        orchestrator.set_auto_approved_callback(lambda role, reason: approved.append(role))
+
+        await orchestrator.start_monitoring()
+        await asyncio.sleep(0.05)
+        orchestrator.task_queue.submit_result(_result("agent-1", "task-1"))
+
+        await _wait_for(lambda: approved == ["agent-1"])
+        assert not orchestrator.task_queue.has_result("agent-1")
+        await orchestrator.stop_monitoring()
+
+    @pytest.mark.asyncio
+    async def test_processes_existing_results_concurrently(self, tmp_path):
+        """起動時に溜まっている複数の結果を並行して処理する"""
+        orchestrator = CTOOrchestrator(tmp_path, num_agents=3, poll_interval=30.0)
+        for i in range(3):
+            orchestrator.task_queue.submit_result(_result(f"agent-{i + 1}", f"task-{i}"))
+
+        active = []
+        peak = []
+        original = orchestrator._auto_approve_task
+
+        async def slow_approve(role, task, decision):
+            active.append(role)
+            peak.append(len(active))
+            await asyncio.sleep(0.1)
+            active.remove(role)
+            await original(role, task, decision)
+
+        orchestrator._auto_approve_task = slow_approve
+
+        await orchestrator.start_monitoring()
+        await _wait_for(lambda: not orchestrator.task_queue.list_completed_reports() and not active)
+        await asyncio.sleep(0.15)
+        await orchestrator.stop_monitoring()
+
+        assert max(peak) == 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+    async def test_agent_written_report_is_detected(self, tmp_path):
+        """エージェントが直接書いた結果ファイルも検知する"""
+        orchestrator = CTOOrchestrator(tmp_path, num_agents=1, poll_interval=30.0)
+        approved = []
+        orchestrator.set_auto_approved_callback(lambda role, reason: approved.append(role))
+
+        await orchestrator.start_monitoring()
+        await asyncio.sleep(0.05)
+        write_document(
+            orchestrator.task_queue.reports_dir,
+            "agent-1",
+            _result("agent-1", "task-1").to_dict(),
+        )
+
+        await _wait_for(lambda: approved == ["agent-1"])
+        await orchestrator.stop_monitoring()
+
+    @pytest.mark.asyncio
+    async def test_stop_removes_listener(self, tmp_path):
+        """停止すると通知先の登録が解除される"""
+        orchestrator = CTOOrchestrator(tmp_path, num_agents=1)
+
+        await orchestrator.start_monitoring()
+        await asyncio.sleep(0.05)
+        assert len(orchestrator.task_queue._result_listeners) == 1
+
+        await orchestrator.stop_monitoring()
+        assert orchestrator.task_queue._result_listeners == []
+
+    @pytest.mark.asyncio
+    async def test_failed_processing_is_not_retried_in_a_loop(self, tmp_path):
+        """処理に失敗した結果は、次の通知まで処理し直さない"""
+        orchestrator = CTOOrchestrator(tmp_path, num_agents=1, poll_interval=30.0)
+        orchestrator.task_queue.submit_result(_result("agent-1", "task-1"))
+        calls = []
+
+        async def failing_process(role):
+            calls.append(role)
+            raise RuntimeError("decision engine is down")
+
+        orchestrator._process_agent_result = failing_process
+
+        await orchestrator.start_monitoring()
+        await asyncio.sleep(0.2)
+        await orchestrator.stop_monitoring()
+
+        assert calls == ["agent-1"]
+        assert orchestrator.task_queue.has_result("agent-1")
@@ -0,0 +1,36 @@
+"""
+Tests for DocumentTracker
+"""
+import pytest
+
+from mao.orchestrator.document_tracker import DocumentTracker
+
+
+class TestDocumentTracker:
+    """DocumentTracker のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_track_and_update(self, tmp_path):
+        """追跡・更新済みマーク・完了"""
+        tracker = DocumentTracker(project_path=tmp_path)
+
+        assert await tracker.start_session("s1", "Docs")
+        assert await tracker.add_document("s1", "README.md", "API changed", line_start=3)
+        assert await tracker.add_document("s1", "docs/guide.md", "new option")
+        assert await tracker.mark_updated("s1", "README.md", "done")
+
+        documents = await tracker.get_tracked_documents("s1")
+        assert [(d["document_path"], d["updated"]) for d in documents] == [
+            ("README.md", True),
+            ("docs/guide.md", False),
+        ]
+        assert [d["document_path"] for d in await tracker.get_pending_updates("s1")] == [
+            "docs/guide.md"
+        ]
+        assert [s["session_id"] for s in await tracker.get_active_sessions()] == ["s1"]
+
+        assert await tracker.complete_session("s1")
+        assert (await tracker.get_session_info("s1"))["status"] == "completed"
+        assert await tracker.get_active_sessions() == []
+        assert "document.add" in tracker.db.latency_stats()
+        tracker.close()
@@ -0,0 +1,75 @@
+"""
+Tests for DirectoryWatcher
+"""
+import asyncio
+import sys
+
+import pytest
+
+from mao.orchestrator.fs_watcher import COMPLETE_WRITE_MASK, DirectoryWatcher
+
+
+class TestDirectoryWatcher:
+    """DirectoryWatcher のテスト"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+    async def test_inotify_wakes_on_write(self, tmp_path):
+        """inotify でファイル書き込み直後に起きる"""
+        watcher = DirectoryWatcher([tmp_path], poll_interval=10.0)
+        watcher.start()
+        try:
+            assert watcher.backend == "inotify"
+
+            waiter = asyncio.create_task(watcher.wait())
+            await asyncio.sleep(0.01)
+            assert not waiter.done()
+
+            (tmp_path / "file.log").write_text("x")
+            await asyncio.wait_for(waiter, timeout=1.0)
+        finally:
+            watcher.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+    async def test_complete_write_mask_waits_for_close(self, tmp_path):
+        """COMPLETE_WRITE_MASK では書き込み中のファイルでは起きず、閉じたときに起きる"""
+        watcher = DirectoryWatcher([tmp_path], poll_interval=10.0, mask=COMPLETE_WRITE_MASK)
+        watcher.start()
+        try:
+            waiter = asyncio.create_task(watcher.wait())
+            with open(tmp_path / "file.json", "w") as f:
+                f.write("{")
+                f.flush()
+                await asyncio.sleep(0.05)
+                assert not waiter.done()
+            await asyncio.wait_for(waiter, timeout=1.0)
+        finally:
+            watcher.close()
+
+    @pytest.mark.asyncio
+    async def test_poll_fallback_detects_changes(self, tmp_path):
+        """ポーリングフォールバックでサイズ変更を検出する"""
+        watcher = DirectoryWatcher([tmp_path], poll_interval=0.02, use_inotify=False)
+        watcher.start()
+        assert watcher.backend == "poll"
+
+        waiter = asyncio.create_task(watcher.wait())
+        await asyncio.sleep(0.1)
+        assert not waiter.done()
+
+        (tmp_path / "file.log").write_text("x")
+        await asyncio.wait_for(waiter, timeout=1.0)
+        watcher.close()
+
+    @pytest.mark.asyncio
+    async def test_notify_wakes_immediately(self, tmp_path):
+        """notify() で即座に起きる"""
+        watcher = DirectoryWatcher([tmp_path], poll_interval=10.0, use_inotify=False)
+        watcher.start()
+
+        waiter = asyncio.create_task(watcher.wait())
+        await asyncio.sleep(0.01)
+        watcher.notify()
+        await asyncio.wait_for(waiter, timeout=1.0)
+        watcher.close()
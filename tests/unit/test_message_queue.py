@@ -3,12 +3,15 @@ Tests for MessageQueue
 """
 import pytest
 import asyncio
+import yaml
 from pathlib import Path
 from mao.orchestrator.message_queue import (
     MessageQueue,
+    MessageIndex,
     Message,
     MessageType,
     MessagePriority,
+    PRIORITY_ORDER,
 )
 
 
@@ -80,6 +83,93 @@ class TestMessage:
         assert message.priority == MessagePriority.URGENT
 
 
+def _indexed_message(message_id, receiver="agent-3", priority=MessagePriority.MEDIUM,
+                     message_type=MessageType.TASK_PROGRESS, timestamp="2026-02-01T10:00:00"):
+    return Message(
+        message_id=message_id,
+        message_type=message_type,
+        sender="cto",
+        receiver=receiver,
+        content=message_id,
+        priority=priority,
+        timestamp=timestamp,
+    )
+
+
+class TestMessageIndex:
+    """MessageIndex のテスト"""
+
+    def test_peek_by_priority_and_type(self):
+        """受信者・タイプ・優先度ごとに最優先メッセージを取得"""
+        index = MessageIndex()
+        index.add(_indexed_message("m1", priority=MessagePriority.LOW))
+        index.add(_indexed_message("m2", priority=MessagePriority.URGENT,
+                                   message_type=MessageType.QUESTION))
+        index.add(_indexed_message("m3", priority=MessagePriority.URGENT,
+                                   timestamp="2026-02-01T09:00:00"))
+        index.add(_indexed_message("m4", receiver="agent-1", priority=MessagePriority.URGENT))
+
+        assert index.peek("agent-3").message_id == "m3"
+        assert index.peek("agent-3", priority=MessagePriority.URGENT).message_id == "m3"
+        assert index.peek("agent-3", message_type=MessageType.QUESTION).message_id == "m2"
+        assert index.peek("agent-3", priority=MessagePriority.LOW).message_id == "m1"
+        assert index.peek("agent-3", priority=MessagePriority.HIGH) is None
+        assert index.peek("agent-2") is None
+
+    def test_remove_is_reflected_in_peek_and_list(self):
+        """削除したメッセージは返されない"""
+        index = MessageIndex()
+        index.add(_indexed_message("m1", priority=MessagePriority.URGENT))
+        index.add(_indexed_message("m2", priority=MessagePriority.HIGH))
+
+        assert index.remove("m1").message_id == "m1"
+        assert index.remove("m1") is None
+        assert index.peek("agent-3").message_id == "m2"
+        assert [m.message_id for m in index.list()] == ["m2"]
+        assert index.count("agent-3") == 1
+
+        # 同じIDを再追加しても重複しない
+        index.add(_indexed_message("m1", priority=MessagePriority.LOW))
+        assert [m.message_id for m in index.list("agent-3")] == ["m2", "m1"]
+
+    def test_list_walks_heaps_in_order(self):
+        """list は受信者をまたいで優先度順に返し、limit 件で止まる（並べ替えない）"""
+        index = MessageIndex()
+        priorities = [MessagePriority.LOW, MessagePriority.URGENT, MessagePriority.HIGH, MessagePriority.MEDIUM]
+        expected = []
+        for i in range(40):
+            message = _indexed_message(
+                f"m{i:02d}",
+                receiver=f"agent-{i % 3}",
+                priority=priorities[i % 4],
+                timestamp=f"2026-02-01T10:00:{59 - i:02d}",
+            )
+            index.add(message)
+            expected.append(message)
+        for i in range(0, 40, 5):
+            index.remove(f"m{i:02d}")
+        expected = [m for m in expected if index.get(m.message_id)]
+        expected.sort(key=lambda m: (PRIORITY_ORDER[m.priority], m.timestamp))
+
+        assert [m.message_id for m in index.list()] == [m.message_id for m in expected]
+        assert [m.message_id for m in index.list(limit=5)] == [m.message_id for m in expected[:5]]
+        assert [m.message_id for m in index.list("agent-1", limit=3)] == [
+            m.message_id for m in expected if m.receiver == "agent-1"
+        ][:3]
+
+    def test_heap_compaction(self):
+        """無効エントリが溜まるとヒープが再構築される"""
+        index = MessageIndex()
+        for i in range(200):
+            index.add(_indexed_message(f"m{i:03d}", timestamp=f"2026-02-01T10:{i // 60:02d}:{i % 60:02d}"))
+        for i in range(199):
+            index.remove(f"m{i:03d}")
+
+        heap = index._heaps[("agent-3", None, None)]
+        assert len(heap) <= 2 + MessageIndex.COMPACT_SLACK
+        assert index.peek("agent-3").message_id == "m199"
+
+
 class TestMessageQueue:
     """MessageQueue のテスト"""
 
@@ -89,13 +179,56 @@ class TestMessageQueue:
         queue = MessageQueue(project_path=tmp_path)
 
         assert queue.project_path == tmp_path
+        assert queue.backend == "log"
+        assert queue.log_dir.exists()
+
+    @pytest.mark.asyncio
+    async def test_initialization_yaml_backend(self, tmp_path):
+        """YAMLバックエンドでの初期化"""
+        queue = MessageQueue(project_path=tmp_path, backend="yaml")
+
+        assert queue.backend == "yaml"
         assert queue.messages_dir.exists()
         assert queue.processed_dir.exists()
 
     @pytest.mark.asyncio
-    async def test_send_message(self, tmp_path):
-        """メッセージ送信"""
+    async def test_imports_pending_yaml_messages(self, tmp_path):
+        """旧形式（yaml ストア）の未処理メッセージを log ストアに取り込む"""
+        old = MessageQueue(project_path=tmp_path, backend="yaml")
+        message_id = await old.send_message(
+            message_type=MessageType.TASK_COMPLETED,
+            sender="agent-1",
+            receiver="cto",
+            content="Sent before upgrade",
+        )
+        await old.send_message(
+            message_type=MessageType.TASK_STARTED,
+            sender="agent-1",
+            receiver="cto",
+            content="Already processed",
+        )
+        processed = (await old.get_messages(message_type=MessageType.TASK_STARTED))[0]
+        await old.mark_as_processed(processed.message_id)
+
         queue = MessageQueue(project_path=tmp_path)
+        messages = await queue.get_messages(receiver="cto")
+        assert [(m.message_id, m.content) for m in messages] == [(message_id, "Sent before upgrade")]
+        assert list(queue.messages_dir.glob("*.yaml")) == []
+        assert (queue.migrated_dir / f"{message_id}.yaml").exists()
+
+        # 2回目以降は取り込まない
+        reopened = MessageQueue(project_path=tmp_path)
+        assert len(await reopened.get_messages(receiver="cto")) == 1
+
+    def test_unknown_backend(self, tmp_path):
+        """未知のバックエンドはエラー"""
+        with pytest.raises(ValueError):
+            MessageQueue(project_path=tmp_path, backend="unknown")
+
+    @pytest.mark.asyncio
+    async def test_send_message(self, tmp_path):
+        """メッセージ送信（YAMLバックエンド）"""
+        queue = MessageQueue(project_path=tmp_path, backend="yaml")
 
         message_id = await queue.send_message(
             message_type=MessageType.TASK_STARTED,
@@ -187,8 +320,8 @@ class TestMessageQueue:
 
     @pytest.mark.asyncio
     async def test_mark_as_processed(self, tmp_path):
-        """メッセージを処理済みとしてマーク"""
-        queue = MessageQueue(project_path=tmp_path)
+        """メッセージを処理済みとしてマーク（YAMLバックエンド）"""
+        queue = MessageQueue(project_path=tmp_path, backend="yaml")
 
         message_id = await queue.send_message(
             message_type=MessageType.TASK_COMPLETED,
@@ -343,3 +476,259 @@ class TestMessageQueue:
         assert stats["unprocessed"] == 1
         assert stats["processed"] == 1
         assert stats["total"] == 2
+
+    @pytest.mark.asyncio
+    async def test_mark_as_processed_log_backend(self, tmp_path):
+        """ログバックエンドで処理済みにすると未処理から消える"""
+        queue = MessageQueue(project_path=tmp_path)
+
+        message_id = await queue.send_message(
+            message_type=MessageType.TASK_COMPLETED,
+            sender="worker-1",
+            receiver="manager",
+            content="Done",
+        )
+
+        assert await queue.mark_as_processed(message_id) is True
+        assert await queue.mark_as_processed(message_id) is False
+        assert await queue.get_messages() == []
+
+        stats = queue.get_stats()
+        assert stats["unprocessed"] == 0
+        assert stats["processed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_messages_visible_across_instances(self, tmp_path):
+        """別インスタンスが送信・処理したメッセージを読み取れる"""
+        sender_queue = MessageQueue(project_path=tmp_path)
+        receiver_queue = MessageQueue(project_path=tmp_path)
+
+        assert await receiver_queue.get_messages(receiver="cto") == []
+
+        message_id = await sender_queue.send_message(
+            message_type=MessageType.TASK_STARTED,
+            sender="agent-1",
+            receiver="cto",
+            content="Started",
+        )
+
+        messages = await receiver_queue.get_messages(receiver="cto")
+        assert [m.message_id for m in messages] == [message_id]
+
+        await receiver_queue.mark_as_processed(message_id)
+        assert await sender_queue.get_messages(receiver="cto") == []
+
+    @pytest.mark.asyncio
+    async def test_start_polling_delivers_without_interval_delay(self, tmp_path):
+        """別インスタンスからの送信がポーリング間隔を待たずに届く"""
+        queue = MessageQueue(project_path=tmp_path)
+        sender_queue = MessageQueue(project_path=tmp_path)
+
+        received = asyncio.Event()
+        queue.register_handler(MessageType.TASK_COMPLETED, lambda m: received.set())
+
+        polling = asyncio.create_task(queue.start_polling(receiver="cto", interval=30.0))
+        try:
+            await asyncio.sleep(0.05)
+            await sender_queue.send_message(
+                message_type=MessageType.TASK_COMPLETED,
+                sender="agent-1",
+                receiver="cto",
+                content="Done",
+            )
+            await asyncio.wait_for(received.wait(), timeout=2.0)
+        finally:
+            polling.cancel()
+            await polling
+
+        assert await queue.get_messages(receiver="cto") == []
+        assert queue._watchers["cto"] == []
+
+    @pytest.mark.asyncio
+    async def test_next_message(self, tmp_path):
+        """受信者・優先度を指定して最優先メッセージを取得"""
+        queue = MessageQueue(project_path=tmp_path)
+
+        await queue.send_message(
+            message_type=MessageType.TASK_PROGRESS,
+            sender="cto",
+            receiver="agent-3",
+            content="Normal",
+        )
+        urgent_id = await queue.send_message(
+            message_type=MessageType.REASSIGN_REQUEST,
+            sender="cto",
+            receiver="agent-3",
+            content="Urgent",
+            priority=MessagePriority.URGENT,
+        )
+
+        message = await queue.next_message("agent-3", priority=MessagePriority.URGENT)
+        assert message.message_id == urgent_id
+
+        await queue.mark_as_processed(urgent_id)
+        assert await queue.next_message("agent-3", priority=MessagePriority.URGENT) is None
+        assert (await queue.next_message("agent-3")).content == "Normal"
+
+        # 再起動後もディスクからインデックスが再構築される
+        reopened = MessageQueue(project_path=tmp_path)
+        assert (await reopened.next_message("agent-3")).content == "Normal"
+
+    @pytest.mark.asyncio
+    async def test_send_messages_batch(self, tmp_path):
+        """まとめて送信すると受信者ごとに1回の書き込みになる"""
+        queue = MessageQueue(project_path=tmp_path, store_options={"fsync": True})
+
+        batch = [
+            {
+                "message_type": MessageType.TASK_STARTED,
+                "sender": "cto",
+                "receiver": f"agent-{i % 3}",
+                "content": f"Subtask {i}",
+            }
+            for i in range(12)
+        ]
+        writes = []
+        original = queue.store._write_records
+        queue.store._write_records = lambda p, records: (writes.append(len(records)), original(p, records))
+
+        message_ids = await queue.send_messages(batch)
+
+        assert len(message_ids) == 12
+        assert len(set(message_ids)) == 12
+        assert writes == [4, 4, 4]
+        messages = await queue.get_messages(receiver="agent-1")
+        assert [m.content for m in messages] == ["Subtask 1", "Subtask 4", "Subtask 7", "Subtask 10"]
+        assert await queue.send_messages([]) == []
+
+    @pytest.mark.asyncio
+    async def test_mark_processed_many(self, tmp_path):
+        """まとめて処理済みにする"""
+        queue = MessageQueue(project_path=tmp_path)
+        message_ids = await queue.send_messages([
+            {
+                "message_type": MessageType.TASK_COMPLETED,
+                "sender": f"agent-{i}",
+                "receiver": "cto",
+                "content": f"Done {i}",
+            }
+            for i in range(5)
+        ])
+
+        marked = await queue.mark_processed_many(message_ids[:3] + ["msg-unknown"])
+        assert marked == 3
+        assert await queue.mark_processed_many(message_ids[:3]) == 0
+
+        stats = queue.get_stats()
+        assert stats["unprocessed"] == 2
+        assert stats["processed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_mark_processed_many_yaml_backend(self, tmp_path):
+        """YAMLバックエンドでもまとめて処理済みにできる"""
+        queue = MessageQueue(project_path=tmp_path, backend="yaml")
+        message_ids = await queue.send_messages([
+            {"message_type": MessageType.TASK_STARTED, "sender": "a", "receiver": "cto", "content": "1"},
+            {"message_type": MessageType.TASK_STARTED, "sender": "b", "receiver": "cto", "content": "2"},
+        ])
+
+        assert await queue.mark_processed_many(message_ids) == 2
+        assert (queue.processed_dir / f"{message_ids[0]}.yaml").exists()
+
+    @pytest.mark.asyncio
+    async def test_consumer_groups_share_stream(self, tmp_path):
+        """複数グループが同じストリームを並行して処理する"""
+        queue = MessageQueue(project_path=tmp_path)
+        seen = []
+        queue.register_handler(MessageType.TASK_COMPLETED, lambda m: seen.append(m.content))
+
+        await queue.send_message(
+            message_type=MessageType.TASK_COMPLETED,
+            sender="agent-1",
+            receiver="cto",
+            content="Done",
+        )
+
+        assert await queue.process_messages("cto", group="dashboard") == 1
+        assert await queue.process_messages("cto", group="monitor") == 1
+        assert await queue.process_messages("cto", group="dashboard") == 0
+        assert seen == ["Done", "Done"]
+
+        # グループ処理は未処理メッセージを消費しない
+        assert len(await queue.get_messages(receiver="cto")) == 1
+
+        # 再起動後も確認済みカーソルから再開する
+        reopened = MessageQueue(project_path=tmp_path)
+        assert await reopened.consumer_group("cto", "dashboard").read() == []
+        assert queue.consumer_group("cto", "dashboard").pending_count == 0
+
+    def test_consumer_group_yaml_backend(self, tmp_path):
+        """yaml バックエンドのコンシューマーグループはバックエンド名を含むエラー"""
+        queue = MessageQueue(project_path=tmp_path, backend="yaml")
+        with pytest.raises(ValueError, match="yaml"):
+            queue.consumer_group("cto", "dashboard")
+
+    @pytest.mark.asyncio
+    async def test_compact(self, tmp_path):
+        """コンパクション後も統計情報が保たれる"""
+        queue = MessageQueue(project_path=tmp_path, store_options={"segment_max_bytes": 400})
+        message_ids = await queue.send_messages([
+            {"message_type": MessageType.TASK_PROGRESS, "sender": "agent-1",
+             "receiver": "cto", "content": f"Progress {i}"}
+            for i in range(20)
+        ])
+        await queue.mark_processed_many(message_ids)
+        await queue.send_message(
+            message_type=MessageType.TASK_COMPLETED,
+            sender="agent-1",
+            receiver="cto",
+            content="Done",
+        )
+
+        result = await queue.compact()
+
+        assert result["archived_messages"] > 0
+        stats = queue.get_stats()
+        assert stats["unprocessed"] == 1
+        assert stats["processed"] == 20
+        assert stats["archived"] == result["archived_messages"]
+        assert [m.content for m in await queue.get_messages(receiver="cto")] == ["Done"]
+
+    @pytest.mark.asyncio
+    async def test_compact_yaml_backend_is_noop(self, tmp_path):
+        """YAMLバックエンドではコンパクションしない"""
+        queue = MessageQueue(project_path=tmp_path, backend="yaml")
+        assert await queue.compact() == {}
+
+    @pytest.mark.asyncio
+    async def test_stats_do_not_hide_new_messages(self, tmp_path):
+        """get_stats で読み込んだ新着メッセージも get_messages で返される"""
+        sender_queue = MessageQueue(project_path=tmp_path)
+        queue = MessageQueue(project_path=tmp_path)
+
+        await sender_queue.send_message(
+            message_type=MessageType.TASK_STARTED,
+            sender="agent-1",
+            receiver="cto",
+            content="Started",
+        )
+
+        assert queue.get_stats()["unprocessed"] == 1
+        assert [m.content for m in await queue.get_messages(receiver="cto")] == ["Started"]
+
+    @pytest.mark.asyncio
+    async def test_export_writes_yaml_per_message(self, tmp_path):
+        """未処理メッセージを受信者ごとの YAML ファイルに書き出す"""
+        queue = MessageQueue(project_path=tmp_path)
+        message_id = await queue.send_message(
+            message_type=MessageType.TASK_STARTED,
+            sender="agent-1",
+            receiver="cto",
+            content="Started",
+        )
+
+        count = await queue.export(tmp_path / "export")
+
+        exported = tmp_path / "export" / "cto" / f"{message_id}.yaml"
+        assert count == 1
+        assert yaml.safe_load(exported.read_text())["content"] == "Started"
@@ -0,0 +1,381 @@
+"""
+Tests for message storage backends
+"""
+import os
+import time
+
+import pytest
+
+from mao.orchestrator.message_store import (
+    RetentionPolicy,
+    SegmentLogStore,
+    YamlFileStore,
+    create_message_store,
+)
+
+
+def _message(message_id: str, receiver: str = "cto") -> dict:
+    return {
+        "message_id": message_id,
+        "message_type": "task_started",
+        "sender": "agent-1",
+        "receiver": receiver,
+        "content": f"content of {message_id}",
+        "priority": "medium",
+        "timestamp": "2026-02-01T10:00:00",
+        "metadata": {},
+    }
+
+
+class TestSegmentLogStore:
+    """SegmentLogStore のテスト"""
+
+    def test_refresh_returns_only_new_records(self, tmp_path):
+        """refresh は前回のオフセット以降のレコードのみ返す"""
+        store = SegmentLogStore(tmp_path)
+
+        store.append(_message("msg-1"))
+        store.append(_message("msg-2"))
+        events = store.refresh("cto")
+        assert [e.message_id for e in events] == ["msg-1", "msg-2"]
+
+        assert store.refresh("cto") == []
+
+        store.append(_message("msg-3"))
+        events = store.refresh("cto")
+        assert [e.message_id for e in events] == ["msg-3"]
+
+    def test_partitions_per_receiver(self, tmp_path):
+        """受信者ごとに別パーティションに書き込まれる"""
+        store = SegmentLogStore(tmp_path)
+
+        store.append(_message("msg-1", receiver="cto"))
+        store.append(_message("msg-2", receiver="agent-1"))
+
+        assert [e.message_id for e in store.refresh("agent-1")] == ["msg-2"]
+        assert (store.log_dir / "cto").is_dir()
+        assert (store.log_dir / "agent-1").is_dir()
+
+    def test_segment_roll(self, tmp_path):
+        """サイズ上限でセグメントがロールし、読み取りが次のセグメントに進む"""
+        store = SegmentLogStore(tmp_path, segment_max_bytes=200)
+
+        for i in range(10):
+            store.append(_message(f"msg-{i}"))
+
+        segments = sorted((store.log_dir / "cto").glob("*.log"))
+        assert len(segments) > 1
+
+        reader = SegmentLogStore(tmp_path)
+        events = reader.refresh("cto")
+        assert [e.message_id for e in events] == [f"msg-{i}" for i in range(10)]
+
+    def test_ack_and_delete(self, tmp_path):
+        """ack と delete がレコードとして反映される"""
+        store = SegmentLogStore(tmp_path)
+        store.append(_message("msg-1"))
+        store.append(_message("msg-2"))
+
+        assert store.ack("cto", "msg-1") is True
+        assert store.ack("cto", "msg-1") is False
+        assert store.delete("msg-2") is True
+        assert store.delete("msg-unknown") is False
+
+        assert store.stats() == {"unprocessed": 0, "processed": 1, "archived": 0}
+
+        # 再起動しても同じ状態に復元される
+        reopened = SegmentLogStore(tmp_path)
+        assert reopened.stats() == {"unprocessed": 0, "processed": 1, "archived": 0}
+
+    def test_stats_does_not_rescan(self, tmp_path):
+        """stats は初回以降ディスクを走査せず、自分の書き込みだけを読み進める"""
+        store = SegmentLogStore(tmp_path)
+        other = SegmentLogStore(tmp_path)
+        store.append(_message("msg-1"))
+        assert store.stats()["unprocessed"] == 1
+
+        store._discover_partitions = None  # 呼ばれたら失敗する
+        store.append(_message("msg-2", receiver="agent-1"))
+        store.ack("cto", "msg-1")
+        assert store.stats() == {"unprocessed": 1, "processed": 1, "archived": 0}
+
+        # 他インスタンスの書き込みは refresh で反映される
+        other.append(_message("msg-3"))
+        assert store.stats()["unprocessed"] == 1
+        store.refresh("cto")
+        assert store.stats()["unprocessed"] == 2
+
+    def test_partial_line_is_not_consumed(self, tmp_path):
+        """書き込み途中の行は次回の refresh まで読まれない"""
+        store = SegmentLogStore(tmp_path)
+        store.append(_message("msg-1"))
+        store.refresh("cto")
+
+        segment = next((store.log_dir / "cto").glob("*.log"))
+        with open(segment, "ab") as f:
+            f.write(b'{"op": "ack", "id": "msg-1"')
+        assert store.refresh("cto") == []
+
+        with open(segment, "ab") as f:
+            f.write(b"}\n")
+        events = store.refresh("cto")
+        assert [(e.op, e.message_id) for e in events] == [("ack", "msg-1")]
+
+    def test_clear_resets_other_readers(self, tmp_path):
+        """clear 後は他インスタンスの未処理メッセージも削除扱いになる"""
+        writer = SegmentLogStore(tmp_path)
+        reader = SegmentLogStore(tmp_path)
+        writer.append(_message("msg-1"))
+        reader.refresh("cto")
+
+        writer.clear()
+        events = reader.refresh("cto")
+        assert [(e.op, e.message_id) for e in events] == [("del", "msg-1")]
+        assert reader.stats() == {"unprocessed": 0, "processed": 0, "archived": 0}
+
+    def test_msgpack_codec(self, tmp_path):
+        """msgpack コーデックではバイナリのセグメントに書き込む"""
+        pytest.importorskip("msgpack")
+        store = SegmentLogStore(tmp_path, codec="msgpack")
+        store.append_many([_message("msg-1"), _message("msg-2")])
+        store.ack("cto", "msg-1")
+
+        reader = SegmentLogStore(tmp_path, codec="msgpack")
+        events = reader.refresh("cto")
+        assert [(e.op, e.message_id) for e in events] == [
+            ("put", "msg-1"), ("put", "msg-2"), ("ack", "msg-1")
+        ]
+        assert events[1].data["content"] == "content of msg-2"
+        assert [p.name for p in (tmp_path / "log" / "cto").glob("*.mpk")] == ["00000000.mpk"]
+
+    def test_yaml_codec_is_rejected(self, tmp_path):
+        """ストリームに対応しないコーデックは使えない"""
+        with pytest.raises(ValueError):
+            SegmentLogStore(tmp_path, codec="yaml")
+
+
+class TestCompaction:
+    """SegmentLogStore.compact のテスト"""
+
+    def _fill(self, store, count, receiver="cto"):
+        for i in range(count):
+            store.append(_message(f"msg-{i}", receiver=receiver))
+        store.ack_many(receiver, [f"msg-{i}" for i in range(count)])
+
+    def test_compact_archives_processed_segments(self, tmp_path):
+        """処理済みの封印済みセグメントがアーカイブされる"""
+        store = SegmentLogStore(tmp_path, segment_max_bytes=300)
+        self._fill(store, 20)
+        store.append(_message("msg-live"))
+        segments_before = len(list((store.log_dir / "cto").glob("*.log")))
+
+        result = store.compact()
+
+        assert result["archived_segments"] > 0
+        assert result["archived_messages"] == 20 - store._processed
+        assert len(list((store.log_dir / "cto").glob("*.log"))) < segments_before
+        assert store.stats() == {"unprocessed": 1, "processed": 20, "archived": result["archived_messages"]}
+        archived_ids = [m["message_id"] for m in store.read_archive("cto")]
+        assert archived_ids == [f"msg-{i}" for i in range(result["archived_messages"])]
+
+        # 再起動後もカウンターが一致し、アーカイブ済みセグメントは読まない
+        reopened = SegmentLogStore(tmp_path)
+        assert reopened.stats() == store.stats()
+        assert reopened._partitions["cto"].segment > reopened._partitions["cto"].archived_through
+
+    def test_pending_messages_block_compaction(self, tmp_path):
+        """未処理メッセージを含むセグメント以降はアーカイブされない"""
+        store = SegmentLogStore(tmp_path, segment_max_bytes=300)
+        store.append(_message("msg-pending"))
+        self._fill(store, 20)
+
+        assert store.compact()["archived_segments"] == 0
+        assert store.stats()["unprocessed"] == 1
+
+    def test_group_cursor_blocks_compaction(self, tmp_path):
+        """コンシューマーグループが未確認のセグメントはアーカイブされない"""
+        store = SegmentLogStore(tmp_path, segment_max_bytes=300)
+        group = store.consumer_group("cto", "monitor")
+        group.read()
+        self._fill(store, 20)
+        group._save_cursor()
+
+        assert store.compact()["archived_segments"] == 0
+
+    def test_deleted_group_no_longer_blocks_compaction(self, tmp_path, caplog):
+        """グループを削除するとアーカイブできる（止めている間は警告する）"""
+        store = SegmentLogStore(tmp_path, segment_max_bytes=300)
+        group = store.consumer_group("cto", "monitor")
+        group.read()
+        self._fill(store, 20)
+        group._save_cursor()
+        store.append(_message("msg-live"))
+
+        assert store.compact()["archived_segments"] == 0
+        assert "'monitor'" in caplog.text
+
+        assert store.delete_consumer_group("cto", "monitor") is True
+        assert store.delete_consumer_group("cto", "monitor") is False
+        assert store.compact()["archived_segments"] > 0
+
+    def test_idle_group_expires(self, tmp_path):
+        """group_max_idle_seconds を過ぎたグループは削除され、アーカイブを止めない"""
+        store = SegmentLogStore(
+            tmp_path, segment_max_bytes=300, retention={"group_max_idle_seconds": 60}
+        )
+        group = store.consumer_group("cto", "abandoned")
+        group.read()
+        self._fill(store, 20)
+        group._save_cursor()
+        store.append(_message("msg-live"))
+
+        assert store.compact()["archived_segments"] == 0
+        stale = time.time() - 120
+        os.utime(group.cursor_file, (stale, stale))
+        assert store.compact()["archived_segments"] > 0
+        assert not group.cursor_file.exists()
+
+    def test_retention_removes_old_archives(self, tmp_path):
+        """保持ポリシーを超えたアーカイブは削除される"""
+        store = SegmentLogStore(
+            tmp_path, segment_max_bytes=300, retention={"max_messages": 3}
+        )
+        self._fill(store, 20)
+        store.append(_message("msg-live"))
+
+        result = store.compact()
+
+        assert result["removed_archives"] > 0
+        stats = store.stats()
+        assert stats["archived"] <= 3
+        assert len(list((store.archive_dir / "cto").glob("*.log.gz"))) == len(
+            store._partitions["cto"].archives
+        )
+
+    def test_retention_by_age(self, tmp_path):
+        """期限切れのアーカイブは削除される"""
+        store = SegmentLogStore(
+            tmp_path, segment_max_bytes=300, retention=RetentionPolicy(max_age_seconds=60)
+        )
+        self._fill(store, 20)
+        store.append(_message("msg-live"))
+        store.compact()
+
+        store._partitions["cto"].archives[0]["archived_at"] -= 120
+        assert store.compact()["removed_archives"] == 1
+
+    def test_lagging_reader_skips_archived_segments(self, tmp_path):
+        """他インスタンスがアーカイブしたセグメントを読み飛ばして処理済み扱いにする"""
+        writer = SegmentLogStore(tmp_path, segment_max_bytes=300)
+        reader = SegmentLogStore(tmp_path)
+        writer.append(_message("msg-0"))
+        reader.refresh("cto")
+
+        for i in range(1, 20):
+            writer.append(_message(f"msg-{i}"))
+        writer.ack_many("cto", [f"msg-{i}" for i in range(20)])
+        writer.append(_message("msg-live"))
+        writer.compact()
+
+        events = reader.refresh("cto")
+        assert ("ack", "msg-0") in [(e.op, e.message_id) for e in events]
+        assert reader.stats()["unprocessed"] == 1
+        assert reader.stats()["processed"] == 20
+
+
+class TestYamlFileStore:
+    """YamlFileStore のテスト"""
+
+    def test_refresh_detects_new_and_removed_files(self, tmp_path):
+        """新規ファイルと消えたファイルを検出する"""
+        store = YamlFileStore(tmp_path)
+        store.append(_message("msg-1"))
+
+        events = store.refresh()
+        assert [(e.op, e.message_id) for e in events] == [("put", "msg-1")]
+        assert store.refresh() == []
+
+        (store.messages_dir / "msg-1.yaml").unlink()
+        events = store.refresh()
+        assert [(e.op, e.message_id) for e in events] == [("ack", "msg-1")]
+
+
+def test_create_message_store(tmp_path):
+    """バックエンド名からストアを作成"""
+    assert isinstance(create_message_store("log", tmp_path), SegmentLogStore)
+    assert isinstance(create_message_store("yaml", tmp_path), YamlFileStore)
+    with pytest.raises(ValueError):
+        create_message_store("unknown", tmp_path)
+
+
+class TestLogConsumerGroup:
+    """LogConsumerGroup のテスト"""
+
+    def test_groups_read_independently(self, tmp_path):
+        """グループごとに独立したカーソルで全メッセージを読む"""
+        store = SegmentLogStore(tmp_path)
+        store.append(_message("msg-1"))
+        store.append(_message("msg-2"))
+
+        dashboard = store.consumer_group("cto", "dashboard")
+        monitor = store.consumer_group("cto", "monitor")
+
+        assert [m["message_id"] for m in dashboard.read()] == ["msg-1", "msg-2"]
+        assert [m["message_id"] for m in monitor.read(max_count=1)] == ["msg-1"]
+        assert [m["message_id"] for m in monitor.read()] == ["msg-2"]
+
+        # グループの読み取りは未処理ビューに影響しない
+        assert store.stats() == {"unprocessed": 2, "processed": 0, "archived": 0}
+
+    def test_unacked_messages_are_redelivered(self, tmp_path):
+        """ack 前に落ちたグループは再オープン時に再配信される"""
+        store = SegmentLogStore(tmp_path)
+        for i in range(3):
+            store.append(_message(f"msg-{i}"))
+
+        group = store.consumer_group("cto", "orchestrator")
+        group.read()
+        assert group.ack(["msg-0"]) == 1
+        assert group.pending_count() == 2
+
+        reopened = SegmentLogStore(tmp_path).consumer_group("cto", "orchestrator")
+        assert [m["message_id"] for m in reopened.read()] == ["msg-1", "msg-2"]
+
+    def test_out_of_order_ack_advances_contiguous_prefix(self, tmp_path):
+        """順不同の ack は先頭から連続した分だけカーソルを進める"""
+        store = SegmentLogStore(tmp_path)
+        for i in range(3):
+            store.append(_message(f"msg-{i}"))
+
+        group = store.consumer_group("cto", "monitor")
+        group.read()
+        group.ack(["msg-2"])
+        reopened = SegmentLogStore(tmp_path).consumer_group("cto", "monitor")
+        assert len(reopened.read()) == 3
+
+        group.ack(["msg-0", "msg-1"])
+        assert group.pending_count() == 0
+        reopened = SegmentLogStore(tmp_path).consumer_group("cto", "monitor")
+        assert reopened.read() == []
+
+        store.append(_message("msg-3"))
+        assert [m["message_id"] for m in reopened.read()] == ["msg-3"]
+
+    def test_group_follows_segment_roll(self, tmp_path):
+        """セグメントをまたいで読み進める"""
+        store = SegmentLogStore(tmp_path, segment_max_bytes=200)
+        for i in range(10):
+            store.append(_message(f"msg-{i}"))
+
+        group = store.consumer_group("cto", "monitor")
+        messages = group.read()
+        assert [m["message_id"] for m in messages] == [f"msg-{i}" for i in range(10)]
+        group.ack([m["message_id"] for m in messages])
+        assert SegmentLogStore(tmp_path).consumer_group("cto", "monitor").read() == []
+
+    def test_yaml_store_has_no_groups(self, tmp_path):
+        """YAMLストアはコンシューマーグループ非対応"""
+        with pytest.raises(ValueError, match="yaml"):
+            YamlFileStore(tmp_path).consumer_group("cto", "monitor")
+        with pytest.raises(ValueError, match="yaml"):
+            YamlFileStore(tmp_path).delete_consumer_group("cto", "monitor")
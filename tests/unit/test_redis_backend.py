@@ -0,0 +1,302 @@
+"""
+Tests for Redis backends (MessageQueue / StateManager)
+
+fakeredis（インプロセスの Redis 互換サーバー）で実行する。
+"""
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from mao.orchestrator.message_queue import MessageQueue, MessageType
+from mao.orchestrator.message_store import create_message_store
+from mao.orchestrator.project_loader import ProjectConfig
+from mao.orchestrator.redis_backend import RedisMessageStore, default_key_prefix
+from mao.orchestrator.state_manager import StateManager, AgentStatus
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+def _client(server):
+    return fakeredis.FakeRedis(server=server, decode_responses=True)
+
+
+def _message(message_id: str, receiver: str = "cto") -> dict:
+    return {
+        "message_id": message_id,
+        "message_type": "task_started",
+        "sender": "agent-1",
+        "receiver": receiver,
+        "content": f"content of {message_id}",
+        "priority": "medium",
+        "timestamp": "2026-02-01T10:00:00",
+        "metadata": {},
+    }
+
+
+def _store(tmp_path, server, **options) -> RedisMessageStore:
+    return RedisMessageStore(tmp_path / ".mao" / "queue", client=_client(server), **options)
+
+
+def _queue(tmp_path, server) -> MessageQueue:
+    return MessageQueue(
+        project_path=tmp_path, backend="redis", store_options={"client": _client(server)}
+    )
+
+
+class TestRedisMessageStore:
+    """RedisMessageStore のテスト"""
+
+    def test_create_by_name(self, tmp_path, redis_server):
+        """create_message_store で redis を選択できる"""
+        store = create_message_store(
+            "redis", tmp_path / ".mao" / "queue", client=_client(redis_server)
+        )
+
+        assert isinstance(store, RedisMessageStore)
+        assert store.prefix == default_key_prefix(tmp_path)
+
+    def test_refresh_returns_only_new_records(self, tmp_path, redis_server):
+        """refresh は前回以降のストリームエントリのみ返す"""
+        store = _store(tmp_path, redis_server)
+        store.append(_message("msg_1"))
+
+        events = store.refresh()
+        assert [(e.op, e.message_id) for e in events] == [("put", "msg_1")]
+        assert events[0].data["content"] == "content of msg_1"
+        assert store.refresh() == []
+
+        store.append(_message("msg_2"))
+        assert [e.message_id for e in store.refresh()] == ["msg_2"]
+
+    def test_new_instance_loads_pending_only(self, tmp_path, redis_server):
+        """新しいインスタンスは未処理ハッシュから起動し、処理済みは返さない"""
+        store = _store(tmp_path, redis_server)
+        store.append_many([_message("msg_1"), _message("msg_2")])
+        store.ack("cto", "msg_1")
+
+        other = _store(tmp_path, redis_server)
+        assert [(e.op, e.message_id) for e in other.refresh()] == [("put", "msg_2")]
+
+    def test_ack_is_exclusive_across_instances(self, tmp_path, redis_server):
+        """同じメッセージを2つのプロセスが ack しても1回だけ成功する"""
+        first = _store(tmp_path, redis_server)
+        second = _store(tmp_path, redis_server)
+        first.append(_message("msg_1"))
+
+        assert first.ack_many("cto", ["msg_1"]) == ["msg_1"]
+        assert second.ack_many("cto", ["msg_1"]) == []
+        assert first.stats() == {"unprocessed": 0, "processed": 1}
+
+    def test_ack_retries_when_acked_concurrently(self, tmp_path, redis_server, monkeypatch):
+        """確認と削除の間に他プロセスが ack したら、やり直して二重に ack しない"""
+        first = _store(tmp_path, redis_server)
+        second = _store(tmp_path, redis_server)
+        first.append_many([_message("msg_1"), _message("msg_2")])
+
+        pipeline_class = type(first.client.pipeline())
+        original = pipeline_class.hmget
+        interleaved = []
+
+        def hmget(pipe, *args, **kwargs):
+            result = original(pipe, *args, **kwargs)
+            if not interleaved:
+                interleaved.append(True)
+                assert second.ack_many("cto", ["msg_1"]) == ["msg_1"]
+            return result
+
+        monkeypatch.setattr(pipeline_class, "hmget", hmget)
+        assert first.ack_many("cto", ["msg_1", "msg_2"]) == ["msg_2"]
+
+        acks = [fields["id"] for _, fields in first.client.xrange(first._stream_key("cto"))
+                if fields["op"] == "ack"]
+        assert acks == ["msg_1", "msg_2"]
+        assert first.stats() == {"unprocessed": 0, "processed": 2}
+
+    def test_delete_and_clear(self, tmp_path, redis_server):
+        """削除とクリアでカウンターが更新される"""
+        store = _store(tmp_path, redis_server)
+        store.append_many([_message("msg_1"), _message("msg_2", receiver="agent-1")])
+        store.refresh()
+
+        assert store.delete("msg_2") is True
+        assert store.delete("missing") is False
+        assert [(e.op, e.message_id) for e in store.refresh()] == [("del", "msg_2")]
+        assert store.stats() == {"unprocessed": 1, "processed": 0}
+
+        store.clear()
+        assert store.stats() == {"unprocessed": 0, "processed": 0}
+        assert _store(tmp_path, redis_server).refresh() == []
+
+    def test_projects_are_isolated(self, tmp_path, redis_server):
+        """プロジェクトごとにキーが分かれる"""
+        _store(tmp_path / "a", redis_server).append(_message("msg_1"))
+
+        assert _store(tmp_path / "b", redis_server).refresh() == []
+
+    def test_compact_applies_retention(self, tmp_path, redis_server):
+        """保持ポリシーで古い処理済みメッセージを削除"""
+        store = _store(tmp_path, redis_server, retention={"max_messages": 1})
+        store.append_many([_message(f"msg_{i}") for i in range(3)])
+        store.ack_many("cto", ["msg_0", "msg_1", "msg_2"])
+
+        result = store.compact()
+
+        assert result["removed_messages"] == 2
+        assert store.stats() == {"unprocessed": 0, "processed": 1}
+
+
+class TestRedisConsumerGroup:
+    """Redis Stream のコンシューマーグループのテスト"""
+
+    def test_read_and_ack(self, tmp_path, redis_server):
+        """未確認のメッセージは再オープン時に再配信される"""
+        store = _store(tmp_path, redis_server)
+        store.append_many([_message("msg_1"), _message("msg_2")])
+
+        group = store.consumer_group("cto", "workers")
+        assert [m["message_id"] for m in group.read()] == ["msg_1", "msg_2"]
+        assert group.ack(["msg_1"]) == 1
+        assert group.pending_count() == 1
+
+        reopened = _store(tmp_path, redis_server).consumer_group("cto", "workers")
+        assert [m["message_id"] for m in reopened.read()] == ["msg_2"]
+
+    def test_skips_bookkeeping_entries(self, tmp_path, redis_server):
+        """ack / del のエントリは配信しない"""
+        store = _store(tmp_path, redis_server)
+        store.append(_message("msg_1"))
+        store.ack("cto", "msg_1")
+        store.append(_message("msg_2"))
+
+        group = store.consumer_group("cto", "audit")
+        assert [m["message_id"] for m in group.read()] == ["msg_1", "msg_2"]
+        assert group.read() == []
+
+    def test_read_respects_max_count(self, tmp_path, redis_server):
+        """max_count 件ずつ読み込む"""
+        store = _store(tmp_path, redis_server)
+        store.append_many([_message(f"msg_{i}") for i in range(3)])
+
+        group = store.consumer_group("cto", "workers")
+        assert len(group.read(max_count=2)) == 2
+        assert [m["message_id"] for m in group.read(max_count=2)] == ["msg_2"]
+
+
+class TestRedisMessageQueue:
+    """redis バックエンドの MessageQueue のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_queues_share_messages(self, tmp_path, redis_server):
+        """別プロセスのキューから送ったメッセージを受信できる"""
+        sender = _queue(tmp_path, redis_server)
+        receiver = _queue(tmp_path, redis_server)
+
+        await sender.send_message(MessageType.TASK_STARTED, "agent-1", "cto", "hello")
+        messages = await receiver.get_messages("cto")
+
+        assert [m.content for m in messages] == ["hello"]
+        assert await receiver.mark_as_processed(messages[0].message_id) is True
+        assert await sender.get_messages("cto") == []
+        assert sender.get_stats()["backend"] == "redis"
+
+    @pytest.mark.asyncio
+    async def test_subscription_wakes_on_remote_send(self, tmp_path, redis_server):
+        """別プロセスの送信で購読が起動する"""
+        sender = _queue(tmp_path, redis_server)
+        receiver = _queue(tmp_path, redis_server)
+        received = []
+        receiver.register_handler(MessageType.TASK_STARTED, received.append)
+
+        task = asyncio.create_task(receiver.start_polling("cto", interval=0.1))
+        await asyncio.sleep(0.2)
+        await sender.send_message(MessageType.TASK_STARTED, "agent-1", "cto", "ping")
+
+        for _ in range(50):
+            if received:
+                break
+            await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+
+        assert [m.content for m in received] == ["ping"]
+
+
+class TestRedisStateManager:
+    """redis バックエンドの StateManager のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_state_is_shared(self, tmp_path, redis_server):
+        """別インスタンスの状態が読み込まれ、変更が通知される"""
+        first = StateManager(
+            tmp_path, session_id="s1", redis_options={"client": _client(redis_server)}
+        )
+        second = StateManager(
+            tmp_path, session_id="s1", redis_options={"client": _client(redis_server)}
+        )
+        assert first.conn is None
+
+        await second.get_all_states()
+        await first.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=10)
+
+        for _ in range(50):
+            if second.get_stats()["total_agents"]:
+                break
+            await asyncio.sleep(0.05)
+        assert second.get_stats()["total_tokens"] == 10
+
+        third = StateManager(
+            tmp_path, session_id="s1", redis_options={"client": _client(redis_server)}
+        )
+        state = await third.get_state("agent-1")
+        assert state.status == AgentStatus.ACTIVE
+
+        await first.clear_state("agent-1")
+        for _ in range(50):
+            if not second.get_stats()["total_agents"]:
+                break
+            await asyncio.sleep(0.05)
+        assert second.get_stats()["total_agents"] == 0
+
+        for manager in (first, second, third):
+            manager.close()
+
+    @pytest.mark.asyncio
+    async def test_sessions_are_isolated(self, tmp_path, redis_server):
+        """セッションごとに別のハッシュを使う"""
+        first = StateManager(
+            tmp_path, session_id="s1", redis_options={"client": _client(redis_server)}
+        )
+        await first.update_state("agent-1", "coder", AgentStatus.ACTIVE)
+
+        other = StateManager(
+            tmp_path, session_id="s2", redis_options={"client": _client(redis_server)}
+        )
+        assert await other.get_all_states() == []
+
+        first.close()
+        other.close()
+
+
+class TestQueueConfig:
+    """キュー・Redis 設定のテスト"""
+
+    def test_store_options(self):
+        """バックエンドごとのストアオプション"""
+        config = ProjectConfig(
+            project_name="test",
+            queue={"backend": "redis", "retention": {"max_messages": 10}},
+            redis={"url": "redis://example:6379/1"},
+        )
+
+        options = config.queue.store_options(config.redis)
+        assert options["url"] == "redis://example:6379/1"
+        assert options["retention"]["max_messages"] == 10
+
+        default = ProjectConfig(project_name="test")
+        assert default.queue.backend == "log"
+        assert "fsync" in default.queue.store_options(default.redis)
@@ -3,6 +3,8 @@ Tests for SessionManager
 """
 import pytest
 import json
+import sqlite3
+import time
 from pathlib import Path
 from mao.orchestrator.session_manager import SessionManager, ChatMessage
 
@@ -296,3 +298,356 @@ class TestSessionManager:
 
         assert manager2.metadata["session_id"] == session_id
         assert manager2.metadata["message_count"] == 1
+
+
+class TestSessionChatLog:
+    """SessionManager のテスト（chat.jsonl）"""
+
+    def test_append_only(self, tmp_path):
+        """メッセージの追加は chat.jsonl への1行の追記"""
+        manager = SessionManager(project_path=tmp_path, session_id="log")
+        manager.add_message("user", "first")
+        size = manager.chat_file.stat().st_size
+
+        manager.add_message("cto", "second")
+
+        lines = manager.chat_file.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["content"] for line in lines] == ["first", "second"]
+        assert manager.chat_file.stat().st_size == size + len(lines[1].encode("utf-8")) + 1
+
+    def test_metadata_is_checkpointed(self, tmp_path, monkeypatch):
+        """メタデータは一定件数ごとに書き直し、読み込み時は履歴から数え直す"""
+        from mao.orchestrator import session_manager
+
+        monkeypatch.setattr(session_manager, "CHECKPOINT_MESSAGES", 3)
+        manager = SessionManager(project_path=tmp_path, session_id="ckpt")
+        for i in range(3):
+            manager.add_message("user", f"message {i}")
+
+        # 最初のメッセージでヘッダーを作成し、その後の2件はまだ反映しない
+        header = json.loads(manager.metadata_file.read_text())
+        assert header["message_count"] == 1
+
+        reopened = SessionManager(project_path=tmp_path, session_id="ckpt")
+        assert reopened.metadata["message_count"] == 3
+        # 数え直した件数はヘッダーとカタログにも保存する（close() されなかった場合）
+        assert json.loads(manager.metadata_file.read_text())["message_count"] == 3
+        assert reopened.find_session("ckpt")["message_count"] == 3
+
+        manager.add_message("user", "message 3")
+        assert json.loads(manager.metadata_file.read_text())["message_count"] == 4
+
+        manager.add_message("user", "message 4")
+        manager.close()
+        assert json.loads(manager.metadata_file.read_text())["message_count"] == 5
+
+    def test_migrates_legacy_chat_json(self, tmp_path):
+        """旧形式の chat.json を chat.jsonl に移行する"""
+        session_dir = tmp_path / ".mao" / "sessions" / "legacy"
+        session_dir.mkdir(parents=True)
+        (session_dir / "chat.json").write_text(json.dumps([
+            {"role": "user", "content": "old", "timestamp": "2026-01-01T00:00:00", "metadata": {}},
+        ]))
+
+        manager = SessionManager(project_path=tmp_path, session_id="legacy")
+        manager.add_message("cto", "new")
+
+        assert not (session_dir / "chat.json").exists()
+        reopened = SessionManager(project_path=tmp_path, session_id="legacy")
+        assert [m.content for m in reopened.messages] == ["old", "new"]
+
+    def test_truncates_torn_record(self, tmp_path):
+        """書き込み途中で途切れた末尾の行は捨てて、続きを追記できる"""
+        manager = SessionManager(project_path=tmp_path, session_id="torn")
+        manager.add_message("user", "complete")
+        with open(manager.chat_file, "ab") as f:
+            f.write(b'{"role": "user", "cont')
+
+        reopened = SessionManager(project_path=tmp_path, session_id="torn")
+        reopened.add_message("user", "after crash")
+
+        again = SessionManager(project_path=tmp_path, session_id="torn")
+        assert [m.content for m in again.messages] == ["complete", "after crash"]
+
+
+class TestSessionCatalog:
+    """SessionManager のテスト（セッションカタログ）"""
+
+    def test_catalog_orders_by_updated_at(self, tmp_path):
+        """一覧はカタログから更新日時の降順で取得する"""
+        for session_id in ["a", "b", "c"]:
+            SessionManager(project_path=tmp_path, session_id=session_id).add_message("user", "hi")
+        manager = SessionManager(project_path=tmp_path, session_id="a")
+        manager.set_title("renamed")
+
+        sessions = manager.get_all_sessions(limit=2)
+        assert [s["session_id"] for s in sessions] == ["a", "c"]
+        assert sessions[0]["title"] == "renamed"
+        assert manager.get_latest_session_id() == "a"
+        assert manager.get_session_count() == 3
+
+    def test_find_by_suffix(self, tmp_path):
+        """短縮IDでセッションを探せる"""
+        SessionManager(project_path=tmp_path, session_id="20260101_abcdef12").add_message("user", "x")
+        manager = SessionManager(project_path=tmp_path, session_id="20260101_abcdef12")
+
+        assert manager.find_session("abcdef12")["session_id"] == "20260101_abcdef12"
+        assert manager.find_session("20260101_abcdef12")["session_id"] == "20260101_abcdef12"
+        assert manager.find_session("zzz") is None
+
+    def test_delete_removes_from_catalog(self, tmp_path):
+        """削除したセッションはカタログからも消える"""
+        manager = SessionManager(project_path=tmp_path, session_id="gone")
+        manager.add_message("user", "bye")
+        manager.delete_session()
+
+        assert manager.get_all_sessions() == []
+
+    def test_writes_do_not_wait_for_lock(self, tmp_path):
+        """カタログがロックされていても add_message は書き込みを待たずに戻る"""
+        manager = SessionManager(project_path=tmp_path, session_id="locked")
+        manager.add_message("user", "first")
+        manager.checkpoint()
+        manager.catalog.wait()
+
+        blocker = sqlite3.connect(str(manager.catalog.db_path))
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            started = time.monotonic()
+            manager.add_message("user", "written while locked")
+            manager.checkpoint()
+            assert time.monotonic() - started < 1.0
+        finally:
+            blocker.rollback()
+            blocker.close()
+
+        # 読み込みは依頼済みの書き込みの完了を待つ
+        assert [hit["seq"] for hit in manager.search_history("locked")] == [1]
+        assert manager.get_all_sessions()[0]["message_count"] == 2
+        manager.close()
+
+    def test_catalog_is_built_from_existing_sessions(self, tmp_path):
+        """カタログがない場合は既存の metadata.json から作成する"""
+        manager = SessionManager(project_path=tmp_path, session_id="old")
+        manager.add_message("user", "hi")
+        manager.close()
+        for path in manager.sessions_dir.glob("catalog.db*"):
+            path.unlink()
+
+        reopened = SessionManager(project_path=tmp_path)
+        assert reopened.session_id == "old"
+        assert [s["session_id"] for s in reopened.get_all_sessions()] == ["old"]
+
+
+    def test_latest_skips_removed_directories(self, tmp_path):
+        """delete_session() を通さずに消されたセッションは最新として使わず、カタログから外す"""
+        import shutil
+
+        SessionManager(project_path=tmp_path, session_id="kept").add_message("user", "hi")
+        removed = SessionManager(project_path=tmp_path, session_id="removed")
+        removed.add_message("user", "hi")
+        shutil.rmtree(removed.session_dir)
+
+        manager = SessionManager(project_path=tmp_path)
+        assert manager.session_id == "kept"
+        assert not removed.session_dir.exists()
+        assert [s["session_id"] for s in manager.get_all_sessions()] == ["kept"]
+
+    def test_rebuild_catalog(self, tmp_path):
+        """カタログをセッションディレクトリから作り直す"""
+        import shutil
+
+        manager = SessionManager(project_path=tmp_path, session_id="a")
+        manager.add_message("user", "alpha message")
+        other = SessionManager(project_path=tmp_path, session_id="b")
+        other.add_message("user", "beta message")
+        shutil.rmtree(other.session_dir)
+
+        assert manager.rebuild_catalog() == 1
+        assert [s["session_id"] for s in manager.get_all_sessions()] == ["a"]
+        assert [hit["session_id"] for hit in manager.search_history("message")] == ["a"]
+
+
+class TestSessionSearch:
+    """SessionManager のテスト（全文検索）"""
+
+    def _populate(self, tmp_path):
+        first = SessionManager(project_path=tmp_path, session_id="first", title="DB設計")
+        first.add_message("user", "データベースのスキーマを設計して")
+        first.add_message("cto", "SQLite index を追加します")
+        second = SessionManager(project_path=tmp_path, session_id="second")
+        second.add_message("user", "index の設計を見直して")
+        second.add_message("cto", "Rebuild the search index; the index is stale")
+        return second
+
+    def test_search_across_sessions(self, tmp_path):
+        """全セッションを関連度順に検索できる"""
+        manager = self._populate(tmp_path)
+
+        hits = manager.search_history("index")
+        assert len(hits) == 3
+        assert {hit["session_id"] for hit in hits} == {"first", "second"}
+        # bm25 のスコアは小さいほど関連度が高い
+        assert [hit["rank"] for hit in hits] == sorted(hit["rank"] for hit in hits)
+        titles = {hit["session_id"]: hit["title"] for hit in hits}
+        assert titles["first"] == "DB設計"
+        assert manager.search_history("index", limit=1) == hits[:1]
+
+    def test_phrase_and_role_filter(self, tmp_path):
+        """フレーズ検索とロールでの絞り込み"""
+        manager = self._populate(tmp_path)
+
+        assert [hit["seq"] for hit in manager.search_history('"search index"')] == [1]
+        assert manager.search_history('"index search"') == []
+        hits = manager.search_history("設計", role="user")
+        assert {hit["session_id"] for hit in hits} == {"first", "second"}
+        assert all(hit["role"] == "user" for hit in hits)
+
+    def test_short_terms(self, tmp_path):
+        """インデックスで照合できない短い語は部分一致で検索する"""
+        manager = self._populate(tmp_path)
+
+        hits = manager.search_history("DB index")
+        assert hits == []
+        hits = manager.search_history("の 設計")
+        assert len(hits) == 2
+
+    def test_index_is_rebuilt(self, tmp_path):
+        """インデックスがない、またはずれている場合は作り直す"""
+        manager = self._populate(tmp_path)
+        manager.close()
+        for path in manager.sessions_dir.glob("catalog.db*"):
+            path.unlink()
+        # インデックス登録前に追記されたメッセージ
+        with open(manager.chat_file, "ab") as f:
+            f.write(b'{"role": "user", "content": "appended offline", "timestamp": "t", "metadata": {}}\n')
+
+        reopened = SessionManager(project_path=tmp_path, session_id="first")
+        assert len(reopened.search_history("index")) == 3
+        assert SessionManager(project_path=tmp_path, session_id="second").search_messages("offline")[0].content == "appended offline"
+
+    def test_delete_and_clear_remove_from_index(self, tmp_path):
+        """削除・クリアしたメッセージは検索されない"""
+        manager = self._populate(tmp_path)
+        manager.clear_messages()
+        assert {hit["session_id"] for hit in manager.search_history("index")} == {"first"}
+
+        SessionManager(project_path=tmp_path, session_id="first").delete_session()
+        assert manager.search_history("index") == []
+
+
+class TestSessionPagination:
+    """SessionManager のテスト（ページ単位の読み込み）"""
+
+    def _populate(self, tmp_path, count=7):
+        manager = SessionManager(project_path=tmp_path, session_id="paged")
+        for i in range(count):
+            manager.add_message("user", f"message {i}")
+        return SessionManager(project_path=tmp_path, session_id="paged")
+
+    def test_tail_and_page(self, tmp_path):
+        """最新から順にカーソルで古いページを取得できる"""
+        manager = self._populate(tmp_path)
+
+        tail = manager.tail(3)
+        assert [m.content for m in tail.messages] == ["message 4", "message 5", "message 6"]
+        assert tail.cursor == 4 and tail.has_more
+
+        older = manager.page(before=tail.cursor, limit=3)
+        assert [m.content for m in older.messages] == ["message 1", "message 2", "message 3"]
+
+        oldest = manager.page(before=older.cursor, limit=3)
+        assert [m.content for m in oldest.messages] == ["message 0"]
+        assert oldest.cursor == 0 and not oldest.has_more
+
+        assert manager.get_message(5).content == "message 5"
+        assert manager.get_message(7) is None
+        assert manager.message_count == 7
+
+    def test_page_after_append(self, tmp_path):
+        """追加したメッセージもページで取得できる"""
+        manager = self._populate(tmp_path, count=2)
+        manager.add_message("cto", "new")
+
+        assert [m.content for m in manager.tail(2).messages] == ["message 1", "new"]
+        assert [m.content for m in manager.page(before=1).messages] == ["message 0"]
+
+    def test_index_is_rebuilt(self, tmp_path):
+        """chat.idx がない・壊れている場合は chat.jsonl から作り直す"""
+        manager = self._populate(tmp_path, count=4)
+        manager.index_file.unlink()
+        assert [m.content for m in SessionManager(project_path=tmp_path, session_id="paged").tail(2).messages] == [
+            "message 2",
+            "message 3",
+        ]
+
+        manager.index_file.write_bytes(b"\x01" * 8)
+        reopened = SessionManager(project_path=tmp_path, session_id="paged")
+        assert reopened.message_count == 4
+        assert reopened.get_message(0).content == "message 0"
+
+    def test_index_catches_up(self, tmp_path):
+        """chat.idx に反映される前の追記は開いたときに走査して追加する"""
+        manager = self._populate(tmp_path, count=2)
+        with open(manager.chat_file, "ab") as f:
+            f.write(b'{"role": "cto", "content": "unindexed", "timestamp": "t", "metadata": {}}\n')
+
+        reopened = SessionManager(project_path=tmp_path, session_id="paged")
+        assert reopened.message_count == 3
+        assert reopened.tail(1).messages[0].content == "unindexed"
+        assert len(reopened.index_file.read_bytes()) == 3 * 8
+
+    def test_clear_resets_pages(self, tmp_path):
+        """クリア後は空のページを返す"""
+        manager = self._populate(tmp_path, count=3)
+        manager.clear_messages()
+
+        page = manager.tail()
+        assert page.messages == [] and page.cursor == 0
+        manager.add_message("user", "fresh")
+        assert [m.content for m in SessionManager(project_path=tmp_path, session_id="paged").messages] == ["fresh"]
+
+    def test_stats_and_role_filter_do_not_read_whole_log(self, tmp_path):
+        """統計とロールでの絞り込みは履歴全体を読まない"""
+        manager = SessionManager(project_path=tmp_path, session_id="paged")
+        for i in range(6):
+            manager.add_message("user" if i % 2 == 0 else "cto", f"message {i}")
+        manager.add_message("system", "note")
+        reopened = SessionManager(project_path=tmp_path, session_id="paged")
+        reopened.add_message("cto", "after reopen")
+
+        def fail(start, end):
+            raise AssertionError(f"read messages {start}..{end}")
+
+        reopened._read_range = fail
+        stats = reopened.get_session_stats()
+        assert stats["total_messages"] == 8
+        assert (stats["user_messages"], stats["cto_messages"], stats["system_messages"]) == (3, 4, 1)
+
+        assert [m.content for m in reopened.get_messages(role="cto", limit=2)] == ["message 5", "after reopen"]
+        assert [m.content for m in reopened.get_messages(role="user")] == ["message 0", "message 2", "message 4"]
+
+        del reopened._read_range
+        reopened.clear_messages()
+        assert reopened.get_session_stats()["cto_messages"] == 0
+        assert reopened.get_messages(role="cto") == []
+
+    def test_role_lookups_use_index(self, tmp_path):
+        """ロールごとの件数とメッセージ番号は全文検索インデックスを走査せずに引く"""
+        manager = SessionManager(project_path=tmp_path, session_id="paged")
+        manager.add_message("user", "hello")
+        manager.add_message("cto", "hi")
+        manager.catalog.wait()
+
+        conn = sqlite3.connect(str(manager.catalog.db_path))
+        try:
+            for query in [
+                "SELECT role, message_count FROM session_roles WHERE session_id = 'paged'",
+                "SELECT seq FROM message_roles WHERE session_id = 'paged' AND role = 'cto' ORDER BY seq DESC LIMIT 10",
+            ]:
+                plan = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+                assert "USING PRIMARY KEY" in plan and "messages_fts" not in plan, plan
+        finally:
+            conn.close()
+        assert manager.catalog.role_counts("paged") == {"user": 1, "cto": 1}
+        assert manager.catalog.message_seqs("paged", "cto") == [1]
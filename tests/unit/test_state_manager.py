@@ -4,7 +4,7 @@ Tests for StateManager
 import pytest
 import asyncio
 from pathlib import Path
-from mao.orchestrator.state_manager import StateManager, AgentState, AgentStatus
+from mao.orchestrator.state_manager import SCHEMA_VERSION, StateManager, AgentState, AgentStatus
 
 
 class TestAgentState:
@@ -333,3 +333,216 @@ class TestStateManagerSQLite:
         assert len(states) == 0
 
         manager2.close()
+
+
+class TestStateManagerWriteBehind:
+    """StateManager のテスト（write-behind）"""
+
+    @staticmethod
+    def _rows(manager):
+        return {
+            row["agent_id"]: row["tokens_used"]
+            for row in manager.conn.execute("SELECT agent_id, tokens_used FROM agent_states")
+        }
+
+    @pytest.mark.asyncio
+    async def test_wal_mode(self, tmp_path):
+        """WAL と synchronous=NORMAL を使用する"""
+        manager = StateManager(project_path=tmp_path)
+
+        assert manager.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert manager.conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_updates_are_coalesced(self, tmp_path):
+        """同じエージェントの更新はまとめて1回書き込む"""
+        manager = StateManager(project_path=tmp_path, flush_interval=60.0)
+
+        for tokens in range(1, 6):
+            await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=tokens)
+
+        # 読み手はメモリ内の最新状態を見る
+        assert (await manager.get_state("agent-1")).tokens_used == 5
+        assert self._rows(manager) == {}
+
+        assert manager.flush() == 1
+        assert self._rows(manager) == {"agent-1": 5}
+        assert manager.flush() == 0
+
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_interval(self, tmp_path):
+        """flush_interval ごとに書き込む"""
+        manager = StateManager(project_path=tmp_path, flush_interval=0.05)
+
+        await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=10)
+        await asyncio.sleep(0.2)
+
+        assert self._rows(manager) == {"agent-1": 10}
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_deletes_and_clear(self, tmp_path):
+        """close() で削除・全削除も書き込む"""
+        manager = StateManager(project_path=tmp_path, flush_interval=60.0)
+        await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE)
+        await manager.update_state("agent-2", "coder", AgentStatus.ACTIVE)
+        manager.flush()
+
+        await manager.clear_all_states()
+        await manager.update_state("agent-3", "tester", AgentStatus.IDLE)
+        await manager.clear_state("agent-3")
+        await manager.update_state("agent-4", "tester", AgentStatus.IDLE, tokens_used=7)
+        manager.close()
+
+        reopened = StateManager(project_path=tmp_path)
+        assert [s.agent_id for s in await reopened.get_all_states()] == ["agent-4"]
+        reopened.close()
+
+
+class TestStateManagerSchema:
+    """StateManager のテスト（セッション別スキーマ）"""
+
+    @pytest.mark.asyncio
+    async def test_sessions_do_not_overwrite_each_other(self, tmp_path):
+        """同じ agent_id でもセッションごとに別の行になる"""
+        first = StateManager(project_path=tmp_path, session_id="s1")
+        second = StateManager(project_path=tmp_path, session_id="s2")
+        await first.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=1)
+        await second.update_state("agent-1", "tester", AgentStatus.IDLE, tokens_used=2)
+        await second.clear_all_states()
+        first.close()
+        second.close()
+
+        reopened = StateManager(project_path=tmp_path, session_id="s1")
+        states = await reopened.get_all_states()
+        assert [(s.role, s.tokens_used) for s in states] == [("coder", 1)]
+        assert reopened.get_stats()["total_agents"] == 1
+        reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_loads_only_active_session(self, tmp_path):
+        """起動時は現在のセッションの行だけを読み込む"""
+        for i in range(5):
+            manager = StateManager(project_path=tmp_path, session_id=f"old-{i}")
+            await manager.update_state("agent-1", "coder", AgentStatus.COMPLETED)
+            manager.close()
+
+        manager = StateManager(project_path=tmp_path, session_id="new")
+        assert manager._states == {}
+        assert await manager.get_state("agent-1") is None
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_indexes(self, tmp_path):
+        """セカンダリインデックスとスキーマバージョン"""
+        manager = StateManager(project_path=tmp_path)
+
+        indexes = {
+            row["name"]
+            for row in manager.conn.execute("PRAGMA index_list(agent_states)")
+        }
+        assert {"idx_agent_states_status", "idx_agent_states_last_updated"} <= indexes
+        assert manager.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_migrates_v1_database(self, tmp_path):
+        """agent_id が主キーの旧スキーマを移行する"""
+        import sqlite3
+
+        (tmp_path / ".mao").mkdir()
+        conn = sqlite3.connect(tmp_path / ".mao" / "agent_states.db")
+        conn.execute(
+            """
+            CREATE TABLE agent_states (
+                agent_id TEXT PRIMARY KEY,
+                role TEXT NOT NULL,
+                status TEXT NOT NULL,
+                current_task TEXT,
+                tokens_used INTEGER DEFAULT 0,
+                cost REAL DEFAULT 0.0,
+                last_updated TEXT,
+                error_message TEXT
+            )
+            """
+        )
+        conn.execute(
+            "INSERT INTO agent_states (agent_id, role, status, tokens_used) "
+            "VALUES ('agent-1', 'coder', 'ACTIVE', 42)"
+        )
+        conn.commit()
+        conn.close()
+
+        manager = StateManager(project_path=tmp_path)
+        state = await manager.get_state("agent-1")
+        assert state.tokens_used == 42
+        assert state.worktree_path == ""
+
+        await manager.update_state("agent-2", "tester", AgentStatus.IDLE)
+        manager.close()
+
+        # 2回目は移行済み
+        reopened = StateManager(project_path=tmp_path)
+        assert len(await reopened.get_all_states()) == 2
+        reopened.close()
+
+
+class TestStateManagerAggregates:
+    """StateManager のテスト（差分で保つ集計）"""
+
+    @pytest.mark.asyncio
+    async def test_aggregates_follow_updates(self, tmp_path):
+        """更新・削除のたびに集計が差分で更新される"""
+        manager = StateManager(project_path=tmp_path, use_sqlite=False)
+        await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE, tokens_used=100, cost=0.5)
+        await manager.update_state("agent-2", "tester", AgentStatus.IDLE, tokens_used=50, cost=0.25)
+        await manager.update_state("agent-1", "coder", AgentStatus.COMPLETED, tokens_used=300, cost=1.5)
+
+        stats = manager.get_stats()
+        assert stats["total_agents"] == 2
+        assert stats["active_agents"] == 0
+        assert stats["total_tokens"] == 350
+        assert stats["total_cost"] == pytest.approx(1.75)
+
+        await manager.clear_state("agent-2")
+        stats = manager.get_stats()
+        assert (stats["total_agents"], stats["total_tokens"]) == (1, 300)
+
+        await manager.clear_all_states()
+        stats = manager.get_stats()
+        assert (stats["total_agents"], stats["total_tokens"], stats["total_cost"]) == (0, 0, 0.0)
+
+    @pytest.mark.asyncio
+    async def test_version_changes_only_on_change(self, tmp_path):
+        """version は状態が変わったときだけ増える"""
+        manager = StateManager(project_path=tmp_path, use_sqlite=False)
+        initial = manager.stats_version
+
+        await manager.update_state("agent-1", "coder", AgentStatus.ACTIVE)
+        after_update = manager.stats_version
+        assert after_update > initial
+        assert manager.get_stats()["version"] == after_update
+
+        # 存在しないエージェントの削除は変更なし
+        await manager.clear_state("agent-9")
+        assert manager.stats_version == after_update
+
+        await manager.clear_state("agent-1")
+        assert manager.stats_version > after_update
+
+    @pytest.mark.asyncio
+    async def test_aggregates_are_loaded(self, tmp_path):
+        """再起動時は読み込んだ状態から集計する"""
+        manager = StateManager(project_path=tmp_path, session_id="s1")
+        await manager.update_state("agent-1", "coder", AgentStatus.THINKING, tokens_used=10)
+        await manager.update_state("agent-2", "coder", AgentStatus.ACTIVE, tokens_used=20)
+        manager.close()
+
+        reopened = StateManager(project_path=tmp_path, session_id="s1")
+        stats = reopened.get_stats()
+        assert (stats["total_agents"], stats["active_agents"], stats["total_tokens"]) == (2, 2, 30)
+        reopened.close()
@@ -42,6 +42,31 @@ tasks:
         assert subtasks[1].subtask_id == "task-2"
         assert subtasks[1].role == "coder_frontend"
 
+    def test_extract_tasks_with_dependencies(self):
+        """depends_on を抽出"""
+        dispatcher = TaskDispatcher()
+
+        response = """
+```yaml
+tasks:
+  - id: api
+    title: Implement API
+  - id: ui
+    title: Implement UI
+  - id: e2e
+    title: Write E2E tests
+    depends_on: [api, ui]
+  - id: docs
+    title: Write docs
+    depends_on: e2e
+```
+"""
+
+        subtasks = dispatcher._extract_tasks_from_yaml(response, "parent-1")
+
+        assert [s.depends_on for s in subtasks] == [[], [], ["api", "ui"], ["e2e"]]
+        assert subtasks[2].to_dict()["depends_on"] == ["api", "ui"]
+
     def test_extract_tasks_without_yaml_markers(self):
         """YAMLマーカーなしの応答"""
         dispatcher = TaskDispatcher()
@@ -1,7 +1,8 @@
 """Test TaskDispatcher"""
 import pytest
 
-from mao.orchestrator.task_dispatcher import TaskDispatcher
+from mao.orchestrator.task_dispatcher import SubTask, TaskDispatcher
+from mao.orchestrator.task_queue import TaskStatus
 
 
 class TestTaskDispatcher:
@@ -40,3 +41,23 @@ class TestTaskDispatcher:
         assert prompt is not None
         assert isinstance(prompt, str)
         assert len(prompt) > 0
+
+    def test_subtasks_go_to_free_agents(self, tmp_path):
+        """Decomposed subtasks are not pinned; free agents take them in order"""
+        dispatcher = TaskDispatcher(project_path=tmp_path, max_agents=2)
+        subtasks = dispatcher.decompose_task_to_agents("task-1", "Do it", num_agents=2)
+        assert all(subtask.agent_id is None for subtask in subtasks)
+
+        dispatcher.assign_tasks_to_agents(subtasks + [SubTask("task-1-sub3", "task-1", "More")])
+        assert [subtask.agent_id for subtask in subtasks] == ["agent-1", "agent-2"]
+
+        # agent-2 finishes first and picks up the remaining subtask
+        task = dispatcher.task_queue.get_task("agent-2")
+        task.status = TaskStatus.COMPLETED
+        task.result = "done"
+        dispatcher.task_queue.submit_result(task)
+
+        results = dispatcher.collect_agent_results()
+        assert results["task-1-sub2"]["result"] == "done"
+        assert subtasks[1].status == "completed"
+        assert dispatcher.scheduler.subtasks["task-1-sub3"].agent_id == "agent-2"
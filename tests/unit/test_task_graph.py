@@ -0,0 +1,108 @@
+"""
+Tests for TaskGraph
+"""
+import pytest
+
+from mao.orchestrator.task_graph import TaskGraph, TaskNodeStatus, parse_dependencies
+
+
+def _ids(nodes):
+    return [node.node_id for node in nodes]
+
+
+class TestTaskGraph:
+    """TaskGraph のテスト"""
+
+    def test_independent_tasks_are_ready(self):
+        """依存のないタスクはすべて実行可能"""
+        graph = TaskGraph()
+        graph.add("a")
+        graph.add("b")
+        graph.add("c", ["a", "b"])
+
+        assert _ids(graph.ready()) == ["a", "b"]
+
+    def test_complete_releases_dependents(self):
+        """依存先がすべて完了すると後続が実行可能になる"""
+        graph = TaskGraph()
+        graph.add("a")
+        graph.add("b")
+        graph.add("c", ["a", "b"])
+        graph.start("a")
+        graph.start("b")
+
+        assert graph.complete("a") == []
+        assert _ids(graph.complete("b")) == ["c"]
+        assert graph.running_count() == 0
+        assert not graph.is_finished()
+
+    def test_forward_reference(self):
+        """後から追加されるタスクに依存できる"""
+        graph = TaskGraph()
+        graph.add("test", ["impl"])
+        assert graph.ready() == []
+
+        graph.add("impl")
+        assert _ids(graph.ready()) == ["impl"]
+
+    def test_cycle_is_rejected(self):
+        """循環する依存は追加できない"""
+        graph = TaskGraph()
+        graph.add("a", ["b"])
+
+        with pytest.raises(ValueError, match="cycle"):
+            graph.add("b", ["a"])
+        assert "b" not in graph
+
+    def test_duplicate_is_rejected(self):
+        """重複したIDは追加できない"""
+        graph = TaskGraph()
+        graph.add("a")
+
+        with pytest.raises(ValueError, match="Duplicate"):
+            graph.add("a")
+
+    def test_fail_blocks_dependents(self):
+        """失敗したタスクに依存するタスクは実行されない"""
+        graph = TaskGraph()
+        graph.add("a")
+        graph.add("b", ["a"])
+        graph.add("c", ["b"])
+        graph.start("a")
+
+        assert _ids(graph.fail("a")) == ["b", "c"]
+        assert graph.is_finished()
+        assert graph.counts() == {"pending": 2, "running": 0, "completed": 0, "failed": 1}
+        assert graph.get("a").status == TaskNodeStatus.FAILED
+
+    def test_critical_path(self):
+        """最長の依存チェーン"""
+        graph = TaskGraph()
+        graph.add("design")
+        graph.add("api", ["design"])
+        graph.add("ui", ["design"])
+        graph.add("e2e", ["api", "ui"])
+        graph.add("docs")
+
+        assert len(graph.critical_path()) == 3
+        assert graph.critical_path()[0] == "design"
+        assert graph.critical_path()[-1] == "e2e"
+
+
+class TestParseDependencies:
+    """parse_dependencies のテスト"""
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            (None, []),
+            ("task-1", ["task-1"]),
+            (2, ["2"]),
+            (["task-1", 2], ["task-1", "2"]),
+            ("api, ui", ["api", "ui"]),
+            ("", []),
+        ],
+    )
+    def test_parse(self, value, expected):
+        """文字列・数値・リストを正規化"""
+        assert parse_dependencies(value) == expected
@@ -0,0 +1,200 @@
+"""
+Tests for TaskQueue
+"""
+import json
+
+from mao.orchestrator.task_queue import TaskQueue, Task, TaskStatus
+
+
+class TestTaskQueue:
+    """TaskQueue のテスト"""
+
+    def test_assign_and_get_task(self, tmp_path):
+        """タスクは JSON で書き込まれ、取得すると削除される"""
+        queue = TaskQueue(tmp_path)
+        assert queue.assign_task(Task(task_id="t1", role="agent-1", prompt="Write tests"))
+
+        assert (queue.tasks_dir / "agent-1.json").exists()
+        assert queue.has_task("agent-1")
+        assert queue.list_pending_tasks() == ["agent-1"]
+
+        task = queue.get_task("agent-1")
+        assert task.task_id == "t1"
+        assert task.status == TaskStatus.ASSIGNED
+        assert not queue.has_task("agent-1")
+
+    def test_reads_yaml_report_written_by_agent(self, tmp_path):
+        """エージェントが書いた YAML の結果も読み込める"""
+        queue = TaskQueue(tmp_path)
+        (queue.reports_dir / "agent-1.yaml").write_text(
+            "task_id: t1\nrole: agent-1\nprompt: Write tests\nstatus: COMPLETED\nresult: done\n",
+            encoding="utf-8",
+        )
+
+        assert queue.list_completed_reports() == ["agent-1"]
+        task = queue.get_result("agent-1")
+        assert task.status == TaskStatus.COMPLETED
+        assert task.result == "done"
+        assert not queue.has_result("agent-1")
+
+    def test_undecodable_report_moves_to_failed(self, tmp_path):
+        """書き直されても読めない結果は failed/ に移し、結果なしとして扱う"""
+        queue = TaskQueue(tmp_path)
+        report = queue.reports_dir / "agent-1.json"
+        report.write_text("{not json", encoding="utf-8")
+
+        assert queue.get_result("agent-1") is None
+        assert queue.has_result("agent-1")
+        assert queue.get_result("agent-1") is None
+        assert queue.has_result("agent-1")
+
+        report.write_text("{still not json", encoding="utf-8")
+        assert queue.get_result("agent-1") is None
+        assert not queue.has_result("agent-1")
+        assert (queue.failed_dir / "agent-1" / "agent-1.json").exists()
+
+    def test_report_written_in_two_steps(self, tmp_path):
+        """書き込み途中の結果は残しておき、書き終わってから読む"""
+        queue = TaskQueue(tmp_path)
+        data = Task(task_id="t1", role="agent-1", prompt="p", status=TaskStatus.COMPLETED).to_dict()
+        encoded = json.dumps(data)
+        report = queue.reports_dir / "agent-1.json"
+
+        report.write_text(encoded[:10], encoding="utf-8")
+        assert queue.get_result("agent-1") is None
+        assert report.exists()
+
+        with open(report, "a", encoding="utf-8") as f:
+            f.write(encoded[10:] + "\n")
+        task = queue.get_result("agent-1")
+        assert task.task_id == "t1"
+        assert not queue.failed_dir.exists()
+
+    def test_submit_result_with_yaml_codec(self, tmp_path):
+        """codec="yaml" で従来の YAML 形式でも書き込める"""
+        queue = TaskQueue(tmp_path, codec="yaml")
+        queue.submit_result(Task(task_id="t1", role="agent-1", prompt="p", status=TaskStatus.COMPLETED))
+
+        assert (queue.reports_dir / "agent-1.yaml").exists()
+        assert TaskQueue(tmp_path).get_result("agent-1").task_id == "t1"
+
+    def test_cleanup_removes_all_formats(self, tmp_path):
+        """cleanup はすべての形式のファイルを削除する"""
+        queue = TaskQueue(tmp_path)
+        queue.assign_task(Task(task_id="t1", role="agent-1", prompt="p"))
+        (queue.tasks_dir / "agent-2.yaml").write_text("task_id: t2\n")
+
+        queue.cleanup()
+
+        assert queue.list_pending_tasks() == []
+
+
+class TestTaskBacklog:
+    """エージェントごとのバックログのテスト"""
+
+    def _assign(self, queue, *task_ids, role="agent-1"):
+        for task_id in task_ids:
+            assert queue.assign_task(Task(task_id=task_id, role=role, prompt=f"do {task_id}"))
+
+    def test_assign_does_not_overwrite_pending_task(self, tmp_path):
+        """実行待ちのタスクがあれば後続はバックログに並ぶ"""
+        queue = TaskQueue(tmp_path)
+        self._assign(queue, "t1", "t2", "t3")
+
+        assert [t.task_id for t in queue.backlog("agent-1")] == ["t2", "t3"]
+        assert queue.get_task("agent-1").task_id == "t1"
+
+    def test_submit_result_hands_out_next_task(self, tmp_path):
+        """結果を提出すると次のタスクがすぐに渡される"""
+        queue = TaskQueue(tmp_path)
+        self._assign(queue, "t1", "t2")
+
+        task = queue.get_task("agent-1")
+        assert queue.in_flight("agent-1") == 1
+        # prefetch=1 では取得済みタスクがある間は次を渡さない
+        assert not queue.has_task("agent-1")
+
+        task.status = TaskStatus.COMPLETED
+        next_task = queue.complete_task(task)
+
+        assert next_task.task_id == "t2"
+        assert next_task.status == TaskStatus.ASSIGNED
+        assert queue.backlog_size("agent-1") == 0
+
+    def test_prefetch_stages_next_task(self, tmp_path):
+        """prefetch=2 なら実行中に次のタスクがタスクファイルに置かれる"""
+        queue = TaskQueue(tmp_path, prefetch=2)
+        self._assign(queue, "t1", "t2", "t3")
+
+        queue.get_task("agent-1")
+
+        assert queue.has_task("agent-1")
+        assert [t.task_id for t in queue.backlog("agent-1")] == ["t3"]
+        assert queue.get_task("agent-1").task_id == "t2"
+        # 取得済みが prefetch に達したので t3 は待つ
+        assert not queue.has_task("agent-1")
+
+    def test_agent_written_report_releases_next_task(self, tmp_path):
+        """エージェントが直接書いた結果を CTO が取得しても次のタスクが渡る"""
+        queue = TaskQueue(tmp_path)
+        self._assign(queue, "t1", "t2")
+        queue.get_task("agent-1")
+        (queue.reports_dir / "agent-1.yaml").write_text(
+            "task_id: t1\nrole: agent-1\nprompt: do t1\nstatus: COMPLETED\n",
+            encoding="utf-8",
+        )
+
+        assert queue.get_result("agent-1").task_id == "t1"
+        assert queue.in_flight("agent-1") == 0
+        assert queue.get_task("agent-1").task_id == "t2"
+
+    def _corrupt(self, queue, task_id, role="agent-1"):
+        """バックログのタスクファイルを読み込めない内容にする"""
+        entry = next(
+            path for path in (queue.backlog_dir / role).iterdir() if task_id in path.read_text()
+        )
+        entry.write_text("{not json", encoding="utf-8")
+        return entry
+
+    def test_undecodable_backlog_task_moves_to_failed(self, tmp_path):
+        """読み込めないタスクは failed/ に移し、次のタスクを渡す"""
+        queue = TaskQueue(tmp_path)
+        self._assign(queue, "t1", "t2", "t3")
+        entry = self._corrupt(queue, "t2")
+        task = queue.get_task("agent-1")
+
+        task.status = TaskStatus.COMPLETED
+        assert queue.complete_task(task).task_id == "t3"
+        assert (queue.failed_dir / "agent-1" / entry.name).exists()
+        assert not any(path.name.endswith(".claimed") for path in entry.parent.iterdir())
+
+    def test_undecodable_task_is_not_stolen(self, tmp_path):
+        """steal() も読み込めないタスクを failed/ に移して次を取り出す"""
+        queue = TaskQueue(tmp_path)
+        self._assign(queue, "t1", "t2", "t3")
+        entry = self._corrupt(queue, "t3")
+
+        assert queue.steal("agent-1").task_id == "t2"
+        assert (queue.failed_dir / "agent-1" / entry.name).exists()
+        assert queue.backlog_size("agent-1") == 0
+
+    def test_backlogs_are_per_agent(self, tmp_path):
+        """バックログはエージェントごとに独立"""
+        queue = TaskQueue(tmp_path)
+        self._assign(queue, "a1", "a2", role="agent-1")
+        self._assign(queue, "b1", role="agent-2")
+
+        assert queue.list_pending_tasks() == ["agent-1", "agent-2"]
+        assert queue.backlog_size("agent-1") == 1
+        assert queue.backlog_size("agent-2") == 0
+
+    def test_cleanup_removes_backlog(self, tmp_path):
+        """cleanup はバックログも削除する"""
+        queue = TaskQueue(tmp_path)
+        self._assign(queue, "t1", "t2")
+        queue.get_task("agent-1")
+
+        queue.cleanup()
+
+        assert queue.backlog_size("agent-1") == 0
+        assert queue.in_flight("agent-1") == 0
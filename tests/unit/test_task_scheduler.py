@@ -0,0 +1,187 @@
+"""
+Tests for WorkStealingScheduler
+"""
+import pytest
+
+from mao.orchestrator.task_dispatcher import SubTask
+from mao.orchestrator.task_queue import Task, TaskQueue, TaskStatus
+from mao.orchestrator.task_scheduler import WorkStealingScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def task_queue(tmp_path):
+    return TaskQueue(tmp_path)
+
+
+def _subtask(subtask_id: str, priority: str = "medium", agent_id: str = None) -> SubTask:
+    return SubTask(
+        subtask_id=subtask_id,
+        parent_task_id="task-1",
+        description=f"do {subtask_id}",
+        agent_id=agent_id,
+        priority=priority,
+    )
+
+
+def _finish(task_queue: TaskQueue, role: str, status: TaskStatus = TaskStatus.COMPLETED) -> Task:
+    """エージェントとしてタスクを取得・提出し、マネージャーとして結果を取得"""
+    task = task_queue.get_task(role)
+    task.status = status
+    task.result = f"done {task.task_id}"
+    task_queue.submit_result(task)
+    return task_queue.get_result(role)
+
+
+class TestWorkStealingScheduler:
+    """WorkStealingScheduler のテスト"""
+
+    def test_dispatch_by_priority(self, task_queue, clock):
+        """空いているエージェントに優先度順で割り当てる（作成時の agent_id は無視）"""
+        scheduler = WorkStealingScheduler(task_queue, ["agent-1", "agent-2"], clock=clock)
+        scheduler.submit_many([
+            _subtask("low", "low", agent_id="agent-1"),
+            _subtask("high", "high", agent_id="agent-2"),
+            _subtask("medium", agent_id="agent-1"),
+        ])
+
+        assert scheduler.dispatch() == [("agent-1", "high"), ("agent-2", "medium")]
+        assert scheduler.subtasks["high"].agent_id == "agent-1"
+        assert scheduler.subtasks["high"].status == "in_progress"
+        assert scheduler.ready_count() == 1
+
+        # どちらも実行中なので割り当てない
+        assert scheduler.dispatch() == []
+
+    def test_idle_agent_pulls_next(self, task_queue, clock):
+        """先に終わったエージェントが残りのタスクを取る"""
+        scheduler = WorkStealingScheduler(task_queue, ["agent-1", "agent-2"], clock=clock)
+        scheduler.submit_many([_subtask(f"sub{i}") for i in range(4)])
+        scheduler.dispatch()
+
+        clock.now += 10
+        scheduler.record_result(_finish(task_queue, "agent-2"))
+        assert scheduler.dispatch() == [("agent-2", "sub2")]
+
+        clock.now += 10
+        scheduler.record_result(_finish(task_queue, "agent-2"))
+        assert scheduler.dispatch() == [("agent-2", "sub3")]
+        assert scheduler.subtasks["sub1"].status == "completed"
+        assert scheduler.subtasks["sub1"].result == "done sub1"
+
+    def test_steals_from_busiest_backlog(self, task_queue, clock):
+        """レディキューが空なら他のエージェントのバックログ末尾を奪う"""
+        scheduler = WorkStealingScheduler(task_queue, ["agent-1", "agent-2"], clock=clock)
+        # agent-1 に固定されたタスク（スケジューラーを通さない割り当て）
+        for i in range(3):
+            task_queue.assign_task(Task(task_id=f"pinned-{i}", role="agent-1", prompt="p"))
+
+        assert scheduler.dispatch() == [("agent-2", "pinned-2")]
+        assert [t.task_id for t in task_queue.backlog("agent-1")] == ["pinned-1"]
+        assert task_queue.get_task("agent-2").task_id == "pinned-2"
+        assert scheduler.stats()["agent-2"]["stolen"] == 1
+
+    def test_steal_returns_none_for_empty_backlog(self, task_queue):
+        """バックログが空なら何も奪わない"""
+        assert task_queue.steal("agent-1") is None
+
+    def test_throughput_stats(self, task_queue, clock):
+        """完了数・稼働時間・稼働率を記録する"""
+        scheduler = WorkStealingScheduler(task_queue, ["agent-1", "agent-2"], clock=clock)
+        scheduler.submit_many([_subtask("sub1"), _subtask("sub2")])
+        scheduler.dispatch()
+
+        clock.now += 30
+        scheduler.record_result(_finish(task_queue, "agent-1"))
+        clock.now += 30
+        scheduler.record_result(_finish(task_queue, "agent-2", TaskStatus.FAILED))
+
+        stats = scheduler.stats()
+        assert stats["agent-1"]["completed"] == 1
+        assert stats["agent-1"]["busy_seconds"] == pytest.approx(30)
+        assert stats["agent-1"]["utilization"] == pytest.approx(0.5)
+        assert stats["agent-1"]["tasks_per_minute"] == pytest.approx(1.0)
+        assert stats["agent-2"]["failed"] == 1
+        assert stats["agent-2"]["utilization"] == pytest.approx(1.0)
+        assert scheduler.subtasks["sub2"].status == "failed"
+
+    def test_unregistered_agent_gets_nothing(self, task_queue, clock):
+        """登録を解除したエージェントには割り当てない"""
+        scheduler = WorkStealingScheduler(task_queue, ["agent-1", "agent-2"], clock=clock)
+        scheduler.unregister_agent("agent-1")
+        scheduler.submit(_subtask("sub1"))
+
+        assert scheduler.dispatch() == [("agent-2", "sub1")]
+
+    def test_dependencies_are_released_on_completion(self, task_queue, clock):
+        """依存先が完了するまでサブタスクは割り当てない"""
+        scheduler = WorkStealingScheduler(task_queue, ["agent-1", "agent-2"], clock=clock)
+        scheduler.submit_many([
+            _subtask("impl"),
+            _subtask("docs", "low"),
+            SubTask("test", "task-1", "do test", priority="high", depends_on=["impl"]),
+        ])
+
+        assert scheduler.dispatch() == [("agent-1", "impl"), ("agent-2", "docs")]
+
+        scheduler.record_result(_finish(task_queue, "agent-1"))
+        assert scheduler.dispatch() == [("agent-1", "test")]
+
+    def test_failed_dependency_blocks_dependents(self, task_queue, clock):
+        """依存先が失敗したサブタスクは割り当てない"""
+        scheduler = WorkStealingScheduler(task_queue, ["agent-1"], clock=clock)
+        scheduler.submit_many([
+            _subtask("impl"),
+            SubTask("test", "task-1", "do test", depends_on=["impl"]),
+        ])
+        scheduler.dispatch()
+
+        scheduler.record_result(_finish(task_queue, "agent-1", TaskStatus.FAILED))
+
+        assert scheduler.dispatch() == []
+        assert scheduler.subtasks["test"].status == "pending"
+
+
+    def test_claim_and_finish(self, task_queue, clock):
+        """claim() で取得したタスクを finish() するとエージェントが空く"""
+        scheduler = WorkStealingScheduler(task_queue, ["agent-1"], clock=clock)
+        scheduler.submit_many([_subtask("sub1"), _subtask("sub2")])
+        scheduler.dispatch()
+
+        task = scheduler.claim("agent-1")
+        assert task.task_id == "sub1"
+        assert scheduler.claim("agent-1") is None
+        assert scheduler.dispatch() == []
+
+        clock.now += 10
+        task.status = TaskStatus.COMPLETED
+        scheduler.finish(task)
+
+        assert scheduler.subtasks["sub1"].status == "completed"
+        assert scheduler.stats()["agent-1"]["busy_seconds"] == pytest.approx(10)
+        assert scheduler.dispatch() == [("agent-1", "sub2")]
+
+    def test_assigned_task_is_stolen_by_idle_agent(self, task_queue, clock):
+        """assign() で実行中のエージェントに積んだタスクは空いたエージェントが奪う"""
+        scheduler = WorkStealingScheduler(task_queue, ["agent-1", "agent-2"], clock=clock)
+        assert scheduler.assign(_subtask("sub1"), "agent-1")
+        assert scheduler.assign(_subtask("sub2"), "agent-1")
+        assert scheduler.claim("agent-1").task_id == "sub1"
+        assert scheduler.subtasks["sub1"].status == "in_progress"
+
+        assert scheduler.dispatch() == [("agent-2", "sub2")]
+        assert scheduler.claim("agent-2").task_id == "sub2"
+        assert scheduler.subtasks["sub2"].agent_id == "agent-2"
+        assert scheduler.stats()["agent-2"]["running"] == 1
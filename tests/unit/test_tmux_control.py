@@ -0,0 +1,243 @@
+"""
+Tests for TmuxControlClient
+"""
+import asyncio
+import subprocess
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from mao.orchestrator.tmux_control import TmuxControlClient, decode_output, quote
+from mao.orchestrator.tmux_manager import TmuxManager
+
+requires_tmux = pytest.mark.skipif(
+    not TmuxManager().is_tmux_available(), reason="tmux not available"
+)
+
+
+@pytest.fixture
+def session():
+    name = "test-mao-control"
+    subprocess.run(["tmux", "kill-session", "-t", name], capture_output=True)
+    subprocess.run(
+        # シェルの起動を待たないよう、入力をそのまま出力する cat を動かす
+        ["tmux", "new-session", "-d", "-s", name, "-x", "120", "-y", "40", "cat"], check=True
+    )
+    yield name
+    subprocess.run(["tmux", "kill-session", "-t", name], capture_output=True)
+
+
+class TestQuoting:
+    """クォートとデコードのテスト"""
+
+    def test_quote(self):
+        """特殊文字をエスケープしてダブルクォートで囲む"""
+        assert quote("ls -la") == '"ls -la"'
+        assert quote('say "hi" $HOME') == '"say \\"hi\\" \\$HOME"'
+        assert quote("a\nb\\c") == '"a\\nb\\\\c"'
+        assert quote("\x01") == '"\\u0001"'
+
+    def test_decode_output(self):
+        """%output の8進エスケープを元に戻す"""
+        assert decode_output(b"hello\\015\\012") == b"hello\r\n"
+        assert decode_output(b"back\\134slash") == b"back\\slash"
+
+
+@requires_tmux
+class TestTmuxControlClient:
+    """tmux -C 接続のテスト"""
+
+    def test_round_trip(self, session):
+        """送信した順に応答が対応付けられる"""
+        client = TmuxControlClient(session)
+        client.start()
+        try:
+            futures = [
+                client.command("display-message", "-p", f"reply-{i}") for i in range(20)
+            ]
+            assert [f.result(5).stdout for f in futures] == [
+                f"reply-{i}\n" for i in range(20)
+            ]
+        finally:
+            client.close()
+        assert not client.alive
+
+    def test_quoted_arguments(self, session):
+        """クォートした引数がそのまま tmux に届く"""
+        text = 'quote " dollar $HOME; semicolon\ttab \\ backslash 日本語'
+        client = TmuxControlClient(session)
+        client.start()
+        try:
+            assert client.run("set-buffer", "-b", "mao-test", text).returncode == 0
+            saved = subprocess.run(
+                ["tmux", "save-buffer", "-b", "mao-test", "-"], capture_output=True, text=True
+            )
+            assert saved.stdout == text
+        finally:
+            client.close()
+
+    def test_error(self, session):
+        """失敗したコマンドは returncode 1 と stderr で返る"""
+        client = TmuxControlClient(session)
+        client.start()
+        try:
+            result = client.run("has-session", "-t", "test-mao-control-missing")
+            assert result.returncode == 1
+            assert result.stderr
+            # 失敗の後も接続は使える
+            assert client.run("display-message", "-p", "ok").stdout == "ok\n"
+        finally:
+            client.close()
+
+    @pytest.mark.asyncio
+    async def test_execute(self, session):
+        """execute() はイベントループをブロックせずに応答を待つ"""
+        client = TmuxControlClient(session)
+        client.start()
+        try:
+            results = await asyncio.gather(
+                *(client.execute("display-message", "-p", str(i)) for i in range(5))
+            )
+            assert [r.stdout for r in results] == [f"{i}\n" for i in range(5)]
+        finally:
+            client.close()
+
+    def test_output_listener(self, session):
+        """ペイン出力が %output 通知としてリスナーに届く"""
+        client = TmuxControlClient(session)
+        client.start()
+        received = []
+        client.add_output_listener(lambda pane, data: received.append((pane, data)))
+        try:
+            client.run("send-keys", "-t", session, "echo mao-output-marker", "C-m")
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if b"mao-output-marker" in b"".join(data for _, data in received):
+                    break
+                time.sleep(0.05)
+            assert b"mao-output-marker" in b"".join(data for _, data in received)
+            assert all(pane.startswith("%") for pane, _ in received)
+        finally:
+            client.close()
+
+    def test_session_killed(self, session):
+        """セッションが破棄されると接続は切れ、コマンドは RuntimeError になる"""
+        client = TmuxControlClient(session)
+        client.start()
+        subprocess.run(["tmux", "kill-session", "-t", session], check=True)
+
+        deadline = time.monotonic() + 5
+        while client.alive and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not client.alive
+        with pytest.raises(RuntimeError):
+            client.command("display-message", "-p", "x")
+        client.close()
+
+    def test_missing_session(self):
+        """存在しないセッションには接続できない"""
+        client = TmuxControlClient("test-mao-control-missing", timeout=2.0)
+        with pytest.raises(RuntimeError):
+            client.start()
+
+
+@requires_tmux
+class TestTmuxManagerControlMode:
+    """TmuxManager の常駐接続のテスト"""
+
+    def test_commands_use_control_client(self, session):
+        """作成済みセッションへのコマンドは常駐接続で送る"""
+        manager = TmuxManager(session_name=session)
+        try:
+            assert manager.session_exists() is True
+            pane_id = manager._tmux("display-message", "-p", "#{pane_id}").stdout.strip()
+            assert manager.control is not None and manager.control.alive
+
+            manager._send_to_pane(pane_id, "echo mao-control-pane")
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                # 端末のエコーと cat の出力
+                if manager.get_pane_content(pane_id, lines=20).count("mao-control-pane") >= 2:
+                    break
+                time.sleep(0.05)
+            assert manager.get_pane_content(pane_id, lines=20).count("mao-control-pane") >= 2
+            assert manager.get_pane_status(pane_id)["pid"] is not None
+        finally:
+            manager.close()
+        assert manager.control is None
+
+    def test_subprocess_fallback(self, session):
+        """use_control_mode=False なら毎回 tmux を起動する"""
+        manager = TmuxManager(session_name=session, use_control_mode=False)
+        assert manager._tmux("display-message", "-p", "fallback").stdout == "fallback\n"
+        assert manager.control is None
+
+        with pytest.raises(subprocess.CalledProcessError):
+            manager._tmux("has-session", "-t", "test-mao-control-missing", check=True)
+
+    def test_timeout_does_not_rerun_command(self, session, monkeypatch):
+        """応答待ちがタイムアウトしてもコマンドを再実行せず、接続を作り直す"""
+        manager = TmuxManager(session_name=session)
+        manager._tmux("display-message", "-p", "x")
+        first = manager.control
+        first.timeout = 0.2
+
+        sent = []
+
+        def command(*args):
+            # 送信はするが応答が返らない
+            sent.append(args)
+            return Future()
+
+        monkeypatch.setattr(first, "command", command)
+        fallback = []
+        run = subprocess.run
+        monkeypatch.setattr(
+            subprocess, "run", lambda cmd, **kw: fallback.append(cmd) or run(cmd, **kw)
+        )
+        try:
+            result = manager._tmux("send-keys", "-t", session, "x")
+            assert result.returncode == 1
+            assert sent == [("send-keys", "-t", session, "x")]
+            assert fallback == []
+            assert manager.control is None and not first.alive
+
+            # 次のコマンドは新しい接続で送る
+            assert manager._tmux("display-message", "-p", "next").stdout == "next\n"
+            assert manager.control is not None and manager.control is not first
+        finally:
+            manager.close()
+
+    def test_reconnects_after_destroy(self, session):
+        """セッションを作り直すと新しい接続で再開する"""
+        manager = TmuxManager(session_name=session)
+        manager._tmux("display-message", "-p", "x")
+        first = manager.control
+
+        manager.destroy_session()
+        assert first is not None and not first.alive
+        assert manager.session_exists() is False
+
+        assert manager.create_session() is True
+        assert manager._tmux("display-message", "-p", "again").stdout == "again\n"
+        assert manager.control is not first
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_subscribe_output(self, session):
+        """subscribe_output() のキューでペイン出力を受け取る"""
+        manager = TmuxManager(session_name=session)
+        pane_id = manager._tmux("display-message", "-p", "#{pane_id}").stdout.strip()
+        queue = manager.subscribe_output(pane_id)
+        try:
+            manager._send_to_pane(pane_id, "echo mao-subscribe-marker")
+            output = b""
+            while b"mao-subscribe-marker\r\n" not in output:
+                pane, data = await asyncio.wait_for(queue.get(), 5)
+                assert pane == pane_id
+                output += data
+        finally:
+            manager.unsubscribe_output(queue)
+            manager.close()
+        assert manager._output_listeners == []
@@ -2,6 +2,7 @@
 import pytest
 import subprocess
 
+from mao.orchestrator.tmux_grid import chain, grid_shape
 from mao.orchestrator.tmux_manager import TmuxManager
 
 
@@ -110,3 +111,147 @@ class TestTmuxManager:
 
         # Clean up
         manager.destroy_session()
+
+
+class TestGridLayout:
+    """Test batched grid construction"""
+
+    @pytest.mark.parametrize(
+        "panes,shape",
+        [(1, (1, 1)), (2, (2, 1)), (5, (3, 2)), (9, (3, 3)), (10, (4, 3)), (13, (4, 4))],
+    )
+    def test_grid_shape(self, panes, shape):
+        """Rows x columns match tmux's tiled layout"""
+        assert grid_shape(panes) == shape
+        rows, columns = shape
+        assert rows * columns >= panes
+
+    def test_chain(self):
+        """Commands are joined with ';' and trailing semicolons are escaped"""
+        assert chain([["new-session", "-d"], ["send-keys", "echo a;", "C-m"]]) == [
+            "new-session", "-d", ";", "send-keys", "echo a\\;", "C-m",
+        ]
+
+    def test_grid_commands_single_batch(self):
+        """Grid construction compiles to one command batch with a split per agent"""
+        manager = TmuxManager(session_name="test-mao-batch", use_grid_layout=True, num_agents=12)
+        commands = manager._grid_commands(["cto"] + [f"agent-{i}" for i in range(1, 13)])
+
+        assert commands[0][0] == "new-session"
+        assert sum(1 for command in commands if command[0] == "split-window") == 12
+        assert ["select-pane", "-t", "test-mao-batch:0.12", "-T", "🔧 AGENT-12"] in commands
+
+    @pytest.mark.skipif(
+        not TmuxManager().is_tmux_available(),
+        reason="tmux not available"
+    )
+    @pytest.mark.parametrize("num_agents", [3, 12])
+    def test_create_grid_any_size(self, num_agents):
+        """Creates exactly CTO + num_agents panes"""
+        manager = TmuxManager(
+            session_name="test-mao-grid-n", use_grid_layout=True, num_agents=num_agents
+        )
+        manager.destroy_session()
+        try:
+            assert manager.create_session_with_grid() is True
+
+            titles = subprocess.run(
+                ["tmux", "list-panes", "-t", "test-mao-grid-n:0", "-F", "#{pane_title}"],
+                capture_output=True,
+                text=True,
+            ).stdout.splitlines()
+            assert len(titles) == num_agents + 1
+            assert titles[0] == "🛡️ CTO"
+            assert titles[-1] == f"🔧 AGENT-{num_agents}"
+            assert manager.grid_panes[f"agent-{num_agents}"] == f"test-mao-grid-n:0.{num_agents}"
+
+            # Creating again fails without touching the existing session
+            assert manager.create_session_with_grid() is False
+            assert manager.session_exists() is True
+        finally:
+            manager.destroy_session()
+
+
+@pytest.mark.skipif(
+    not TmuxManager().is_tmux_available(),
+    reason="tmux not available"
+)
+class TestPaneSnapshot:
+    """Test bulk pane status snapshots"""
+
+    @pytest.fixture
+    def manager(self):
+        manager = TmuxManager(
+            session_name="test-mao-snapshot", use_grid_layout=True, num_agents=2, snapshot_ttl=60
+        )
+        manager.destroy_session()
+        assert manager.create_session_with_grid() is True
+        yield manager
+        manager.destroy_session()
+
+    def _count_list_panes(self, manager):
+        """Wrap _tmux to count list-panes calls"""
+        calls = []
+        original = manager._tmux
+
+        def counting(*args, **kwargs):
+            if args[0] == "list-panes":
+                calls.append(args)
+            return original(*args, **kwargs)
+
+        manager._tmux = counting
+        return calls
+
+    def test_snapshot_all_panes(self, manager):
+        """One list-panes call returns every pane, addressable by id or target"""
+        calls = self._count_list_panes(manager)
+
+        panes = manager.snapshot()
+        ours = [pane for pane in panes.values() if pane["target"].startswith("test-mao-snapshot:")]
+        assert len(ours) == 3
+        for pane in ours:
+            assert pane["pane_id"].startswith("%")
+            assert pane["pid"] is not None
+            assert pane["dead"] is False
+            # window_activity は使わない（グリッドの全ペインで同じ値になる）
+            assert pane["last_activity"] is None or pane["last_activity"] > 0
+
+        cto = manager.grid_panes["cto"]
+        assert manager.pane_snapshot(cto) is panes[manager.pane_snapshot(cto)["pane_id"]]
+        assert manager.get_pane_status(cto)["busy"] is False
+        assert manager.is_pane_busy(manager.grid_panes["agent-2"]) is False
+        assert len(calls) == 1
+
+    def test_snapshot_ttl(self, manager):
+        """Snapshots are reused within the TTL and refreshed on demand"""
+        calls = self._count_list_panes(manager)
+
+        first = manager.snapshot()
+        assert manager.snapshot() is first
+        assert manager.snapshot(max_age=0) is not first
+        assert len(calls) == 2
+
+    def test_invalidated_by_new_pane(self, manager, tmp_path):
+        """Creating a pane drops the cached snapshot"""
+        before = manager.snapshot()
+        pane_id = manager.create_pane_for_agent("agent-x", "Agent X", tmp_path / "x.log")
+
+        assert pane_id not in before
+        assert manager.pane_snapshot(pane_id) is not None
+
+    def test_last_activity_is_per_pane(self, manager):
+        """last_activity comes from each pane's own control-mode output"""
+        cto = manager.pane_snapshot(manager.grid_panes["cto"])["pane_id"]
+        agent = manager.pane_snapshot(manager.grid_panes["agent-1"])["pane_id"]
+        manager._pane_activity.clear()
+        manager._dispatch_output(cto, b"output")
+
+        panes = manager.snapshot(max_age=0)
+        assert panes[cto]["last_activity"] > 0
+        assert panes[agent]["last_activity"] is None
+
+    def test_missing_pane(self, manager):
+        """Unknown panes report as dead"""
+        assert manager.pane_snapshot("%99999") is None
+        assert manager.get_pane_status("%99999")["dead"] is True
+        assert manager.is_pane_busy("%99999") is False